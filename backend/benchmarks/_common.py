@@ -0,0 +1,55 @@
+"""Shared helpers for the benchmark scripts in this directory."""
+
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+# Benchmarks import the agent modules the same way `src/agent.py` does
+SRC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"
+)
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[k]
+
+
+class LoopLagProbe:
+    """Measures event-loop lag by timing how late a short periodic sleep wakes up."""
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.samples_ms: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.samples_ms.append(max(0.0, lag) * 1000)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def summary(self) -> str:
+        s = self.samples_ms
+        return (
+            f"loop lag p50={percentile(s, 50):.3f}ms p99={percentile(s, 99):.3f}ms "
+            f"max={max(s, default=0.0):.3f}ms ({len(s)} samples)"
+        )
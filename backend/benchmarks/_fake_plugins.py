@@ -0,0 +1,467 @@
+"""Deterministic stand-ins for the STT, LLM, TTS, VAD and room audio of a session.
+
+Everything is driven by a ``Customer``: the load test calls
+``customer.say(text)`` and the fakes behave as if a person had spoken that
+sentence into the room:
+
+- ``FakeAudioInput`` delivers silent frames at real time, like the room's
+  microphone track
+- ``FakeVAD`` runs one "inference" per ``update_interval`` of audio and
+  reports speech while the customer is talking; END_OF_SPEECH follows after
+  ``silence`` seconds of quiet, like silero's ``min_silence_duration``
+- ``FakeSTT`` streams a FINAL_TRANSCRIPT ``delay`` seconds after the
+  customer stops talking
+- ``ScriptedLLM`` answers from the customer's script: it waits ``ttft``, then
+  either calls the scripted tool or streams a reply at ``tokens_per_s``
+- ``FakeTTS`` waits ``ttfb``, then produces silence for the text (~60 ms per
+  character) at ``realtime`` x real time
+- ``FakeAudioOutput`` "plays" the agent's audio at real time and reports
+  playout, so the agent states and interruptions behave as in a room
+
+``speedup`` compresses the human-paced parts (customer speech, agent
+playout, pauses); provider latencies are never scaled.
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+
+from livekit import rtc
+from livekit.agents import APIConnectOptions, llm, stt, tts, utils, vad
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.voice import io
+
+SAMPLE_RATE = 16000
+TTS_SAMPLE_RATE = 24000
+WORDS_PER_SECOND = 2.5
+
+# What the agent asks next, keyed on the "Next: ..." hint in the update_order output
+NEXT_QUESTIONS = (
+    ("customer's name", "May I have your name, please?"),
+    ("what drink", "What would you like to drink today?"),
+    ("what size", "Great choice! What size would you like - small, medium, or large?"),
+    ("what milk", "And which milk would you like?"),
+    ("about extras", "Any extras, like an extra shot or vanilla syrup?"),
+)
+
+
+class Customer:
+    """The person on the other end of one session.
+
+    Args:
+        speedup: Speech runs this many times faster than real time.
+    """
+
+    def __init__(self, *, speedup: float = 1.0) -> None:
+        self.speedup = speedup
+        self.speaking = False
+        self.stopped_at = 0.0
+        self.script: dict[str, Optional[dict] | list[tuple[str, dict]]] = {}
+        # (text, perf_counter time the customer went quiet), consumed by FakeSTT
+        self._utterances: asyncio.Queue[tuple[str, float]] = asyncio.Queue()
+
+    async def say(self, text: str) -> float:
+        """Speak ``text``; returns the perf_counter time the customer went quiet."""
+        self.speaking = True
+        await asyncio.sleep(len(text.split()) / WORDS_PER_SECOND / self.speedup)
+        self.speaking = False
+        self.stopped_at = time.perf_counter()
+        self._utterances.put_nowait((text, self.stopped_at))
+        return self.stopped_at
+
+
+class FakeAudioInput(io.AudioInput):
+    def __init__(self, *, frame_ms: int = 10) -> None:
+        super().__init__(label="fake-microphone")
+        self._frame = rtc.AudioFrame(
+            data=bytes(SAMPLE_RATE * frame_ms // 1000 * 2),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            samples_per_channel=SAMPLE_RATE * frame_ms // 1000,
+        )
+        self._interval = frame_ms / 1000
+        self._next = 0.0
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        now = time.perf_counter()
+        self._next = max(self._next + self._interval, now)
+        await asyncio.sleep(self._next - now)
+        return self._frame
+
+
+class FakeVAD(vad.VAD):
+    def __init__(
+        self,
+        customer: Customer,
+        *,
+        silence: float = 0.55,
+        update_interval: float = 0.032,
+    ) -> None:
+        super().__init__(
+            capabilities=vad.VADCapabilities(update_interval=update_interval)
+        )
+        self.customer = customer
+        self.silence = silence
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @property
+    def provider(self) -> str:
+        return "load-test"
+
+    def stream(self) -> "FakeVADStream":
+        return FakeVADStream(self)
+
+
+class FakeVADStream(vad.VADStream):
+    async def _main_task(self) -> None:
+        fake: FakeVAD = self._vad
+        customer = fake.customer
+        window = fake.capabilities.update_interval
+        pending = 0.0
+        samples = 0
+        speaking = False
+        speech = silence = 0.0
+        async for frame in self._input_ch:
+            if not isinstance(frame, rtc.AudioFrame):
+                continue
+            samples += frame.samples_per_channel
+            pending += frame.duration
+            if pending < window:
+                continue
+            step, pending = pending, 0.0
+            now = time.time()
+            if customer.speaking:
+                speech += step
+                silence = 0.0
+                if not speaking:
+                    speaking = True
+                    self._send(
+                        vad.VADEventType.START_OF_SPEECH,
+                        samples,
+                        now,
+                        speech,
+                        0.0,
+                        True,
+                    )
+            else:
+                silence += step
+            self._send(
+                vad.VADEventType.INFERENCE_DONE,
+                samples,
+                now,
+                speech,
+                silence,
+                speaking,
+                raw_speech=step if customer.speaking else 0.0,
+            )
+            if speaking and silence >= fake.silence:
+                speaking = False
+                self._send(
+                    vad.VADEventType.END_OF_SPEECH, samples, now, speech, silence, False
+                )
+                speech = 0.0
+
+    def _send(
+        self, kind, samples, now, speech, silence, speaking, *, raw_speech: float = 0.0
+    ) -> None:
+        self._event_ch.send_nowait(
+            vad.VADEvent(
+                type=kind,
+                samples_index=samples,
+                timestamp=now,
+                speech_duration=speech,
+                silence_duration=silence,
+                speaking=speaking,
+                probability=1.0 if speaking else 0.0,
+                raw_accumulated_speech=raw_speech,
+            )
+        )
+
+
+class FakeSTT(stt.STT):
+    def __init__(self, customer: Customer, *, delay: float = 0.15) -> None:
+        super().__init__(
+            capabilities=stt.STTCapabilities(streaming=True, interim_results=False)
+        )
+        self.customer = customer
+        self.delay = delay
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @property
+    def provider(self) -> str:
+        return "load-test"
+
+    async def _recognize_impl(
+        self, buffer, *, language=None, conn_options=DEFAULT_API_CONNECT_OPTIONS
+    ):
+        raise NotImplementedError("the load test only streams")
+
+    def stream(
+        self,
+        *,
+        language=None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ):
+        return FakeRecognizeStream(stt=self, conn_options=conn_options)
+
+
+class FakeRecognizeStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        async def _drain() -> None:
+            async for _ in self._input_ch:
+                pass
+
+        fake: FakeSTT = self._stt
+        drain = asyncio.create_task(_drain())
+        try:
+            while True:
+                text, stopped_at = await fake.customer._utterances.get()
+                await asyncio.sleep(
+                    max(0.0, stopped_at + fake.delay - time.perf_counter())
+                )
+                self._event_ch.send_nowait(
+                    stt.SpeechEvent(
+                        type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                        alternatives=[
+                            stt.SpeechData(language="en", text=text, confidence=1.0)
+                        ],
+                    )
+                )
+                self._event_ch.send_nowait(
+                    stt.SpeechEvent(type=stt.SpeechEventType.END_OF_SPEECH)
+                )
+        finally:
+            await utils.aio.cancel_and_wait(drain)
+
+
+class ScriptedLLM(llm.LLM):
+    """Plays the model's side of the order flow from the customer's script.
+
+    A customer turn whose script entry has arguments becomes one
+    ``update_order`` call, a ``None`` entry (the customer's "yes") becomes
+    ``save_order`` and a list of ``(tool, arguments)`` pairs becomes those
+    calls in one response (a group order: ``update_order`` plus ``add_item``
+    per further drink). After the order tools fill the last field it calls
+    ``confirm_order``; every other tool result is answered with speech.
+
+    ``requests`` counts the chat requests made so far.
+    """
+
+    def __init__(
+        self, customer: Customer, *, ttft: float = 0.45, tokens_per_s: float = 80.0
+    ) -> None:
+        super().__init__()
+        self.customer = customer
+        self.ttft = ttft
+        self.tokens_per_s = tokens_per_s
+        self.requests = 0
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    def chat(
+        self,
+        *,
+        chat_ctx,
+        tools=None,
+        conn_options=DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ):
+        self.requests += 1
+        return ScriptedStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options
+        )
+
+
+ORDER_TOOLS = ("update_order", "add_item", "remove_item")
+
+
+class ScriptedStream(llm.LLMStream):
+    def _next_action(self) -> tuple[list[tuple[str, dict]], str]:
+        """(tool calls, spoken text) for this request."""
+        # the agent's ORDER STATE and EARLIER ORDERS notes are not part of the dialogue
+        items = [
+            item
+            for item in self._chat_ctx.items
+            if not (
+                item.type == "message"
+                and item.role == "user"
+                and (item.text_content or "").startswith(
+                    ("[ORDER STATE", "[EARLIER ORDERS")
+                )
+            )
+        ]
+        last = items[-1]
+        if last.type == "function_call_output":
+            if last.name in ORDER_TOOLS and "All details are filled" in last.output:
+                return [("confirm_order", {})], ""
+            if last.name in ORDER_TOOLS:
+                for hint, question in NEXT_QUESTIONS:
+                    if hint in last.output:
+                        return [], question
+            return [], last.output
+
+        utterance = next(
+            item.text_content
+            for item in reversed(items)
+            if item.type == "message" and item.role == "user"
+        )
+        script = self._llm.customer.script
+        if utterance not in script:
+            return [], "Sorry, could you say that again?"
+        arguments = script[utterance]
+        if arguments is None:
+            return [("save_order", {})], ""
+        if isinstance(arguments, list):
+            return arguments, ""
+        return [("update_order", arguments)], ""
+
+    def _tool_call(self, tool: str, arguments: dict) -> llm.FunctionToolCall:
+        # models send every parameter, with null for the ones they leave unset
+        function = next(
+            t for t in self._tools if llm.utils.get_function_info(t).name == tool
+        )
+        model = llm.utils.function_arguments_to_pydantic_model(function)
+        arguments = dict.fromkeys(model.model_fields) | arguments
+        return llm.FunctionToolCall(
+            name=tool, arguments=json.dumps(arguments), call_id=utils.shortuuid("call_")
+        )
+
+    async def _run(self) -> None:
+        scripted: ScriptedLLM = self._llm
+        calls, text = self._next_action()
+        await asyncio.sleep(scripted.ttft)
+        if calls:
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=utils.shortuuid(),
+                    delta=llm.ChoiceDelta(
+                        role="assistant",
+                        tool_calls=[
+                            self._tool_call(tool, arguments)
+                            for tool, arguments in calls
+                        ],
+                    ),
+                )
+            )
+            return
+
+        words = text.split(" ")
+        for i in range(0, len(words), 4):
+            if i:
+                await asyncio.sleep(4 / scripted.tokens_per_s)
+            chunk = " ".join(words[i : i + 4]) + (" " if i + 4 < len(words) else "")
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=utils.shortuuid(),
+                    delta=llm.ChoiceDelta(role="assistant", content=chunk),
+                )
+            )
+
+
+class FakeTTS(tts.TTS):
+    def __init__(self, *, ttfb: float = 0.25, realtime: float = 4.0) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=TTS_SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.ttfb = ttfb
+        self.realtime = realtime
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @property
+    def provider(self) -> str:
+        return "load-test"
+
+    def synthesize(
+        self, text, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ):
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        fake: FakeTTS = self._tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=TTS_SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        await asyncio.sleep(fake.ttfb)
+        chunk = bytes(TTS_SAMPLE_RATE // 10 * 2)  # 100 ms
+        for i in range(max(1, len(self._input_text) * 60 // 100)):
+            if i:
+                await asyncio.sleep(0.1 / fake.realtime)
+            output_emitter.push(chunk)
+        output_emitter.flush()
+
+
+class FakeAudioOutput(io.AudioOutput):
+    """Plays segments back to back at ``speedup`` x real time.
+
+    ``first_frame_at`` is the perf_counter time of the first frame captured
+    after ``mark()``, which is how the load test measures response latency.
+    """
+
+    def __init__(self, *, speedup: float = 1.0) -> None:
+        super().__init__(
+            label="fake-speaker", capabilities=io.AudioOutputCapabilities(pause=False)
+        )
+        self.speedup = speedup
+        self.first_frame_at: Optional[float] = None
+        self._segment_start: Optional[float] = None
+        self._segment_audio = 0.0
+        self._playout_end = 0.0
+        self._playing: dict[asyncio.Task, float] = {}
+
+    def mark(self) -> None:
+        self.first_frame_at = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        now = time.perf_counter()
+        if self.first_frame_at is None:
+            self.first_frame_at = now
+        if self._segment_start is None:
+            self._segment_start = max(now, self._playout_end)
+            self._segment_audio = 0.0
+        self._segment_audio += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._segment_start is None:
+            return
+        audio = self._segment_audio
+        self._playout_end = self._segment_start + audio / self.speedup
+        task = asyncio.create_task(self._play(self._playout_end, audio))
+        self._playing[task] = audio
+        task.add_done_callback(lambda t: self._playing.pop(t, None))
+        self._segment_start = None
+
+    async def _play(self, end: float, audio: float) -> None:
+        await asyncio.sleep(max(0.0, end - time.perf_counter()))
+        self.on_playback_finished(playback_position=audio, interrupted=False)
+
+    def clear_buffer(self) -> None:
+        for task in list(self._playing):
+            task.cancel()
+            self._playing.pop(task)
+            self.on_playback_finished(playback_position=0.0, interrupted=True)
+        if self._segment_start is not None:
+            super().flush()
+            self._segment_start = None
+            self.on_playback_finished(playback_position=0.0, interrupted=True)
+        self._playout_end = time.perf_counter()
@@ -0,0 +1,239 @@
+"""LLM requests and wall-clock time for a 4-drink group order, one order per drink vs one cart.
+
+Runs a real ``AgentSession`` with ``CoffeeBarista`` against the fake room
+audio, VAD, STT, scripted LLM and TTS of ``_fake_plugins.py`` (see
+``load_test.py``). The customer orders the same four drinks three ways:
+
+- separate: four complete orders, each with its own name, recap, "yes",
+  token, journal record and receipt (the only way before carts)
+- cart, one per turn: the first drink via ``update_order``, every further
+  one in its own turn via ``add_item``; one recap and "yes" at the end
+- cart, one utterance: all four drinks in one sentence, answered with
+  ``update_order`` + 3 ``add_item`` calls in one LLM response
+
+Reported per flow: customer turns, LLM requests, wall-clock time from the
+first word to the end of the last reply, and what was saved (journal
+records, drinks, receipts).
+
+    uv run python benchmarks/bench_cart_order.py --speedup 1
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from _common import SRC_DIR  # noqa: F401  (puts src/ on sys.path)
+
+DRINKS = [
+    (
+        "a large latte with oat milk, no extras",
+        {"drink_type": "latte", "size": "large", "milk": "oat", "extras": []},
+    ),
+    (
+        "a small cappuccino with almond milk and vanilla syrup",
+        {
+            "drink_type": "cappuccino",
+            "size": "small",
+            "milk": "almond",
+            "extras": ["vanilla syrup"],
+        },
+    ),
+    (
+        "a medium cold brew, black, no extras",
+        {"drink_type": "cold brew", "size": "medium", "milk": "none", "extras": []},
+    ),
+    (
+        "a medium iced latte with skim milk and caramel drizzle",
+        {
+            "drink_type": "iced latte",
+            "size": "medium",
+            "milk": "skim",
+            "extras": ["caramel drizzle"],
+        },
+    ),
+]
+NAME = "Ravi"
+
+
+def separate_orders() -> list[tuple[str, object]]:
+    turns = []
+    for i, (text, arguments) in enumerate(DRINKS):
+        turns.append((f"Order {i + 1} for {NAME}: {text}", {"name": NAME, **arguments}))
+        turns.append((f"Yes, lock in order {i + 1}", None))
+    return turns
+
+
+def cart_per_turn() -> list[tuple[str, object]]:
+    (first, first_args), *rest = DRINKS
+    turns = [(f"Hi, I'm {NAME}, {first}", {"name": NAME, **first_args})]
+    turns += [(f"Also {text}", [("add_item", arguments)]) for text, arguments in rest]
+    turns.append(("Yes, that's everything", None))
+    return turns
+
+
+def cart_one_utterance() -> list[tuple[str, object]]:
+    text = f"Hi, I'm {NAME}, four drinks please: " + "; ".join(
+        text for text, _ in DRINKS
+    )
+    calls = [("update_order", {"name": NAME, **DRINKS[0][1]})]
+    calls += [("add_item", arguments) for _, arguments in DRINKS[1:]]
+    return [(text, calls), ("Yes, that's everything", None)]
+
+
+FLOWS = (
+    ("separate", separate_orders),
+    ("cart, one per turn", cart_per_turn),
+    ("cart, one utterance", cart_one_utterance),
+)
+
+
+async def run_flow(turns: list[tuple[str, object]], args) -> dict:
+    from _fake_plugins import (
+        Customer,
+        FakeAudioInput,
+        FakeAudioOutput,
+        FakeSTT,
+        FakeTTS,
+        FakeVAD,
+        ScriptedLLM,
+    )
+    from livekit.agents import AgentSession
+
+    import agent
+    from order_journal import read_journal
+    from tts_cache import CachedTTS
+
+    journal = agent.create_order_journal()
+    customer = Customer(speedup=args.speedup)
+    customer.script.update(turns)
+    scripted = ScriptedLLM(
+        customer, ttft=args.ttft_ms / 1000, tokens_per_s=args.tokens_per_s
+    )
+    session = AgentSession(
+        stt=FakeSTT(customer, delay=args.stt_ms / 1000),
+        llm=scripted,
+        tts=CachedTTS(
+            FakeTTS(ttfb=args.tts_ttfb_ms / 1000),
+            agent.create_tts_cache(),
+            voice=agent.TTS_VOICE,
+            style=agent.TTS_STYLE,
+            phrases=agent.PRECOMPUTED_PHRASES,
+            sentence_tokenizer=agent.create_sentence_tokenizer(),
+            text_pacing=True,
+        ),
+        vad=FakeVAD(customer, silence=args.vad_silence_ms / 1000),
+        turn_detection="vad",
+    )
+    session.input.audio = FakeAudioInput()
+    session.output.audio = FakeAudioOutput(speedup=args.speedup)
+
+    changed = asyncio.Event()
+    spoke = False
+
+    def _on_state(ev) -> None:
+        nonlocal spoke
+        if ev.new_state == "speaking":
+            spoke = True
+        changed.set()
+
+    session.on("agent_state_changed", _on_state)
+
+    async def agent_replied() -> None:
+        while not (spoke and session.agent_state == "listening"):
+            changed.clear()
+            await changed.wait()
+
+    await session.start(agent=agent.CoffeeBarista(order_journal=journal))
+    try:
+        await asyncio.wait_for(agent_replied(), args.turn_timeout)  # greeting
+        requests = scripted.requests
+        started = time.perf_counter()
+        for utterance, _ in turns:
+            await asyncio.sleep(args.think_ms / 1000 / args.speedup)
+            spoke = False
+            await customer.say(utterance)
+            await asyncio.wait_for(agent_replied(), args.turn_timeout)
+        wall = time.perf_counter() - started
+    finally:
+        await session.aclose()
+    await journal.aflush()
+    journal.close()
+
+    orders = read_journal(agent.ORDERS_DIR)
+    saved = [
+        (item["drinkType"], item["size"], item["milk"], item["extras"])
+        for order in orders
+        for item in order["items"]
+    ]
+    expected = [
+        (a["drink_type"].title(), a["size"], a["milk"], a["extras"]) for _, a in DRINKS
+    ]
+    return {
+        "correct": saved == expected,
+        "turns": len(turns),
+        "llm_requests": scripted.requests - requests,
+        "wall_s": wall,
+        "records": len(orders),
+        "drinks": sum(len(order["items"]) for order in orders),
+        "tokens": len({order["token_number"] for order in orders}),
+        "receipts": len(
+            [f for f in os.listdir(agent.ORDERS_DIR) if f.endswith(".html")]
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--speedup",
+        type=float,
+        default=1.0,
+        help="human-paced parts run this much faster",
+    )
+    parser.add_argument("--think-ms", type=float, default=400.0)
+    parser.add_argument("--stt-ms", type=float, default=150.0)
+    parser.add_argument("--vad-silence-ms", type=float, default=550.0)
+    parser.add_argument("--ttft-ms", type=float, default=450.0)
+    parser.add_argument("--tokens-per-s", type=float, default=80.0)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=250.0)
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # save_order logs an error per order because there is no room to send the receipt to
+    logging.getLogger("agent").setLevel(logging.CRITICAL)
+    logging.getLogger("livekit.agents").setLevel(logging.ERROR)
+
+    workdir = tempfile.mkdtemp(prefix="bench-cart-")
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts-cache")
+    os.environ["ORDERS_DIR"] = workdir
+    import agent
+
+    print(
+        f"4 drinks, speedup {args.speedup}x, LLM TTFT {args.ttft_ms:.0f} ms, "
+        f"STT {args.stt_ms:.0f} ms, TTS TTFB {args.tts_ttfb_ms:.0f} ms"
+    )
+    print(
+        f"{'flow':<22}{'turns':>6}{'LLM req':>9}{'wall s':>8}{'records':>9}{'drinks':>8}"
+        f"{'tokens':>8}{'receipts':>10}  saved as ordered"
+    )
+    for label, flow in FLOWS:
+        # a fresh order directory (journal, store, token counters) per flow
+        agent.ORDERS_DIR = os.path.join(
+            workdir, label.replace(", ", "-").replace(" ", "_")
+        )
+        agent.ORDER_DB_PATH = os.path.join(agent.ORDERS_DIR, "orders.db")
+        r = asyncio.run(run_flow(flow(), args))
+        print(
+            f"{label:<22}{r['turns']:>6}{r['llm_requests']:>9}{r['wall_s']:>8.1f}{r['records']:>9}"
+            f"{r['drinks']:>8}{r['tokens']:>8}{r['receipts']:>10}  {'yes' if r['correct'] else 'NO'}"
+        )
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
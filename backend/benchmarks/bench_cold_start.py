@@ -0,0 +1,186 @@
+"""Job start to first agent audio frame, per-job setup vs the prewarm stage.
+
+Runs offline against local stub providers. A stub Murf endpoint answers the
+real ``murf.TTS`` plugin's HTTP synthesis request: it waits ``--tts-ms``,
+then streams PCM. It sits behind a local TCP proxy that delays every new
+connection by ``--connect-ms``, standing in for the DNS, TCP and TLS
+handshakes to a real provider; reused keep-alive connections skip that
+delay. Joining the room is simulated with ``--room-ms``.
+
+Each trial is one job process. It gets a fresh ``http_context``, as the
+LiveKit job runner gives every job, so it starts with no pooled connections.
+
+- per-job: the old entrypoint. It builds silero VAD, the Deepgram STT,
+  Gemini LLM and Murf TTS clients and BVC, joins the room, then speaks the
+  greeting over a cold connection
+- prewarm: the same objects are built in ``prewarm`` before the job is
+  assigned (timed separately). The job starts ``ConnectionWarmer``
+  alongside the room join and speaks the greeting over the warmed connection
+
+The timer starts at job assignment and stops at the first greeting audio
+frame.
+
+    uv run python benchmarks/bench_cold_start.py --connect-ms 150 --trials 10
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from _common import percentile
+
+for key in ("DEEPGRAM_API_KEY", "GOOGLE_API_KEY", "MURF_API_KEY"):
+    os.environ.setdefault(key, "stub")
+
+from aiohttp import web  # noqa: E402
+from livekit import rtc  # noqa: E402
+from livekit.agents import tokenize, tts  # noqa: E402
+from livekit.agents.utils import http_context  # noqa: E402
+from livekit.plugins import deepgram, google, murf, noise_cancellation, silero  # noqa: E402
+
+import agent  # noqa: E402
+from warmup import ConnectionWarmer  # noqa: E402
+
+SAMPLE_RATE = 24000
+
+
+async def start_stub_provider(tts_ms: float) -> web.AppRunner:
+    async def speech(request: web.Request) -> web.StreamResponse:
+        await request.json()
+        await asyncio.sleep(tts_ms / 1000)
+        resp = web.StreamResponse()
+        await resp.prepare(request)
+        for _ in range(5):
+            await resp.write(bytes(SAMPLE_RATE // 10 * 2))  # 100 ms of silence
+        await resp.write_eof()
+        return resp
+
+    async def anything(request: web.Request) -> web.Response:
+        return web.Response(status=404, text="not found")
+
+    app = web.Application()
+    app.router.add_post("/v1/speech/stream", speech)
+    app.router.add_route("*", "/{tail:.*}", anything)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def start_handshake_proxy(
+    upstream_port: int, connect_ms: float
+) -> asyncio.base_events.Server:
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer) -> None:
+        await asyncio.sleep(
+            connect_ms / 1000
+        )  # handshake round-trips of a new connection
+        upstream_reader, upstream_writer = await asyncio.open_connection(
+            "127.0.0.1", upstream_port
+        )
+        await asyncio.gather(
+            pipe(client_reader, upstream_writer), pipe(upstream_reader, client_writer)
+        )
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def build_models(base_url: str) -> dict:
+    """Everything the session needs that can be built ahead of a job."""
+    return {
+        "vad": silero.VAD.load(),
+        "stt": deepgram.STT(model="nova-3"),
+        "llm": google.LLM(model="gemini-2.5-flash"),
+        "tts": tts.StreamAdapter(
+            tts=murf.TTS(
+                voice=agent.TTS_VOICE, style=agent.TTS_STYLE, base_url=base_url
+            ),
+            sentence_tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+        ),
+        "noise_cancellation": noise_cancellation.BVC(),
+    }
+
+
+async def first_greeting_frame(session_tts: tts.TTS) -> None:
+    async with session_tts.stream() as stream:
+        stream.push_text(agent.GREETING)
+        stream.end_input()
+        async for audio in stream:
+            if isinstance(audio.frame, rtc.AudioFrame):
+                return
+
+
+async def job(mode: str, base_url: str, room_ms: float, prewarmed: dict) -> float:
+    http_context._new_session_ctx()
+    start = time.perf_counter()
+    try:
+        if mode == "per-job":
+            models = build_models(base_url)
+            await asyncio.sleep(room_ms / 1000)
+        else:
+            models = prewarmed
+            warmer = ConnectionWarmer([base_url])
+            warmer.start()
+            await asyncio.sleep(room_ms / 1000)
+            await warmer.warmed.wait()
+        await first_greeting_frame(models["tts"])
+        elapsed = (time.perf_counter() - start) * 1000
+        if mode == "prewarm":
+            await warmer.aclose()
+        return elapsed
+    finally:
+        await http_context._close_http_ctx()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connect-ms", type=float, default=150.0)
+    parser.add_argument("--tts-ms", type=float, default=120.0)
+    parser.add_argument("--room-ms", type=float, default=200.0)
+    parser.add_argument("--trials", type=int, default=10)
+    args = parser.parse_args()
+
+    runner = await start_stub_provider(args.tts_ms)
+    upstream_port = runner.addresses[0][1]
+    proxy = await start_handshake_proxy(upstream_port, args.connect_ms)
+    base_url = f"http://127.0.0.1:{proxy.sockets[0].getsockname()[1]}"
+
+    build_models(base_url)  # first-import costs are paid once per worker, not per job
+    prewarm_ms = []
+    results: dict[str, list[float]] = {"per-job": [], "prewarm": []}
+    for _ in range(args.trials):
+        start = time.perf_counter()
+        prewarmed = build_models(base_url)
+        prewarm_ms.append((time.perf_counter() - start) * 1000)
+        for mode in results:
+            results[mode].append(await job(mode, base_url, args.room_ms, prewarmed))
+
+    print(
+        f"stub providers: connect {args.connect_ms:.0f} ms, TTS {args.tts_ms:.0f} ms, "
+        f"room join {args.room_ms:.0f} ms, {args.trials} trials"
+    )
+    print(
+        f"prewarm stage (before job assignment): p50 {percentile(prewarm_ms, 50):6.1f} ms"
+    )
+    for mode, samples in results.items():
+        print(
+            f"{mode:8s} job start -> first audio frame: p50 {percentile(samples, 50):6.1f} ms   "
+            f"p95 {percentile(samples, 95):6.1f} ms"
+        )
+
+    proxy.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
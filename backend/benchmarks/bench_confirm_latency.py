@@ -0,0 +1,217 @@
+"""Latency from the customer's "yes" to the spoken confirmation, with and without the speculative save.
+
+Runs a real ``AgentSession`` with ``CoffeeBarista`` against the fake room
+audio, VAD, STT, scripted LLM and TTS of ``_fake_plugins.py`` (see
+``load_test.py``). Every order runs in a fresh session with a fresh
+``TokenAllocator``, as every job process starts without a token lease, so its
+first save takes the counter file's lock and fsync. Every ``--change-every``
+th customer changes the size after the recap, which makes the agent confirm
+again and throws the first speculative save away.
+
+Reported per mode: time from the end of "yes" to the agent's first audio
+frame, ``save_order``'s own duration (``tool_duration_seconds``), and
+whether every saved record matches what was ordered last. ``--fsync-ms``
+adds a blocking delay to every ``os.fsync`` in this process, standing in for
+slow or network-attached storage.
+
+    uv run python benchmarks/bench_confirm_latency.py --orders 12 --fsync-ms 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from _common import SRC_DIR, percentile  # noqa: F401  (puts src/ on sys.path)
+
+
+def script(n: int, change: bool) -> list[tuple[str, object]]:
+    turns = [
+        (
+            f"Hi, I'm Guest {n}, a large latte with oat milk, no extras",
+            {
+                "name": f"Guest {n}",
+                "drink_type": "latte",
+                "size": "large",
+                "milk": "oat",
+                "extras": [],
+            },
+        )
+    ]
+    if change:
+        turns.append((f"Actually make that a small one, guest {n}", {"size": "small"}))
+    turns.append((f"Yes, lock it in for guest {n}", None))
+    return turns
+
+
+async def run_order(turns, args) -> tuple[float, str]:
+    """(yes-to-first-audio ms, size saved) for one order in its own session."""
+    from _fake_plugins import (
+        Customer,
+        FakeAudioInput,
+        FakeAudioOutput,
+        FakeSTT,
+        FakeTTS,
+        FakeVAD,
+        ScriptedLLM,
+    )
+    from livekit.agents import AgentSession
+
+    import agent
+    from order_journal import read_journal
+    from tts_cache import CachedTTS
+
+    journal = agent.create_order_journal()
+    customer = Customer(speedup=args.speedup)
+    customer.script.update(turns)
+    output = FakeAudioOutput(speedup=args.speedup)
+    session = AgentSession(
+        stt=FakeSTT(customer, delay=args.stt_ms / 1000),
+        llm=ScriptedLLM(
+            customer, ttft=args.ttft_ms / 1000, tokens_per_s=args.tokens_per_s
+        ),
+        tts=CachedTTS(
+            FakeTTS(ttfb=args.tts_ttfb_ms / 1000),
+            agent.create_tts_cache(),
+            voice=agent.TTS_VOICE,
+            style=agent.TTS_STYLE,
+            phrases=agent.PRECOMPUTED_PHRASES,
+            sentence_tokenizer=agent.create_sentence_tokenizer(),
+            text_pacing=True,
+        ),
+        vad=FakeVAD(customer, silence=args.vad_silence_ms / 1000),
+        turn_detection="vad",
+    )
+    session.input.audio = FakeAudioInput()
+    session.output.audio = output
+
+    changed = asyncio.Event()
+    spoke = False
+
+    def _on_state(ev) -> None:
+        nonlocal spoke
+        if ev.new_state == "speaking":
+            spoke = True
+        changed.set()
+
+    session.on("agent_state_changed", _on_state)
+
+    async def agent_replied() -> None:
+        while not (spoke and session.agent_state == "listening"):
+            changed.clear()
+            await changed.wait()
+
+    # a new job process: nothing leased yet
+    await session.start(
+        agent=agent.CoffeeBarista(
+            order_journal=journal,
+            token_allocator=agent.create_token_allocator(),
+        )
+    )
+    latency = 0.0
+    try:
+        await asyncio.wait_for(agent_replied(), args.turn_timeout)  # greeting
+        for utterance, _ in turns:
+            await asyncio.sleep(args.think_ms / 1000 / args.speedup)
+            spoke = False
+            output.mark()
+            stopped = await customer.say(utterance)
+            await asyncio.wait_for(agent_replied(), args.turn_timeout)
+            latency = (output.first_frame_at - stopped) * 1000
+    finally:
+        await session.aclose()
+    await journal.aflush()
+    journal.close()
+    saved = [
+        order
+        for order in read_journal(agent.ORDERS_DIR)
+        if order["name"] == turns[0][1]["name"]
+    ]
+    return latency, saved[0]["items"][0]["size"] if len(saved) == 1 else "?"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=12)
+    parser.add_argument("--change-every", type=int, default=4)
+    parser.add_argument("--fsync-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="interleaved rounds of both modes"
+    )
+    parser.add_argument(
+        "--speedup",
+        type=float,
+        default=4.0,
+        help="human-paced parts run this much faster",
+    )
+    parser.add_argument("--think-ms", type=float, default=400.0)
+    parser.add_argument("--stt-ms", type=float, default=150.0)
+    parser.add_argument("--vad-silence-ms", type=float, default=550.0)
+    parser.add_argument("--ttft-ms", type=float, default=450.0)
+    parser.add_argument("--tokens-per-s", type=float, default=80.0)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=250.0)
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # save_order logs an error per order because there is no room to send the receipt to
+    logging.getLogger("agent").setLevel(logging.CRITICAL)
+    logging.getLogger("livekit.agents").setLevel(logging.ERROR)
+
+    if args.fsync_ms:
+        fsync = os.fsync
+
+        def slow_fsync(fd) -> None:
+            time.sleep(args.fsync_ms / 1000)
+            fsync(fd)
+
+        os.fsync = slow_fsync
+
+    workdir = tempfile.mkdtemp(prefix="bench-confirm-")
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts-cache")
+    os.environ["ORDERS_DIR"] = workdir
+    import agent
+    from turn_metrics import PROCESS_METRICS
+
+    tool = PROCESS_METRICS.histogram("tool_duration_seconds", {"tool": "save_order"})
+    results = {"without": [], "speculative": []}
+    tool_ms = {"without": [], "speculative": []}
+    correct = {"without": 0, "speculative": 0}
+    for round_ in range(args.repeat):
+        for mode in results:
+            agent.AGENT_SPECULATIVE_SAVE = mode == "speculative"
+            agent.ORDERS_DIR = os.path.join(workdir, f"{mode}-{round_}")
+            agent.ORDER_DB_PATH = os.path.join(agent.ORDERS_DIR, "orders.db")
+            for n in range(args.orders):
+                change = (
+                    args.change_every and n % args.change_every == args.change_every - 1
+                )
+                before = tool.count, tool.total
+                latency, size = asyncio.run(run_order(script(n, change), args))
+                results[mode].append(latency)
+                tool_ms[mode].append(
+                    (tool.total - before[1]) / max(1, tool.count - before[0]) * 1000
+                )
+                correct[mode] += size == ("small" if change else "large")
+
+    print(
+        f"{args.orders} orders x {args.repeat}, each in a fresh session; 1 in {args.change_every} "
+        f"changed after the recap; extra fsync delay {args.fsync_ms:.0f} ms"
+    )
+    print(
+        "mode          yes->audio p50    p95    max   save_order p50    max  saved as ordered"
+    )
+    for mode, latencies in results.items():
+        print(
+            f"{mode:<13} {percentile(latencies, 50):13.0f} {percentile(latencies, 95):6.0f} "
+            f"{max(latencies):6.0f} {percentile(tool_ms[mode], 50):16.2f} {max(tool_ms[mode]):6.2f}"
+            f"  {correct[mode]}/{len(latencies)}"
+        )
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Prompt size over 100 consecutive orders in one kiosk session, with and without context pruning.
+
+Runs a real ``AgentSession`` with ``CoffeeBarista`` against the fake room
+audio, VAD, STT, scripted LLM and TTS of ``_fake_plugins.py`` (see
+``load_test.py``). One session serves ``--orders`` customers back to back,
+each with a one-sentence order and a "yes". Every LLM request's chat context
+is measured with the ``prompt_budget`` estimator as it enters ``llm_node``
+(tool schemas excluded; they are the same for every request).
+
+- keep all: ``AGENT_CONTEXT_BUDGET_TOKENS=0``, the chat history grows forever
+- pruned: the default budget; saved orders become one EARLIER ORDERS note
+
+Also checks that every order was saved with its own token.
+
+    uv run python benchmarks/bench_context_pruning.py --orders 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from _common import SRC_DIR  # noqa: F401  (puts src/ on sys.path)
+
+DRINKS = (
+    (
+        "a large latte with oat milk, no extras",
+        {"drink_type": "latte", "size": "large", "milk": "oat", "extras": []},
+    ),
+    (
+        "a small cappuccino with almond milk and vanilla syrup",
+        {
+            "drink_type": "cappuccino",
+            "size": "small",
+            "milk": "almond",
+            "extras": ["vanilla syrup"],
+        },
+    ),
+    (
+        "a medium cold brew, black, no extras",
+        {"drink_type": "cold brew", "size": "medium", "milk": "none", "extras": []},
+    ),
+)
+
+
+def kiosk_day(orders: int) -> list[tuple[str, object]]:
+    turns = []
+    for n in range(orders):
+        text, arguments = DRINKS[n % len(DRINKS)]
+        turns.append(
+            (f"Hi, I'm Guest {n}, {text}", {"name": f"Guest {n}", **arguments})
+        )
+        turns.append((f"Yes, that's right for order {n}", None))
+    return turns
+
+
+async def run_session(turns, budget: int, args) -> dict:
+    from _fake_plugins import (
+        Customer,
+        FakeAudioInput,
+        FakeAudioOutput,
+        FakeSTT,
+        FakeTTS,
+        FakeVAD,
+        ScriptedLLM,
+    )
+    from livekit.agents import AgentSession
+
+    import agent
+    from context_pruner import ContextPruner
+    from order_journal import read_journal
+    from prompt_budget import PromptAccountant, estimate_chat_tokens
+    from tts_cache import CachedTTS
+
+    class Recorder(PromptAccountant):
+        def __init__(self) -> None:
+            super().__init__()
+            self.chat_tokens: list[int] = []
+
+        def begin_request(self, chat_ctx, tools) -> int:
+            self.chat_tokens.append(estimate_chat_tokens(chat_ctx))
+            return super().begin_request(chat_ctx, tools)
+
+    journal = agent.create_order_journal()
+    recorder = Recorder()
+    customer = Customer(speedup=args.speedup)
+    customer.script.update(turns)
+    session = AgentSession(
+        stt=FakeSTT(customer, delay=args.stt_ms / 1000),
+        llm=ScriptedLLM(
+            customer, ttft=args.ttft_ms / 1000, tokens_per_s=args.tokens_per_s
+        ),
+        tts=CachedTTS(
+            FakeTTS(ttfb=args.tts_ttfb_ms / 1000),
+            agent.create_tts_cache(),
+            voice=agent.TTS_VOICE,
+            style=agent.TTS_STYLE,
+            phrases=agent.PRECOMPUTED_PHRASES,
+            sentence_tokenizer=agent.create_sentence_tokenizer(),
+            text_pacing=True,
+        ),
+        vad=FakeVAD(customer, silence=args.vad_silence_ms / 1000),
+        turn_detection="vad",
+        # the prompt is what is measured here, not the turn-taking
+        min_endpointing_delay=0.05,
+    )
+    session.input.audio = FakeAudioInput()
+    session.output.audio = FakeAudioOutput(speedup=args.speedup)
+
+    changed = asyncio.Event()
+    spoke = False
+
+    def _on_state(ev) -> None:
+        nonlocal spoke
+        if ev.new_state == "speaking":
+            spoke = True
+        changed.set()
+
+    session.on("agent_state_changed", _on_state)
+
+    async def agent_replied() -> None:
+        while not (spoke and session.agent_state == "listening"):
+            changed.clear()
+            await changed.wait()
+
+    barista = agent.CoffeeBarista(
+        order_journal=journal,
+        prompt_accountant=recorder,
+        context_pruner=ContextPruner(
+            budget, max_orders=agent.AGENT_CONTEXT_SUMMARY_ORDERS
+        ),
+    )
+    await session.start(agent=barista)
+    # requests per order, for the per-order averages below
+    boundaries = []
+    try:
+        await asyncio.wait_for(agent_replied(), args.turn_timeout)  # greeting
+        started = time.perf_counter()
+        for n, (utterance, _) in enumerate(turns):
+            spoke = False
+            await customer.say(utterance)
+            await asyncio.wait_for(agent_replied(), args.turn_timeout)
+            if n % 2:
+                boundaries.append(len(recorder.chat_tokens))
+        wall = time.perf_counter() - started
+        history = len(barista.chat_ctx.items)
+    finally:
+        await session.aclose()
+    await journal.aflush()
+    journal.close()
+
+    orders = read_journal(agent.ORDERS_DIR)
+    per_order, start = [], 0
+    for end in boundaries:
+        requests = recorder.chat_tokens[start:end]
+        per_order.append(max(requests) if requests else 0)
+        start = end
+    return {
+        "per_order": per_order,
+        "requests": len(recorder.chat_tokens),
+        "history": history,
+        "wall_s": wall,
+        "saved": len(orders) == len(boundaries)
+        and len({o["token_number"] for o in orders}) == len(boundaries),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument(
+        "--speedup",
+        type=float,
+        default=20.0,
+        help="human-paced parts run this much faster",
+    )
+    parser.add_argument("--stt-ms", type=float, default=20.0)
+    parser.add_argument("--vad-silence-ms", type=float, default=100.0)
+    parser.add_argument("--ttft-ms", type=float, default=20.0)
+    parser.add_argument("--tokens-per-s", type=float, default=2000.0)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=20.0)
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # save_order logs an error per order because there is no room to send the receipt to
+    logging.getLogger("agent").setLevel(logging.CRITICAL)
+    logging.getLogger("livekit.agents").setLevel(logging.ERROR)
+
+    workdir = tempfile.mkdtemp(prefix="bench-context-")
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts-cache")
+    os.environ["ORDERS_DIR"] = workdir
+    import agent
+
+    marks = sorted(
+        {1, 2, 10, args.orders // 2, args.orders} & set(range(1, args.orders + 1))
+    )
+    print(
+        f"{args.orders} orders in one session; largest chat context (estimated tokens) "
+        f"sent during order N"
+    )
+    print(
+        f"{'context':<22}"
+        + "".join(f"{'#' + str(m):>8}" for m in marks)
+        + f"{'requests':>10}{'items left':>12}{'wall s':>8}  all saved"
+    )
+    for label, budget in (
+        ("keep all", 0),
+        (
+            f"pruned ({agent.AGENT_CONTEXT_BUDGET_TOKENS} tok)",
+            agent.AGENT_CONTEXT_BUDGET_TOKENS,
+        ),
+    ):
+        agent.ORDERS_DIR = os.path.join(workdir, "keep" if not budget else "pruned")
+        agent.ORDER_DB_PATH = os.path.join(agent.ORDERS_DIR, "orders.db")
+        r = asyncio.run(run_session(kiosk_day(args.orders), budget, args))
+        print(
+            f"{label:<22}"
+            + "".join(f"{r['per_order'][m - 1]:>8}" for m in marks)
+            + f"{r['requests']:>10}{r['history']:>12}{r['wall_s']:>8.1f}  {'yes' if r['saved'] else 'NO'}"
+        )
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
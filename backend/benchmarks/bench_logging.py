@@ -0,0 +1,115 @@
+"""Event-loop time spent in logging per order.
+
+"before" replays the old per-order log calls (f-strings plus the 4 KB HTML
+receipt) through a synchronous file handler; "after" replays the current
+lazy calls through the queue-based pipeline from ``log_pipeline``.
+
+    uv run python benchmarks/bench_logging.py --orders 2000
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from _common import percentile
+
+import log_pipeline
+from receipt_renderer import ReceiptRenderer
+
+ORDER = {
+    "drinkType": "Latte",
+    "size": "medium",
+    "milk": "oat",
+    "extras": ["extra shot"],
+    "name": "Sam",
+    "timestamp": "2025-11-23T16:41:18.000000",
+}
+
+
+def old_order_logs(logger: logging.Logger, html: str) -> None:
+    logger.info(f"Set name: {ORDER['name']}")
+    logger.info(f"Set drink type: {ORDER['drinkType']}")
+    logger.info(f"Set size: {ORDER['size']}")
+    logger.info(f"Set milk: {ORDER['milk']}")
+    logger.info(f"Set extras: {ORDER['extras']}")
+    logger.info(f"Order confirmation: {ORDER}")
+    logger.info(f"SAVE_ORDER_JSON: {json.dumps(ORDER, separators=(',', ':'))}")
+    logger.info("TOKEN_NUMBER: BT-20251123-0001")
+    logger.info("HTML_SNIPPET:")
+    logger.info(html)
+    logger.info("END_HTML_SNIPPET")
+    logger.info("Sending HTML as data message to frontend")
+
+
+def new_order_logs(logger: logging.Logger, tools: logging.Logger) -> None:
+    tools.info("Set name: %s", ORDER["name"])
+    tools.info("Set drink type: %s", ORDER["drinkType"])
+    tools.info("Set size: %s", ORDER["size"])
+    tools.info("Set milk: %s", ORDER["milk"])
+    tools.info("Set extras: %s", ORDER["extras"])
+    logger.info("Order confirmation: %s", ORDER)
+    logger.info("SAVE_ORDER_JSON: %s", ORDER)
+    logger.info("TOKEN_NUMBER: %s", "BT-20251123-0001")
+    logger.info("Order queued for %s (receipt %s)", "orders", "order_x.html")
+    logger.info("✅ Receipt sent on %s (%d bytes)", "blue-tokai.receipt", 183)
+
+
+def measure(label: str, orders: int, fn) -> None:
+    samples = []
+    for _ in range(orders):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1e6)
+    print(
+        f"{label:<28} loop time/order p50={percentile(samples, 50):7.1f}us "
+        f"p99={percentile(samples, 99):7.1f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    args = parser.parse_args()
+    html = ReceiptRenderer().render(ORDER, "BT-20251123-0001")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        file_handler = logging.FileHandler(os.path.join(tmp, "agent.log"))
+        file_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s - %(message)s")
+        )
+        root.addHandler(file_handler)
+
+        agent_logger = logging.getLogger("agent")
+        tools_logger = logging.getLogger("agent.tools")
+        measure(
+            "before (sync, HTML logged)",
+            args.orders,
+            lambda: old_order_logs(agent_logger, html),
+        )
+
+        log_pipeline.setup_agent_logging()
+        measure(
+            "after (queue pipeline)",
+            args.orders,
+            lambda: new_order_logs(agent_logger, tools_logger),
+        )
+        log_pipeline.flush_agent_logging()
+
+        log_pipeline.setup_agent_logging(sample_rates={"tools": 0.1})
+        measure(
+            "after + tools sampled at 10%",
+            args.orders,
+            lambda: new_order_logs(agent_logger, tools_logger),
+        )
+        log_pipeline.flush_agent_logging()
+        root.removeHandler(file_handler)
+        file_handler.close()
+
+
+if __name__ == "__main__":
+    main()
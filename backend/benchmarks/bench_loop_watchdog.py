@@ -0,0 +1,189 @@
+"""Overhead and detection accuracy of the event-loop watchdog.
+
+- overhead: wall time of a busy loop (tasks doing small synchronous work
+  between ``await asyncio.sleep(0)``) without the watchdog and with it at
+  several heartbeat intervals, best of ``--repeat`` interleaved runs, and the
+  CPU time of one heartbeat measured on an idle loop
+- detection: deliberate blocking ``time.sleep`` calls in a ``@timed_tool``
+  method, a plain loop callback and a coroutine, plus short ones below the
+  threshold; checks which stalls were reported, the blamed source and the
+  recorded stall time vs the real block (the heartbeat can be posted up to
+  one interval after the block started, so the recorded time is a lower bound)
+
+    uv run python benchmarks/bench_loop_watchdog.py --iterations 200000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from _common import percentile
+
+from loop_watchdog import LoopWatchdog
+from turn_metrics import MetricsRegistry, timed_tool
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def busy_loop(iterations: int, tasks: int) -> float:
+    async def worker(n: int) -> None:
+        total = 0
+        for i in range(n):
+            total += i * i
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(iterations // tasks) for _ in range(tasks)))
+    return time.perf_counter() - start
+
+
+async def timed_run(
+    iterations: int, tasks: int, interval: float
+) -> tuple[float, float]:
+    """Wall seconds of the busy loop and CPU seconds, with a watchdog when ``interval``."""
+    watchdog = None
+    if interval:
+        watchdog = LoopWatchdog(0.1, interval=interval, registry=MetricsRegistry())
+        watchdog.start()
+    cpu = time.process_time()
+    wall = await busy_loop(iterations, tasks)
+    cpu = time.process_time() - cpu
+    if watchdog is not None:
+        await watchdog.aclose()
+    return wall, cpu
+
+
+async def heartbeat_cost(seconds: float, interval: float) -> tuple[float, int]:
+    """CPU microseconds per heartbeat (both threads) on an otherwise idle loop."""
+    registry = MetricsRegistry()
+    idle = time.process_time()
+    await asyncio.sleep(seconds)
+    idle = time.process_time() - idle
+    watchdog = LoopWatchdog(0.1, interval=interval, registry=registry)
+    watchdog.start()
+    cpu = time.process_time()
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - cpu
+    await watchdog.aclose()
+    beats = registry.histogram("loop_lag_seconds").count
+    return (cpu - idle) / beats * 1e6, beats
+
+
+class Tools:
+    @timed_tool
+    async def save_order(self, seconds: float) -> None:
+        time.sleep(seconds)  # stands in for a synchronous file write
+
+
+def blocking_callback(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def blocking_coroutine(seconds: float) -> None:
+    await asyncio.sleep(0)
+    time.sleep(seconds)
+
+
+async def detection(threshold: float, interval: float) -> None:
+    registry = MetricsRegistry()
+    watchdog = LoopWatchdog(
+        threshold, interval=interval, roots=(BENCH_DIR,), registry=registry
+    )
+    watchdog.start()
+    loop = asyncio.get_running_loop()
+    tools = Tools()
+    cases = [
+        ("tool", 0.3, lambda s: tools.save_order(s)),
+        ("callback", 0.3, None),
+        ("coroutine", 0.5, blocking_coroutine),
+        ("tool", threshold / 2, lambda s: tools.save_order(s)),
+        ("callback", threshold / 2, None),
+    ]
+    print(
+        f"threshold {threshold * 1000:.0f} ms, heartbeat every {interval * 1000:.0f} ms"
+    )
+    print(
+        "case       blocked ms  reported  source                                   recorded ms"
+    )
+    for kind, seconds, coro in cases:
+        before = {key: hist.count for key, hist in registry.histograms.items()}
+        await asyncio.sleep(interval * 2)
+        if coro is None:
+            loop.call_soon(blocking_callback, seconds)
+            await asyncio.sleep(0)
+        else:
+            await coro(seconds)
+        # let the delayed heartbeat run
+        await asyncio.sleep(interval * 2)
+        new = [
+            (key, hist)
+            for key, hist in registry.histograms.items()
+            if key.startswith("loop_stall_seconds") and hist.count > before.get(key, 0)
+        ]
+        if new:
+            key, hist = new[0]
+            source = key.partition('source="')[2].rstrip('"}')
+            recorded = f"{hist.quantile(1.0) * 1000:11.0f}"
+        else:
+            source, recorded = "-", "          -"
+        print(
+            f"{kind:10s} {seconds * 1000:10.0f}  {'yes' if new else 'no':8s}  {source:40s} {recorded}"
+        )
+    lag = registry.histogram("loop_lag_seconds")
+    print(
+        f"loop_lag_seconds: {lag.count} heartbeats, p50 {lag.quantile(0.5) * 1e6:.0f} us"
+    )
+    await watchdog.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--tasks", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--threshold-ms", type=float, default=100)
+    parser.add_argument("--interval-ms", type=float, default=100)
+    args = parser.parse_args()
+    # the stall stacks are checked below; keep them out of the output
+    logging.getLogger("agent.watchdog").setLevel(logging.ERROR)
+
+    print(
+        f"busy loop: {args.iterations} iterations in {args.tasks} tasks, best of {args.repeat}"
+    )
+    print("watchdog            wall s    us/iter  overhead  cpu s")
+    configs = (
+        ("off", 0.0),
+        ("every 100 ms", 0.1),
+        ("every 10 ms", 0.01),
+        ("every 1 ms", 0.001),
+    )
+    runs = {label: [] for label, _ in configs}
+    # interleaved, so drift in the machine's speed hits every configuration alike
+    for _ in range(args.repeat):
+        for label, interval in configs:
+            runs[label].append(
+                asyncio.run(timed_run(args.iterations, args.tasks, interval))
+            )
+    base = min(w for w, _ in runs["off"])
+    for label, _ in configs:
+        wall = min(w for w, _ in runs[label])
+        cpu = percentile([c for _, c in runs[label]], 50)
+        print(
+            f"{label:16s} {wall:9.3f} {wall / args.iterations * 1e6:10.2f} "
+            f"{(wall - base) / base:+9.2%} {cpu:6.3f}"
+        )
+
+    per_beat, beats = asyncio.run(heartbeat_cost(3.0, 0.001))
+    print(
+        f"heartbeat cost {per_beat:.1f} us CPU ({beats} beats on an idle loop); "
+        f"at one beat per 100 ms that is {per_beat * 10 / 1e6:.4%} of a core"
+    )
+
+    print()
+    asyncio.run(detection(args.threshold_ms / 1000, args.interval_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Menu catalog: resolution accuracy and lookups/s over noisy STT variants.
+
+The corpus mixes hand-written transcription variants ("capuchino", "oat milk
+please", "frappay"), phrases that must NOT resolve (custom drinks, sizes off
+the menu) and seeded single-edit typos of every menu name. It is resolved
+three ways:
+
+- exact: what the tools did before - lowercase equality with a menu name
+- catalog: ``MenuCatalog`` without its lookup cache (cold path)
+- cached: ``MenuCatalog.resolve`` as the agent calls it (repeated phrases)
+
+    uv run python benchmarks/bench_menu_catalog.py --typos 2000
+"""
+
+import argparse
+import random
+import time
+
+from _common import percentile
+
+from menu_catalog import MENU, MenuCatalog
+
+# (category, heard text, expected canonical name or None)
+VARIANTS = [
+    ("drink", "capuchino", "Cappuccino"),
+    ("drink", "a cappucino please", "Cappuccino"),
+    ("drink", "frappay", "Frappe"),
+    ("drink", "Frappé", "Frappe"),
+    ("drink", "one frapuccino", "Frappe"),
+    ("drink", "expresso", "Espresso"),
+    ("drink", "double espresso", "Espresso"),
+    ("drink", "lattay", "Latte"),
+    ("drink", "a latte", "Latte"),
+    ("drink", "caffe latte", "Latte"),
+    ("drink", "flat wine", "Flat White"),
+    ("drink", "flat-white", "Flat White"),
+    ("drink", "mocca", "Mocha"),
+    ("drink", "the mocha I guess", "Mocha"),
+    ("drink", "cold coffee", "Cold Brew"),
+    ("drink", "coldbrew", "Cold Brew"),
+    ("drink", "your signature cold brew", "Cold Brew"),
+    ("drink", "ice latte", "Iced Latte"),
+    ("drink", "iced lattee", "Iced Latte"),
+    ("drink", "hot cocoa", "Hot Chocolate"),
+    ("drink", "hot chocolat", "Hot Chocolate"),
+    ("drink", "americano coffee", "Americano"),
+    ("drink", "amercano", "Americano"),
+    ("drink", "masala chai", None),
+    ("drink", "green tea", None),
+    ("size", "Large", "large"),
+    ("size", "the biggest one", "large"),
+    ("size", "lárge", "large"),
+    ("size", "venti", "large"),
+    ("size", "medum", "medium"),
+    ("size", "regular size", "medium"),
+    ("size", "a small one", "small"),
+    ("size", "smol", "small"),
+    ("size", "huge", None),
+    ("milk", "oat milk please", "oat"),
+    ("milk", "oats", "oat"),
+    ("milk", "almand milk", "almond"),
+    ("milk", "soya", "soy"),
+    ("milk", "skimmed milk", "skim"),
+    ("milk", "normal milk", "regular"),
+    ("milk", "full cream", "regular"),
+    ("milk", "no milk", "none"),
+    ("milk", "black", "none"),
+    ("milk", "coconut milk", None),
+    ("extra", "extra shot", "extra shot"),
+    ("extra", "double shot", "extra shot"),
+    ("extra", "vanila", "vanilla syrup"),
+    ("extra", "vanilla", "vanilla syrup"),
+    ("extra", "caramel syrup", "caramel drizzle"),
+    ("extra", "carmel drizzle", "caramel drizzle"),
+    ("extra", "whipped creme", "whipped cream"),
+    ("extra", "whip", "whipped cream"),
+    ("extra", "cinnamon", None),
+]
+
+
+def typo(word: str, rng: random.Random) -> str:
+    """One deletion, substitution, duplication or transposition."""
+    i = rng.randrange(len(word))
+    op = rng.choice("dsrt")
+    if op == "d" and len(word) > 4:
+        return word[:i] + word[i + 1 :]
+    if op == "s":
+        return word[:i] + rng.choice("aeiou") + word[i + 1 :]
+    if op == "r":
+        return word[:i] + word[i] + word[i:]
+    if i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+    return word + word[-1]
+
+
+def build_corpus(typos: int, seed: int) -> list[tuple[str, str, "str | None"]]:
+    rng = random.Random(seed)
+    # typos of names long enough that one edit is still recognisable
+    names = [(category, name) for _, category, name, _ in MENU if len(name) >= 5]
+    corpus = list(VARIANTS)
+    for _ in range(typos):
+        category, name = rng.choice(names)
+        corpus.append((category, typo(name.lower(), rng), name))
+    return corpus
+
+
+def exact(category: str, text: str, names: dict[str, list[str]]) -> "str | None":
+    lowered = text.lower().strip()
+    for name in names[category]:
+        if name.lower() == lowered:
+            return name
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--typos", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    build_start = time.perf_counter()
+    catalog = MenuCatalog()
+    build_ms = (time.perf_counter() - build_start) * 1000
+    names = {c: catalog.names(c) for c in ("drink", "size", "milk", "extra")}
+    corpus = build_corpus(args.typos, args.seed)
+
+    def accuracy(resolve) -> tuple[float, int]:
+        correct = wrong = 0
+        for category, text, expected in corpus:
+            got = resolve(category, text)
+            if got == expected:
+                correct += 1
+            elif got is not None:
+                wrong += 1  # resolved to the wrong item: worse than asking again
+        return correct / len(corpus) * 100, wrong
+
+    def catalog_name(category: str, text: str) -> "str | None":
+        match = catalog._resolve(category, text)
+        return match.name if match else None
+
+    print(
+        f"corpus: {len(corpus)} phrases ({len(VARIANTS)} hand-written, {args.typos} typos); "
+        f"catalog built in {build_ms:.2f} ms"
+    )
+    for label, resolve in (
+        ("exact", lambda c, t: exact(c, t, names)),
+        ("catalog", catalog_name),
+    ):
+        pct, wrong = accuracy(resolve)
+        print(f"{label:8s} accuracy {pct:5.1f}%   wrong item: {wrong}")
+
+    # per-lookup latency on the cold path, then throughput with and without the cache
+    samples_us = []
+    for category, text, _ in corpus:
+        start = time.perf_counter()
+        catalog._resolve(category, text)
+        samples_us.append((time.perf_counter() - start) * 1e6)
+    print(
+        f"uncached latency: p50 {percentile(samples_us, 50):.1f} us   "
+        f"p99 {percentile(samples_us, 99):.1f} us"
+    )
+
+    for label, resolve in (("uncached", catalog._resolve), ("cached", catalog.resolve)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for category, text, _ in corpus:
+                resolve(category, text)
+        elapsed = time.perf_counter() - start
+        print(f"{label:8s} {args.rounds * len(corpus) / elapsed:12,.0f} lookups/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Order dashboards over a long history: full scan vs rolling counters vs columnar archive.
+
+Generates ``--orders`` synthetic orders (1-3 drinks each) spread over a year
+into a journal segment, the order store and the hourly counters, then times:
+
+- full scan: today's top drinks and orders per hour by parsing every order in
+  the journal (the per-file ``orders/*.json`` layout is timed on a sample and
+  scaled up, as a million files do not fit this machine's disk budget)
+- counters: the same dashboard from ``OrderAnalytics`` (``print_dashboard``'s
+  queries), at a small and the full history size; and what the journal sink
+  costs per saved order
+- columnar: ``ColumnArchive.compact`` of the whole store, then all-time and
+  filtered breakdowns with NumPy and with the ``array`` fallback
+
+Every answer is checked against the full scan.
+
+    uv run python benchmarks/bench_order_analytics.py --orders 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from _common import SRC_DIR  # noqa: F401  (puts src/ on sys.path)
+
+import order_analytics
+from order_analytics import ColumnArchive, OrderAnalytics
+from order_store import OrderStore
+
+DRINKS = (
+    "Latte",
+    "Cappuccino",
+    "Cold Brew",
+    "Americano",
+    "Mocha",
+    "Flat White",
+    "Iced Latte",
+    "Espresso",
+)
+SIZES = ("small", "medium", "large")
+MILKS = ("regular", "oat", "almond", "soy", "skim", "none")
+EXTRAS = ("extra shot", "vanilla syrup", "caramel drizzle", "whipped cream")
+END = datetime(2025, 11, 24)
+TODAY = "2025-11-23"
+CHUNK = 20_000
+
+
+def synthetic_orders(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    span = 365 * 24 * 3600
+    for n in range(count):
+        # evenly spread over the year, newest last
+        at = END - timedelta(seconds=span * (count - n) / count)
+        items = [
+            {
+                "drinkType": rng.choices(DRINKS, weights=(8, 6, 5, 4, 3, 3, 2, 1))[0],
+                "size": rng.choice(SIZES),
+                "milk": rng.choice(MILKS),
+                "extras": rng.sample(EXTRAS, rng.choice((0, 0, 1, 2))),
+            }
+            for _ in range(rng.choice((1, 1, 1, 2, 3)))
+        ]
+        yield {
+            "name": f"Guest {n % 5000}",
+            "items": items,
+            "token_number": f"BT-{n:08d}",
+            "timestamp": at.isoformat(),
+            "status": "confirmed",
+        }
+
+
+def dashboard_from(orders, day: str) -> tuple[Counter, Counter]:
+    drinks, hours = Counter(), Counter()
+    for order in orders:
+        if order["timestamp"].startswith(day):
+            hours[order["timestamp"][11:13]] += 1
+            for item in order["items"]:
+                drinks[item["drinkType"]] += 1
+    return drinks, hours
+
+
+def full_scan(journal: str, day: str) -> tuple[Counter, Counter]:
+    with open(journal, encoding="utf-8") as f:
+        return dashboard_from((json.loads(line) for line in f), day)
+
+
+def per_file_scan(directory: str, day: str) -> tuple[Counter, Counter]:
+    def orders():
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                yield json.load(f)
+
+    return dashboard_from(orders(), day)
+
+
+def counters_dashboard(analytics: OrderAnalytics, day: str) -> tuple[Counter, Counter]:
+    end = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    for field in ("size", "milk", "extras"):
+        analytics.top(field, day, end, limit=5)
+    drinks = Counter(dict(analytics.top("drinkType", day, end)))
+    hours = Counter(
+        {hour[11:13]: orders for hour, orders, _ in analytics.per_hour(day, end)}
+    )
+    return drinks, hours
+
+
+def best_ms(fn, repeat: int = 5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--file-sample", type=int, default=20_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-analytics-")
+    try:
+        run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, workdir: str) -> None:
+    journal = os.path.join(workdir, "orders.jsonl")
+    db = os.path.join(workdir, "orders.db")
+    small_db = os.path.join(workdir, "small.db")
+    files = os.path.join(workdir, "files")
+    os.makedirs(files)
+    store, analytics, small = (
+        OrderStore(db),
+        OrderAnalytics(db),
+        OrderAnalytics(small_db),
+    )
+
+    t = time.perf_counter()
+    drinks_total = 0
+    with open(journal, "w", encoding="utf-8") as out:
+        chunk = []
+        for n, order in enumerate(synthetic_orders(args.orders)):
+            chunk.append(order)
+            drinks_total += len(order["items"])
+            if n >= args.orders - args.file_sample:
+                with open(
+                    os.path.join(files, f"order_{n}.json"), "w", encoding="utf-8"
+                ) as f:
+                    json.dump(order, f)
+            if len(chunk) == CHUNK:
+                out.write(
+                    "".join(json.dumps(o, separators=(",", ":")) + "\n" for o in chunk)
+                )
+                store.put_many(chunk)
+                analytics.add_many(chunk)
+                chunk = []
+        out.write("".join(json.dumps(o, separators=(",", ":")) + "\n" for o in chunk))
+        store.put_many(chunk)
+        analytics.add_many(chunk)
+    # the last days only: what a fresh install has after a couple of weeks
+    small.add_many(
+        o for o in synthetic_orders(args.orders) if o["timestamp"] >= "2025-11-10"
+    )
+    print(
+        f"{args.orders} orders, {drinks_total} drinks over a year "
+        f"(journal {os.path.getsize(journal) / 2**20:.0f} MB, generated in {time.perf_counter() - t:.0f} s)"
+    )
+
+    scan_ms, expected = best_ms(lambda: full_scan(journal, TODAY), repeat=1)
+    sample_ms, _ = best_ms(lambda: per_file_scan(files, TODAY), repeat=1)
+    per_file_ms = sample_ms / args.file_sample * args.orders
+    count_ms, got = best_ms(lambda: counters_dashboard(analytics, TODAY))
+    small_ms, _ = best_ms(lambda: counters_dashboard(small, TODAY))
+    print(f"today's dashboard ({sum(expected[1].values())} orders today)")
+    print(f"  full scan, journal            {scan_ms:10.0f} ms")
+    print(
+        f"  full scan, one file per order {per_file_ms:10.0f} ms  (scaled from {args.file_sample} files)"
+    )
+    print(
+        f"  counters, full history        {count_ms:10.2f} ms  same answer: {got == expected}"
+    )
+    print(f"  counters, last two weeks only {small_ms:10.2f} ms")
+
+    # one journal batch per saved order (the worst case: nothing to group)
+    one = [next(iter(synthetic_orders(1, seed=n))) for n in range(200)]
+    sink_ms, _ = best_ms(lambda: [analytics.add_many([o]) for o in one], repeat=3)
+    batch = list(synthetic_orders(256, seed=1))
+    batch_ms, _ = best_ms(lambda: analytics.add_many(batch), repeat=3)
+    print(
+        f"journal sink: {sink_ms / len(one) * 1000:.0f} us per single-order batch, "
+        f"{batch_ms / len(batch) * 1000:.0f} us per order in a 256-order batch"
+    )
+
+    archive = ColumnArchive(os.path.join(workdir, "columns"))
+    t = time.perf_counter()
+    rows = archive.compact(store)
+    compact_s = time.perf_counter() - t
+    size = sum(
+        os.path.getsize(os.path.join(archive.directory, f))
+        for f in os.listdir(archive.directory)
+    )
+    print(
+        f"columnar archive: {rows} drinks compacted in {compact_s:.1f} s, {size / 2**20:.1f} MB "
+        f"({os.path.getsize(db) / 2**20:.0f} MB store)"
+    )
+
+    with open(journal, encoding="utf-8") as f:
+        all_orders = [json.loads(line) for line in f]
+    want_all = Counter(item["drinkType"] for o in all_orders for item in o["items"])
+    want_oat = Counter(
+        e
+        for o in all_orders
+        if o["timestamp"] >= "2025-06"
+        for item in o["items"]
+        if item["milk"] == "oat" and item["size"] == "large"
+        for e in item["extras"]
+    )
+    del all_orders
+    queries = (
+        (
+            "all-time top drinks",
+            lambda cols: archive.top("drinkType", columns=cols),
+            want_all,
+        ),
+        (
+            "extras, large oat since June",
+            lambda cols: archive.top(
+                "extras",
+                since="2025-06",
+                where={"milk": "oat", "size": "large"},
+                columns=cols,
+            ),
+            want_oat,
+        ),
+    )
+    numpy = order_analytics.np
+    for label, backend in (("numpy", numpy), ("array", None)):
+        if label == "numpy" and numpy is None:
+            continue
+        order_analytics.np = backend
+        load_ms, cols = best_ms(archive.load, repeat=3)
+        print(f"  {label}: load {load_ms:.0f} ms")
+        for name, query, want in queries:
+            ms, got = best_ms(
+                lambda query=query, cols=cols: query(cols),
+                repeat=3 if label == "numpy" else 1,
+            )
+            print(
+                f"    {name:<30} {ms:9.1f} ms  same answer: {dict(got) == dict(want)}"
+            )
+    order_analytics.np = numpy
+
+
+if __name__ == "__main__":
+    main()
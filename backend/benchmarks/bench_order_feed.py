@@ -0,0 +1,260 @@
+"""Fan-out of confirmed orders to bar displays: live feed vs polling the orders directory.
+
+- feed: a child process runs ``LocalHTTPServer`` with the ``/orders/feed``
+  routes and publishes orders at ``--rate`` per minute; ``--subscribers``
+  SSE clients in this process record when each order arrives. Every
+  ``--reconnect-every`` seconds one client drops its connection and resumes
+  with ``Last-Event-ID``. Reported: delivery latency (publish to client),
+  publish cost on the agent's loop, its loop lag, server CPU, and whether
+  every client saw every order exactly once and in order
+- polling: what a display paid before, one ``os.listdir`` of the orders
+  directory per poll to find new receipts, at several directory sizes; the
+  CPU for ``--subscribers`` displays polling once a second, and the average
+  wait of half the poll interval
+
+    uv run python benchmarks/bench_order_feed.py --subscribers 100 --rate 1000 --seconds 60
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+import aiohttp
+from _common import LoopLagProbe, percentile
+
+
+def serve(port_queue, args) -> None:
+    from local_http import LocalHTTPServer
+    from order_feed import OrderFeed, add_feed_routes
+
+    async def main() -> dict:
+        feed = OrderFeed(max_queue=args.max_queue)
+        server = LocalHTTPServer(0)
+        add_feed_routes(server, feed)
+        port_queue.put(await server.start())
+        # wait for the subscribers
+        while feed.subscribers < args.subscribers:
+            await asyncio.sleep(0.05)
+        probe = LoopLagProbe()
+        probe.start()
+        publish_us = []
+        cpu = time.process_time()
+        started = time.perf_counter()
+        total = int(args.rate * args.seconds / 60)
+        for n in range(total):
+            # absolute schedule, so a slow publish does not lower the rate
+            await asyncio.sleep(
+                max(0.0, started + n * 60 / args.rate - time.perf_counter())
+            )
+            order = {
+                "name": f"Guest {n}",
+                "items": [
+                    {
+                        "drinkType": "Latte",
+                        "size": "medium",
+                        "milk": "oat",
+                        "extras": [],
+                    }
+                ],
+                "token_number": f"BT-{n:06d}",
+                "timestamp": datetime.now().isoformat(),
+            }
+            t = time.perf_counter()
+            feed.publish(order)
+            publish_us.append((time.perf_counter() - t) * 1e6)
+        await asyncio.sleep(1.0)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - started
+        await probe.stop()
+        await feed.aclose()
+        await server.aclose()
+        return {
+            "orders": total,
+            "publish_p50_us": percentile(publish_us, 50),
+            "publish_p99_us": percentile(publish_us, 99),
+            "lag_p99_ms": percentile(probe.samples_ms, 99),
+            "cpu_pct": cpu / wall * 100,
+            "dropped": feed.dropped,
+        }
+
+    port_queue.put(asyncio.run(main()))
+
+
+class Display:
+    """One SSE subscriber: arrival latency per order, and the sequence numbers seen."""
+
+    def __init__(self) -> None:
+        self.last_id = ""
+        self.seqs: list[int] = []
+        self.latencies_ms: list[float] = []
+        self.connects = 0
+        self.resets = 0
+
+    async def run(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        stop: asyncio.Event,
+        reconnect: asyncio.Event,
+    ) -> None:
+        while not stop.is_set():
+            headers = {"Last-Event-ID": self.last_id} if self.last_id else {}
+            self.connects += 1
+            async with session.get(url, headers=headers) as resp:
+                read = asyncio.create_task(self._read(resp))
+                done = asyncio.create_task(
+                    asyncio.wait(
+                        [
+                            asyncio.create_task(stop.wait()),
+                            asyncio.create_task(reconnect.wait()),
+                        ],
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                )
+                await asyncio.wait([read, done], return_when=asyncio.FIRST_COMPLETED)
+                read.cancel()
+                done.cancel()
+            reconnect.clear()
+
+    async def _read(self, resp: aiohttp.ClientResponse) -> None:
+        event: dict[str, str] = {}
+        async for raw in resp.content:
+            line = raw.decode().rstrip("\n")
+            if line:
+                key, _, value = line.partition(": ")
+                event[key] = value
+                continue
+            if "id" in event:
+                self.last_id = event["id"]
+            if event.get("event") == "reset":
+                self.resets += 1
+            elif event.get("event") == "order":
+                arrived = time.time()
+                self.seqs.append(int(event["id"].rpartition(":")[2]))
+                # the "timestamp" of the order is taken right before publish
+                sent = datetime.fromisoformat(
+                    event["data"].split('"timestamp":"')[1][:26]
+                )
+                self.latencies_ms.append((arrived - sent.timestamp()) * 1000)
+            event = {}
+
+
+async def run_displays(port: int, args) -> list[Display]:
+    url = f"http://127.0.0.1:{port}/orders/feed"
+    stop = asyncio.Event()
+    displays = [Display() for _ in range(args.subscribers)]
+    reconnects = [asyncio.Event() for _ in displays]
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout()
+    ) as session:
+        tasks = [
+            asyncio.create_task(d.run(session, url, stop, r))
+            for d, r in zip(displays, reconnects)
+        ]
+        # drop one connection now and then; the display resumes from its last event id
+        rounds = (
+            int(args.seconds // args.reconnect_every) if args.reconnect_every else 0
+        )
+        for i in range(rounds):
+            await asyncio.sleep(args.reconnect_every)
+            reconnects[i % len(reconnects)].set()
+        await asyncio.sleep(args.seconds - rounds * args.reconnect_every + 0.5)
+        stop.set()
+        await asyncio.gather(*tasks)
+    return displays
+
+
+def feed_benchmark(args) -> None:
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    server = ctx.Process(target=serve, args=(results, args))
+    server.start()
+    port = results.get()
+    cpu = time.process_time()
+    displays = asyncio.run(run_displays(port, args))
+    client_cpu = time.process_time() - cpu
+    stats = results.get()
+    server.join()
+
+    expected = list(range(1, stats["orders"] + 1))
+    complete = sum(d.seqs == expected for d in displays)
+    latencies = [ms for d in displays for ms in d.latencies_ms]
+    print(
+        f"feed: {args.subscribers} SSE subscribers, {stats['orders']} orders at {args.rate:.0f}/min "
+        f"over {args.seconds:.0f} s, one reconnect every {args.reconnect_every:.0f} s"
+    )
+    print(
+        f"  delivery latency   p50 {percentile(latencies, 50):6.1f} ms  p99 "
+        f"{percentile(latencies, 99):6.1f} ms  max {max(latencies, default=0):6.1f} ms"
+    )
+    print(
+        f"  publish on loop    p50 {stats['publish_p50_us']:6.0f} us  p99 {stats['publish_p99_us']:6.0f} us"
+        f"  (all {args.subscribers} subscribers)"
+    )
+    print(
+        f"  agent loop lag p99 {stats['lag_p99_ms']:6.2f} ms, server CPU {stats['cpu_pct']:.1f}% "
+        f"(clients {client_cpu:.1f} s CPU on the same core)"
+    )
+    print(
+        f"  reconnects {sum(d.connects for d in displays) - len(displays)}, resets "
+        f"{sum(d.resets for d in displays)}, dropped subscribers {stats['dropped']}"
+    )
+    print(f"  every order exactly once, in order: {complete}/{len(displays)} displays")
+
+
+def polling_benchmark(args) -> None:
+    print(
+        f"polling: one os.listdir per poll; {args.subscribers} displays polling once a second"
+    )
+    workdir = tempfile.mkdtemp(prefix="bench-feed-")
+    try:
+        made = 0
+        for size in (1_000, 10_000, 50_000):
+            for n in range(made, size):
+                with open(
+                    os.path.join(workdir, f"order_20250101_120000_BT-{n:06d}.html"), "w"
+                ) as f:
+                    f.write("<html></html>")
+            made = size
+            seen = set(os.listdir(workdir))
+            best = float("inf")
+            for _ in range(5):
+                t = time.perf_counter()
+                names = os.listdir(workdir)
+                new = [
+                    name
+                    for name in names
+                    if name.endswith(".html") and name not in seen
+                ]
+                best = min(best, time.perf_counter() - t)
+            assert not new
+            print(
+                f"  {size:>6} receipts: {best * 1000:7.2f} ms/poll, "
+                f"{best * args.subscribers * 100:5.1f}% of a core, new order seen after ~500 ms"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1000.0, help="orders per minute")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--reconnect-every", type=float, default=2.0)
+    parser.add_argument("--max-queue", type=int, default=256)
+    args = parser.parse_args()
+
+    feed_benchmark(args)
+    print()
+    polling_benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
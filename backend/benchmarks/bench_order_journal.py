@@ -0,0 +1,94 @@
+"""Event-loop lag while many orders are saved at the same time.
+
+Compares the old inline save (makedirs + json.dump + HTML write on the loop)
+with the write-behind ``OrderJournal``.
+
+    uv run python benchmarks/bench_order_journal.py --saves 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from _common import LoopLagProbe, percentile
+
+from order_journal import DURABILITY_MODES, OrderJournal
+
+RECEIPT_HTML = "<html>" + "x" * 4096 + "</html>"
+
+
+def _order(i: int) -> dict:
+    return {
+        "drinkType": "latte",
+        "size": "medium",
+        "milk": "oat",
+        "extras": ["extra shot"],
+        "name": f"Customer{i}",
+        "token_number": f"BT-{datetime.now():%Y%m%d}-{i:04d}",
+        "timestamp": datetime.now().isoformat(),
+        "status": "confirmed",
+    }
+
+
+async def inline_save(directory: str, i: int) -> None:
+    os.makedirs(directory, exist_ok=True)
+    order = _order(i)
+    with open(os.path.join(directory, f"order_{i}.json"), "w") as f:
+        json.dump(order, f, indent=2)
+    with open(os.path.join(directory, f"order_{i}.html"), "w", encoding="utf-8") as f:
+        f.write(RECEIPT_HTML)
+
+
+async def journal_save(journal: OrderJournal, i: int) -> None:
+    await journal.submit(_order(i), files={f"order_{i}.html": RECEIPT_HTML})
+
+
+async def run(label: str, saves: int, save) -> None:
+    probe = LoopLagProbe()
+    probe.start()
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    latencies = []
+
+    async def timed(i: int) -> None:
+        t = time.perf_counter()
+        await save(i)
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    await asyncio.gather(*(timed(i) for i in range(saves)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.05)
+    await probe.stop()
+    print(
+        f"{label:<16} {saves} saves in {elapsed * 1000:7.2f}ms  "
+        f"save p99={percentile(latencies, 99):.3f}ms  {probe.summary()}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--saves", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for r in range(args.rounds):
+            print(f"-- round {r + 1}")
+            inline_dir = os.path.join(tmp, f"inline{r}")
+            await run("inline", args.saves, lambda i, d=inline_dir: inline_save(d, i))
+            for mode in DURABILITY_MODES:
+                journal = OrderJournal(os.path.join(tmp, f"{mode}{r}"), durability=mode)
+                await run(
+                    f"journal/{mode}",
+                    args.saves,
+                    lambda i, j=journal: journal_save(j, i),
+                )
+                journal.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""Token lookup: indexed order store vs scanning the orders directory.
+
+    uv run python benchmarks/bench_order_store.py --sizes 10000 1000000
+
+Writing a million order files takes a while; the directory is built once per
+size in a temporary directory and removed afterwards.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from _common import percentile
+
+from order_store import OrderStore
+
+DRINKS = ["latte", "cappuccino", "americano", "mocha", "cold brew", "espresso"]
+
+
+def synthetic_orders(n: int):
+    for i in range(n):
+        yield {
+            "drinkType": DRINKS[i % len(DRINKS)],
+            "size": ("small", "medium", "large")[i % 3],
+            "milk": ("regular", "oat", "soy")[i % 3],
+            "extras": [],
+            "name": f"Customer{i % 5000}",
+            "token_number": f"BT-20251123-{i:07d}",
+            "timestamp": f"2025-11-23T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}.{i:06d}",
+            "status": "confirmed",
+        }
+
+
+def scan_lookup(directory: str, token: str):
+    for fname in os.listdir(directory):
+        with open(os.path.join(directory, fname)) as f:
+            order = json.load(f)
+        if order.get("token_number") == token:
+            return order
+    return None
+
+
+def bench_size(n: int, lookups: int, scan_lookups: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        files_dir = os.path.join(tmp, "orders")
+        os.makedirs(files_dir)
+        store = OrderStore(os.path.join(tmp, "orders.db"))
+
+        batch = []
+        for i, order in enumerate(synthetic_orders(n)):
+            with open(os.path.join(files_dir, f"order_{i}.json"), "w") as f:
+                json.dump(order, f)
+            batch.append(order)
+            if len(batch) == 10_000:
+                store.put_many(batch)
+                batch.clear()
+        store.put_many(batch)
+
+        rng = random.Random(n)
+        tokens = [f"BT-20251123-{rng.randrange(n):07d}" for _ in range(lookups)]
+
+        store_us = []
+        for token in tokens:
+            t = time.perf_counter()
+            assert store.get_by_token(token) is not None
+            store_us.append((time.perf_counter() - t) * 1e6)
+
+        scan_ms = []
+        for token in tokens[:scan_lookups]:
+            t = time.perf_counter()
+            assert scan_lookup(files_dir, token) is not None
+            scan_ms.append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        hour = sum(1 for _ in store.scan_time_range("2025-11-23T01", "2025-11-23T02"))
+        range_ms = (time.perf_counter() - t) * 1000
+        store.close()
+
+    print(
+        f"n={n:>9,}  store lookup p50={percentile(store_us, 50):8.1f}us "
+        f"p99={percentile(store_us, 99):8.1f}us  |  "
+        f"directory scan p50={percentile(scan_ms, 50):10.1f}ms "
+        f"({len(scan_ms)} lookups)  |  1h range scan: {hour} orders in {range_ms:.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--scan-lookups", type=int, default=5)
+    args = parser.parse_args()
+    for n in args.sizes:
+        bench_size(n, args.lookups, args.scan_lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Prompt tokens per LLM request, legacy 3 KB instructions vs slim core + ORDER STATE note.
+
+Replays the scripted conversations from ``bench_tool_roundtrips.py`` against
+a fake LLM, one LLM request per customer turn, with the real tools and the
+real ``PromptAccountant`` hooked to the fake LLM's ``metrics_collected``
+event. Nothing leaves the machine.
+
+The fake LLM reports prompt tokens with the local estimator. It models
+Gemini's implicit caching: the part of the request that matches the
+previous request byte for byte counts as cached once it reaches
+``--min-cache-tokens``. System messages are folded into the system
+instruction, as the Google plugin does. TTFT is synthetic:
+``--ttft-base-ms`` plus ``--ms-per-token`` for every uncached prompt token.
+
+- legacy: the old instructions, plus a system "ORDER STATE" message only on
+  turns the pre-extractor filled something
+- slim: the current ``CoffeeBarista`` instructions, plus its ORDER STATE note
+  on every turn
+
+    uv run python benchmarks/bench_prompt_budget.py --min-cache-tokens 1024
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+from _common import percentile
+
+os.environ["ORDERS_DIR"] = tempfile.mkdtemp(prefix="bench-prompt-")
+
+from bench_tool_roundtrips import CONVERSATIONS
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, llm
+
+import agent
+from prompt_budget import PromptAccountant, estimate_tokens
+
+# CoffeeBarista.instructions before the prompt was split
+LEGACY_INSTRUCTIONS = """You are a multilingual, witty virtual barista for BLUE TOKAI COFFEE ROASTERS. Your single goal is to take coffee orders via conversation, fill an internal order state, confirm it with the customer, and then save the final order.
+
+PERSONA & TONE:
+- You are friendly, slightly witty, and warm with an Indian English speaking style
+- Use a conversational, upbeat tone with occasional playful comments
+- Speak ONLY in English - no Hindi or Hinglish words
+- Keep jokes light and never be rude or harsh
+- Examples: "What would you like today \u2013 a strong espresso or a chill cold brew?" or "Got it, one medium latte coming right up!"
+
+BRAND CONTEXT:
+- You work at BLUE TOKAI COFFEE ROASTERS
+- Reference "our roasts", "Blue Tokai brews", "signature cold brews"
+- Menu: Espresso, Americano, Cappuccino, Latte, Flat White, Mocha, Cold Brew, Iced Latte, Frappé, Hot Chocolate
+- Accept custom drinks too
+
+LANGUAGE BEHAVIOR:
+- Speak ONLY in English with an Indian conversational style
+- Use natural Indian English expressions and phrasing
+- Be warm and friendly but stick to English only
+- Examples: "What would you like today?", "That's great!", "One medium latte", "What's your name?"
+- Keep it conversational and fun but entirely in English
+
+ORDER STATE MANAGEMENT:
+You maintain an internal order with these fields:
+- drinkType: type of coffee drink
+- size: "small", "medium", or "large"
+- milk: "regular", "skim", "oat", "soy", "almond"
+- extras: array of extras like "extra shot", "vanilla syrup", "caramel drizzle", "whipped cream"
+- name: customer's name
+
+CONVERSATION FLOW:
+1. Ask for name first: "What's your name?"
+2. Ask drink type: "What are you in the mood for today? Latte, cappuccino, cold brew?"
+3. Ask size: If not specified, default to "medium" but confirm: "What size would you like - small, medium, or large?"
+4. Ask milk: If not specified, default to "regular milk" but confirm: "What kind of milk would you prefer? Regular, oat, almond, soy?"
+5. Ask extras: "Would you like any extras? Extra shot, vanilla syrup, whipped cream?"
+6. Recap the complete order clearly in English
+7. Ask for confirmation: "Does that sound good? Should I confirm this order?"
+8. CRITICAL: After user says YES/confirms, you MUST immediately call the save_order function tool. DO NOT just say "confirmed" - you must actually call save_order()
+9. Only after calling save_order successfully, tell the customer their order is confirmed
+
+CLARIFYING QUESTIONS:
+- Ask one or two things at a time to keep it natural
+- If user provides multiple details at once, extract them and only ask about missing fields
+- If user changes their mind, update only that field
+- Record every detail from one customer message with a SINGLE update_order call instead of several set_* calls
+- Details already pre-filled from the customer's words are listed in an "ORDER STATE" note - do not call tools again for those
+
+ERROR HANDLING:
+- If input is unclear, politely ask again
+- If user is off-topic too long, gently bring them back: "I'm loving this chat, but let's get your coffee order sorted out!"
+
+IMPORTANT:
+- Keep responses natural and conversational for voice interaction
+- Don't use complex formatting, emojis, or markdown in your speech
+- Use the function tools to manage order state
+- Only call save_order after explicit user confirmation"""
+
+
+def provider_request(chat_ctx: llm.ChatContext, tools) -> str:
+    """The request as the Google plugin lays it out: system instruction, tools, turns."""
+    turns, extra = chat_ctx.to_provider_format(format="google")
+    schemas = [llm.utils.build_legacy_openai_schema(tool) for tool in tools]
+    return "\n".join(
+        [
+            "\n".join(extra.system_messages or []),
+            json.dumps(schemas, separators=(",", ":")),
+            json.dumps(turns, separators=(",", ":")),
+        ]
+    )
+
+
+class FakeLLM(llm.LLM):
+    def __init__(
+        self, *, min_cache_tokens: int, ttft_base: float, per_token: float
+    ) -> None:
+        super().__init__()
+        self.min_cache_tokens = min_cache_tokens
+        self.ttft_base = ttft_base
+        self.per_token = per_token
+        self._previous = ""
+
+    def chat(
+        self,
+        *,
+        chat_ctx,
+        tools=None,
+        conn_options=DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ):
+        return FakeStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options
+        )
+
+
+class FakeStream(llm.LLMStream):
+    async def _run(self) -> None:
+        fake: FakeLLM = self._llm
+        request = provider_request(self._chat_ctx, self._tools)
+        common = 0
+        for a, b in zip(request, fake._previous):
+            if a != b:
+                break
+            common += 1
+        fake._previous = request
+
+        prompt_tokens = estimate_tokens(request)
+        cached = estimate_tokens(request[:common])
+        if cached < fake.min_cache_tokens:
+            cached = 0
+        await asyncio.sleep(fake.ttft_base + (prompt_tokens - cached) * fake.per_token)
+        reply = "Sure thing!"
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id="fake",
+                delta=llm.ChoiceDelta(role="assistant", content=reply),
+                usage=llm.CompletionUsage(
+                    completion_tokens=estimate_tokens(reply),
+                    prompt_tokens=prompt_tokens,
+                    prompt_cached_tokens=cached,
+                    total_tokens=prompt_tokens + estimate_tokens(reply),
+                ),
+            )
+        )
+
+
+async def replay(flavor: str, fake: FakeLLM) -> PromptAccountant:
+    accountant = PromptAccountant()
+    fake.on("metrics_collected", accountant.record)
+
+    for conversation in CONVERSATIONS:
+        barista = agent.CoffeeBarista(prompt_accountant=accountant)
+        instructions = (
+            LEGACY_INSTRUCTIONS if flavor == "legacy" else barista.instructions
+        )
+        history = llm.ChatContext()
+        history.add_message(role="system", content=instructions)
+        for utterance, _ in conversation:
+            history.add_message(role="user", content=utterance)
+            turn_ctx = history.copy()
+            if flavor == "legacy":
+                slots = agent.extract_order_slots(utterance)
+                if slots and not barista._apply_slots(slots):
+                    turn_ctx.add_message(
+                        role="system",
+                        content=f"ORDER STATE (pre-filled {', '.join(slots)}): "
+                        f"{json.dumps(barista.order_state)}. {barista._next_step()}",
+                    )
+            else:
+                turn_ctx = barista._with_order_state(turn_ctx)
+
+            accountant.begin_request(turn_ctx, barista.tools)
+            reply = ""
+            async with fake.chat(chat_ctx=turn_ctx, tools=barista.tools) as stream:
+                async for chunk in stream:
+                    reply += chunk.delta.content if chunk.delta else ""
+            history.add_message(role="assistant", content=reply)
+            if flavor != "legacy":
+                # what the agent does once the reply has been spoken
+                history = barista._context_pruner.prune(history) or history
+        await asyncio.sleep(0)  # let the metrics task of the last request finish
+        barista._journal.close()
+
+    fake.off("metrics_collected", accountant.record)
+    return accountant
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-cache-tokens", type=int, default=1024)
+    parser.add_argument("--ttft-base-ms", type=float, default=20.0)
+    parser.add_argument("--ms-per-token", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(
+        f"instructions: legacy {len(LEGACY_INSTRUCTIONS)} chars, "
+        f"slim {len(agent.CoffeeBarista(prompt_accountant=PromptAccountant()).instructions)} chars"
+    )
+    for flavor in ("legacy", "slim"):
+        fake = FakeLLM(
+            min_cache_tokens=args.min_cache_tokens,
+            ttft_base=args.ttft_base_ms / 1000,
+            per_token=args.ms_per_token / 1000,
+        )
+        accountant = await replay(flavor, fake)
+        requests = list(accountant.requests)
+        prompt = [r.prompt_tokens for r in requests]
+        uncached = [r.prompt_tokens - r.prompt_cached_tokens for r in requests]
+        ttft = [r.ttft * 1000 for r in requests]
+        summary = accountant.summary()
+        print(
+            f"{flavor:7s} {len(requests):3d} requests  prompt p50 {percentile(prompt, 50):5.0f} "
+            f"max {max(prompt):5.0f} tok  uncached p50 {percentile(uncached, 50):5.0f} tok  "
+            f"cached {summary['prompt_cached_ratio'] * 100:4.1f}%  "
+            f"estimate/provider {summary['estimated_tokens_avg'] / summary['prompt_tokens_avg']:.2f}  "
+            f"ttft p50 {percentile(ttft, 50):5.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
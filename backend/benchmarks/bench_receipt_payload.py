@@ -0,0 +1,66 @@
+"""Bytes per receipt and prompt tokens added per following LLM turn.
+
+Compares the old HTML receipt (published inside HTML_SNIPPET markers and
+returned in the save_order tool result) with the compact receipt protocol.
+
+    uv run python benchmarks/bench_receipt_payload.py
+"""
+
+from datetime import datetime
+
+from _common import SRC_DIR  # noqa: F401  (puts src/ on sys.path)
+
+from receipt_renderer import ReceiptRenderer
+from receipts import encode_receipt
+
+# Rough English/markup average for Gemini-style tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, round(len(text) / CHARS_PER_TOKEN))
+
+
+def main() -> None:
+    order = {
+        "drinkType": "Iced Latte",
+        "size": "large",
+        "milk": "oat",
+        "extras": ["extra shot", "whipped cream"],
+        "name": "Sarah",
+        "token_number": "BT-20251123-7QK2",
+        "timestamp": datetime(2025, 11, 23, 19, 16, 28).isoformat(),
+        "status": "confirmed",
+    }
+    confirmation = (
+        f"Perfect! Your Blue Tokai order is locked in. Your {order['size']} "
+        f"{order['drinkType']} will be ready shortly. Thank you, {order['name']}! "
+        f"Enjoy your brew!"
+    )
+
+    html = ReceiptRenderer().render(order, order["token_number"])
+    old_payload = f"HTML_SNIPPET:{html}END_HTML_SNIPPET".encode()
+    old_tool_result = f"{confirmation} HTML_SNIPPET:{html}END_HTML_SNIPPET"
+
+    new_payload = encode_receipt(order)
+    new_tool_result = (
+        f"{confirmation[: -len(' Enjoy your brew!')]} "
+        f"Your token number is {order['token_number']}. Enjoy your brew!"
+    )
+
+    print(f"{'':<28}{'before':>10}{'after':>10}")
+    print(
+        f"{'data-channel bytes/receipt':<28}{len(old_payload):>10}{len(new_payload):>10}"
+    )
+    print(
+        f"{'tool result bytes':<28}{len(old_tool_result.encode()):>10}"
+        f"{len(new_tool_result.encode()):>10}"
+    )
+    print(
+        f"{'prompt tokens/later turn':<28}{estimate_tokens(old_tool_result):>10}"
+        f"{estimate_tokens(new_tool_result):>10}"
+    )
+
+
+if __name__ == "__main__":
+    main()
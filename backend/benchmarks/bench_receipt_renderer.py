@@ -0,0 +1,305 @@
+"""Receipt rendering throughput and allocations, f-string vs precompiled renderer.
+
+Also checks that the precompiled renderer's inline output is byte-identical to
+the original f-string receipt for every drink in the sample set, and that
+markup in a customer's name is escaped.
+
+    uv run python benchmarks/bench_receipt_renderer.py --renders 20000
+"""
+
+import argparse
+import itertools
+import time
+import tracemalloc
+
+from _common import SRC_DIR  # noqa: F401  (puts src/ on sys.path)
+
+from receipt_renderer import ReceiptRenderer
+
+DRINKS = ["Latte", "Cappuccino", "Iced Latte", "Cold Brew", "Mocha", "Frappe"]
+SIZES = ["small", "medium", "large"]
+MILKS = ["regular", "oat", "soy"]
+EXTRAS = [[], ["extra shot"], ["vanilla syrup", "whipped cream"]]
+
+
+class LegacyReceipt:
+    """The original f-string receipt, copied from CoffeeBarista._generate_html_receipt."""
+
+    def _generate_html_receipt(self, order_data: dict, token_number: str) -> str:
+        """Generate an HTML receipt visualization for the order."""
+
+        # Determine cup size for visualization
+        cup_heights = {"small": "100px", "medium": "140px", "large": "180px"}
+        cup_height = cup_heights.get(order_data["size"], "140px")
+
+        # Check if it's a cold drink
+        is_cold = any(
+            word in order_data["drinkType"].lower()
+            for word in ["iced", "cold", "frappe"]
+        )
+        cup_color = "#87CEEB" if is_cold else "#8B4513"
+
+        # Check for whipped cream
+        has_whipped_cream = any(
+            "whipped" in extra.lower() for extra in order_data.get("extras", [])
+        )
+
+        # Build extras list
+        extras_html = ""
+        if order_data.get("extras"):
+            extras_items = "".join(
+                [f"<li>{extra}</li>" for extra in order_data["extras"]]
+            )
+            extras_html = f"<div style='margin-top: 10px;'><strong>Extras:</strong><ul style='margin: 5px 0; padding-left: 20px;'>{extras_items}</ul></div>"
+
+        # Whipped cream topping
+        whipped_cream_html = ""
+        if has_whipped_cream:
+            whipped_cream_html = """
+            <div style='position: absolute; top: -20px; left: 50%; transform: translateX(-50%); 
+                        width: 80px; height: 30px; background: #FFFACD; 
+                        border-radius: 50% 50% 0 0; border: 2px solid #F5DEB3;'></div>
+            """  # noqa: W291 (kept as the original wrote it)
+
+        html = f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Blue Tokai Order - {order_data["name"]}</title>
+    <style>
+        body {{
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            min-height: 100vh;
+            margin: 0;
+            padding: 20px;
+        }}
+        .receipt {{
+            background: white;
+            border-radius: 20px;
+            padding: 40px;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+            max-width: 500px;
+            width: 100%;
+        }}
+        .header {{
+            text-align: center;
+            border-bottom: 3px solid #667eea;
+            padding-bottom: 20px;
+            margin-bottom: 30px;
+        }}
+        .header h1 {{
+            color: #667eea;
+            margin: 0;
+            font-size: 28px;
+        }}
+        .header p {{
+            color: #666;
+            margin: 5px 0 0 0;
+            font-size: 14px;
+        }}
+        .token-number {{
+            background: #667eea;
+            color: white;
+            padding: 10px 20px;
+            border-radius: 25px;
+            font-size: 18px;
+            font-weight: 700;
+            letter-spacing: 1px;
+            margin: 15px 0;
+            display: inline-block;
+        }}
+        .cup-container {{
+            display: flex;
+            justify-content: center;
+            margin: 30px 0;
+            position: relative;
+        }}
+        .cup {{
+            position: relative;
+            width: 100px;
+            height: {cup_height};
+            background: {cup_color};
+            border-radius: 0 0 20px 20px;
+            border: 3px solid #333;
+            box-shadow: inset 0 -20px 30px rgba(0,0,0,0.2);
+        }}
+        .order-details {{
+            background: #f8f9fa;
+            border-radius: 10px;
+            padding: 20px;
+            margin: 20px 0;
+        }}
+        .order-row {{
+            display: flex;
+            justify-content: space-between;
+            padding: 10px 0;
+            border-bottom: 1px solid #dee2e6;
+        }}
+        .order-row:last-child {{
+            border-bottom: none;
+        }}
+        .label {{
+            font-weight: 600;
+            color: #495057;
+        }}
+        .value {{
+            color: #212529;
+            text-transform: capitalize;
+        }}
+        .footer {{
+            text-align: center;
+            margin-top: 30px;
+            padding-top: 20px;
+            border-top: 2px solid #dee2e6;
+        }}
+        .footer h2 {{
+            color: #667eea;
+            margin: 0 0 10px 0;
+            font-size: 24px;
+        }}
+        .footer p {{
+            color: #666;
+            margin: 5px 0;
+            font-size: 14px;
+        }}
+        .timestamp {{
+            text-align: center;
+            color: #999;
+            font-size: 12px;
+            margin-top: 20px;
+        }}
+    </style>
+</head>
+<body>
+    <div class="receipt">
+        <div class="header">
+            <h1>☕ BLUE TOKAI</h1>
+            <p>Coffee Roasters</p>
+            <div class="token-number">Token: {token_number}</div>
+        </div>
+        
+        <div class="cup-container">
+            <div class="cup">
+                {whipped_cream_html}
+            </div>
+        </div>
+        
+        <div class="order-details">
+            <div class="order-row">
+                <span class="label">Customer:</span>
+                <span class="value">{order_data["name"]}</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Drink:</span>
+                <span class="value">{order_data["drinkType"]}</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Size:</span>
+                <span class="value">{order_data["size"]}</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Milk:</span>
+                <span class="value">{order_data["milk"]}</span>
+            </div>
+            {extras_html}
+        </div>
+        
+        <div class="footer">
+            <h2>Order Confirmed!</h2>
+            <p>Your coffee will be ready shortly</p>
+            <p style="color: #667eea; font-weight: 600;">Enjoy your brew! ☕</p>
+        </div>
+        
+        <div class="timestamp">
+            Order placed: {order_data["timestamp"]}
+        </div>
+    </div>
+</body>
+</html>
+"""  # noqa: W293
+        return html
+
+
+def sample_orders() -> list[dict]:
+    orders = []
+    for i, (drink, size, milk, extras) in enumerate(
+        itertools.product(DRINKS, SIZES, MILKS, EXTRAS)
+    ):
+        orders.append(
+            {
+                "drinkType": drink,
+                "size": size,
+                "milk": milk,
+                "extras": extras,
+                "name": f"Customer{i}",
+                "token_number": f"BT-20251123-{i:04d}",
+                "timestamp": f"2025-11-23T10:{i % 60:02d}:00.000000",
+                "status": "confirmed",
+            }
+        )
+    return orders
+
+
+def bench(label: str, render, orders: list[dict], n: int) -> None:
+    start = time.perf_counter()
+    for i in range(n):
+        order = orders[i % len(orders)]
+        render(order, order["token_number"])
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    sizes = []
+    for order in orders:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        render(order, order["token_number"])
+        sizes.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    print(
+        f"{label:<22} {n / elapsed:>10,.0f} renders/s  "
+        f"{elapsed / n * 1e6:7.2f}us/render  "
+        f"peak alloc/render={sum(sizes) / len(sizes) / 1024:6.1f} KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+
+    orders = sample_orders()
+    legacy_render = LegacyReceipt()._generate_html_receipt
+    inline = ReceiptRenderer()
+    hoisted = ReceiptRenderer(stylesheet_href="receipt.css")
+
+    for order in orders:
+        assert inline.render(order, order["token_number"]) == legacy_render(
+            order, order["token_number"]
+        ), order
+    print(
+        f"inline output byte-identical to the f-string receipt for {len(orders)} drinks"
+    )
+    hostile = dict(orders[0], name="<script>alert(1)</script>")
+    assert "<script>" not in inline.render(hostile, "BT-1")
+    print("markup in the customer's name is escaped")
+
+    bench("f-string", legacy_render, orders, args.renders)
+    bench("precompiled/inline", inline.render, orders, args.renders)
+    bench("precompiled/hoisted", hoisted.render, orders, args.renders)
+    print(f"cache: {inline.cache_info()}")
+    sample = orders[0]
+    print(
+        f"bytes/receipt: inline={len(inline.render(sample, 'BT-1'))} "
+        f"hoisted={len(hoisted.render(sample, 'BT-1'))}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Session audit trail: memory vs session length, event-loop cost, compression and lookup by token.
+
+Each simulated turn emits what a real session does: the customer's message,
+an ``update_order`` tool call with its result and the agent's reply, as
+livekit event objects through an ``EventEmitter`` the trail is attached to
+(``SessionTrail.attach``). Every ``--order-every`` turns an order is saved.
+
+- memory: peak Python allocation (tracemalloc) while one session of N turns
+  is recorded, the trail kept in memory and compressed when the session
+  ends vs ``SessionRecorder``, which streams it into segments
+- loop cost: time the event handlers take on the loop per record
+- burst: records taken and dropped when far more arrive at once than the
+  queue holds
+- lookup: ``--sessions`` sessions written into segments rotated at
+  ``--segment-kb``. One session is fetched by token through the index vs
+  decompressing and parsing every segment; the bytes decompressed are
+  reported as well
+- calls: ``--calls`` job processes, each recording one call and exiting as a
+  livekit job process does, four at a time; the segments and index files
+  they leave behind in the shared directory
+
+    uv run python benchmarks/bench_session_recorder.py --turns 100,1000,10000 --sessions 2000
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from _common import SRC_DIR, percentile  # noqa: F401  (puts src/ on sys.path)
+from livekit.agents import llm, utils
+from livekit.agents.voice.events import (
+    ConversationItemAddedEvent,
+    FunctionToolsExecutedEvent,
+)
+
+from session_recorder import SessionRecorder, _index_files, read_trail
+
+
+def turn_events(n: int) -> list[tuple[str, object]]:
+    call = llm.FunctionCall(
+        call_id=f"call-{n}",
+        name="update_order",
+        arguments=json.dumps({"drink_type": "latte", "size": "large", "milk": "oat"}),
+    )
+    output = llm.FunctionCallOutput(
+        call_id=f"call-{n}",
+        name="update_order",
+        is_error=False,
+        output="Updated drinkType, size, milk. Next: ask about extras - extra shot, vanilla syrup, "
+        "caramel drizzle, whipped cream, or none.",
+    )
+    return [
+        (
+            "conversation_item_added",
+            ConversationItemAddedEvent(
+                item=llm.ChatMessage(
+                    role="user",
+                    content=[f"Hi, I'm Guest {n}, a large latte with oat milk please"],
+                )
+            ),
+        ),
+        (
+            "function_tools_executed",
+            FunctionToolsExecutedEvent(
+                function_calls=[call], function_call_outputs=[output]
+            ),
+        ),
+        (
+            "conversation_item_added",
+            ConversationItemAddedEvent(
+                item=llm.ChatMessage(
+                    role="assistant",
+                    content=[
+                        "Large oat latte, lovely. Koi extras chahiye? Extra shot, "
+                        "vanilla syrup, caramel, whipped cream?"
+                    ],
+                )
+            ),
+        ),
+    ]
+
+
+def order(session: int, n: int) -> dict:
+    return {
+        "name": f"Guest {n}",
+        "items": [
+            {
+                "drinkType": "Latte",
+                "size": "large",
+                "milk": "oat",
+                "extras": ["extra shot"],
+            }
+        ],
+        "token_number": f"BT-20251123-{session:05d}{n:03d}",
+        "timestamp": "2025-11-23T08:00:00",
+        "status": "confirmed",
+    }
+
+
+class InMemoryTrail:
+    """The trail kept as a list and compressed when the session ends."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.records = []
+
+    def _on_item(self, ev) -> None:
+        item = ev.item
+        self.records.append(
+            {
+                "type": "message",
+                "ts": time.time(),
+                "role": item.role,
+                "text": item.text_content,
+                "interrupted": item.interrupted,
+            }
+        )
+
+    def _on_tools(self, ev) -> None:
+        for call, output in ev.zipped():
+            self.records.append(
+                {
+                    "type": "tool",
+                    "ts": time.time(),
+                    "name": call.name,
+                    "arguments": call.arguments,
+                    "output": output.output,
+                    "error": output.is_error,
+                }
+            )
+
+    def attach(self, session) -> None:
+        session.on("conversation_item_added", self._on_item)
+        session.on("function_tools_executed", self._on_tools)
+
+    def order(self, order_data: dict) -> None:
+        self.records.append({"type": "order", "ts": time.time(), "order": order_data})
+
+    def end(self) -> None:
+        payload = "".join(
+            json.dumps(r, separators=(",", ":")) + "\n" for r in self.records
+        )
+        with open(self.path, "wb") as f:
+            f.write(gzip.compress(payload.encode()))
+
+
+def run_session(trail, turns: int, args, session: int = 0) -> float:
+    """Emit ``turns`` turns into ``trail``; seconds the handlers took."""
+    emitter = utils.EventEmitter()
+    trail.attach(emitter)
+    events = turn_events(0)
+    spent = 0.0
+    for n in range(turns):
+        t = time.perf_counter()
+        for name, ev in events:
+            emitter.emit(name, ev)
+        if n % args.order_every == args.order_every - 1:
+            trail.order(order(session, n))
+        spent += time.perf_counter() - t
+    return spent
+
+
+def memory(args, workdir: str) -> None:
+    print("peak allocation while one session is recorded")
+    print(f"{'turns':>8}{'records':>10}{'in-memory':>14}{'recorder':>14}{'dropped':>9}")
+    for turns in args.turns:
+        directory = os.path.join(workdir, f"mem-{turns}")
+        os.makedirs(directory)
+        tracemalloc.start()
+        trail = InMemoryTrail(os.path.join(directory, "session.jsonl.gz"))
+        run_session(trail, turns, args)
+        trail.end()
+        in_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        recorder = SessionRecorder(
+            directory, codec=args.codec, flush_interval=args.flush_s
+        )
+        recorder.start()
+        tracemalloc.start()
+        trail = recorder.trail("s-0", "room-0")
+        run_session(trail, turns, args)
+        trail.end()
+        recorder.flush()
+        streamed = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        recorder.close()
+        records = turns * 4 + turns // args.order_every
+        print(
+            f"{turns:>8}{records:>10}{in_memory / 1024:>11.0f} KiB{streamed / 1024:>11.0f} KiB"
+            f"{trail.dropped:>9}"
+        )
+
+
+def loop_cost(args, workdir: str) -> None:
+    directory = os.path.join(workdir, "cost")
+    recorder = SessionRecorder(directory, codec=args.codec, flush_interval=args.flush_s)
+    trail = recorder.trail("s-0", "room-0")
+    in_memory = InMemoryTrail(os.path.join(workdir, "cost.jsonl.gz"))
+    turns = max(args.turns) // 5
+    per_turn = {"in-memory": [], "recorder": []}
+    for _ in range(5):
+        per_turn["in-memory"].append(run_session(in_memory, turns, args) / turns * 1e6)
+        per_turn["recorder"].append(run_session(trail, turns, args) / turns * 1e6)
+    trail.end()
+    recorder.close()
+    stats = recorder.stats()
+    records = 4 + 1 / args.order_every
+    print(
+        "loop cost per record, event emit included: "
+        + ", ".join(
+            f"{mode} {percentile(values, 50) / records:.1f} us"
+            for mode, values in per_turn.items()
+        )
+        + " (the recorder's includes its writer thread's share of the GIL)"
+    )
+    print(
+        f"compression: {stats['bytes_in'] / 1024:.0f} KiB of records -> {stats['bytes_out'] / 1024:.0f} KiB "
+        f"{recorder.codec} ({stats['bytes_in'] / max(1, stats['bytes_out']):.1f}x) in {stats['members']} members"
+    )
+
+    burst = SessionRecorder(
+        os.path.join(workdir, "burst"), codec=args.codec, max_queue=args.max_queue
+    )
+    trail = burst.trail("s-burst", "room-burst")
+    t = time.perf_counter()
+    for n in range(args.burst):
+        trail.record("message", role="user", text=f"burst {n}", interrupted=False)
+    spent = time.perf_counter() - t
+    trail.end()
+    burst.close()
+    taken = args.burst - trail.dropped
+    print(
+        f"burst: {args.burst} records at once into a queue of {args.max_queue}: {taken} recorded, "
+        f"{trail.dropped} dropped, {spent / args.burst * 1e6:.2f} us each on the loop"
+    )
+
+
+def lookup(args, workdir: str) -> None:
+    directory = os.path.join(workdir, "lookup")
+    recorder = SessionRecorder(
+        directory,
+        codec=args.codec,
+        flush_interval=args.flush_s,
+        max_bytes=args.segment_kb * 1024,
+    )
+    # sessions overlap, as on a worker with several job processes sharing the directory
+    trails = [recorder.trail(f"s-{s}", f"room-{s}") for s in range(args.sessions)]
+    events = turn_events(0)
+    emitters = []
+    for trail in trails:
+        emitter = utils.EventEmitter()
+        trail.attach(emitter)
+        emitters.append(emitter)
+    for n in range(args.session_turns):
+        for s, emitter in enumerate(emitters):
+            for name, ev in events:
+                emitter.emit(name, ev)
+            if n == args.session_turns - 1:
+                trails[s].order(order(s, n))
+        recorder.flush()
+    for trail in trails:
+        trail.end()
+    recorder.close()
+
+    segments = [path[: -len(".idx")] for path in _index_files(directory)]
+    total = sum(os.path.getsize(p) for p in segments)
+    index_bytes = sum(os.path.getsize(p + ".idx") for p in segments)
+    wanted = args.sessions // 2
+    token = order(wanted, args.session_turns - 1)["token_number"]
+    print(
+        f"lookup: {args.sessions} sessions x {args.session_turns} turns in {len(segments)} segments, "
+        f"{total / 1024:.0f} KiB + {index_bytes / 1024:.0f} KiB index"
+    )
+
+    def indexed():
+        return read_trail(directory, token=token)
+
+    def scan_all():
+        found = []
+        for path in segments:
+            with gzip.open(path, "rt") if path.endswith(".gz") else open(path) as f:
+                records = [json.loads(line) for line in f]
+            found.extend(
+                r
+                for r in records
+                if r["type"] == "order" and r["order"]["token_number"] == token
+            )
+        return found
+
+    for label, fn in (
+        ("index + matching members", indexed),
+        ("decompress every segment", scan_all),
+    ):
+        if label.startswith("decompress") and recorder.codec == "zstd":
+            continue
+        times = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t) * 1000)
+        print(f"  {label:<28}{percentile(times, 50):9.1f} ms")
+    records = next(iter(indexed().values()))
+    members = 0
+    member_bytes = 0
+    for path in _index_files(directory):
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["session"] == f"s-{wanted}":
+                    members += 1
+                    member_bytes += entry["length"]
+    kinds = sorted({r["type"] for r in records})
+    print(
+        f"  session s-{wanted}: {len(records)} records ({', '.join(kinds)}) from {members} members, "
+        f"{member_bytes / 1024:.1f} KiB decompressed vs {total / 1024:.0f} KiB"
+    )
+
+
+def one_call(directory: str, call: int, args) -> None:
+    recorder = SessionRecorder(directory, codec=args.codec, flush_interval=args.flush_s)
+    trail = recorder.trail(f"call-{call}", f"room-{call}")
+    run_session(trail, args.session_turns, args, session=call)
+    trail.end()
+    recorder.close()
+
+
+def calls(args, workdir: str) -> None:
+    directory = os.path.join(workdir, "calls")
+    context = multiprocessing.get_context("fork")
+    t = time.perf_counter()
+    for start in range(0, args.calls, 4):
+        jobs = [
+            context.Process(target=one_call, args=(directory, call, args))
+            for call in range(start, min(start + 4, args.calls))
+        ]
+        for job in jobs:
+            job.start()
+        for job in jobs:
+            job.join()
+    elapsed = time.perf_counter() - t
+    segments = [path[: -len(".idx")] for path in _index_files(directory)]
+    last = f"call-{args.calls - 1}"
+    found = len(read_trail(directory, session=last)[last])
+    print(
+        f"calls: {args.calls} job processes, one call each, in {elapsed:.1f} s: "
+        f"{len(segments)} segment(s) + {len(segments)} index file(s); "
+        f"last call read back with {found} records"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--turns",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=[100, 1000, 10000],
+    )
+    parser.add_argument("--order-every", type=int, default=5)
+    parser.add_argument(
+        "--codec", default=None, help="zstd or gzip; zstd when zstandard is installed"
+    )
+    parser.add_argument("--flush-s", type=float, default=5.0)
+    parser.add_argument("--max-queue", type=int, default=4096)
+    parser.add_argument("--burst", type=int, default=50000)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--session-turns", type=int, default=8)
+    parser.add_argument("--segment-kb", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=40)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("agent").setLevel(logging.ERROR)
+
+    workdir = tempfile.mkdtemp(prefix="bench-recorder-")
+    try:
+        memory(args, workdir)
+        loop_cost(args, workdir)
+        lookup(args, workdir)
+        calls(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
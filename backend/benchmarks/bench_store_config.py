@@ -0,0 +1,291 @@
+"""Per-session construction cost of the store config, parsed per session vs shared, and its hot reload.
+
+Every session builds a ``CoffeeBarista``. Measured per session:
+
+- per-session: the store config file is parsed, validated and turned into a
+  ``StoreConfig`` (menu catalog included) for every session, with its own
+  receipt renderer and instructions, as a config without a shared holder
+  would need
+- shared: ``StoreConfigFile.current()`` from prewarm (its thread stats the
+  file every ``check_interval``), with the renderer and instructions cached
+  per config, as ``entrypoint`` does
+- built-in: no config file at all, the hardcoded defaults
+
+The parts are timed on their own as well. The reload section times
+``current()``, which is all the event loop pays, and the checking thread's
+``check()`` when nothing changed (a stat) and after the file was replaced.
+The consistency section replaces the file (``os.replace``) and rewrites it
+in place (truncate and write, which readers can catch half written) from a
+second thread while the holder's thread checks it every millisecond and
+sessions are built against ``current()``: every session's brand, greeting
+and menu must come from the same version of the file.
+
+    uv run python benchmarks/bench_store_config.py --sessions 2000
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from _common import SRC_DIR, percentile  # noqa: F401  (puts src/ on sys.path)
+
+
+def store_file(version: int) -> dict:
+    """A full config whose brand, greeting and one drink name all carry ``version``."""
+    from store_config import DEFAULT_STORE_CONFIG
+
+    data = DEFAULT_STORE_CONFIG.to_dict()
+    data["brand"] = f"Store {version}"
+    data["replies"]["greeting"] = f"Hello! Welcome to Store {version}."
+    data["menu"].append(
+        {
+            "sku": "DRK-HOUSE",
+            "category": "drink",
+            "name": f"House Blend {version}",
+            "aliases": [],
+        }
+    )
+    return data
+
+
+def write_atomic(path: str, data: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def write_in_place(path: str, data: dict) -> None:
+    payload = json.dumps(data)
+    with open(path, "w") as f:
+        # two writes, so a reader can see the first half alone
+        f.write(payload[: len(payload) // 2])
+        f.flush()
+        f.write(payload[len(payload) // 2 :])
+
+
+def timed(fn, n: int) -> list[float]:
+    """Microseconds per call, one sample per call."""
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1e6)
+    return samples
+
+
+def construction(args, path: str) -> None:
+    import agent
+    from receipt_renderer import ReceiptRenderer
+    from store_config import StoreConfig, StoreConfigFile
+    from transport import DataTransport
+
+    # what prewarm passes to every session
+    shared = {
+        "order_journal": agent.create_order_journal(),
+        "order_feed": agent.OrderFeed.from_env(),
+        "token_allocator": agent.create_token_allocator(),
+        "data_transport": DataTransport(None),
+    }
+    holder = StoreConfigFile(path, check_interval=0)
+
+    def per_session() -> None:
+        config = StoreConfig.load(path)
+        # a config object per session: every per-config cache misses
+        agent.CoffeeBarista(
+            store_config=config,
+            receipt_renderer=ReceiptRenderer(
+                brand=config.brand,
+                tagline=config.tagline,
+                cup_heights=config.cup_heights,
+                default_cup_height=config.default_cup_height,
+                cold_keywords=config.cold_keywords,
+            ),
+            **shared,
+        )
+
+    def shared_config() -> None:
+        config = holder.current()
+        agent.CoffeeBarista(
+            store_config=config,
+            receipt_renderer=agent.create_receipt_renderer(config),
+            **shared,
+        )
+
+    def built_in() -> None:
+        agent.CoffeeBarista(receipt_renderer=agent.create_receipt_renderer(), **shared)
+
+    def read_json() -> dict:
+        with open(path) as f:
+            return json.loads(f.read())
+
+    with open(path) as f:
+        raw = f.read()
+    config = holder.current()
+    parts = (
+        ("read + json.loads", read_json),
+        ("validate + StoreConfig", lambda: StoreConfig.from_dict(json.loads(raw))),
+        (
+            "build_instructions (uncached)",
+            lambda: agent.build_instructions.__wrapped__(config, config.catalog),
+        ),
+        ("ReceiptRenderer()", lambda: ReceiptRenderer(brand=config.brand)),
+        ("StoreConfigFile.current()", holder.current),
+    )
+
+    print(
+        f"per-session construction, {args.sessions} sessions, median of interleaved rounds"
+    )
+    print(f"{'mode':<34}{'p50 us':>10}{'p95 us':>10}{'sessions/s':>12}")
+    modes = {
+        "per-session parse": per_session,
+        "shared (current())": shared_config,
+        "built-in defaults": built_in,
+    }
+    samples = {mode: [] for mode in modes}
+    for _ in range(args.rounds):
+        for mode, fn in modes.items():
+            samples[mode].extend(timed(fn, args.sessions // args.rounds))
+    for mode, values in samples.items():
+        p50 = percentile(values, 50)
+        print(
+            f"{mode:<34}{p50:>10.1f}{percentile(values, 95):>10.1f}{1e6 / p50:>12.0f}"
+        )
+    print("parts")
+    for label, fn in parts:
+        print(f"  {label:<32}{percentile(timed(fn, args.sessions // 4), 50):>10.2f}")
+
+
+def reload_cost(args, path: str) -> None:
+    from store_config import StoreConfigFile
+
+    print("reload")
+    holder = StoreConfigFile(path, check_interval=0)
+    print(
+        f"  {'current()':<32}{percentile(timed(holder.current, 20000), 50):>10.2f} us"
+    )
+    print(
+        f"  {'check(), unchanged':<32}{percentile(timed(holder.check, 20000), 50):>10.2f} us"
+    )
+    reloads = []
+    for n in range(args.reloads):
+        write_atomic(path, store_file(n % 2))
+        t = time.perf_counter()
+        holder.check()
+        reloads.append((time.perf_counter() - t) * 1e6)
+    print(
+        f"  {'check(), file replaced':<32}{percentile(reloads, 50):>10.1f} us  ({holder.reloads} reloads)"
+    )
+
+
+def consistency(args, path: str) -> None:
+    import agent
+    from store_config import StoreConfigFile
+    from transport import DataTransport
+
+    shared = {
+        "order_journal": agent.create_order_journal(),
+        "order_feed": agent.OrderFeed.from_env(),
+        "token_allocator": agent.create_token_allocator(),
+        "data_transport": DataTransport(None),
+    }
+    print(
+        f"consistency, {args.consistency_s:.0f} s per writer, sessions built while the file changes"
+    )
+    for label, write in (
+        ("os.replace", write_atomic),
+        ("in-place rewrite", write_in_place),
+    ):
+        write_atomic(path, store_file(0))
+        holder = StoreConfigFile(path, check_interval=0.001)
+        stop = threading.Event()
+        writes = 0
+
+        def writer(stop=stop, write=write) -> None:
+            nonlocal writes
+            while not stop.is_set():
+                writes += 1
+                write(path, store_file(writes % 2))
+                time.sleep(args.write_interval_ms / 1000)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        sessions = mixed = 0
+        seen = set()
+        deadline = time.monotonic() + args.consistency_s
+        while time.monotonic() < deadline:
+            config = holder.current()
+            barista = agent.CoffeeBarista(
+                store_config=config,
+                receipt_renderer=agent.create_receipt_renderer(config),
+                **shared,
+            )
+            version = config.brand.rpartition(" ")[2]
+            receipt = barista._receipt_renderer.render(
+                {
+                    "name": "A",
+                    "items": [
+                        {
+                            "drinkType": "Latte",
+                            "size": "small",
+                            "milk": "oat",
+                            "extras": [],
+                        }
+                    ],
+                    "timestamp": "",
+                },
+                "T",
+            )
+            views = (
+                barista._replies["greeting"].rstrip(".").rpartition(" ")[2],
+                barista._menu.names("drink")[-1].rpartition(" ")[2],
+                barista.instructions.partition("Custom drinks")[0]
+                .rstrip(". ")
+                .rpartition(" ")[2],
+                "ok" if f"<title>Store {version} Order" in receipt else "?",
+            )
+            mixed += views[:3] != (version,) * 3 or views[3] != "ok"
+            seen.add(version)
+            sessions += 1
+        stop.set()
+        thread.join()
+        holder.close()
+        print(
+            f"  {label:<18} {writes:6d} writes {holder.reloads:6d} reloads {holder.rejected:5d} rejected reads "
+            f"{sessions:7d} sessions "
+            f"versions seen {sorted(seen)}  mixed {mixed}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--reloads", type=int, default=200)
+    parser.add_argument("--consistency-s", type=float, default=3.0)
+    parser.add_argument("--write-interval-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # rejected half-written files are logged as errors, once per version of the file
+    logging.getLogger("agent").setLevel(logging.CRITICAL)
+
+    workdir = tempfile.mkdtemp(prefix="bench-store-")
+    os.environ["ORDERS_DIR"] = workdir
+    path = os.path.join(workdir, "store.json")
+    write_atomic(path, store_file(0))
+    try:
+        construction(args, path)
+        reload_cost(args, path)
+        consistency(args, path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Offline replay: LLM calls and simulated turn latency per completed order.
+
+Each scripted conversation lists the customer's utterances together with the
+order fields each one carries. The replay counts the LLM calls every flow
+needs to complete the order:
+
+- old/sequential: one set_* tool call per field, each followed by another
+  LLM call (how the per-field tools are typically driven)
+- old/parallel: all set_* calls for a turn issued together, then one more
+  LLM call to speak
+- new: the rule-based pre-extractor fills what it can before the LLM runs;
+  anything it missed costs a single update_order call
+
+confirm_order and save_order cost the same in every flow.
+
+    uv run python benchmarks/bench_tool_roundtrips.py --ttft-ms 450
+"""
+
+import argparse
+
+from _common import SRC_DIR  # noqa: F401  (puts src/ on sys.path)
+
+from order_extractor import extract_order_slots
+
+# (utterance, fields it carries)
+CONVERSATIONS = [
+    [
+        ("Hi, I'm Ravi", {"name"}),
+        ("A latte please", {"drinkType"}),
+        ("Medium", {"size"}),
+        ("Oat milk", {"milk"}),
+        ("No extras", {"extras"}),
+    ],
+    [
+        (
+            "Hey, my name is Priya, can I get a large oat milk latte with an extra shot",
+            {"name", "drinkType", "size", "milk", "extras"},
+        ),
+    ],
+    [
+        ("My name is Sam", {"name"}),
+        ("I'd like a small cappuccino with almond milk", {"drinkType", "size", "milk"}),
+        ("Add whipped cream and vanilla", {"extras"}),
+    ],
+    [
+        ("This is Jenna, one cold brew", {"name", "drinkType"}),
+        ("Make it a large, black", {"size", "milk"}),
+        ("Nothing else, thanks", {"extras"}),
+    ],
+    [
+        (
+            "Call me Arjun, I want something chocolatey, the mocha I guess",
+            {"name", "drinkType"},
+        ),
+        ("Whatever is the biggest one", {"size"}),
+        ("Soya milk", {"milk"}),
+        ("That's it", {"extras"}),
+    ],
+    [
+        ("Hello! Name's Meera", {"name"}),
+        (
+            "Iced latte, medium, skim milk and caramel drizzle please",
+            {"drinkType", "size", "milk", "extras"},
+        ),
+    ],
+]
+
+CONFIRM_AND_SAVE_CALLS = (
+    2 * 2
+)  # confirm_order + save_order, each a tool call plus a reply
+
+
+def old_sequential(conversation) -> int:
+    return sum(1 + len(fields) for _, fields in conversation) + CONFIRM_AND_SAVE_CALLS
+
+
+def old_parallel(conversation) -> int:
+    return (
+        sum(2 if fields else 1 for _, fields in conversation) + CONFIRM_AND_SAVE_CALLS
+    )
+
+
+def new_flow(conversation) -> tuple[int, int]:
+    calls = 0
+    prefilled = 0
+    for utterance, fields in conversation:
+        extracted = set(extract_order_slots(utterance))
+        prefilled += len(fields & extracted)
+        calls += 2 if fields - extracted else 1
+    return calls + CONFIRM_AND_SAVE_CALLS, prefilled
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--ttft-ms", type=float, default=450.0, help="simulated LLM time-to-first-token"
+    )
+    args = parser.parse_args()
+
+    totals = {"old/sequential": 0, "old/parallel": 0, "new": 0}
+    fields_total = prefilled_total = 0
+    print(f"{'order':<6}{'turns':>6}{'old/seq':>9}{'old/par':>9}{'new':>6}  prefilled")
+    for i, conversation in enumerate(CONVERSATIONS, 1):
+        seq, par = old_sequential(conversation), old_parallel(conversation)
+        new, prefilled = new_flow(conversation)
+        fields = sum(len(f) for _, f in conversation)
+        totals["old/sequential"] += seq
+        totals["old/parallel"] += par
+        totals["new"] += new
+        fields_total += fields
+        prefilled_total += prefilled
+        print(
+            f"{i:<6}{len(conversation):>6}{seq:>9}{par:>9}{new:>6}  {prefilled}/{fields}"
+        )
+
+    n = len(CONVERSATIONS)
+    print(
+        f"\npre-extractor filled {prefilled_total}/{fields_total} fields without the LLM"
+    )
+    for flow, calls in totals.items():
+        print(
+            f"{flow:<16} {calls / n:5.2f} LLM calls/order  "
+            f"~{calls / n * args.ttft_ms / 1000:5.2f}s simulated LLM wait/order"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Data-channel payload size and delivery time: raw payloads vs the message transport.
+
+Sends each message through a stand-in room: ``publish_data`` puts packets on
+one simulated link (``--kbps`` of bandwidth, ``--latency-ms`` one way) to a
+receiver, and drops packets over LiveKit's ~15 KiB reliable-packet limit the
+way the SFU does. The receiver is a Python stand-in for the frontend:
+
+- raw: the payload goes out as one packet (HTML receipts inside the old
+  ``HTML_SNIPPET`` markers); the receiver regex-scans every packet for the
+  markers, as ``blue-tokai-session.tsx`` once did
+- envelope: ``DataTransport`` with compression off; chunked above the limit
+- envelope+zlib: ``DataTransport`` as the agent uses it
+
+Reported per message: bytes and packets on the wire, end-to-end time from
+``send`` to the handler, whether it arrived intact, and the agent-side cost
+(encoding plus the ctypes copy ``publish_data`` makes of every payload).
+The receiver cost of routing by topic vs scanning is reported on a mix of
+unrelated traffic.
+
+    uv run python benchmarks/bench_transport.py --kbps 2000 --latency-ms 40
+"""
+
+import argparse
+import asyncio
+import ctypes
+import json
+import re
+import time
+from datetime import datetime, timedelta
+
+from _common import SRC_DIR, percentile  # noqa: F401  (puts src/ on sys.path)
+
+from receipt_renderer import ReceiptRenderer
+from receipts import RECEIPT_TOPIC, RECEIPT_TYPE, build_receipt
+from transport import DataTransport, Reassembler
+
+HTML_PATTERN = re.compile(rb"HTML_SNIPPET:(.*?)END_HTML_SNIPPET", re.S)
+# what LiveKit accepts in one reliable packet
+LIVEKIT_LIMIT = 15 * 1024
+DRINKS = (
+    ("Iced Latte", "large", "oat", ["extra shot", "whipped cream"]),
+    ("Cappuccino", "medium", "regular", []),
+    ("Cold Brew", "small", "almond", ["vanilla syrup"]),
+    ("Mocha", "large", "soy", ["caramel drizzle", "whipped cream"]),
+)
+
+
+def order(n: int, drinks: int) -> dict:
+    return {
+        "name": f"Guest {n}",
+        "items": [
+            {"drinkType": d, "size": s, "milk": m, "extras": e}
+            for d, s, m, e in (DRINKS[i % len(DRINKS)] for i in range(drinks))
+        ],
+        "token_number": f"BT-20251123-{n:04d}",
+        "timestamp": (datetime(2025, 11, 23, 8) + timedelta(minutes=n)).isoformat(),
+        "status": "confirmed",
+    }
+
+
+def messages() -> list[tuple[str, str, object, bytes]]:
+    """(label, type, data, raw payload) per message."""
+    renderer = ReceiptRenderer()
+    one, cart = order(1, 1), order(2, 8)
+    history = [build_receipt(order(n, 1 + n % 3)) for n in range(200)]
+
+    def raw_json(data) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    def raw_html(o: dict) -> bytes:
+        return f"HTML_SNIPPET:{renderer.render(o, o['token_number'])}END_HTML_SNIPPET".encode()
+
+    return [
+        (
+            "receipt, 1 drink",
+            RECEIPT_TYPE,
+            build_receipt(one),
+            raw_json(build_receipt(one)),
+        ),
+        (
+            "receipt, 8 drinks",
+            RECEIPT_TYPE,
+            build_receipt(cart),
+            raw_json(build_receipt(cart)),
+        ),
+        (
+            "HTML receipt, 1 drink",
+            "receipt_html",
+            renderer.render(one, one["token_number"]),
+            raw_html(one),
+        ),
+        (
+            "HTML receipt, 8 drinks",
+            "receipt_html",
+            renderer.render(cart, cart["token_number"]),
+            raw_html(cart),
+        ),
+        ("last 200 orders", "history", history, raw_json(history)),
+    ]
+
+
+class StandInRoom:
+    """One simulated link from the agent to a browser."""
+
+    def __init__(self, kbps: float, latency_ms: float, on_packet) -> None:
+        self.bytes_per_s = kbps * 1000 / 8
+        self.latency = latency_ms / 1000
+        self.on_packet = on_packet
+        self.link_free_at = 0.0
+        self.ffi_copy_s = 0.0
+        self.dropped = 0
+
+    async def publish_data(
+        self,
+        payload: bytes,
+        *,
+        reliable: bool = True,
+        destination_identities=(),
+        topic: str = "",
+    ) -> None:
+        t = time.perf_counter()
+        (ctypes.c_byte * len(payload))(
+            *payload
+        )  # what livekit.rtc does before the FFI call
+        self.ffi_copy_s += time.perf_counter() - t
+        if len(payload) > LIVEKIT_LIMIT:
+            self.dropped += 1
+            return
+        now = time.perf_counter()
+        self.link_free_at = (
+            max(now, self.link_free_at) + len(payload) / self.bytes_per_s
+        )
+        arrive = self.link_free_at + self.latency
+        asyncio.get_running_loop().call_later(
+            arrive - now, self.on_packet, payload, topic
+        )
+
+
+async def deliver(mode: str, msg_type: str, data, raw: bytes, args) -> dict:
+    done = asyncio.get_running_loop().create_future()
+    reassembler = Reassembler()
+
+    def on_packet(payload: bytes, topic: str) -> None:
+        if done.done():
+            return
+        if mode == "raw":
+            match = HTML_PATTERN.search(payload)
+            got = match.group(1).decode() if match else json.loads(payload)
+        else:
+            if topic != RECEIPT_TOPIC:
+                return
+            message = reassembler.feed(payload, "agent")
+            if message is None:
+                return
+            got = message[1]
+        done.set_result((time.perf_counter(), got))
+
+    room = StandInRoom(args.kbps, args.latency_ms, on_packet)
+    transport = DataTransport(
+        room.publish_data, compress_threshold=0 if mode == "envelope" else 1024
+    )
+    packets = [raw] if mode == "raw" else transport.encode(msg_type, data)
+    started = time.perf_counter()
+    if mode == "raw":
+        await room.publish_data(raw, topic=RECEIPT_TOPIC)
+    else:
+        await transport.send(RECEIPT_TOPIC, msg_type, data)
+    agent_us = (time.perf_counter() - started) * 1e6
+    try:
+        if room.dropped:
+            raise asyncio.TimeoutError
+        arrived, got = await asyncio.wait_for(done, 5 + len(raw) / room.bytes_per_s * 2)
+        ms, intact = (arrived - started) * 1000, got == data
+    except asyncio.TimeoutError:
+        ms, intact = float("nan"), False
+    return {
+        "bytes": sum(len(p) for p in packets),
+        "packets": len(packets),
+        "ms": ms,
+        "intact": intact,
+        "agent_us": agent_us,
+        "ffi_us": room.ffi_copy_s * 1e6,
+    }
+
+
+def receiver_cost(args) -> None:
+    """Receiver time per packet on unrelated traffic: regex scan vs topic routing."""
+    chatter = [
+        (
+            json.dumps({"text": f"transcript segment {n} " * 4}).encode(),
+            "lk.transcription",
+        )
+        for n in range(args.mix)
+    ]
+    receipt = DataTransport(None).encode(RECEIPT_TYPE, build_receipt(order(1, 1)))[0]
+    traffic = [*chatter, (receipt, RECEIPT_TOPIC)]
+    reassembler = Reassembler()
+
+    def scan() -> None:
+        for payload, _ in traffic:
+            HTML_PATTERN.search(payload)
+
+    def route() -> None:
+        for payload, topic in traffic:
+            if topic == RECEIPT_TOPIC:
+                reassembler.feed(payload)
+
+    for label, fn in (("regex scan of every packet", scan), ("route by topic", route)):
+        best = float("inf")
+        for _ in range(20):
+            t = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t)
+        print(f"  {label:<28} {best / len(traffic) * 1e9:7.0f} ns/packet")
+
+
+async def run(args) -> None:
+    print(
+        f"stand-in room: {args.kbps:.0f} kbit/s, {args.latency_ms:.0f} ms one way, "
+        f"packets over {LIVEKIT_LIMIT} bytes dropped; median of {args.repeat}"
+    )
+    print(
+        f"{'message':<24}{'mode':<15}{'bytes':>8}{'packets':>8}{'end-to-end':>12}"
+        f"{'intact':>8}{'agent us':>10}{'ffi copy us':>12}"
+    )
+    for label, msg_type, data, raw in messages():
+        for mode in ("raw", "envelope", "envelope+zlib"):
+            runs = [
+                await deliver(mode, msg_type, data, raw, args)
+                for _ in range(args.repeat)
+            ]
+            r = runs[0]
+            ms = percentile([x["ms"] for x in runs], 50)
+            print(
+                f"{label:<24}{mode:<15}{r['bytes']:>8}{r['packets']:>8}"
+                f"{'lost' if ms != ms else f'{ms:.1f} ms':>12}{all(x['intact'] for x in runs)!s:>8}"
+                f"{percentile([x['agent_us'] for x in runs], 50):>10.0f}"
+                f"{percentile([x['ffi_us'] for x in runs], 50):>12.0f}"
+            )
+    print(f"receiver, {args.mix} unrelated packets per receipt")
+    receiver_cost(args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kbps", type=float, default=2000.0)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--mix", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Time to first audio frame for fixed phrases, phrase-cache hits vs misses.
+
+A fake streaming TTS stands in for Murf's websocket stream. It waits
+``--network-ms`` after the input ends, then delivers 100 ms chunks of silence
+at ``--realtime`` x real time. The first frame out of each stream is timed:
+
+- direct: the fake TTS's own stream, no cache, as the agent spoke before
+  the cache existed
+- miss: ``CachedTTS`` (basic sentence tokenizer) on an empty cache; every
+  sentence goes to the fake TTS's stream
+- hit: same process, after the misses were stored
+- hit/new process: a fresh ``PhraseAudioCache`` on the same directory, as a
+  second job process on the host would see it
+
+Misses must go through ``stream``, never ``synthesize``, and hits must never
+reach the TTS.
+
+    uv run python benchmarks/bench_tts_cache.py --network-ms 250 --rounds 20
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from _common import percentile
+from livekit import rtc
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, tokenize, tts, utils
+
+import agent
+from tts_cache import CachedTTS, PhraseAudioCache
+
+SAMPLE_RATE = 24000
+PHRASES = list(agent.PRECOMPUTED_PHRASES)
+
+
+class FakeTTS(tts.TTS):
+    def __init__(self, *, network_ms: float, realtime: float) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=True),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.network = network_ms / 1000
+        self.realtime = realtime
+        self.streamed: list[str] = []
+
+    def synthesize(self, text, *, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        raise AssertionError(f"synthesize({text!r}) instead of stream()")
+
+    def stream(self, *, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        return FakeStream(tts=self, conn_options=conn_options)
+
+
+class FakeStream(tts.SynthesizeStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        fake: FakeTTS = self._tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        text = ""
+        async for data in self._input_ch:
+            if isinstance(data, str):
+                text += data
+        fake.streamed.append(text)
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        self._mark_started()
+        await asyncio.sleep(fake.network)
+        # ~60 ms of speech per character, delivered in 100 ms chunks
+        chunk = bytes(SAMPLE_RATE // 10 * 2)
+        for _ in range(max(1, len(text) * 60 // 100)):
+            output_emitter.push(chunk)
+            await asyncio.sleep(0.1 / fake.realtime)
+        output_emitter.end_input()
+
+
+async def first_frame_ms(speaker: tts.TTS, text: str) -> float:
+    start = time.perf_counter()
+    first = None
+    async with speaker.stream() as stream:
+        stream.push_text(text)
+        stream.end_input()
+        async for audio in stream:
+            if first is None and isinstance(audio.frame, rtc.AudioFrame):
+                first = (time.perf_counter() - start) * 1000
+    return first or 0.0
+
+
+def cached_tts(fake: FakeTTS, cache: PhraseAudioCache) -> CachedTTS:
+    return CachedTTS(
+        fake,
+        cache,
+        voice=agent.TTS_VOICE,
+        style=agent.TTS_STYLE,
+        phrases=PHRASES,
+        sentence_tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--network-ms", type=float, default=250.0)
+    parser.add_argument(
+        "--realtime", type=float, default=20.0, help="fake synthesis speed"
+    )
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-tts-")
+    fake = FakeTTS(network_ms=args.network_ms, realtime=args.realtime)
+    results: dict[str, list[float]] = {
+        "direct": [],
+        "miss": [],
+        "hit": [],
+        "hit/new process": [],
+    }
+
+    for round_ in range(args.rounds):
+        for phrase in PHRASES:
+            results["direct"].append(await first_frame_ms(fake, phrase))
+        direct_requests = len(fake.streamed)
+
+        round_dir = f"{directory}/{round_}"
+        cached = cached_tts(fake, PhraseAudioCache(round_dir))
+        for phrase in PHRASES:
+            results["miss"].append(await first_frame_ms(cached, phrase))
+        await asyncio.gather(*cached._write_tasks)
+        requests_after_miss = len(fake.streamed)
+        assert requests_after_miss > direct_requests, (
+            "misses did not reach the TTS stream"
+        )
+        for phrase in PHRASES:
+            results["hit"].append(await first_frame_ms(cached, phrase))
+        assert len(fake.streamed) == requests_after_miss, (
+            "a cached sentence went to the TTS"
+        )
+
+        cached = cached_tts(fake, PhraseAudioCache(round_dir))
+        for phrase in PHRASES:
+            results["hit/new process"].append(await first_frame_ms(cached, phrase))
+        assert len(fake.streamed) == requests_after_miss
+
+    print(
+        f"{len(PHRASES)} phrases, fake network {args.network_ms:.0f} ms, {args.rounds} rounds"
+    )
+    for label, samples in results.items():
+        print(
+            f"{label:16s} first audio p50 {percentile(samples, 50):7.2f} ms   "
+            f"p95 {percentile(samples, 95):7.2f} ms"
+        )
+    print(
+        f"TTS streams: {len(fake.streamed)} for {4 * args.rounds * len(PHRASES)} "
+        "phrases spoken, no synthesize calls"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
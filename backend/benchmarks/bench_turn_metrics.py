@@ -0,0 +1,226 @@
+"""Cost per recorded sample and quantile accuracy of the turn-latency histograms.
+
+- record: ``LogHistogram.record`` on lognormal latencies (what every
+  EOU/STT/TTFT/TTFB sample costs, per registry)
+- on_metrics: ``TurnMetrics.on_metrics`` on a stream of EOU, LLM and TTS
+  metrics events (type dispatch, histogram records and the speech_id join),
+  per event and per recorded sample
+- timed_tool: overhead of the ``timed_tool`` wrapper around an empty coroutine
+- quantiles: histogram p50/p95/p99 vs the exact values from the sorted samples
+- scrape: one ``/metrics`` request against ``LocalHTTPServer`` with
+  ``--processes`` snapshot files of running jobs in the metrics directory
+- fold: ``fold_snapshots`` taking in ``--processes`` snapshots of exited
+  jobs, then a scrape of the folded directory
+
+    uv run python benchmarks/bench_turn_metrics.py --samples 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import aiohttp
+from _common import percentile
+from livekit.agents.metrics import EOUMetrics, LLMMetrics, TTSMetrics
+
+import turn_metrics
+from local_http import LocalHTTPServer
+from turn_metrics import (
+    LogHistogram,
+    TurnMetrics,
+    add_metrics_routes,
+    fold_snapshots,
+    timed_tool,
+    write_snapshot,
+)
+
+REPEAT = 20
+
+
+def ns_per_call(fn, items, repeat: int = REPEAT) -> float:
+    """Best of ``repeat`` passes over ``items``, so scheduler noise does not count.
+
+    ``items`` is kept small enough to stay in CPU cache: a live sample is a
+    float that was just computed, not one of a million cold objects.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / len(items)
+
+
+def turn_events(turns: int, rng: random.Random) -> list:
+    events = []
+    for i in range(turns):
+        sid = f"speech_{i}"
+        events.append(
+            EOUMetrics(
+                timestamp=0.0,
+                end_of_utterance_delay=rng.lognormvariate(-1.2, 0.4),
+                transcription_delay=rng.lognormvariate(-1.5, 0.4),
+                on_user_turn_completed_delay=0.0,
+                speech_id=sid,
+            )
+        )
+        events.append(
+            LLMMetrics(
+                label="llm",
+                request_id=sid,
+                timestamp=0.0,
+                duration=1.0,
+                ttft=rng.lognormvariate(-0.7, 0.3),
+                cancelled=False,
+                completion_tokens=20,
+                prompt_tokens=1000,
+                prompt_cached_tokens=0,
+                total_tokens=1020,
+                tokens_per_second=50.0,
+                speech_id=sid,
+            )
+        )
+        events.append(
+            TTSMetrics(
+                label="tts",
+                request_id=sid,
+                timestamp=0.0,
+                ttfb=rng.lognormvariate(-1.3, 0.3),
+                duration=1.0,
+                audio_duration=2.0,
+                cancelled=False,
+                characters_count=40,
+                streamed=True,
+                speech_id=sid,
+            )
+        )
+    return events
+
+
+class Tools:
+    @timed_tool
+    async def timed(self) -> None:
+        pass
+
+    async def plain(self) -> None:
+        pass
+
+
+async def tool_overhead_ns(calls: int) -> float:
+    tools = Tools()
+    timings = {}
+    for name in ("plain", "timed"):
+        method = getattr(tools, name)
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            await method()
+        timings[name] = (time.perf_counter_ns() - start) / calls
+    return timings["timed"] - timings["plain"]
+
+
+async def scrape_ms(directory: str, rounds: int) -> float:
+    server = LocalHTTPServer(0)
+    add_metrics_routes(server, directory, max_age=3600)
+    port = await server.start()
+    samples = []
+    async with aiohttp.ClientSession() as http:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            async with http.get(f"http://127.0.0.1:{port}/metrics") as resp:
+                await resp.text()
+            samples.append((time.perf_counter() - start) * 1000)
+    await server.aclose()
+    return percentile(samples, 50)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--samples", type=int, default=1_000_000, help="for the quantile check"
+    )
+    parser.add_argument("--turns", type=int, default=2_000)
+    parser.add_argument(
+        "--processes", type=int, default=50, help="snapshot files to merge per scrape"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    latencies = [rng.lognormvariate(-1.0, 0.6) for _ in range(args.samples)]
+    hist = LogHistogram()
+    record_ns = ns_per_call(hist.record, latencies[:10_000])
+    empty_ns = ns_per_call(lambda seconds: None, latencies[:10_000])
+    for seconds in latencies:
+        hist.record(seconds)
+
+    session = TurnMetrics("bench")
+    events = turn_events(args.turns, rng)
+    on_metrics_ns = ns_per_call(session.on_metrics, events)
+    turns = session.registry.histogram("turn_latency_seconds").count // REPEAT
+    # per turn: EOU delay, STT latency, TTFT, TTFB and the joined turn latency
+    samples = sum(h.count for h in session.registry.histograms.values()) // REPEAT
+
+    tool_ns = asyncio.run(tool_overhead_ns(200_000))
+
+    print(
+        f"{args.samples} samples, {args.turns} turns ({len(events)} metrics events, best of {REPEAT} passes)"
+    )
+    print(
+        f"LogHistogram.record        {record_ns:7.1f} ns/sample "
+        f"(an empty Python call here: {empty_ns:.1f} ns)"
+    )
+    print(
+        f"TurnMetrics.on_metrics     {on_metrics_ns:7.1f} ns/event, "
+        f"{on_metrics_ns * len(events) / samples:7.1f} ns/sample "
+        f"({samples} samples, {turns} turns joined)"
+    )
+    print(f"timed_tool overhead        {tool_ns:7.1f} ns/call")
+    print(
+        f"histogram memory           {len(hist.counts)} buckets, "
+        f"{len(hist.snapshot()['buckets'])} non-empty"
+    )
+
+    print("quantile   exact (ms)  histogram (ms)  error")
+    for q in (50, 95, 99):
+        exact = percentile(latencies, q)
+        approx = hist.quantile(q / 100)
+        print(
+            f"p{q:<8d} {exact * 1000:10.2f}  {approx * 1000:14.2f}  {(approx - exact) / exact:+6.1%}"
+        )
+
+    directory = tempfile.mkdtemp(prefix="bench-metrics-")
+    for pid in range(args.processes):
+        path = write_snapshot(directory)
+        # stand-ins for the other job processes' files
+        os.replace(path, f"{directory}/{100000 + pid}.json")
+    session.close()
+    print(
+        f"/metrics scrape, {args.processes} process snapshots: "
+        f"p50 {asyncio.run(scrape_ms(directory, 50)):.2f} ms, "
+        f"{len(turn_metrics.PROCESS_METRICS.histograms)} series in this process"
+    )
+
+    # the same files as left by exited jobs (pids above any pid_max)
+    for pid in range(args.processes):
+        path = f"{directory}/{100000 + pid}.json"
+        with open(path) as f:
+            data = json.load(f)
+        data["pid"] = 1 << 23 | pid
+        with open(path, "w") as f:
+            json.dump(data, f)
+    start = time.perf_counter()
+    folded = fold_snapshots(directory)
+    fold_ms = (time.perf_counter() - start) * 1000
+    print(
+        f"fold_snapshots, {folded} exited jobs: {fold_ms:.2f} ms, "
+        f"{len(os.listdir(directory))} file(s) left; /metrics scrape after: "
+        f"p50 {asyncio.run(scrape_ms(directory, 50)):.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
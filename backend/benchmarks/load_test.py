@@ -0,0 +1,629 @@
+"""Concurrent-session load test: how many customers one worker host can serve.
+
+Runs ``--sessions`` concurrent ``AgentSession``s with the real
+``CoffeeBarista`` (tools, order journal, order store, token allocator,
+phrase cache) against the deterministic fake STT/LLM/TTS/VAD and room audio
+in ``_fake_plugins.py``. Each session's customer works through scripted
+orders, speaking only after the agent finished its reply. Nothing touches
+the network.
+
+Like the LiveKit worker, every job gets its own process
+(``--sessions-per-process 1``). The processes start and prewarm first; the
+clock starts when all of them are ready. They share one temporary
+ORDERS_DIR, TTS cache and metrics directory.
+
+Turn detection is VAD based: the multilingual turn detector needs the
+worker's inference process, which only exists under ``cli.run_app``.
+
+Reported per level (JSON with ``--json``):
+
+- processes, sessions, completed and failed orders, orders saved to the
+  journal and saves per minute
+- response latency: customer stops talking -> first agent audio frame
+  (p50/p95/p99), and the same for the "yes" turn that saves the order
+- EOU / STT / LLM TTFT / TTS TTFB / turn latency from the ``turn_metrics``
+  snapshots of all processes
+- event-loop lag p99 and max over all processes; with ``--watchdog-ms``, the
+  ``loop_watchdog`` stalls per blamed tool or callback
+- CPU: busy cores and % of the host, per session
+- with ``--load-score``, the ``worker_load.WorkerLoad`` score the worker
+  would report, sampled every 0.5 s over the job processes (median, max, and
+  the part that drove the max); the job processes then write their metrics
+  snapshots every ``--load-window`` seconds
+- memory: RSS and PSS per process, the growth of each process while its
+  sessions ran (per session), and how many sessions the memory available
+  before the level would hold
+
+A level whose job processes die (usually the OOM killer) is reported as
+failed and ends the run.
+
+Each level starts with a fresh order store and a phrase cache holding only
+the fixed phrases, as prewarm leaves it.
+
+A level is "ok" when response p95 and loop-lag p99 stay under
+``--max-response-p95-ms`` and ``--max-lag-p99-ms``; the highest ok level is
+printed as sessions per worker host.
+
+    uv run python benchmarks/load_test.py --sessions 5,10,20,40 --speedup 2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from _common import LoopLagProbe, percentile
+
+# (utterance, update_order arguments); None is the customer's "yes" that saves the order
+SCRIPTS = [
+    [
+        (
+            "Hi, I'm Priya. Can I get a large oat milk latte?",
+            {"name": "Priya", "drink_type": "latte", "size": "large", "milk": "oat"},
+        ),
+        ("An extra shot, please", {"extras": ["extra shot"]}),
+        ("Yes, that's perfect", None),
+    ],
+    [
+        ("My name is Sam", {"name": "Sam"}),
+        (
+            "I'd like a small cappuccino with almond milk",
+            {"drink_type": "cappuccino", "size": "small", "milk": "almond"},
+        ),
+        ("No extras, thanks", {"extras": []}),
+        ("Yes please", None),
+    ],
+    [
+        ("This is Jenna, one cold brew", {"name": "Jenna", "drink_type": "cold brew"}),
+        ("Make it a large, black", {"size": "large", "milk": "none"}),
+        ("Add vanilla syrup", {"extras": ["vanilla syrup"]}),
+        ("Sounds good, go ahead", None),
+    ],
+    [
+        ("Hello! Name's Meera", {"name": "Meera"}),
+        (
+            "Iced latte, medium, skim milk and caramel drizzle please",
+            {
+                "drink_type": "iced latte",
+                "size": "medium",
+                "milk": "skim",
+                "extras": ["caramel drizzle"],
+            },
+        ),
+        ("Yes, lock it in", None),
+    ],
+]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def pss_mb() -> float:
+    """Proportional set size (shared library pages split between processes), 0 if unavailable."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def mem_available_mb() -> float:
+    with open("/proc/meminfo") as f:
+        for line in f:
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+# -- job process -------------------------------------------------------------
+
+
+async def run_session(index: int, shared: dict, args, results: dict) -> None:
+    from _fake_plugins import (
+        Customer,
+        FakeAudioInput,
+        FakeAudioOutput,
+        FakeSTT,
+        FakeTTS,
+        FakeVAD,
+        ScriptedLLM,
+    )
+    from livekit.agents import AgentSession
+
+    import agent
+    from tts_cache import CachedTTS
+    from turn_metrics import TurnMetrics
+
+    customer = Customer(speedup=args.speedup)
+    session = AgentSession(
+        stt=FakeSTT(customer, delay=args.stt_ms / 1000),
+        llm=ScriptedLLM(
+            customer, ttft=args.ttft_ms / 1000, tokens_per_s=args.tokens_per_s
+        ),
+        tts=CachedTTS(
+            FakeTTS(ttfb=args.tts_ttfb_ms / 1000, realtime=args.tts_realtime),
+            shared["tts_cache"],
+            voice=agent.TTS_VOICE,
+            style=agent.TTS_STYLE,
+            phrases=agent.PRECOMPUTED_PHRASES,
+            sentence_tokenizer=agent.create_sentence_tokenizer(),
+            text_pacing=True,
+        ),
+        vad=FakeVAD(customer, silence=args.vad_silence_ms / 1000),
+        turn_detection="vad",
+        preemptive_generation=True,
+    )
+    output = FakeAudioOutput(speedup=args.speedup)
+    session.input.audio = FakeAudioInput(frame_ms=args.frame_ms)
+    session.output.audio = output
+
+    turn_metrics = TurnMetrics(f"load-{os.getpid()}-{index}")
+    session.on("metrics_collected", lambda ev: turn_metrics.on_metrics(ev.metrics))
+
+    changed = asyncio.Event()
+    spoke = False
+
+    def _on_state(ev) -> None:
+        nonlocal spoke
+        if ev.new_state == "speaking":
+            spoke = True
+        changed.set()
+
+    session.on("agent_state_changed", _on_state)
+
+    async def agent_replied() -> None:
+        while not (spoke and session.agent_state == "listening"):
+            changed.clear()
+            await changed.wait()
+
+    store_config = shared["store_config"].current()
+    await session.start(
+        agent=agent.CoffeeBarista(
+            order_journal=shared["order_journal"],
+            receipt_renderer=agent.create_receipt_renderer(store_config),
+            token_allocator=shared["token_allocator"],
+            store_config=store_config,
+        )
+    )
+    try:
+        await asyncio.wait_for(agent_replied(), args.turn_timeout)  # greeting
+        for order in range(args.orders):
+            script = SCRIPTS[(index + order) % len(SCRIPTS)]
+            customer.script.update(script)
+            started = time.perf_counter()
+            for utterance, arguments in script:
+                await asyncio.sleep(args.think_ms / 1000 / args.speedup)
+                spoke = False
+                output.mark()
+                stopped = await customer.say(utterance)
+                await asyncio.wait_for(agent_replied(), args.turn_timeout)
+                if (
+                    output.first_frame_at is not None
+                    and output.first_frame_at > stopped
+                ):
+                    key = "save_response_ms" if arguments is None else "response_ms"
+                    results[key].append((output.first_frame_at - stopped) * 1000)
+            results["order_s"].append(time.perf_counter() - started)
+            results["orders"] += 1
+    except asyncio.TimeoutError:
+        results["failed"] += 1
+    finally:
+        await session.aclose()
+        turn_metrics.close()
+
+
+async def job_process(args) -> None:
+    logging.basicConfig(level=logging.WARNING)
+    # save_order logs an error on every order because there is no room to send the receipt to
+    logging.getLogger("agent").setLevel(logging.CRITICAL)
+    # the fake speaker cannot pause, which livekit warns about once per session
+    logging.getLogger("livekit.agents").setLevel(logging.ERROR)
+
+    import agent
+    from loop_watchdog import LoopWatchdog, sample_loop_lag
+    from turn_metrics import SnapshotWriter, write_snapshot
+
+    # what prewarm gives each job process
+    shared = {
+        "order_journal": agent.create_order_journal(),
+        "token_allocator": agent.create_token_allocator(),
+        "store_config": agent.create_store_config(),
+        "tts_cache": agent.create_tts_cache(),
+    }
+    rss_ready = rss_mb()
+    print("ready", flush=True)
+    if not await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline):
+        return  # the driver is gone
+
+    results = {
+        "response_ms": [],
+        "save_response_ms": [],
+        "order_s": [],
+        "orders": 0,
+        "failed": 0,
+    }
+    probe = LoopLagProbe(interval=0.005)
+    probe.start()
+    # as entrypoint: the watchdog, or for the load score alone the lag sampler
+    watchdog = lag_sampler = None
+    if args.watchdog_ms:
+        watchdog = LoopWatchdog(args.watchdog_ms / 1000)
+        watchdog.start()
+    elif args.load_score:
+        lag_sampler = asyncio.create_task(sample_loop_lag())
+    snapshots = None
+    if args.load_score:
+        snapshots = SnapshotWriter(
+            os.environ["AGENT_METRICS_DIR"], interval=args.load_window
+        )
+        snapshots.start()
+    peak = {"rss": rss_ready, "pss": 0.0}
+
+    async def sample_memory() -> None:
+        while True:
+            rss = rss_mb()
+            if rss > peak["rss"]:
+                peak["rss"], peak["pss"] = rss, pss_mb()
+            await asyncio.sleep(0.25)
+
+    sampler = asyncio.create_task(sample_memory())
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    await asyncio.sleep(args.offset)
+    await asyncio.gather(
+        *(
+            run_session(i, shared, args, results)
+            for i in range(args.sessions_per_process)
+        )
+    )
+    cpu, wall = cpu_seconds() - cpu_start, time.perf_counter() - wall_start
+    sampler.cancel()
+    await probe.stop()
+    if watchdog is not None:
+        await watchdog.aclose()
+    if lag_sampler is not None:
+        lag_sampler.cancel()
+    if snapshots is not None:
+        await snapshots.aclose()
+
+    shared["order_journal"].close()
+    write_snapshot(os.environ["AGENT_METRICS_DIR"])
+    print(
+        json.dumps(
+            {
+                **results,
+                "pid": os.getpid(),
+                "cpu_s": cpu,
+                "wall_s": wall,
+                "rss_ready_mb": rss_ready,
+                "rss_peak_mb": peak["rss"],
+                "pss_peak_mb": peak["pss"],
+                "lag_p99_ms": percentile(probe.samples_ms, 99),
+                "lag_max_ms": max(probe.samples_ms, default=0.0),
+            }
+        ),
+        flush=True,
+    )
+
+
+# -- driver ------------------------------------------------------------------
+
+
+async def run_level(sessions: int, args, workdir: str) -> dict:
+    from _fake_plugins import FakeTTS
+
+    import agent
+    from order_journal import read_journal
+    from tts_cache import CachedTTS, PhraseAudioCache
+    from turn_metrics import merge_snapshots
+
+    orders_dir = os.path.join(workdir, f"orders-{sessions}")
+    metrics_dir = os.path.join(workdir, f"metrics-{sessions}")
+    tts_cache_dir = os.path.join(workdir, f"tts-cache-{sessions}")
+    env = {
+        **os.environ,
+        "ORDERS_DIR": orders_dir,
+        "AGENT_METRICS_DIR": metrics_dir,
+        "TTS_CACHE_DIR": tts_cache_dir,
+    }
+    # every level starts from what prewarm leaves behind: only the fixed phrases cached
+    cached = CachedTTS(
+        FakeTTS(ttfb=0.0, realtime=1000.0),
+        PhraseAudioCache(tts_cache_dir),
+        voice=agent.TTS_VOICE,
+        style=agent.TTS_STYLE,
+        phrases=agent.PRECOMPUTED_PHRASES,
+        sentence_tokenizer=agent.create_sentence_tokenizer(),
+    )
+    await cached.precompute()
+    processes = math.ceil(sessions / args.sessions_per_process)
+    child_args = [
+        f"--{name.replace('_', '-')}"
+        if value is True
+        else f"--{name.replace('_', '-')}={value}"
+        for name, value in vars(args).items()
+        if name not in ("sessions", "json", "job_process", "offset")
+        and value is not False
+    ]
+    procs = []
+    for i in range(processes):
+        offset = args.ramp * i / processes
+        procs.append(
+            await asyncio.create_subprocess_exec(
+                sys.executable,
+                os.path.abspath(__file__),
+                *child_args,
+                "--job-process",
+                "--offset",
+                str(offset),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                env=env,
+            )
+        )
+    available_mb = mem_available_mb()
+    # (score, parts) of the worker's load score every 0.5 s, with --load-score
+    scores: list[tuple[float, dict]] = []
+    sampler = None
+    try:
+        for proc in procs:
+            if (await proc.stdout.readline()).strip() != b"ready":
+                raise RuntimeError("a job process died while starting (out of memory?)")
+
+        if args.load_score:
+            sampler = asyncio.create_task(
+                sample_load(sessions, metrics_dir, args, scores)
+            )
+        wall_start = time.perf_counter()
+        for proc in procs:
+            proc.stdin.write(b"go\n")
+            await proc.stdin.drain()
+        reports = []
+        for proc in procs:
+            out, _ = await proc.communicate()
+            if proc.returncode != 0:
+                raise RuntimeError(f"a job process exited with {proc.returncode}")
+            reports.append(json.loads(out.decode().strip().splitlines()[-1]))
+        wall = time.perf_counter() - wall_start
+    except RuntimeError as e:
+        for proc in procs:
+            if proc.returncode is None:
+                proc.kill()
+        await asyncio.gather(*(proc.wait() for proc in procs))
+        return {
+            "sessions": sessions,
+            "processes": processes,
+            "ok": False,
+            "error": str(e),
+        }
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+
+    def merged(key: str) -> list:
+        return [v for r in reports for v in r[key]]
+
+    response, save, order_s = (
+        merged("response_ms"),
+        merged("save_response_ms"),
+        merged("order_s"),
+    )
+    saved = len(read_journal(orders_dir))
+    cpu = sum(r["cpu_s"] for r in reports)
+    turns = merge_snapshots(metrics_dir).summary()
+    level = {
+        "sessions": sessions,
+        "processes": processes,
+        "wall_s": round(wall, 1),
+        "orders_completed": sum(r["orders"] for r in reports),
+        "sessions_failed": sum(r["failed"] for r in reports),
+        "orders_saved": saved,
+        "saves_per_min": round(saved / wall * 60, 1),
+        "order_duration_p50_s": round(percentile(order_s, 50), 2),
+        "response_ms": {
+            f"p{q}": round(percentile(response, q), 1) for q in (50, 95, 99)
+        },
+        "save_response_ms": {
+            f"p{q}": round(percentile(save, q), 1) for q in (50, 95, 99)
+        },
+        "turn_metrics_ms": {
+            name: {k: v for k, v in row.items() if k != "count"} | {"n": row["count"]}
+            for name, row in turns.items()
+        },
+        "loop_lag_p99_ms": round(max(r["lag_p99_ms"] for r in reports), 2),
+        "loop_lag_max_ms": round(max(r["lag_max_ms"] for r in reports), 2),
+        "cpu_cores": round(cpu / wall, 2),
+        "cpu_host_percent": round(cpu / wall / os.cpu_count() * 100, 1),
+        "cpu_ms_per_session_s": round(cpu / wall / sessions * 1000, 1),
+        "rss_per_process_mb": round(
+            sum(r["rss_peak_mb"] for r in reports) / processes, 1
+        ),
+        "pss_per_process_mb": round(
+            sum(r["pss_peak_mb"] for r in reports) / processes, 1
+        ),
+        "session_growth_mb": round(
+            sum(r["rss_peak_mb"] - r["rss_ready_mb"] for r in reports) / sessions, 2
+        ),
+    }
+    # how many job processes the memory that was free before this level would hold; RSS,
+    # not PSS, because a process briefly needs more while it imports and prewarms
+    level["memory_limit_sessions"] = int(
+        available_mb / level["rss_per_process_mb"] * args.sessions_per_process
+    )
+    if scores:
+        peak, parts = max(scores, key=lambda score: score[0])
+        level["load_score"] = {
+            "p50": round(percentile([score for score, _ in scores], 50), 2),
+            "max": round(peak, 2),
+            "max_by": max(parts, key=parts.get),
+        }
+    level["ok"] = (
+        level["sessions_failed"] == 0
+        and level["response_ms"]["p95"] <= args.max_response_p95_ms
+        and level["loop_lag_p99_ms"] <= args.max_lag_p99_ms
+    )
+    return level
+
+
+async def sample_load(sessions: int, metrics_dir: str, args, scores: list) -> None:
+    """The score ``WorkerLoad`` would report for this host, as the worker samples it."""
+    from worker_load import WorkerLoad
+
+    # the job processes are this driver's children, like a worker's
+    load = WorkerLoad(metrics_dir, window=args.load_window)
+    loop = asyncio.get_running_loop()
+    while True:
+        score = await loop.run_in_executor(None, load.update, sessions)
+        scores.append((score, dict(load.parts)))
+        await asyncio.sleep(0.5)
+
+
+def print_level(level: dict) -> None:
+    if "error" in level:
+        print(
+            f"{level['sessions']:>8} {level['processes']:>5}  FAILED: {level['error']}",
+            flush=True,
+        )
+        return
+    turn = level["turn_metrics_ms"].get("turn_latency_seconds", {})
+    print(
+        f"{level['sessions']:>8} {level['processes']:>5} {level['orders_saved']:>6} "
+        f"{level['saves_per_min']:>9.1f} {level['response_ms']['p50']:>8.0f} "
+        f"{level['response_ms']['p95']:>8.0f} {turn.get('p95_ms', 0):>8.0f} "
+        f"{level['loop_lag_p99_ms']:>8.1f} {level['cpu_host_percent']:>6.1f} "
+        f"{level['rss_per_process_mb']:>7.0f} {level['session_growth_mb']:>7.1f}  "
+        f"{'ok' if level['ok'] else 'DEGRADED'}",
+        flush=True,
+    )
+    if "load_score" in level:
+        score = level["load_score"]
+        print(
+            f"{'':>15}load score p50 {score['p50']:.2f}, max {score['max']:.2f} ({score['max_by']})",
+            flush=True,
+        )
+    for name, row in level["turn_metrics_ms"].items():
+        if name.startswith("loop_stall_seconds"):
+            print(
+                f"{'':>15}stalls {name}: {row['n']}, p50 {row['p50_ms']:.0f} ms, "
+                f"max ~{row['p99_ms']:.0f} ms",
+                flush=True,
+            )
+
+
+async def drive(args) -> None:
+    levels = [int(n) for n in args.sessions.split(",")]
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    # the driver reads the journal and the metrics snapshots, the job processes write them
+    os.environ.setdefault("ORDERS_DIR", os.path.join(workdir, "driver"))
+    print(
+        f"{os.cpu_count()} CPUs, speedup {args.speedup}x, {args.orders} orders per session, "
+        f"STT {args.stt_ms:.0f} ms, TTFT {args.ttft_ms:.0f} ms, TTS TTFB {args.tts_ttfb_ms:.0f} ms"
+    )
+    print(
+        f"{'sessions':>8} {'procs':>5} {'saved':>6} {'saves/min':>9} {'resp p50':>8} "
+        f"{'resp p95':>8} {'turn p95':>8} {'lag p99':>8} {'cpu %':>6} {'rss MB':>7} {'+MB/s':>7}"
+    )
+    report = []
+    try:
+        for sessions in levels:
+            level = await run_level(sessions, args, workdir)
+            report.append(level)
+            print_level(level)
+            if "error" in level:
+                break
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ok = [level["sessions"] for level in report if level["ok"]]
+    print(
+        f"sessions per worker host within limits: {max(ok) if ok else 0} "
+        f"(response p95 <= {args.max_response_p95_ms:.0f} ms, loop lag p99 <= {args.max_lag_p99_ms:.0f} ms)"
+    )
+    measured = [level for level in report if "error" not in level]
+    if measured:
+        print(
+            f"memory allows about {measured[-1]['memory_limit_sessions']} sessions "
+            f"({measured[-1]['rss_per_process_mb']:.0f} MB RSS per job process)"
+        )
+    if args.json:
+        text = json.dumps(
+            {"levels": report, "sessions_per_worker": max(ok) if ok else 0}, indent=2
+        )
+        if args.json == "-":
+            print(text)
+        else:
+            with open(args.json, "w") as f:
+                f.write(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sessions", default="5,10,20", help="comma-separated concurrency levels"
+    )
+    parser.add_argument("--sessions-per-process", type=int, default=1)
+    parser.add_argument("--orders", type=int, default=2, help="orders per session")
+    parser.add_argument(
+        "--speedup",
+        type=float,
+        default=2.0,
+        help="human-paced parts run this much faster",
+    )
+    parser.add_argument(
+        "--ramp", type=float, default=2.0, help="seconds over which sessions start"
+    )
+    parser.add_argument(
+        "--think-ms", type=float, default=400.0, help="customer pause before speaking"
+    )
+    parser.add_argument(
+        "--frame-ms", type=int, default=10, help="room audio frame size"
+    )
+    parser.add_argument("--stt-ms", type=float, default=150.0)
+    parser.add_argument("--vad-silence-ms", type=float, default=550.0)
+    parser.add_argument("--ttft-ms", type=float, default=450.0)
+    parser.add_argument("--tokens-per-s", type=float, default=80.0)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=250.0)
+    parser.add_argument("--tts-realtime", type=float, default=4.0)
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--max-response-p95-ms", type=float, default=3000.0)
+    parser.add_argument("--max-lag-p99-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--watchdog-ms",
+        type=float,
+        default=0.0,
+        help="run loop_watchdog at this threshold",
+    )
+    parser.add_argument(
+        "--load-score", action="store_true", help="sample the worker_load score"
+    )
+    parser.add_argument(
+        "--load-window", type=float, default=2.0, help="snapshot and load-score window"
+    )
+    parser.add_argument(
+        "--json", help="write the report as JSON to this file ('-' for stdout)"
+    )
+    parser.add_argument("--job-process", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--offset", type=float, default=0.0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    asyncio.run(job_process(args) if args.job_process else drive(args))
+
+
+if __name__ == "__main__":
+    main()
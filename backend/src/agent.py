@@ -1,506 +1,839 @@
+import asyncio
+import json
 import logging
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
 
+import aiohttp
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
     AgentSession,
+    AgentStateChangedEvent,
     JobContext,
     JobProcess,
     MetricsCollectedEvent,
+    ModelSettings,
     RoomInputOptions,
+    RunContext,
     WorkerOptions,
     cli,
+    function_tool,
+    get_job_context,
+    llm,
     metrics,
     tokenize,
-    function_tool,
-    RunContext
+    tts,
+    utils,
 )
-import json
-import os
-from datetime import datetime
-from typing import Optional
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
+from livekit.plugins import deepgram, google, murf, noise_cancellation, silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from context_pruner import ContextPruner
+from local_http import LocalHTTPServer, serve_in_thread
+from log_pipeline import aflush_agent_logging, setup_agent_logging
+from loop_watchdog import LoopWatchdog, sample_loop_lag
+from menu_catalog import MenuCatalog
+from order_analytics import OrderAnalytics
+from order_extractor import NO_MILK, extract_order_slots
+from order_feed import OrderFeed, OrderRelay, add_feed_routes
+from order_journal import OrderJournal
+from order_store import OrderStore
+from prompt_budget import PromptAccountant
+from receipt_renderer import ReceiptRenderer
+from receipts import RECEIPT_TOPIC, RECEIPT_TYPE, build_receipt
+from session_recorder import SessionRecorder, SessionTrail
+from store_config import DEFAULT_STORE_CONFIG, StoreConfig, StoreConfigFile
+from token_allocator import TokenAllocator
+from transport import DataTransport
+from tts_cache import CachedTTS, PhraseAudioCache, precompute_in_background
+from turn_metrics import (
+    SnapshotWriter,
+    TurnMetrics,
+    add_metrics_routes,
+    fold_snapshots_every,
+    timed_tool,
+)
+from warmup import ConnectionWarmer
+from worker_load import WorkerLoad
+
 logger = logging.getLogger("agent")
+# Per-field tool chatter gets its own category so it can be sampled (AGENT_LOG_SAMPLING=tools=0.1)
+tool_logger = logging.getLogger("agent.tools")
 
 load_dotenv(".env.local")
 
+ORDERS_DIR = os.getenv("ORDERS_DIR", "orders")
+ORDER_DB_PATH = os.getenv("ORDER_DB_PATH", os.path.join(ORDERS_DIR, "orders.db"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".tts-cache")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "64"))
+# Brand, menu, persona and replies (see store_config.py); re-read when the file changes
+# (checked every STORE_CONFIG_CHECK_S off the event loop; 0 = never)
+STORE_CONFIG = os.getenv("STORE_CONFIG", "store.json")
+STORE_CONFIG_CHECK_S = float(os.getenv("STORE_CONFIG_CHECK_S", "2"))
+# Per-session transcript, tool calls and orders for QA and disputes ("" = off)
+SESSION_RECORDINGS_DIR = os.getenv("SESSION_RECORDINGS_DIR", "recordings")
+# Per-job latency histograms: JSON snapshots here, Prometheus text on the worker's loopback port
+AGENT_METRICS_DIR = os.getenv("AGENT_METRICS_DIR", "metrics")
+AGENT_METRICS_INTERVAL = float(os.getenv("AGENT_METRICS_INTERVAL", "30"))
+AGENT_HTTP_PORT = int(os.getenv("AGENT_HTTP_PORT", "9464"))
+# Chat context kept for the LLM: estimated-token budget (0 = keep everything) and the
+# number of saved orders summarized in place of their turns
+AGENT_CONTEXT_BUDGET_TOKENS = int(os.getenv("AGENT_CONTEXT_BUDGET_TOKENS", "1500"))
+AGENT_CONTEXT_SUMMARY_ORDERS = int(os.getenv("AGENT_CONTEXT_SUMMARY_ORDERS", "5"))
+# confirm_order reserves the token and stages the record while the customer answers
+AGENT_SPECULATIVE_SAVE = os.getenv("AGENT_SPECULATIVE_SAVE", "1") == "1"
+# Opt-in: log and count event-loop stalls longer than this many milliseconds (0 = off)
+AGENT_LOOP_WATCHDOG_MS = float(os.getenv("AGENT_LOOP_WATCHDOG_MS", "0"))
+# The worker stops taking jobs at this load score (see worker_load.py; 0 = LiveKit's CPU-only default)
+AGENT_LOAD_THRESHOLD = float(os.getenv("AGENT_LOAD_THRESHOLD", "0.75"))
+
+TTS_VOICE = "anisha"
+TTS_STYLE = "Conversation"
+
+# The built-in store's fixed phrases; prewarm precomputes those of the loaded store config
+GREETING = DEFAULT_STORE_CONFIG.replies["greeting"]
+PRECOMPUTED_PHRASES = DEFAULT_STORE_CONFIG.phrases
+
+# Per-drink fields of a cart item; the customer's name belongs to the whole order
+ITEM_FIELDS = ("drinkType", "size", "milk", "extras")
+FIELD_LABELS = {
+    "name": "name",
+    "drinkType": "drink type",
+    "size": "size",
+    "milk": "milk preference",
+}
+
+
+def new_cart_item() -> dict:
+    # extras stays None until the customer answers; [] means "no extras"
+    return {"drinkType": "", "size": "", "milk": "", "extras": None}
+
+
+def new_order_state() -> dict:
+    return {"name": "", "items": [new_cart_item()]}
+
+
+def create_order_journal() -> OrderJournal:
+    """Journal whose writer thread also indexes every order in the order store and counts it."""
+    store = OrderStore(ORDER_DB_PATH)
+    analytics = OrderAnalytics(ORDER_DB_PATH)
+    return OrderJournal.from_env(ORDERS_DIR, sinks=(store.put_many, analytics.add_many))
+
+
+def create_token_allocator() -> TokenAllocator:
+    """Token allocator shared by every job process through counter files in ORDERS_DIR."""
+    return TokenAllocator(os.path.join(ORDERS_DIR, "tokens"))
+
+
+async def _publish_to_room(payload: bytes, **kwargs) -> None:
+    await get_job_context().room.local_participant.publish_data(payload, **kwargs)
+
+
+def create_data_transport() -> DataTransport:
+    """Transport to the frontend through the current job's room."""
+    return DataTransport.from_env(_publish_to_room)
+
+
+def create_sentence_tokenizer() -> tokenize.SentenceTokenizer:
+    return tokenize.basic.SentenceTokenizer(min_sentence_len=2)
+
+
+def create_stt() -> deepgram.STT:
+    return deepgram.STT(model="nova-3")
+
+
+def create_llm() -> google.LLM:
+    return google.LLM(model="gemini-2.5-flash")
+
+
+def create_tts(http_session: Optional[aiohttp.ClientSession] = None) -> tts.TTS:
+    return murf.TTS(voice=TTS_VOICE, style=TTS_STYLE, http_session=http_session)
+
+
+def create_session_tts(
+    tts_cache: PhraseAudioCache, phrases: tuple[str, ...]
+) -> tts.TTS:
+    """Murf behind the phrase cache: the sentences of ``phrases`` are played from disk, the rest streamed"""
+    return CachedTTS(
+        create_tts(),
+        tts_cache,
+        voice=TTS_VOICE,
+        style=TTS_STYLE,
+        phrases=phrases,
+        sentence_tokenizer=create_sentence_tokenizer(),
+        text_pacing=True,
+    )
+
+
+def create_tts_cache() -> PhraseAudioCache:
+    """On-disk phrase audio shared by every job process on the host."""
+    return PhraseAudioCache(TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024)
+
+
+def create_session_recorder() -> Optional[SessionRecorder]:
+    """Process-wide recorder of session trails, or None when SESSION_RECORDINGS_DIR is empty."""
+    return (
+        SessionRecorder.from_env(SESSION_RECORDINGS_DIR)
+        if SESSION_RECORDINGS_DIR
+        else None
+    )
+
+
+def create_store_config() -> StoreConfigFile:
+    """The store config file, parsed now and checked for changes every STORE_CONFIG_CHECK_S by a thread."""
+    return StoreConfigFile(STORE_CONFIG, check_interval=STORE_CONFIG_CHECK_S)
+
+
+@lru_cache(maxsize=4)
+def create_receipt_renderer(
+    store_config: StoreConfig = DEFAULT_STORE_CONFIG,
+) -> ReceiptRenderer:
+    """Receipt renderer per store config; RECEIPT_STYLESHEET hoists the static CSS into a shared file."""
+    stylesheet = os.getenv("RECEIPT_STYLESHEET")
+    renderer = ReceiptRenderer(
+        stylesheet_href=stylesheet,
+        brand=store_config.brand,
+        tagline=store_config.tagline,
+        cup_heights=store_config.cup_heights,
+        default_cup_height=store_config.default_cup_height,
+        cold_keywords=store_config.cold_keywords,
+    )
+    if stylesheet:
+        renderer.write_stylesheet(ORDERS_DIR, stylesheet)
+    return renderer
+
+
+@lru_cache(maxsize=4)
+def build_instructions(store_config: StoreConfig, menu: MenuCatalog) -> str:
+    """System instructions, built once per store config and menu and shared by their sessions."""
+    style = "\n".join(f"- {line}" for line in store_config.style)
+    return f"""{store_config.persona}
+
+STYLE:
+{style}
+
+MENU: {", ".join(menu.names("drink"))}. Custom drinks are fine.
+Sizes: {", ".join(menu.names("size"))}. Milk: {", ".join(menu.names("milk"))}. Extras: {", ".join(menu.names("extra"))}.
+
+ORDER FLOW:
+- Every customer message is followed by an ORDER STATE note with the saved fields, what is missing, and the next step. Trust it over the conversation history and never re-ask a saved field
+- Record every new or changed detail with a SINGLE update_order call
+- Group orders go in one cart: call add_item once per additional drink. Drinks are numbered from 1; pass item to update_order or remove_item to change a drink other than the one being ordered now
+- When nothing is missing, call confirm_order and read the whole order back
+- After the customer says yes, you MUST call save_order before telling them the order is confirmed
+- An EARLIER ORDERS note lists orders already saved in this session; never save them again
+- If input is unclear, politely ask again"""
+
+
+def _spoken_list(names: list[str]) -> str:
+    """The options as spoken: "small, medium, or large"."""
+    if len(names) < 3:
+        return " or ".join(names)
+    return f"{', '.join(names[:-1])}, or {names[-1]}"
+
+
+@lru_cache(maxsize=4)
+def next_step_questions(menu: MenuCatalog) -> dict[str, str]:
+    """The question for each missing field, offering the options on ``menu``."""
+    milks = [name for name in menu.names("milk") if name != NO_MILK]
+    return {
+        "name": "Next: ask for the customer's name.",
+        "drinkType": f"Next: ask what drink they would like - {', '.join(menu.names('drink')[:4])}, something else?",
+        "size": f"Next: ask what size - {_spoken_list(menu.names('size'))}.",
+        "milk": f"Next: ask what milk - {_spoken_list(milks)}.",
+        "extras": f"Next: ask about extras - {', '.join(menu.names('extra'))}, or none.",
+    }
+
+
+class _CompactJson:
+    """Defers ``json.dumps`` of a log argument until the log listener formats it."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value) -> None:
+        # snapshot now: order_state is reset right after it is logged
+        self.value = dict(value)
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, separators=(",", ":"))
+
 
 class CoffeeBarista(Agent):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        order_journal: Optional[OrderJournal] = None,
+        order_feed: "Optional[OrderFeed | OrderRelay]" = None,
+        receipt_renderer: Optional[ReceiptRenderer] = None,
+        token_allocator: Optional[TokenAllocator] = None,
+        menu_catalog: Optional[MenuCatalog] = None,
+        prompt_accountant: Optional[PromptAccountant] = None,
+        context_pruner: Optional[ContextPruner] = None,
+        data_transport: Optional[DataTransport] = None,
+        store_config: Optional[StoreConfig] = None,
+        session_trail: Optional[SessionTrail] = None,
+    ) -> None:
+        # The store config this session started with; a reload only reaches later sessions
+        self._store = store_config or DEFAULT_STORE_CONFIG
+        self._replies = self._store.replies
+        # Canonicalizes noisy drink/size/milk/extra names ("capuchino", "oat milk please")
+        self._menu = menu_catalog or self._store.catalog
         super().__init__(
-            instructions="""You are a multilingual, witty virtual barista for BLUE TOKAI COFFEE ROASTERS. Your single goal is to take coffee orders via conversation, fill an internal order state, confirm it with the customer, and then save the final order.
-
-PERSONA & TONE:
-- You are friendly, slightly witty, and warm with an Indian English speaking style
-- Use a conversational, upbeat tone with occasional playful comments
-- Speak ONLY in English - no Hindi or Hinglish words
-- Keep jokes light and never be rude or harsh
-- Examples: "What would you like today – a strong espresso or a chill cold brew?" or "Got it, one medium latte coming right up!"
-
-BRAND CONTEXT:
-- You work at BLUE TOKAI COFFEE ROASTERS
-- Reference "our roasts", "Blue Tokai brews", "signature cold brews"
-- Menu: Espresso, Americano, Cappuccino, Latte, Flat White, Mocha, Cold Brew, Iced Latte, Frappé, Hot Chocolate
-- Accept custom drinks too
-
-LANGUAGE BEHAVIOR:
-- Speak ONLY in English with an Indian conversational style
-- Use natural Indian English expressions and phrasing
-- Be warm and friendly but stick to English only
-- Examples: "What would you like today?", "That's great!", "One medium latte", "What's your name?"
-- Keep it conversational and fun but entirely in English
-
-ORDER STATE MANAGEMENT:
-You maintain an internal order with these fields:
-- drinkType: type of coffee drink
-- size: "small", "medium", or "large"
-- milk: "regular", "skim", "oat", "soy", "almond"
-- extras: array of extras like "extra shot", "vanilla syrup", "caramel drizzle", "whipped cream"
-- name: customer's name
-
-CONVERSATION FLOW:
-1. Ask for name first: "What's your name?"
-2. Ask drink type: "What are you in the mood for today? Latte, cappuccino, cold brew?"
-3. Ask size: If not specified, default to "medium" but confirm: "What size would you like - small, medium, or large?"
-4. Ask milk: If not specified, default to "regular milk" but confirm: "What kind of milk would you prefer? Regular, oat, almond, soy?"
-5. Ask extras: "Would you like any extras? Extra shot, vanilla syrup, whipped cream?"
-6. Recap the complete order clearly in English
-7. Ask for confirmation: "Does that sound good? Should I confirm this order?"
-8. CRITICAL: After user says YES/confirms, you MUST immediately call the save_order function tool. DO NOT just say "confirmed" - you must actually call save_order()
-9. Only after calling save_order successfully, tell the customer their order is confirmed
-
-CLARIFYING QUESTIONS:
-- Ask one or two things at a time to keep it natural
-- If user provides multiple details at once, extract them and only ask about missing fields
-- If user changes their mind, update only that field
-
-ERROR HANDLING:
-- If input is unclear, politely ask again
-- If user is off-topic too long, gently bring them back: "I'm loving this chat, but let's get your coffee order sorted out!"
-
-IMPORTANT:
-- Keep responses natural and conversational for voice interaction
-- Don't use complex formatting, emojis, or markdown in your speech
-- Use the function tools to manage order state
-- Only call save_order after explicit user confirmation""",
+            # Kept short and byte-identical across turns so providers can cache it as a
+            # prompt prefix; per-turn order progress arrives as the ORDER STATE note instead
+            instructions=build_instructions(self._store, self._menu),
         )
-        
-        # Initialize order state
-        self.order_state = {
-            "drinkType": "",
-            "size": "",
-            "milk": "",
-            "extras": [],
-            "name": ""
-        }
+
+        # Confirmed orders are written by the journal's background thread
+        self._journal = order_journal or create_order_journal()
+        # ... and pushed to the bar display's live feed (relayed to the worker's in a job)
+        self._order_feed = order_feed or OrderFeed.from_env()
+        self._receipt_renderer = receipt_renderer or create_receipt_renderer(
+            self._store
+        )
+        self._tokens = token_allocator or create_token_allocator()
+        self._prompt_accountant = prompt_accountant or PromptAccountant()
+        # Receipts reach the frontend as typed messages on their topic
+        self._transport = data_transport or create_data_transport()
+        # A kiosk session serves customer after customer; saved orders leave the chat context
+        self._context_pruner = context_pruner or ContextPruner(
+            AGENT_CONTEXT_BUDGET_TOKENS, max_orders=AGENT_CONTEXT_SUMMARY_ORDERS
+        )
+
+        # Pre-filled slots and saved orders go into the session's audit trail, if recorded
+        self._trail = session_trail
+
+        # Initialize order state: the customer's name and a cart of drinks
+        self.order_state = new_order_state()
+        # Speculative save started by confirm_order: (order state it was made for, task)
+        self._prepared: Optional[tuple[str, asyncio.Task]] = None
+        # Id of the last customer message slots were pre-filled from
+        self._prefilled_message = ""
+        # Context pruning started when the last reply ended
+        self._prune_task: Optional[asyncio.Task] = None
 
     async def on_enter(self) -> None:
         """Called when the agent starts - greet the customer"""
-        await self.session.say("Hello! Welcome to Blue Tokai Coffee Roasters. I'm your virtual barista today. What's your name, and what kind of coffee are you in the mood for?")
-    
-    def _generate_token_number(self) -> str:
-        """Generate a unique token number for the order."""
-        import random
-        import string
-        # Format: BT-YYYYMMDD-XXXX (BT = Blue Tokai, XXXX = random alphanumeric)
-        date_part = datetime.now().strftime("%Y%m%d")
-        random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        return f"BT-{date_part}-{random_part}"
-    
-    def _generate_html_receipt(self, order_data: dict, token_number: str) -> str:
-        """Generate an HTML receipt visualization for the order."""
-        
-        # Determine cup size for visualization
-        cup_heights = {"small": "100px", "medium": "140px", "large": "180px"}
-        cup_height = cup_heights.get(order_data["size"], "140px")
-        
-        # Check if it's a cold drink
-        is_cold = any(word in order_data["drinkType"].lower() for word in ["iced", "cold", "frappe"])
-        cup_color = "#87CEEB" if is_cold else "#8B4513"
-        
-        # Check for whipped cream
-        has_whipped_cream = any("whipped" in extra.lower() for extra in order_data.get("extras", []))
-        
-        # Build extras list
-        extras_html = ""
-        if order_data.get("extras"):
-            extras_items = "".join([f"<li>{extra}</li>" for extra in order_data["extras"]])
-            extras_html = f"<div style='margin-top: 10px;'><strong>Extras:</strong><ul style='margin: 5px 0; padding-left: 20px;'>{extras_items}</ul></div>"
-        
-        # Whipped cream topping
-        whipped_cream_html = ""
-        if has_whipped_cream:
-            whipped_cream_html = """
-            <div style='position: absolute; top: -20px; left: 50%; transform: translateX(-50%); 
-                        width: 80px; height: 30px; background: #FFFACD; 
-                        border-radius: 50% 50% 0 0; border: 2px solid #F5DEB3;'></div>
-            """
-        
-        html = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Blue Tokai Order - {order_data['name']}</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            min-height: 100vh;
-            margin: 0;
-            padding: 20px;
-        }}
-        .receipt {{
-            background: white;
-            border-radius: 20px;
-            padding: 40px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            max-width: 500px;
-            width: 100%;
-        }}
-        .header {{
-            text-align: center;
-            border-bottom: 3px solid #667eea;
-            padding-bottom: 20px;
-            margin-bottom: 30px;
-        }}
-        .header h1 {{
-            color: #667eea;
-            margin: 0;
-            font-size: 28px;
-        }}
-        .header p {{
-            color: #666;
-            margin: 5px 0 0 0;
-            font-size: 14px;
-        }}
-        .token-number {{
-            background: #667eea;
-            color: white;
-            padding: 10px 20px;
-            border-radius: 25px;
-            font-size: 18px;
-            font-weight: 700;
-            letter-spacing: 1px;
-            margin: 15px 0;
-            display: inline-block;
-        }}
-        .cup-container {{
-            display: flex;
-            justify-content: center;
-            margin: 30px 0;
-            position: relative;
-        }}
-        .cup {{
-            position: relative;
-            width: 100px;
-            height: {cup_height};
-            background: {cup_color};
-            border-radius: 0 0 20px 20px;
-            border: 3px solid #333;
-            box-shadow: inset 0 -20px 30px rgba(0,0,0,0.2);
-        }}
-        .order-details {{
-            background: #f8f9fa;
-            border-radius: 10px;
-            padding: 20px;
-            margin: 20px 0;
-        }}
-        .order-row {{
-            display: flex;
-            justify-content: space-between;
-            padding: 10px 0;
-            border-bottom: 1px solid #dee2e6;
-        }}
-        .order-row:last-child {{
-            border-bottom: none;
-        }}
-        .label {{
-            font-weight: 600;
-            color: #495057;
-        }}
-        .value {{
-            color: #212529;
-            text-transform: capitalize;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 30px;
-            padding-top: 20px;
-            border-top: 2px solid #dee2e6;
-        }}
-        .footer h2 {{
-            color: #667eea;
-            margin: 0 0 10px 0;
-            font-size: 24px;
-        }}
-        .footer p {{
-            color: #666;
-            margin: 5px 0;
-            font-size: 14px;
-        }}
-        .timestamp {{
-            text-align: center;
-            color: #999;
-            font-size: 12px;
-            margin-top: 20px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="receipt">
-        <div class="header">
-            <h1>☕ BLUE TOKAI</h1>
-            <p>Coffee Roasters</p>
-            <div class="token-number">Token: {token_number}</div>
-        </div>
-        
-        <div class="cup-container">
-            <div class="cup">
-                {whipped_cream_html}
-            </div>
-        </div>
-        
-        <div class="order-details">
-            <div class="order-row">
-                <span class="label">Customer:</span>
-                <span class="value">{order_data['name']}</span>
-            </div>
-            <div class="order-row">
-                <span class="label">Drink:</span>
-                <span class="value">{order_data['drinkType']}</span>
-            </div>
-            <div class="order-row">
-                <span class="label">Size:</span>
-                <span class="value">{order_data['size']}</span>
-            </div>
-            <div class="order-row">
-                <span class="label">Milk:</span>
-                <span class="value">{order_data['milk']}</span>
-            </div>
-            {extras_html}
-        </div>
-        
-        <div class="footer">
-            <h2>Order Confirmed!</h2>
-            <p>Your coffee will be ready shortly</p>
-            <p style="color: #667eea; font-weight: 600;">Enjoy your brew! ☕</p>
-        </div>
-        
-        <div class="timestamp">
-            Order placed: {order_data['timestamp']}
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return html
+        self.session.on("agent_state_changed", self._on_agent_state_changed)
+        await self.session.say(self._replies["greeting"])
+
+    async def on_exit(self) -> None:
+        self.session.off("agent_state_changed", self._on_agent_state_changed)
+
+    def _on_agent_state_changed(self, ev: AgentStateChangedEvent) -> None:
+        # Pruned once a reply is over, not in on_user_turn_completed: a turn context
+        # changed there never matches the one a preemptive reply was generated from
+        if ev.new_state == "listening" and (
+            self._prune_task is None or self._prune_task.done()
+        ):
+            self._prune_task = asyncio.create_task(self._prune_chat_ctx())
+
+    async def _prune_chat_ctx(self) -> None:
+        """Summarize saved orders out of the context once they outgrow the budget"""
+        pruned = self._context_pruner.prune(self.chat_ctx)
+        if pruned is not None:
+            await self.update_chat_ctx(pruned)
+
+    def _prefill(self, message: llm.ChatMessage) -> list[str]:
+        """Fill the obvious empty slots from the customer's words; the fields filled"""
+        # Only empty fields: in a cart, "and a small mocha" describes a new drink, not a change
+        item = self.order_state["items"][self._item_index()]
+        slots = {
+            field: value
+            for field, value in extract_order_slots(
+                message.text_content or "", self._menu
+            ).items()
+            if not (
+                self.order_state["name"]
+                if field == "name"
+                else self._is_answered(field, item)
+            )
+        }
+        if not slots:
+            return []
+        errors = self._apply_slots(slots)
+        tool_logger.info("Pre-filled from transcript: %s", slots)
+        if self._trail is not None:
+            self._trail.prefilled(slots)
+        return [field for field in slots if field not in errors]
+
+    def _with_order_state(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        """A copy of ``chat_ctx`` ending with the ORDER STATE note.
+
+        The note is added here rather than in ``on_user_turn_completed``: a
+        turn context changed there never matches the one a preemptive reply
+        was generated from, so LiveKit would discard every preemptive reply
+        (pruning waits for the end of a reply for the same reason).
+        Slots are pre-filled once per customer message, on the first request
+        that carries it (the preemptive one when there is one). The note is
+        sent after the customer's words rather than as a system message
+        because the Gemini plugin folds system messages into
+        system_instruction, which would make the cacheable prompt prefix
+        differ on every request.
+        """
+        filled = []
+        message = next(
+            (
+                item
+                for item in reversed(chat_ctx.items)
+                if item.type == "message" and item.role == "user"
+            ),
+            None,
+        )
+        if message is not None and message.id != self._prefilled_message:
+            self._prefilled_message = message.id
+            filled = self._prefill(message)
+        chat_ctx = chat_ctx.copy()
+        chat_ctx.add_message(role="user", content=self._order_state_note(filled))
+        return chat_ctx
+
+    def _order_state_note(self, filled: list[str]) -> str:
+        """Compact machine-generated order progress for the LLM."""
+        state = {"name": self.order_state["name"]} if self.order_state["name"] else {}
+        state["items"] = [
+            {field: value for field, value in item.items() if value}
+            for item in self.order_state["items"]
+        ]
+        missing = self._missing_fields()
+        note = f"[ORDER STATE, not said by the customer] saved={json.dumps(state, separators=(',', ':'))}"
+        if filled:
+            note += f" prefilled={','.join(filled)}"
+        if missing:
+            note += f" missing={','.join(missing)}"
+        return f"{note}. {self._next_step()}"
+
+    async def llm_node(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool],
+        model_settings: ModelSettings,
+    ):
+        """Default LLM node, with the ORDER STATE note and the outgoing prompt estimated"""
+        chat_ctx = self._with_order_state(chat_ctx)
+        self._prompt_accountant.begin_request(chat_ctx, tools)
+        async for chunk in Agent.default.llm_node(
+            self, chat_ctx, tools, model_settings
+        ):
+            yield chunk
+
+    def _apply_slots(self, slots: dict, index: Optional[int] = None) -> dict[str, str]:
+        """Validate all given fields together, apply the valid ones and return errors per field.
+
+        Drink fields go to cart item ``index`` (0-based), by default the one being ordered now.
+        """
+        item = self.order_state["items"][self._item_index() if index is None else index]
+        errors = {}
+        resolved = {}
+        for field in ("size", "milk"):
+            if slots.get(field) is None:
+                continue
+            match = self._menu.resolve(field, slots[field])
+            if match is None:
+                errors[field] = (
+                    f"{field} must be one of {', '.join(self._menu.names(field))}"
+                )
+            else:
+                resolved[field] = match.name
+
+        for field, value in slots.items():
+            if field in errors or value is None:
+                continue
+            if field == "extras":
+                item["extras"] = self._canonical_extras(value)
+            elif field in resolved:
+                item[field] = resolved[field]
+            elif field == "drinkType":
+                item[field] = self._canonical_drink(value)
+            elif field == "name":
+                self.order_state["name"] = value.strip()
+            else:
+                item[field] = value.strip()
+        return errors
+
+    def _canonical_drink(self, drink_type: str) -> str:
+        """Menu name for a known drink; custom drinks are kept as the customer said them."""
+        match = self._menu.resolve_drink(drink_type)
+        return match.name if match else drink_type.strip()
+
+    def _canonical_extras(self, extras: list[str]) -> list[str]:
+        canonical = []
+        for extra in extras:
+            if not extra.strip():
+                continue
+            match = self._menu.resolve_extra(extra)
+            name = match.name if match else extra.strip()
+            if name not in canonical:
+                canonical.append(name)
+        return canonical
+
+    @staticmethod
+    def _is_answered(field: str, item: dict) -> bool:
+        return (
+            item["extras"] is not None if field == "extras" else bool(item.get(field))
+        )
+
+    def _item_missing(self, item: dict) -> list[str]:
+        return [field for field in ITEM_FIELDS if not self._is_answered(field, item)]
+
+    def _item_index(self, item: Optional[int] = None) -> int:
+        """0-based cart index for a 1-based ``item``; by default the first unfinished drink, else the last."""
+        items = self.order_state["items"]
+        if item is not None:
+            return item - 1
+        for index, entry in enumerate(items):
+            if self._item_missing(entry):
+                return index
+        return len(items) - 1
+
+    def _valid_item(self, item: Optional[int]) -> bool:
+        return item is None or 1 <= item <= len(self.order_state["items"])
+
+    def _missing_fields(self) -> list[str]:
+        """Missing fields, prefixed with the drink number ("2:size") when the cart has several drinks."""
+        missing = [] if self.order_state["name"] else ["name"]
+        items = self.order_state["items"]
+        for number, item in enumerate(items, 1):
+            prefix = f"{number}:" if len(items) > 1 else ""
+            missing.extend(prefix + field for field in self._item_missing(item))
+        return missing
+
+    def _next_step(self) -> str:
+        """What the agent should ask next, based on the first missing slot."""
+        questions = next_step_questions(self._menu)
+        missing = self._missing_fields()
+        if missing:
+            number, _, field = missing[0].rpartition(":")
+            return (
+                f"For drink {number}: {questions[field]}"
+                if number
+                else questions[field]
+            )
+        return "All details are filled: recap the order with confirm_order and ask the customer to confirm."
+
+    def _describe(self, item: dict) -> str:
+        extras_text = f" with {', '.join(item['extras'])}" if item["extras"] else ""
+        return (
+            f"{item['size']} {item['drinkType']} with {item['milk']} milk{extras_text}"
+        )
 
     @function_tool()
-    async def set_name(self, context: RunContext, name: str) -> str:
-        """Set the customer's name for the order.
-        
+    @timed_tool
+    async def update_order(
+        self,
+        context: RunContext,
+        name: Optional[str] = None,
+        drink_type: Optional[str] = None,
+        size: Optional[str] = None,
+        milk: Optional[str] = None,
+        extras: Optional[list[str]] = None,
+        item: Optional[int] = None,
+    ) -> str:
+        """Set any number of order fields in ONE call. Use this whenever the customer gives one or more order details.
+
         Args:
             name: Customer's name
+            drink_type: A drink from the MENU, or the custom drink the customer asked for
+            size: One of the Sizes on the MENU
+            milk: One of the Milk options on the MENU
+            extras: List of Extras from the MENU; pass an empty list when the customer wants none
+            item: Number of the drink to change (1 = first); leave empty for the drink being ordered now
         """
-        self.order_state["name"] = name
-        logger.info(f"Set name: {name}")
-        
-        if not self.order_state["drinkType"]:
-            return f"Nice to meet you, {name}! What are you in the mood for? Latte, cappuccino, cold brew, mocha, something else?"
-        return f"Got it, {name}!"
+        if not self._valid_item(item):
+            return f"There is no drink {item}; the order has {len(self.order_state['items'])}."
+        slots = {
+            field: value
+            for field, value in (
+                ("name", name),
+                ("drinkType", drink_type),
+                ("size", size),
+                ("milk", milk),
+                ("extras", extras),
+            )
+            if value is not None
+        }
+        errors = self._apply_slots(slots, self._item_index(item))
+        tool_logger.info("Update order: %s item %s (errors: %s)", slots, item, errors)
+
+        updated = [field for field in slots if field not in errors]
+        parts = []
+        if updated:
+            parts.append(f"Updated {', '.join(updated)}.")
+        if errors:
+            parts.append(f"Could not update: {'; '.join(errors.values())}.")
+        parts.append(self._next_step())
+        return " ".join(parts)
 
     @function_tool()
-    async def set_drink_type(self, context: RunContext, drink_type: str) -> str:
-        """Set the drink type in the order.
-        
-        Args:
-            drink_type: The type of coffee drink (e.g., latte, cappuccino, espresso, americano, mocha, cold brew, iced latte)
-        """
-        self.order_state["drinkType"] = drink_type
-        logger.info(f"Set drink type: {drink_type}")
-        
-        if not self.order_state["size"]:
-            return f"Great choice! What size would you like - small, medium, or large?"
-        return f"Changed to {drink_type}!"
+    @timed_tool
+    async def add_item(
+        self,
+        context: RunContext,
+        drink_type: Optional[str] = None,
+        size: Optional[str] = None,
+        milk: Optional[str] = None,
+        extras: Optional[list[str]] = None,
+    ) -> str:
+        """Add another drink to the same order, with whatever details the customer gave for it.
 
-    @function_tool()
-    async def set_size(self, context: RunContext, size: str) -> str:
-        """Set the size of the drink.
-        
         Args:
-            size: The size of the drink - must be "small", "medium", or "large"
+            drink_type: A drink from the MENU, or the custom drink the customer asked for
+            size: One of the Sizes on the MENU
+            milk: One of the Milk options on the MENU
+            extras: List of Extras from the MENU; pass an empty list when the customer wants none
         """
-        size = size.lower()
-        if size not in ["small", "medium", "large"]:
-            size = "medium"
-        
-        self.order_state["size"] = size
-        logger.info(f"Set size: {size}")
-        
-        if not self.order_state["milk"]:
-            return f"Perfect, a {size} {self.order_state['drinkType']}. What kind of milk - regular, oat, almond, soy, or skim?"
-        return f"Changed to {size}!"
+        items = self.order_state["items"]
+        # the first drink of a fresh order fills the empty cart slot
+        if (
+            any(items[-1][field] for field in ("drinkType", "size", "milk"))
+            or items[-1]["extras"] is not None
+        ):
+            items.append(new_cart_item())
+        slots = {
+            field: value
+            for field, value in (
+                ("drinkType", drink_type),
+                ("size", size),
+                ("milk", milk),
+                ("extras", extras),
+            )
+            if value is not None
+        }
+        errors = self._apply_slots(slots, len(items) - 1)
+        tool_logger.info("Add item %d: %s (errors: %s)", len(items), slots, errors)
 
-    @function_tool()
-    async def set_milk(self, context: RunContext, milk: str) -> str:
-        """Set the milk preference.
-        
-        Args:
-            milk: Type of milk - "regular", "skim", "oat", "almond", "soy", or "none"
-        """
-        self.order_state["milk"] = milk.lower()
-        logger.info(f"Set milk: {milk}")
-        
-        if not self.order_state["extras"] and self.order_state["name"]:
-            return f"Great! {milk} milk it is. Koi extras chahiye? Extra shot, vanilla syrup, caramel, whipped cream? Ya simple hi?"
-        return f"Changed to {milk} milk!"
+        parts = [f"Added drink {len(items)}."]
+        if errors:
+            parts.append(f"Could not set: {'; '.join(errors.values())}.")
+        parts.append(self._next_step())
+        return " ".join(parts)
 
     @function_tool()
-    async def add_extras(self, context: RunContext, extras: str) -> str:
-        """Add extras to the order.
-        
+    @timed_tool
+    async def remove_item(self, context: RunContext, item: int) -> str:
+        """Remove a drink from the order.
+
         Args:
-            extras: Comma-separated list of extras (e.g., "extra shot, vanilla syrup, whipped cream")
+            item: Number of the drink to remove (1 = first)
         """
-        extras_list = [e.strip() for e in extras.split(",")]
-        self.order_state["extras"] = extras_list
-        logger.info(f"Set extras: {extras_list}")
-        return f"Added {', '.join(extras_list)}!"
+        items = self.order_state["items"]
+        if not self._valid_item(item):
+            return f"There is no drink {item}; the order has {len(items)}."
+        removed = items.pop(item - 1)
+        if not items:
+            items.append(new_cart_item())
+        tool_logger.info("Removed item %d: %s", item, removed)
+        what = removed["drinkType"] or "drink"
+        return f"Removed drink {item} ({what}); the order now has {len(items)}. {self._next_step()}"
 
     @function_tool()
-    async def no_extras(self, context: RunContext) -> str:
-        """Call this when customer doesn't want any extras."""
-        self.order_state["extras"] = []
-        logger.info("No extras requested")
-        return "No problem, keeping it simple!"
-    
-    @function_tool()
+    @timed_tool
     async def confirm_order(self, context: RunContext) -> str:
         """Confirm the complete order with the customer before saving. Call this to recap all order details."""
-        
-        # Check if all required fields are filled
+
+        # Check if all required fields are filled; extras are optional here
+        items = self.order_state["items"]
         missing = []
         if not self.order_state["name"]:
-            missing.append("name")
-        if not self.order_state["drinkType"]:
-            missing.append("drink type")
-        if not self.order_state["size"]:
-            missing.append("size")
-        if not self.order_state["milk"]:
-            missing.append("milk preference")
-        
+            missing.append(FIELD_LABELS["name"])
+        for number, item in enumerate(items, 1):
+            for field in ("drinkType", "size", "milk"):
+                if not item[field]:
+                    prefix = f"drink {number} " if len(items) > 1 else ""
+                    missing.append(prefix + FIELD_LABELS[field])
+
         if missing:
             return f"I still need: {', '.join(missing)}. Let me know those details."
-        
+
         # Build confirmation message
-        extras_text = ""
-        if self.order_state["extras"]:
-            extras_text = f" with {', '.join(self.order_state['extras'])}"
-        
-        confirmation = (
-            f"Alright, here's your order: "
-            f"A {self.order_state['size']} {self.order_state['drinkType']} "
-            f"with {self.order_state['milk']} milk{extras_text} "
-            f"for {self.order_state['name']}. "
-            f"Sab theek hai? Should I lock this in?"
-        )
-        
-        logger.info(f"Order confirmation: {self.order_state}")
+        name = self.order_state["name"]
+        if len(items) == 1:
+            confirmation = (
+                f"Alright, here's your order: A {self._describe(items[0])} for {name}. "
+            )
+        else:
+            drinks = "; ".join(
+                f"{number}. a {self._describe(item)}"
+                for number, item in enumerate(items, 1)
+            )
+            confirmation = f"Alright, here's your order for {name}, {len(items)} drinks: {drinks}. "
+        confirmation += self._replies["confirm_question"]
+        if AGENT_SPECULATIVE_SAVE:
+            self._start_prepare()
+
+        logger.info("Order confirmation: %s", self.order_state)
         return confirmation
 
+    def _stage_order(self, token_number: str) -> dict:
+        """Order record for the current state: every drink in one record, so the cart is saved all or nothing"""
+        return {
+            "name": self.order_state["name"],
+            "items": [
+                {**item, "extras": item["extras"] or []}
+                for item in self.order_state["items"]
+            ],
+            "token_number": token_number,
+            "timestamp": "",
+            "status": "confirmed",
+        }
+
+    def _start_prepare(self) -> None:
+        """Reserve a token and stage the record in the background while the recap is spoken"""
+        self._discard_prepared()
+        snapshot = json.dumps(self.order_state, sort_keys=True)
+
+        async def prepare() -> dict:
+            # the token counter file is locked and fsynced on a new lease; keep it off the loop
+            token_number = await asyncio.get_running_loop().run_in_executor(
+                None, self._tokens.allocate
+            )
+            if snapshot != json.dumps(self.order_state, sort_keys=True):
+                return {}  # changed while the token was reserved; save_order starts over
+            return self._stage_order(token_number)
+
+        self._prepared = (
+            snapshot,
+            asyncio.create_task(prepare(), name="prepare_order"),
+        )
+
+    def _discard_prepared(self) -> None:
+        if self._prepared is not None:
+            # a reserved token is skipped like the rest of an unused lease
+            self._prepared[1].cancel()
+            self._prepared = None
+
+    async def _take_prepared(self) -> Optional[dict]:
+        """The staged record if the order has not changed since confirm_order, else None"""
+        if self._prepared is None:
+            return None
+        snapshot, task = self._prepared
+        self._prepared = None
+        if snapshot != json.dumps(self.order_state, sort_keys=True):
+            task.cancel()
+            tool_logger.info(
+                "Order changed after confirmation, discarded the prepared save"
+            )
+            return None
+        try:
+            return await task or None
+        except (OSError, ValueError):
+            # the token counter file could not be read or written; save_order tries again
+            logger.exception("Prepared save failed, saving without it")
+            return None
+
     @function_tool()
+    @timed_tool
     async def save_order(self, context: RunContext) -> str:
-        """CRITICAL: Save the complete order to a JSON file and send HTML receipt to frontend. 
+        """CRITICAL: Save the complete order and send the receipt to the frontend.
         You MUST call this function immediately after the customer confirms their order (says yes/okay/confirm).
         DO NOT just say the order is confirmed - you must actually call this function to save it."""
-        
+
         # Validate all fields are filled
-        if not all([
-            self.order_state["name"],
-            self.order_state["drinkType"],
-            self.order_state["size"],
-            self.order_state["milk"]
-        ]):
+        items = self.order_state["items"]
+        if not self.order_state["name"] or not all(
+            item["drinkType"] and item["size"] and item["milk"] for item in items
+        ):
             return "I can't save the order yet - some details are missing. Let me confirm everything first."
-        
-        # Create orders directory if it doesn't exist
-        orders_dir = "orders"
-        os.makedirs(orders_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{orders_dir}/order_{timestamp}_{self.order_state['name']}.json"
-        
-        # Generate unique token number
-        token_number = self._generate_token_number()
-        
-        # Prepare order data
-        order_data = {
-            **self.order_state,
-            "token_number": token_number,
-            "timestamp": datetime.now().isoformat(),
-            "status": "confirmed"
-        }
-        
-        # Save to JSON file
-        with open(filename, 'w') as f:
-            json.dump(order_data, f, indent=2)
-        
+
+        # Use what confirm_order staged if the order is still the one read back,
+        # otherwise take one token for the whole cart now (a new lease locks and
+        # fsyncs the counter file, so off the loop)
+        order_data = await self._take_prepared()
+        if order_data is None:
+            token_number = await asyncio.get_running_loop().run_in_executor(
+                None, self._tokens.allocate
+            )
+            order_data = self._stage_order(token_number)
+        token_number = order_data["token_number"]
+
+        # Receipt filename carries the token so same-name orders never collide
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        order_data["timestamp"] = now.isoformat()
+
+        # Generate HTML visualization. Rendered here rather than in the prepare task: the
+        # receipt shows the time the order was placed, and a render takes microseconds
+        html_filename = f"order_{timestamp}_{token_number}.html"
+        html_content = self._receipt_renderer.render(order_data, token_number)
+
+        # Hand the order and its receipt to the journal; the writes happen off the event loop
+        await self._journal.submit(order_data, files={html_filename: html_content})
+        self._order_feed.publish(order_data)
+        if self._trail is not None:
+            self._trail.order(order_data)
+
         # Log the machine-readable format
-        json_str = json.dumps(self.order_state, separators=(',', ':'))
-        logger.info(f"SAVE_ORDER_JSON: {json_str}")
-        logger.info(f"TOKEN_NUMBER: {token_number}")
-        logger.info(f"Order saved to {filename}")
-        
-        # Generate HTML visualization
-        html_filename = f"{orders_dir}/order_{timestamp}_{self.order_state['name']}.html"
-        html_content = self._generate_html_receipt(order_data, token_number)
-        with open(html_filename, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        logger.info(f"HTML_SNIPPET:")
-        logger.info(html_content)
-        logger.info(f"END_HTML_SNIPPET")
-        logger.info(f"HTML receipt saved to {html_filename}")
-        
-        # Reset order state for next customer
-        self.order_state = {
-            "drinkType": "",
-            "size": "",
-            "milk": "",
-            "extras": [],
-            "name": ""
-        }
-        
-        # Send HTML as data message to frontend
-        logger.info("Sending HTML as data message to frontend")
-        html_message = f"HTML_SNIPPET:{html_content}END_HTML_SNIPPET"
-        
-        # Send via data channel using session's room
+        logger.info("SAVE_ORDER_JSON: %s", _CompactJson(order_data))
+        logger.info("TOKEN_NUMBER: %s", token_number)
+        logger.info("Order queued for %s (receipt %s)", ORDERS_DIR, html_filename)
+
+        # Reset order state for next customer; their turns are summarized on the next turn
+        self.order_state = new_order_state()
+        self._context_pruner.order_saved(
+            f"{token_number} for {order_data['name']}: "
+            + "; ".join(self._describe(item) for item in order_data["items"])
+        )
+
+        # Send the compact receipt to the frontend, which renders it from its own template
         try:
-            await self.session.room.local_participant.publish_data(
-                html_message.encode('utf-8'),
-                reliable=True
+            sent = await self._transport.send(
+                RECEIPT_TOPIC, RECEIPT_TYPE, build_receipt(order_data)
             )
-            logger.info("✅ HTML sent via data message")
+            logger.info("✅ Receipt sent on %s (%d bytes)", RECEIPT_TOPIC, sent)
         except Exception as e:
-            logger.error(f"❌ Failed to send HTML via data message: {e}")
-        
-        # ALSO return confirmation with HTML embedded as fallback
-        confirmation = f"Perfect! Your Blue Tokai order is locked in. Your {order_data['size']} {order_data['drinkType']} will be ready shortly. Thank you, {order_data['name']}! Enjoy your brew!"
-        
-        # Return both confirmation and HTML for chat message fallback
-        return f"{confirmation} HTML_SNIPPET:{html_content}END_HTML_SNIPPET"
+            logger.error("❌ Failed to send receipt via data message: %s", e)
+
+        # Only the short confirmation goes back to the LLM - the receipt stays out of the chat context
+        saved = order_data["items"]
+        what = (
+            f"{saved[0]['size']} {saved[0]['drinkType']}"
+            if len(saved) == 1
+            else f"{len(saved)} drinks"
+        )
+        return self._replies["saved"].format(
+            what=what, token=token_number, name=order_data["name"]
+        )
 
 
 def prewarm(proc: JobProcess):
+    setup_agent_logging()
     proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["order_journal"] = create_order_journal()
+    # The feed itself lives in the worker process (serve_worker_http)
+    proc.userdata["order_feed"] = OrderRelay.from_env(
+        f"http://127.0.0.1:{AGENT_HTTP_PORT}/orders/publish"
+    )
+    proc.userdata["token_allocator"] = create_token_allocator()
+    proc.userdata["session_recorder"] = create_session_recorder()
+    # Parsed once per process; sessions share the immutable config and its menu catalog
+    store_config = create_store_config()
+    proc.userdata["store_config"] = store_config
+    create_receipt_renderer(store_config.current())
+
+    # Synthesize the fixed phrases in the background; prewarm itself must return quickly
+    tts_cache = create_tts_cache()
+    proc.userdata["tts_cache"] = tts_cache
+    phrases = store_config.current().phrases
+    # prewarm has no job context, so the precompute thread brings its own HTTP session
+    precompute_in_background(
+        create_tts,
+        tts_cache,
+        phrases,
+        voice=TTS_VOICE,
+        style=TTS_STYLE,
+        sentence_tokenizer=create_sentence_tokenizer(),
+    )
+
+    # Provider clients and the noise-cancellation filter are built here rather than per
+    # job, so a new call only pays for connecting. HTTP sessions are still bound lazily
+    # to the job's http_context on first use. The turn detector stays in entrypoint:
+    # it binds to the job's inference executor, and its model already lives in the
+    # worker's shared inference process.
+    proc.userdata["stt"] = create_stt()
+    proc.userdata["llm"] = create_llm()
+    proc.userdata["tts"] = create_session_tts(tts_cache, phrases)
+    proc.userdata["noise_cancellation"] = noise_cancellation.BVC()
 
 
 async def entrypoint(ctx: JobContext):
@@ -510,24 +843,39 @@ async def entrypoint(ctx: JobContext):
         "room": ctx.room.name,
     }
 
+    # Blocking code in tools and callbacks shows up as loop_stall_seconds{source=...}.
+    # The load score's lag part reads loop_lag_seconds: the watchdog records it with
+    # every heartbeat, and without the watchdog a lone sampler task feeds it
+    if AGENT_LOOP_WATCHDOG_MS > 0:
+        loop_watchdog = LoopWatchdog(AGENT_LOOP_WATCHDOG_MS / 1000)
+        loop_watchdog.start()
+        ctx.add_shutdown_callback(loop_watchdog.aclose)
+    elif AGENT_LOAD_THRESHOLD > 0:
+        lag_sampler = asyncio.create_task(sample_loop_lag(), name="loop_lag_sampler")
+
+        async def stop_lag_sampler() -> None:
+            await utils.aio.cancel_and_wait(lag_sampler)
+
+        ctx.add_shutdown_callback(stop_lag_sampler)
+
+    # Open the provider connections while the room and session are still starting up
+    connection_warmer = ConnectionWarmer()
+    connection_warmer.start()
+    ctx.add_shutdown_callback(connection_warmer.aclose)
+
     # Set up a voice AI pipeline using OpenAI, Cartesia, AssemblyAI, and the LiveKit turn detector
     session = AgentSession(
         # Speech-to-text (STT) is your agent's ears, turning the user's speech into text that the LLM can understand
         # See all available models at https://docs.livekit.io/agents/models/stt/
-        stt=deepgram.STT(model="nova-3"),
+        stt=ctx.proc.userdata["stt"],
         # A Large Language Model (LLM) is your agent's brain, processing user input and generating a response
         # See all available models at https://docs.livekit.io/agents/models/llm/
-        llm=google.LLM(
-                model="gemini-2.5-flash",
-            ),
+        llm=ctx.proc.userdata["llm"],
         # Text-to-speech (TTS) is your agent's voice, turning the LLM's text into speech that the user can hear
         # See all available models as well as voice selections at https://docs.livekit.io/agents/models/tts/
-        tts=murf.TTS(
-                voice="anisha", 
-                style="Conversation",
-                tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
-                text_pacing=True
-            ),
+        # Sentences go to Murf one at a time through the phrase cache, so repeated
+        # sentences are served from disk instead of the network
+        tts=ctx.proc.userdata["tts"],
         # VAD and turn detection are used to determine when the user is speaking and when the agent should respond
         # See more at https://docs.livekit.io/agents/build/turns
         turn_detection=MultilingualModel(),
@@ -550,18 +898,45 @@ async def entrypoint(ctx: JobContext):
     # Metrics collection, to measure pipeline performance
     # For more information, see https://docs.livekit.io/agents/build/metrics/
     usage_collector = metrics.UsageCollector()
+    # Prompt tokens, cached tokens and TTFT per LLM request
+    prompt_accountant = PromptAccountant()
+    # EOU / STT / TTFT / TTFB / turn latency histograms for this session and the worker
+    turn_metrics = TurnMetrics(ctx.room.name)
 
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
+        turn_metrics.on_metrics(ev.metrics)
+        if isinstance(ev.metrics, metrics.LLMMetrics):
+            prompt_accountant.record(ev.metrics)
 
     async def log_usage():
         summary = usage_collector.get_summary()
-        logger.info(f"Usage: {summary}")
+        logger.info("Usage: %s", summary)
+        logger.info("Prompt budget: %s", prompt_accountant.summary())
+        logger.info("Turn latency: %s", turn_metrics.registry.summary())
 
     ctx.add_shutdown_callback(log_usage)
 
+    snapshot_writer = SnapshotWriter(AGENT_METRICS_DIR, interval=AGENT_METRICS_INTERVAL)
+    snapshot_writer.start()
+    # The worker process serves the snapshots on /metrics (serve_worker_http)
+    order_feed = ctx.proc.userdata["order_feed"]
+
+    async def close_metrics():
+        # the last snapshot still includes this session
+        await snapshot_writer.aclose()
+        turn_metrics.close()
+        await order_feed.aclose()
+
+    ctx.add_shutdown_callback(close_metrics)
+
+    # Make sure every queued order reaches disk before the job exits
+    order_journal = ctx.proc.userdata["order_journal"]
+    ctx.add_shutdown_callback(order_journal.aflush)
+    ctx.add_shutdown_callback(aflush_agent_logging)
+
     # # Add a virtual avatar to the session, if desired
     # # For other providers, see https://docs.livekit.io/agents/models/avatar/
     # avatar = hedra.AvatarSession(
@@ -570,13 +945,40 @@ async def entrypoint(ctx: JobContext):
     # # Start the avatar and wait for it to join
     # await avatar.start(session, room=ctx.room)
 
+    # The session keeps this config even if the file is reloaded while it runs
+    store_config = ctx.proc.userdata["store_config"].current()
+
+    # Messages, tool calls and saved orders of this session, findable by room or token
+    session_recorder = ctx.proc.userdata["session_recorder"]
+    session_trail = None
+    if session_recorder is not None:
+        session_trail = session_recorder.trail(ctx.job.id, ctx.room.name)
+        session_trail.attach(session)
+
+        async def close_trail(reason: str) -> None:
+            await session_trail.aclose(reason)
+            await session_recorder.aflush()
+
+        ctx.add_shutdown_callback(close_trail)
+
     # Start the session, which initializes the voice pipeline and warms up the models
     await session.start(
-        agent=CoffeeBarista(),
+        agent=CoffeeBarista(
+            order_journal=order_journal,
+            order_feed=order_feed,
+            receipt_renderer=create_receipt_renderer(store_config),
+            token_allocator=ctx.proc.userdata["token_allocator"],
+            store_config=store_config,
+            session_trail=session_trail,
+            prompt_accountant=prompt_accountant,
+            data_transport=DataTransport.from_env(
+                ctx.room.local_participant.publish_data
+            ),
+        ),
         room=ctx.room,
         room_input_options=RoomInputOptions(
             # For telephony applications, use `BVCTelephony` for best results
-            noise_cancellation=noise_cancellation.BVC(),
+            noise_cancellation=ctx.proc.userdata["noise_cancellation"],
         ),
     )
 
@@ -584,5 +986,35 @@ async def entrypoint(ctx: JobContext):
     await ctx.connect()
 
 
+def serve_worker_http() -> None:
+    """Start the worker's loopback server: ``/orders/feed``, ``/metrics``, ``/snapshot``.
+
+    Job processes exit with their call, so the feed lives here and every job
+    relays its orders to it; the metrics come from the jobs' snapshots, and
+    those of finished jobs are folded together every interval. The jobs are
+    started after this, so they inherit the bound port through
+    ``AGENT_HTTP_PORT``.
+    """
+    global AGENT_HTTP_PORT
+    server = LocalHTTPServer(AGENT_HTTP_PORT)
+    add_feed_routes(server, OrderFeed.from_env())
+    # a running job rewrites its snapshot every interval; older ones are hung or gone
+    add_metrics_routes(server, AGENT_METRICS_DIR, max_age=3 * AGENT_METRICS_INTERVAL)
+    AGENT_HTTP_PORT = serve_in_thread(
+        server,
+        lambda: fold_snapshots_every(AGENT_METRICS_DIR, AGENT_METRICS_INTERVAL),
+        name="worker-http",
+    )
+    os.environ["AGENT_HTTP_PORT"] = str(AGENT_HTTP_PORT)
+
+
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
+    serve_worker_http()
+    worker_options = {"entrypoint_fnc": entrypoint, "prewarm_fnc": prewarm}
+    if AGENT_LOAD_THRESHOLD > 0:
+        # lag and turn latency come from the job snapshots, so read them as often as they change
+        worker_options["load_fnc"] = WorkerLoad.from_env(
+            AGENT_METRICS_DIR, AGENT_LOAD_THRESHOLD, window=AGENT_METRICS_INTERVAL
+        )
+        worker_options["load_threshold"] = AGENT_LOAD_THRESHOLD
+    cli.run_app(WorkerOptions(**worker_options))
@@ -0,0 +1,115 @@
+"""Keeps a long-running session's chat context small.
+
+A kiosk session serves one customer after another, and every finished order
+would otherwise stay in the chat history that each later LLM request sends.
+``CoffeeBarista`` calls ``ContextPruner.order_saved`` from ``save_order``;
+once the agent has finished speaking, ``prune`` replaces every earlier turn
+with one ``[EARLIER ORDERS]`` note listing the last few saved orders (token,
+name, drinks), so "same again" or "what was my token?" can still be
+answered. Pruning between replies, rather than when the customer's turn
+ends, leaves the context a preemptive reply was started from unchanged.
+
+Within an order the context can also outgrow the token budget, e.g. a chatty
+customer. Whole turns are then dropped oldest first, always keeping the
+newest turn. Tool calls stay together with their outputs, and the ORDER
+STATE note carries what was already saved, so nothing the order needs is
+lost.
+
+Like the ORDER STATE note, the summary is a user-role message: Gemini folds
+system messages into the system instruction, and a summary there would
+change the cacheable prompt prefix after every order.
+"""
+
+import logging
+from collections import deque
+from typing import Optional
+
+from livekit.agents import llm
+
+from prompt_budget import estimate_item_tokens
+
+logger = logging.getLogger("agent.context")
+
+SUMMARY_ID = "blue-tokai.earlier-orders"
+
+
+class ContextPruner:
+    """Summarizes saved orders out of the chat context and enforces a token budget.
+
+    Args:
+        budget_tokens: Estimated tokens (``prompt_budget``) the chat items may
+            take before old turns are dropped; 0 disables pruning.
+        max_orders: Saved orders listed in the summary.
+    """
+
+    def __init__(self, budget_tokens: int = 1500, *, max_orders: int = 5) -> None:
+        self.budget_tokens = budget_tokens
+        self.summaries: deque[str] = deque(maxlen=max_orders)
+        self.saved = 0
+        self._order_done = False
+
+    def order_saved(self, summary: str) -> None:
+        """Record a saved order; its turns are summarized on the next ``prune``."""
+        self.summaries.append(summary)
+        self.saved += 1
+        self._order_done = True
+
+    def summary_message(self) -> Optional[llm.ChatMessage]:
+        if not self.summaries:
+            return None
+        text = "[EARLIER ORDERS, not said by the customer, already saved] " + "; ".join(
+            self.summaries
+        )
+        if self.saved > len(self.summaries):
+            text += f" (+{self.saved - len(self.summaries)} older)"
+        return llm.ChatMessage(id=SUMMARY_ID, role="user", content=[text])
+
+    def prune(self, chat_ctx: llm.ChatContext) -> Optional[llm.ChatContext]:
+        """Pruned copy of ``chat_ctx``, or None when it needs no pruning."""
+        if not self.budget_tokens:
+            return None
+        sizes = [estimate_item_tokens(item) for item in chat_ctx.items]
+        if not self._order_done and sum(sizes) <= self.budget_tokens:
+            return None
+
+        # instructions first, then the summary, then the turns still relevant
+        head: list[llm.ChatItem] = []
+        turns: list[list[llm.ChatItem]] = []
+        for item in chat_ctx.items:
+            if item.id == SUMMARY_ID:
+                continue
+            if (
+                not turns
+                and item.type == "message"
+                and item.role in ("system", "developer")
+            ):
+                head.append(item)
+            elif not turns or (item.type == "message" and item.role == "user"):
+                turns.append([item])
+            else:
+                turns[-1].append(item)
+        if self._order_done:
+            # every turn so far belongs to an order that is saved now
+            turns = []
+            self._order_done = False
+        summary = self.summary_message()
+        if summary is not None:
+            head.append(summary)
+
+        size = sum(estimate_item_tokens(item) for item in head)
+        kept: list[list[llm.ChatItem]] = []
+        for turn in reversed(turns):
+            turn_size = sum(estimate_item_tokens(item) for item in turn)
+            if kept and size + turn_size > self.budget_tokens:
+                break
+            kept.append(turn)
+            size += turn_size
+        dropped = len(turns) - len(kept)
+        logger.debug(
+            "Chat context pruned from %d to %d tokens (%d turns dropped)",
+            sum(sizes),
+            size,
+            dropped,
+        )
+        items = head + [item for turn in reversed(kept) for item in turn]
+        return llm.ChatContext(items)
@@ -0,0 +1,105 @@
+"""Small loopback HTTP server.
+
+``LocalHTTPServer`` binds to 127.0.0.1 only. When the configured port is
+taken it falls back to an ephemeral port and logs it. The routes are
+registered by callers (``add_get``, ``add_post``) before ``start``.
+
+Job processes exit with their call, so endpoints that must outlive a call
+run in the worker process: ``serve_in_thread`` gives the server an event loop
+of its own there, next to the LiveKit worker's.
+"""
+
+import asyncio
+import errno
+import logging
+import threading
+from collections.abc import Awaitable
+from typing import Callable, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger("agent.http")
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+class LocalHTTPServer:
+    """aiohttp server on the loopback interface.
+
+    Args:
+        port: Preferred port; 0 always picks an ephemeral one.
+        host: Interface to bind to.
+    """
+
+    def __init__(self, port: int = 0, *, host: str = "127.0.0.1") -> None:
+        self.host = host
+        self.port = port
+        self._app = web.Application()
+        self._runner: Optional[web.AppRunner] = None
+
+    def add_get(self, path: str, handler: Handler) -> None:
+        self._app.router.add_get(path, handler)
+
+    def add_post(self, path: str, handler: Handler) -> None:
+        self._app.router.add_post(path, handler)
+
+    async def start(self) -> int:
+        """Start serving; returns the bound port."""
+        self._runner = web.AppRunner(self._app, access_log=None)
+        await self._runner.setup()
+        try:
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE:
+                raise
+            logger.info(
+                "Port %d is taken by another job, using an ephemeral port", self.port
+            )
+            site = web.TCPSite(self._runner, self.host, 0)
+            await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info("Local HTTP server on http://%s:%d", self.host, self.port)
+        return self.port
+
+    async def aclose(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def serve_in_thread(
+    server: LocalHTTPServer,
+    *tasks: Callable[[], Awaitable[None]],
+    name: str = "local-http",
+) -> int:
+    """Run ``server`` and the ``tasks`` coroutines in a daemon thread for the life of the process.
+
+    Returns the bound port once the server listens; raises what ``start`` raised.
+    """
+    started = threading.Event()
+    error: list[BaseException] = []
+
+    async def _run() -> None:
+        try:
+            await server.start()
+        except BaseException as e:
+            error.append(e)
+            raise
+        finally:
+            started.set()
+        await asyncio.gather(*(task() for task in tasks))
+        await asyncio.Event().wait()
+
+    def _target() -> None:
+        try:
+            asyncio.run(_run())
+        except Exception:
+            if not error:
+                logger.exception("Local HTTP server on port %d stopped", server.port)
+
+    threading.Thread(target=_target, name=name, daemon=True).start()
+    started.wait()
+    if error:
+        raise error[0]
+    return server.port
@@ -0,0 +1,260 @@
+"""Non-blocking logging pipeline for the agent's hot path.
+
+``setup_agent_logging`` puts a ``QueueHandler`` on the ``agent`` logger so a
+log call on the event loop only builds a ``LogRecord`` and enqueues it. A
+``QueueListener`` thread does everything else:
+
+- formatting (log calls use lazy ``%s`` arguments, never f-strings)
+- per-category sampling, where the category is the logger name below ``agent``
+  (``agent.tools`` -> ``tools``) or an explicit ``extra={"category": ...}``
+- size caps: messages above ``max_message_bytes`` are truncated and tagged with
+  a payload id; with ``payload_dir`` set the full text is spilled to
+  ``<payload_dir>/<id>.txt``
+- emitting, either as structured JSON lines or by forwarding to the handlers
+  the LiveKit CLI installed on the root logger
+
+Records carry the job's ``ctx.log_context_fields`` (e.g. ``room``) because the
+LiveKit job installs a record factory that copies them onto every record.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+AGENT_LOGGER = "agent"
+
+# Attributes every LogRecord has; anything else is structured context/extra
+_RECORD_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+    | {"message", "asctime", "category", "payload_id"}
+)
+
+
+def _category(record: logging.LogRecord) -> str:
+    category = getattr(record, "category", None)
+    if category:
+        return category
+    name = record.name
+    if name.startswith(AGENT_LOGGER + "."):
+        return name[len(AGENT_LOGGER) + 1 :].split(".", 1)[0]
+    return name
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of INFO/DEBUG records per category.
+
+    Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = dict(rates)
+        self._random = random.Random()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(_category(record))
+        if rate is None:
+            return True
+        return rate > 0 and (rate >= 1 or self._random.random() < rate)
+
+
+class _AgentQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers formatting to the listener thread.
+
+    The stock ``prepare`` formats the message on the calling thread; here we
+    only snapshot mutable arguments so later changes (e.g. to ``order_state``)
+    do not leak into a record that has not been formatted yet.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_queue: int) -> None:
+        super().__init__(log_queue)
+        self.max_queue = max_queue
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if isinstance(args, tuple) and any(
+            isinstance(a, (dict, list, set)) for a in args
+        ):
+            record.args = tuple(
+                copy.copy(a) if isinstance(a, (dict, list, set)) else a for a in args
+            )
+        elif isinstance(args, dict):
+            record.args = copy.copy(args)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue.put never blocks; bound it by dropping instead of waiting
+        if self.queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return
+        self.queue.put(record)
+
+
+class _CapAndDispatchHandler(logging.Handler):
+    """Runs in the listener thread: applies size caps, then emits."""
+
+    def __init__(
+        self,
+        *,
+        max_message_bytes: int,
+        payload_dir: Optional[str],
+        json_stream=None,
+    ) -> None:
+        super().__init__()
+        self.max_message_bytes = max_message_bytes
+        self.payload_dir = payload_dir
+        self._json_handler: Optional[logging.Handler] = None
+        if json_stream is not None:
+            self._json_handler = logging.StreamHandler(json_stream)
+            self._json_handler.setFormatter(JsonLineFormatter())
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._cap(record)
+            if self._json_handler is not None:
+                self._json_handler.handle(record)
+                return
+            for handler in logging.getLogger().handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def _cap(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        size = len(message.encode("utf-8", errors="replace"))
+        if size <= self.max_message_bytes:
+            record.msg, record.args = message, ()
+            return
+
+        payload_id = hashlib.sha1(
+            message.encode("utf-8", errors="replace")
+        ).hexdigest()[:12]
+        if self.payload_dir:
+            os.makedirs(self.payload_dir, exist_ok=True)
+            with open(
+                os.path.join(self.payload_dir, f"{payload_id}.txt"),
+                "w",
+                encoding="utf-8",
+            ) as f:
+                f.write(message)
+        record.msg = (
+            f"{message[: self.max_message_bytes]}... "
+            f"[truncated {size} bytes, payload_id={payload_id}]"
+        )
+        record.args = ()
+        record.payload_id = payload_id
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record, including context fields and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, tz=timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "name": record.name,
+            "category": _category(record),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if getattr(record, "payload_id", None):
+            entry["payload_id"] = record.payload_id
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[_AgentQueueHandler] = None
+
+
+def parse_sampling(spec: str) -> dict[str, float]:
+    """Parse ``"tools=0.1,receipt=0"`` into ``{"tools": 0.1, "receipt": 0.0}``."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        category, _, rate = part.partition("=")
+        rates[category.strip()] = float(rate)
+    return rates
+
+
+def setup_agent_logging(
+    *,
+    sample_rates: Optional[dict[str, float]] = None,
+    max_message_bytes: Optional[int] = None,
+    payload_dir: Optional[str] = None,
+    json_stream=None,
+    max_queue: int = 10_000,
+) -> logging.handlers.QueueListener:
+    """Route the ``agent`` logger through a queue and a listener thread.
+
+    Idempotent per process. Defaults come from ``AGENT_LOG_SAMPLING``,
+    ``AGENT_LOG_MAX_BYTES``, ``AGENT_LOG_PAYLOAD_DIR`` and ``AGENT_LOG_JSON``
+    (``1`` writes JSON lines to stderr instead of forwarding to the root
+    logger's handlers).
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    if sample_rates is None:
+        sample_rates = parse_sampling(os.getenv("AGENT_LOG_SAMPLING", ""))
+    if max_message_bytes is None:
+        max_message_bytes = int(os.getenv("AGENT_LOG_MAX_BYTES", "2048"))
+    if payload_dir is None:
+        payload_dir = os.getenv("AGENT_LOG_PAYLOAD_DIR") or None
+    if json_stream is None and os.getenv("AGENT_LOG_JSON") == "1":
+        json_stream = sys.stderr
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = _AgentQueueHandler(log_queue, max_queue)
+    _queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    dispatch = _CapAndDispatchHandler(
+        max_message_bytes=max_message_bytes,
+        payload_dir=payload_dir,
+        json_stream=json_stream,
+    )
+    _listener = logging.handlers.QueueListener(log_queue, dispatch)
+    _listener.start()
+
+    agent_logger = logging.getLogger(AGENT_LOGGER)
+    agent_logger.addHandler(_queue_handler)
+    agent_logger.propagate = False
+    if agent_logger.level == logging.NOTSET:
+        agent_logger.setLevel(logging.INFO)
+    return _listener
+
+
+def flush_agent_logging() -> None:
+    """Stop the listener after it drains the queue, then restore propagation."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    agent_logger = logging.getLogger(AGENT_LOGGER)
+    agent_logger.removeHandler(_queue_handler)
+    agent_logger.propagate = True
+    _listener = None
+    _queue_handler = None
+
+
+async def aflush_agent_logging() -> None:
+    """Async ``flush_agent_logging`` for use as a job shutdown callback."""
+    await asyncio.get_running_loop().run_in_executor(None, flush_agent_logging)
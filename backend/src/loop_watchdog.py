@@ -0,0 +1,189 @@
+"""Event-loop stall detector for a job process.
+
+A daemon thread posts a heartbeat onto the event loop every ``interval``
+seconds (``call_soon_threadsafe``) and waits for it to run. If it has not run
+after ``threshold`` seconds, something is holding the loop. The thread then
+takes the loop thread's stack from ``sys._current_frames()`` and blames:
+
+- ``tool:<name>`` when the task holding the loop is running a ``@function_tool``
+  (``turn_metrics.running_tool``), e.g. a synchronous file write in
+  ``save_order``
+- ``callback:<module>.<function>`` for the innermost frame of our own code
+  otherwise (``on_user_turn_completed``, a ``session.on`` handler, ...)
+- ``other`` when none of our code is on the stack (a plugin, livekit itself)
+
+When the heartbeat finally runs, the stall goes into
+``loop_stall_seconds{source=...}`` in ``PROCESS_METRICS`` and is logged once
+with the captured stack and how much of the stall the loop thread spent on
+the CPU: little CPU with no blocking call on the stack means the process was
+starved by its neighbours rather than blocked. Every heartbeat also records ``loop_lag_seconds``,
+how late a ready callback runs.
+
+Between heartbeats the thread sleeps, so the loop pays one callback per
+``interval`` and the stack is only walked when a stall is caught.
+
+``sample_loop_lag`` records ``loop_lag_seconds`` alone, for a job that needs
+the lag (the worker's load score) but runs no watchdog: a task on the loop
+sleeps ``interval`` and records how late it woke up.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from turn_metrics import PROCESS_METRICS, MetricsRegistry, running_tool
+
+logger = logging.getLogger("agent.watchdog")
+
+_THIS_FILE = os.path.abspath(__file__)
+SRC_DIR = os.path.dirname(_THIS_FILE)
+# innermost frames kept per captured stack
+MAX_FRAMES = 40
+
+
+class _Beat:
+    __slots__ = ("cpu", "done", "posted", "stall")
+
+    def __init__(self, cpu: float) -> None:
+        self.posted = time.perf_counter()
+        self.cpu = cpu
+        self.done = threading.Event()
+        self.stall: Optional[tuple[str, float, str]] = None
+
+
+class LoopWatchdog:
+    """Reports event-loop stalls longer than ``threshold`` seconds.
+
+    Args:
+        threshold: Heartbeat delay that counts as a stall.
+        interval: Pause between heartbeats.
+        roots: Directories whose code counts as ours when blaming a callback.
+        registry: Where ``loop_lag_seconds`` and ``loop_stall_seconds`` go.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        *,
+        interval: float = 0.1,
+        roots: tuple[str, ...] = (SRC_DIR,),
+        registry: MetricsRegistry = PROCESS_METRICS,
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.roots = tuple(os.path.join(os.path.abspath(root), "") for root in roots)
+        self.registry = registry
+        self.stalls = 0
+        self._lag = registry.histogram("loop_lag_seconds").record
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread = 0
+        self._cpu_clock: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Watch the running event loop. Call from the loop's thread."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        try:
+            self._cpu_clock = time.pthread_getcpuclockid(self._loop_thread)
+        except (AttributeError, OSError):  # not on Linux
+            self._cpu_clock = None
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            beat = _Beat(self._loop_cpu())
+            try:
+                self._loop.call_soon_threadsafe(self._on_beat, beat)
+            except RuntimeError:  # loop closed
+                return
+            if beat.done.wait(self.threshold):
+                continue
+            source, stack = self._capture()
+            stall = source, self._loop_cpu() - beat.cpu, stack
+            with self._lock:
+                if not beat.done.is_set():
+                    beat.stall = stall
+            while not beat.done.wait(self.interval):
+                if self._stopped.is_set():
+                    return
+
+    def _on_beat(self, beat: _Beat) -> None:
+        delay = time.perf_counter() - beat.posted
+        self._lag(delay)
+        with self._lock:
+            beat.done.set()
+            stall = beat.stall
+        if stall is None:
+            return
+        source, cpu, stack = stall
+        self.stalls += 1
+        self.registry.histogram("loop_stall_seconds", {"source": source}).record(delay)
+        logger.warning(
+            "Event loop blocked for %.0f ms by %s (on CPU for %.0f ms of the first %.0f ms), stack:\n%s",
+            delay * 1000,
+            source,
+            cpu * 1000,
+            self.threshold * 1000,
+            stack,
+        )
+
+    def _loop_cpu(self) -> float:
+        """CPU seconds used by the loop thread (0 where that cannot be read)."""
+        if self._cpu_clock is None:
+            return 0.0
+        return time.clock_gettime(self._cpu_clock)
+
+    def _capture(self) -> tuple[str, str]:
+        """Blame and formatted stack of whatever the loop thread is running now."""
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return "other", ""
+        stack = traceback.extract_stack(frame, limit=MAX_FRAMES)
+        del frame
+        return self._blame(stack), "".join(stack.format())
+
+    def _blame(self, stack: traceback.StackSummary) -> str:
+        tool = running_tool(self._loop)
+        if tool is not None and any(entry.name == tool for entry in stack):
+            return f"tool:{tool}"
+        for entry in reversed(stack):
+            # agent.py runs as a script, so its frames may carry a relative path
+            filename = os.path.abspath(entry.filename)
+            if filename.startswith(self.roots) and filename != _THIS_FILE:
+                module = os.path.splitext(os.path.basename(filename))[0]
+                return f"callback:{module}.{entry.name}"
+        return "other"
+
+    async def aclose(self) -> None:
+        if self._thread is None:
+            return
+        self._stopped.set()
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+        self._thread = None
+
+
+async def sample_loop_lag(
+    interval: float = 0.1, *, registry: MetricsRegistry = PROCESS_METRICS
+) -> None:
+    """Record ``loop_lag_seconds`` every ``interval`` until cancelled."""
+    record = registry.histogram("loop_lag_seconds").record
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        # timers may fire up to one clock tick early
+        record(max(0.0, loop.time() - due))
@@ -0,0 +1,280 @@
+"""In-memory menu catalog with fuzzy canonicalization.
+
+The catalog is built once per process (``get_catalog``) and indexes every
+drink, size, milk and extra under its canonical name and known aliases. A
+lookup tries, in order:
+
+1. the whole normalized phrase against the alias table
+2. every word window of the phrase against the alias table ("oat milk please")
+3. trigram candidates ranked by edit distance ("capuchino", "frappay")
+
+Resolved values map to canonical SKUs so noisy STT text and LLM paraphrases
+end up as the same order data.
+"""
+
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+CATEGORIES = ("drink", "size", "milk", "extra")
+
+# (sku, category, canonical name, aliases)
+MENU = (
+    ("DRK-ESPRESSO", "drink", "Espresso", ("expresso", "espreso", "single espresso")),
+    ("DRK-AMERICANO", "drink", "Americano", ("americana", "long black")),
+    (
+        "DRK-CAPPUCCINO",
+        "drink",
+        "Cappuccino",
+        ("capuchino", "cappucino", "capuccino", "cappuchino"),
+    ),
+    (
+        "DRK-LATTE",
+        "drink",
+        "Latte",
+        ("caffe latte", "cafe latte", "latte coffee", "lattay"),
+    ),
+    ("DRK-FLATWHITE", "drink", "Flat White", ("flatwhite", "flat wine")),
+    ("DRK-MOCHA", "drink", "Mocha", ("mocca", "moka", "mochaccino", "cafe mocha")),
+    (
+        "DRK-COLDBREW",
+        "drink",
+        "Cold Brew",
+        ("coldbrew", "cold coffee", "cold bru", "signature cold brew"),
+    ),
+    (
+        "DRK-ICEDLATTE",
+        "drink",
+        "Iced Latte",
+        ("ice latte", "iced lattay", "cold latte"),
+    ),
+    ("DRK-FRAPPE", "drink", "Frappe", ("frappay", "frapay", "frappuccino", "frap")),
+    (
+        "DRK-HOTCHOC",
+        "drink",
+        "Hot Chocolate",
+        ("hot choc", "hot cocoa", "drinking chocolate"),
+    ),
+    ("SIZE-S", "size", "small", ("short", "tall", "smallest", "little", "mini")),
+    (
+        "SIZE-M",
+        "size",
+        "medium",
+        ("regular size", "normal size", "grande", "mid", "middle"),
+    ),
+    ("SIZE-L", "size", "large", ("big", "biggest", "venti", "extra large", "largest")),
+    (
+        "MILK-REGULAR",
+        "milk",
+        "regular",
+        ("normal", "whole", "full cream", "dairy", "cow"),
+    ),
+    ("MILK-SKIM", "milk", "skim", ("skimmed", "low fat", "skinny", "fat free")),
+    ("MILK-OAT", "milk", "oat", ("oats", "oatly")),
+    ("MILK-SOY", "milk", "soy", ("soya", "soy bean")),
+    ("MILK-ALMOND", "milk", "almond", ("almonds", "badam")),
+    ("MILK-NONE", "milk", "none", ("no milk", "without milk", "black", "no")),
+    (
+        "EXT-SHOT",
+        "extra",
+        "extra shot",
+        ("double shot", "additional shot", "another shot", "shot"),
+    ),
+    ("EXT-VANILLA", "extra", "vanilla syrup", ("vanilla", "vanilla flavour")),
+    (
+        "EXT-CARAMEL",
+        "extra",
+        "caramel drizzle",
+        ("caramel", "caramel syrup", "caramel sauce"),
+    ),
+    (
+        "EXT-WHIP",
+        "extra",
+        "whipped cream",
+        ("whip", "whipped", "cream on top", "whip cream"),
+    ),
+)
+
+# Filler words dropped before matching; some words only carry meaning in
+# other categories ("milk" says nothing about which milk)
+_STOPWORD_TEXT = (
+    "a an the one please i id want would like can could get have me some of "
+    "with and make it just for thanks thank you um uh"
+)
+_STOPWORDS = frozenset(_STOPWORD_TEXT.split())
+_CATEGORY_NOISE = {
+    "drink": frozenset({"coffee", "cup", "drink"}),
+    "size": frozenset({"size", "cup"}),
+    "milk": frozenset({"milk"}),
+    "extra": frozenset({"add", "extra", "syrup"}),
+}
+
+_MIN_SIMILARITY = 0.72
+# a fuzzy match on the whole phrase beats an exact match on part of it
+_WHOLE_PHRASE_SIMILARITY = 0.85
+_CANDIDATES = 5
+_MAX_WINDOW = 3
+
+
+@dataclass(frozen=True)
+class MenuItem:
+    sku: str
+    category: str
+    name: str
+    aliases: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Match:
+    item: MenuItem
+    score: float
+
+    @property
+    def name(self) -> str:
+        return self.item.name
+
+    @property
+    def sku(self) -> str:
+        return self.item.sku
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = "".join(c if c.isalnum() or c == "'" else " " for c in text)
+    return " ".join(text.replace("'", "").split())
+
+
+def _trigrams(text: str) -> frozenset[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance that also counts a swap of neighbours as one edit."""
+    before: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = previous[j - 1] + (ca != cb)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if (
+                i > 1
+                and j > 1
+                and ca == b[j - 2]
+                and a[i - 2] == cb
+                and before[j - 2] + 1 < cost
+            ):
+                cost = before[j - 2] + 1
+            current.append(cost)
+        before, previous = previous, current
+    return previous[-1]
+
+
+class MenuCatalog:
+    """Precomputed alias and trigram indexes over the menu, per category."""
+
+    def __init__(self, menu=MENU) -> None:
+        self.items: dict[str, MenuItem] = {}
+        self._aliases: dict[str, dict[str, MenuItem]] = {c: {} for c in CATEGORIES}
+        self._grams: dict[str, dict[str, list[str]]] = {c: {} for c in CATEGORIES}
+        for sku, category, name, aliases in menu:
+            item = MenuItem(sku, category, name, tuple(aliases))
+            self.items[sku] = item
+            for alias in (name, *aliases):
+                # both spellings: "extra shot" is "shot" once filler words are dropped,
+                # but "extrashot" is only close to the full form
+                normalized = normalize(alias)
+                self._aliases[category][normalized] = item
+                self._aliases[category].setdefault(
+                    self._clean(category, normalized) or normalized, item
+                )
+        for category, table in self._aliases.items():
+            for key in table:
+                for gram in _trigrams(key):
+                    self._grams[category].setdefault(gram, []).append(key)
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    def names(self, category: str) -> list[str]:
+        """Canonical names in a category, in menu order."""
+        return [i.name for i in self.items.values() if i.category == category]
+
+    @staticmethod
+    def _clean(category: str, text: str) -> str:
+        noise = _STOPWORDS | _CATEGORY_NOISE[category]
+        return " ".join(w for w in text.split() if w not in noise)
+
+    def _resolve(self, category: str, text: str) -> Optional[Match]:
+        """Best match for ``text`` in ``category``, or None."""
+        normalized = normalize(text)
+        aliases = self._aliases[category]
+        if normalized in aliases:
+            return Match(aliases[normalized], 1.0)
+
+        cleaned = self._clean(category, normalized)
+        if not cleaned:
+            return None
+        if cleaned in aliases:
+            return Match(aliases[cleaned], 1.0)
+
+        words = cleaned.split()
+        whole = self._fuzzy(category, (cleaned,))
+        for size in range(min(_MAX_WINDOW, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                window = " ".join(words[start : start + size])
+                if window in aliases:
+                    # "icd latte" is a misheard "iced latte", not a "latte"
+                    if whole is not None and whole.score >= _WHOLE_PHRASE_SIMILARITY:
+                        return whole
+                    return Match(aliases[window], 0.95)
+
+        if len(words) == 1:
+            return whole
+        # each word on its own, so "medium capuchino" finds "capuchino"
+        best = self._fuzzy(category, words)
+        if whole is not None and (best is None or whole.score >= best.score):
+            return whole
+        return best
+
+    def _fuzzy(self, category: str, probes) -> Optional[Match]:
+        grams = self._grams[category]
+        aliases = self._aliases[category]
+        best: Optional[Match] = None
+        for probe in probes:
+            votes: dict[str, int] = {}
+            for gram in _trigrams(probe):
+                for key in grams.get(gram, ()):
+                    votes[key] = votes.get(key, 0) + 1
+            for key in sorted(votes, key=votes.__getitem__, reverse=True)[:_CANDIDATES]:
+                longest = max(len(probe), len(key))
+                # the score can not reach the threshold if the lengths differ too much
+                if abs(len(probe) - len(key)) > longest * (1 - _MIN_SIMILARITY):
+                    continue
+                score = 1 - _edit_distance(probe, key) / longest
+                if score >= _MIN_SIMILARITY and (best is None or score > best.score):
+                    best = Match(aliases[key], round(score, 3))
+        return best
+
+    def resolve_drink(self, text: str) -> Optional[Match]:
+        return self.resolve("drink", text)
+
+    def resolve_size(self, text: str) -> Optional[Match]:
+        return self.resolve("size", text)
+
+    def resolve_milk(self, text: str) -> Optional[Match]:
+        return self.resolve("milk", text)
+
+    def resolve_extra(self, text: str) -> Optional[Match]:
+        return self.resolve("extra", text)
+
+
+@lru_cache(maxsize=1)
+def get_catalog() -> MenuCatalog:
+    """The process-wide catalog, built on first use."""
+    return MenuCatalog()
@@ -0,0 +1,494 @@
+"""Order analytics: rolling counters plus a columnar archive.
+
+Two parts, both derived from confirmed orders:
+
+- ``OrderAnalytics`` keeps hourly counters (orders, drinks, and drinks by
+  ``drinkType``, ``size``, ``milk`` and ``extras``) in an ``order_counts``
+  table next to the order store. It is an order journal sink, so every batch
+  of saved orders adds to the counters in one transaction and a dashboard
+  only reads the hours it shows, however long the history is.
+- ``ColumnArchive`` compacts the order store into one file per column (one
+  row per drink; categories dictionary-encoded, extras as a bitmask), appended
+  incrementally after the last compacted row. Ad-hoc breakdowns over any time
+  range and filter run vectorized with NumPy when it is installed, and with
+  the ``array`` module otherwise. ``rebuild`` recounts the counters from it,
+  e.g. after ``order_store.py import``.
+
+Usage from the command line (run from ``backend/``)::
+
+    python src/order_analytics.py                       # today's dashboard
+    python src/order_analytics.py day 2025-11-23
+    python src/order_analytics.py compact
+    python src/order_analytics.py top drinkType --since 2025-11-01 --where milk=oat
+    python src/order_analytics.py rebuild
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Optional
+
+from order_store import OrderStore
+from receipts import order_items
+
+try:
+    import numpy as np
+# not a declared dependency; the array fallback gives the same answers
+except ImportError:
+    np = None
+
+logger = logging.getLogger("agent.analytics")
+
+# Categorical fields counted per drink; "extras" is counted per extra, and
+# "orders" / "drinks" rows (with an empty value) hold the totals
+FIELDS = ("drinkType", "size", "milk")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS order_counts (
+    hour TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour, field, value)
+) WITHOUT ROWID;
+"""
+
+_ADD = """
+INSERT INTO order_counts (hour, field, value, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (hour, field, value) DO UPDATE SET count = count + excluded.count
+"""
+
+# typecodes shared by array and numpy, one file per column
+_COLUMNS = {
+    "hour": "i",
+    "drinkType": "H",
+    "size": "H",
+    "milk": "H",
+    "extras": "I",
+    "first": "B",
+}
+# extras beyond this many distinct names share the last bit
+_MAX_EXTRAS = 32
+_OTHER = "(other)"
+_EPOCH = datetime(1970, 1, 1)
+_UNKNOWN_HOUR = "1970-01-01T00"
+
+
+def _hour_key(timestamp: str) -> str:
+    """``"2025-11-23T10"`` for an ISO-8601 timestamp (1970 when it has none)."""
+    return timestamp[:13] if len(timestamp) >= 13 else _UNKNOWN_HOUR
+
+
+def _hour_number(key: str) -> int:
+    """Hours since 1970 for an ``_hour_key``; timestamps are naive local time."""
+    return int((datetime.strptime(key, "%Y-%m-%dT%H") - _EPOCH).total_seconds()) // 3600
+
+
+def _hour_label(number: int) -> str:
+    return (_EPOCH + timedelta(hours=number)).strftime("%Y-%m-%dT%H")
+
+
+def _bound(prefix: str) -> int:
+    """Hour number where an ISO-8601 prefix (``"2025"`` ... ``"2025-11-23T10"``) starts."""
+    return _hour_number((prefix + _UNKNOWN_HOUR[len(prefix) :])[:13])
+
+
+def count_orders(orders: Iterable[dict]) -> Counter:
+    """Counters of ``orders`` keyed by ``(hour, field, value)``."""
+    counts: Counter = Counter()
+    for order in orders:
+        hour = _hour_key(order.get("timestamp", ""))
+        items = order_items(order)
+        counts[hour, "orders", ""] += 1
+        counts[hour, "drinks", ""] += len(items)
+        for item in items:
+            for field in FIELDS:
+                counts[hour, field, item.get(field) or ""] += 1
+            for extra in item.get("extras") or ():
+                counts[hour, "extras", extra] += 1
+    return counts
+
+
+class OrderAnalytics:
+    """Hourly order counters in SQLite; safe to share between threads and processes.
+
+    Args:
+        path: SQLite database, normally the order store's ``orders.db``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def add_many(self, orders: Iterable[dict]) -> int:
+        """Add orders to the counters in one transaction (the journal sink). Returns the order count."""
+        counts = count_orders(orders)
+        if not counts:
+            return 0
+        with self._connection() as conn:
+            conn.executemany(_ADD, [(*key, n) for key, n in counts.items()])
+        return sum(n for (_, field, _), n in counts.items() if field == "orders")
+
+    def replace(self, counts: Counter) -> None:
+        """Replace every counter with ``counts`` (see ``ColumnArchive.counts``)."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM order_counts")
+            conn.executemany(_ADD, [(*key, n) for key, n in counts.items()])
+
+    def top(
+        self, field: str, start: str, end: str, limit: Optional[int] = None
+    ) -> list[tuple[str, int]]:
+        """``(value, count)`` of ``field`` for hours in ``[start, end)``, most frequent first.
+
+        Bounds are ISO-8601 prefixes like the order store's (``"2025-11-23"``).
+        """
+        rows = self._connection().execute(
+            "SELECT value, SUM(count) AS n FROM order_counts "
+            "WHERE field = ? AND hour >= ? AND hour < ? GROUP BY value ORDER BY n DESC, value "
+            "LIMIT ?",
+            (field, start, end, -1 if limit is None else limit),
+        )
+        return [(value, n) for value, n in rows]
+
+    def per_hour(self, start: str, end: str) -> list[tuple[str, int, int]]:
+        """``(hour, orders, drinks)`` for every hour in ``[start, end)`` with orders."""
+        rows = self._connection().execute(
+            "SELECT hour, SUM(CASE WHEN field = 'orders' THEN count END), "
+            "SUM(CASE WHEN field = 'drinks' THEN count END) FROM order_counts "
+            "WHERE field IN ('orders', 'drinks') AND hour >= ? AND hour < ? "
+            "GROUP BY hour ORDER BY hour",
+            (start, end),
+        )
+        return [(hour, orders or 0, drinks or 0) for hour, orders, drinks in rows]
+
+
+class ColumnArchive:
+    """Append-only columnar copy of the order store, one row per drink.
+
+    ``meta.json`` holds the row count, the last compacted store row and the
+    dictionaries; it is replaced atomically after the columns are appended,
+    so readers never see a half-written compaction.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.meta = self._read_meta()
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {
+                "rows": 0,
+                "last_id": 0,
+                "dictionaries": {field: [] for field in (*FIELDS, "extras")},
+            }
+
+    def _write_meta(self) -> None:
+        path = os.path.join(self.directory, "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    def compact(self, store: OrderStore, batch: int = 50_000) -> int:
+        """Append store rows added since the last compaction. Returns the number of drinks appended."""
+        os.makedirs(self.directory, exist_ok=True)
+        dictionaries = self.meta["dictionaries"]
+        codes = {
+            field: {v: i for i, v in enumerate(values)}
+            for field, values in dictionaries.items()
+        }
+        hours: dict[str, int] = {}  # hour key -> hour number, parsed once per hour
+        appended = 0
+        # a previous compaction may have died after appending columns; cut back to meta
+        self._truncate()
+        while True:
+            rows = store.scan_after(self.meta["last_id"], batch)
+            if not rows:
+                break
+            columns = {name: array(code) for name, code in _COLUMNS.items()}
+            for _, order in rows:
+                key = _hour_key(order.get("timestamp", ""))
+                hour = hours.get(key)
+                if hour is None:
+                    hour = hours[key] = _hour_number(key)
+                for n, item in enumerate(order_items(order)):
+                    columns["hour"].append(hour)
+                    columns["first"].append(n == 0)
+                    for field in FIELDS:
+                        columns[field].append(
+                            _code(
+                                codes[field], dictionaries[field], item.get(field) or ""
+                            )
+                        )
+                    mask = 0
+                    for extra in item.get("extras") or ():
+                        mask |= 1 << _code(
+                            codes["extras"], dictionaries["extras"], extra, _MAX_EXTRAS
+                        )
+                    columns["extras"].append(mask)
+            for name, column in columns.items():
+                with open(os.path.join(self.directory, f"{name}.col"), "ab") as f:
+                    column.tofile(f)
+            appended += len(columns["hour"])
+            self.meta["rows"] += len(columns["hour"])
+            self.meta["last_id"] = rows[-1][0]
+            self._write_meta()
+        return appended
+
+    def _truncate(self) -> None:
+        for name, code in _COLUMNS.items():
+            path = os.path.join(self.directory, f"{name}.col")
+            size = self.rows * array(code).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def load(self) -> dict:
+        """Every column as a NumPy array (``array.array`` without NumPy), ``rows`` long."""
+        columns = {}
+        for name, code in _COLUMNS.items():
+            path = os.path.join(self.directory, f"{name}.col")
+            if np is not None:
+                columns[name] = (
+                    np.fromfile(path, dtype=code, count=self.rows)
+                    if self.rows
+                    else np.zeros(0, code)
+                )
+            else:
+                column = array(code)
+                if self.rows:
+                    with open(path, "rb") as f:
+                        column.fromfile(f, self.rows)
+                columns[name] = column
+        return columns
+
+    def top(
+        self,
+        field: str,
+        *,
+        since: str = "",
+        until: str = "",
+        where: Optional[dict[str, str]] = None,
+        columns: Optional[dict] = None,
+    ) -> list[tuple[str, int]]:
+        """``(value, drinks)`` of ``field`` (or ``"extras"``) in ``[since, until)``, filtered by ``where``."""
+        columns = columns if columns is not None else self.load()
+        dictionaries = self.meta["dictionaries"]
+        low = _bound(since) if since else None
+        high = _bound(until) if until else None
+        filters = []
+        for name, value in (where or {}).items():
+            if name not in FIELDS:
+                raise ValueError(f"can only filter on {FIELDS}, got {name!r}")
+            if value not in dictionaries[name]:
+                return []
+            filters.append((name, dictionaries[name].index(value)))
+        if np is not None:
+            counts = _top_numpy(
+                columns, field, len(dictionaries[field]), low, high, filters
+            )
+        else:
+            counts = _top_array(
+                columns, field, len(dictionaries[field]), low, high, filters
+            )
+        return sorted(
+            ((dictionaries[field][code], n) for code, n in enumerate(counts) if n),
+            key=lambda vn: (-vn[1], vn[0]),
+        )
+
+    def counts(self) -> Counter:
+        """The ``OrderAnalytics`` counters for everything in the archive."""
+        columns = self.load()
+        dictionaries = self.meta["dictionaries"]
+        counts: Counter = Counter()
+        if np is not None:
+            hours, index = np.unique(columns["hour"], return_inverse=True)
+            labels = [_hour_label(int(h)) for h in hours]
+
+            def add(field: str, value: str, selected) -> None:
+                for i, n in enumerate(
+                    np.bincount(index[selected], minlength=len(hours))
+                ):
+                    if n:
+                        counts[labels[i], field, value] = int(n)
+
+            add("orders", "", columns["first"] == 1)
+            add("drinks", "", slice(None))
+            for field in FIELDS:
+                for code, value in enumerate(dictionaries[field]):
+                    add(field, value, columns[field] == code)
+            for bit, value in enumerate(dictionaries["extras"]):
+                add("extras", value, (columns["extras"] & (1 << bit)) != 0)
+            return counts
+
+        labels: dict[int, str] = {}
+        for row, hour in enumerate(columns["hour"]):
+            label = labels.get(hour)
+            if label is None:
+                label = labels[hour] = _hour_label(hour)
+            if columns["first"][row]:
+                counts[label, "orders", ""] += 1
+            counts[label, "drinks", ""] += 1
+            for field in FIELDS:
+                counts[label, field, dictionaries[field][columns[field][row]]] += 1
+            mask = columns["extras"][row]
+            for bit, value in enumerate(dictionaries["extras"]):
+                if mask & (1 << bit):
+                    counts[label, "extras", value] += 1
+        return counts
+
+
+def _code(
+    codes: dict[str, int], values: list[str], value: str, limit: Optional[int] = None
+) -> int:
+    code = codes.get(value)
+    if code is None:
+        if limit is not None and len(values) >= limit - 1:
+            if _OTHER not in codes:
+                codes[_OTHER] = len(values)
+                values.append(_OTHER)
+            return codes[_OTHER]
+        code = codes[value] = len(values)
+        values.append(value)
+    return code
+
+
+def _top_numpy(columns: dict, field: str, size: int, low, high, filters) -> list[int]:
+    mask = np.ones(len(columns["hour"]), dtype=bool)
+    if low is not None:
+        mask &= columns["hour"] >= low
+    if high is not None:
+        mask &= columns["hour"] < high
+    for name, code in filters:
+        mask &= columns[name] == code
+    if field == "extras":
+        extras = columns["extras"][mask]
+        return [int(np.count_nonzero(extras & (1 << bit))) for bit in range(size)]
+    return np.bincount(columns[field][mask], minlength=size).tolist()
+
+
+def _top_array(columns: dict, field: str, size: int, low, high, filters) -> list[int]:
+    counts = [0] * size
+    hours = columns["hour"]
+    for row in range(len(hours)):
+        if (low is not None and hours[row] < low) or (
+            high is not None and hours[row] >= high
+        ):
+            continue
+        if any(columns[name][row] != code for name, code in filters):
+            continue
+        if field == "extras":
+            mask = columns["extras"][row]
+            for bit in range(size):
+                if mask & (1 << bit):
+                    counts[bit] += 1
+        else:
+            counts[columns[field][row]] += 1
+    return counts
+
+
+def _bar(n: int, peak: int, width: int = 30) -> str:
+    return "#" * max(1, round(n / peak * width)) if n else ""
+
+
+def print_dashboard(analytics: OrderAnalytics, day: str) -> None:
+    """Orders, top values per field and orders per hour for one day (``YYYY-MM-DD``)."""
+    end = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    hours = analytics.per_hour(day, end)
+    print(
+        f"{day}: {sum(o for _, o, _ in hours)} orders, {sum(d for _, _, d in hours)} drinks"
+    )
+    for field in (*FIELDS, "extras"):
+        top = analytics.top(field, day, end, limit=5)
+        print(
+            f"  top {field:<9} " + ", ".join(f"{value or '-'} {n}" for value, n in top)
+        )
+    peak = max((o for _, o, _ in hours), default=0)
+    print("  orders per hour")
+    for hour, orders, _ in hours:
+        print(f"    {hour[11:13]}:00 {orders:6d} {_bar(orders, peak)}")
+
+
+def main() -> None:
+    orders_dir = os.getenv("ORDERS_DIR", "orders")
+    parser = argparse.ArgumentParser(
+        description="Order dashboards and the columnar archive"
+    )
+    parser.add_argument("--db", default=os.path.join(orders_dir, "orders.db"))
+    parser.add_argument("--columns", default=os.path.join(orders_dir, "columns"))
+    sub = parser.add_subparsers(dest="command")
+    p_day = sub.add_parser("day", help="dashboard for one day (default: today)")
+    p_day.add_argument("day", nargs="?")
+    sub.add_parser("compact", help="append new store orders to the columnar archive")
+    sub.add_parser(
+        "rebuild",
+        help="compact, then recount the hourly counters from the archive (run while idle)",
+    )
+    p_top = sub.add_parser("top", help="breakdown of a field over the columnar archive")
+    p_top.add_argument("field", choices=(*FIELDS, "extras"))
+    p_top.add_argument("--since", default="", help="ISO date or hour prefix, inclusive")
+    p_top.add_argument("--until", default="", help="ISO date or hour prefix, exclusive")
+    p_top.add_argument(
+        "--where", action="append", default=[], help="FIELD=VALUE, repeatable"
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "compact":
+        archive = ColumnArchive(args.columns)
+        appended = archive.compact(OrderStore(args.db))
+        print(f"appended {appended} drinks, {archive.rows} in {args.columns}")
+    elif args.command == "rebuild":
+        archive = ColumnArchive(args.columns)
+        archive.compact(OrderStore(args.db))
+        counts = archive.counts()
+        OrderAnalytics(args.db).replace(counts)
+        print(f"rebuilt {len(counts)} hourly counters")
+    elif args.command == "top":
+        where = dict(clause.split("=", 1) for clause in args.where)
+        for value, n in ColumnArchive(args.columns).top(
+            args.field, since=args.since, until=args.until, where=where
+        ):
+            print(f"{n:10d}  {value or '-'}")
+    else:
+        day = getattr(args, "day", None) or datetime.now().strftime("%Y-%m-%d")
+        print_dashboard(OrderAnalytics(args.db), day)
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Rule-based pre-extraction of order slots from a user transcript.
+
+Runs before the LLM on every user turn and picks up the obvious slots
+("a large oat latte for Priya") so the agent can fill them without spending
+an LLM tool round-trip per field. Anything ambiguous is left to the LLM.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+from menu_catalog import CATEGORIES, MenuCatalog, get_catalog, normalize
+
+_MENU = get_catalog()
+
+# Name of the milk menu item that stands for no milk
+NO_MILK = "none"
+
+
+def _alternation(terms) -> str:
+    """``terms`` as a regex alternation, longest first so "iced latte" wins over "latte"."""
+    return "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+
+
+class _MenuTerms:
+    """The words of one menu the extractor takes, each mapped to its menu name.
+
+    Drinks and sizes match by name or multi-word alias: a lone size alias
+    ("big", "little") is too common a word to fill a slot without the LLM.
+    Milks and extras also take single-word aliases of four letters or more
+    ("whole", "vanilla", but not "no"). A milk counts when "milk" follows it
+    ("oat milk") or "with" comes before it ("with oat").
+    """
+
+    def __init__(self, menu: MenuCatalog) -> None:
+        self.names: dict[str, dict[str, str]] = {c: {} for c in CATEGORIES}
+        for item in menu.items.values():
+            table = self.names[item.category]
+            table[normalize(item.name)] = item.name
+            for alias in map(normalize, item.aliases):
+                if " " in alias or (
+                    item.category in ("milk", "extra") and len(alias) > 3
+                ):
+                    table.setdefault(alias, item.name)
+
+        milks = _alternation(
+            term for term, name in self.names["milk"].items() if name != NO_MILK
+        )
+        no_milk = [
+            re.escape(term)
+            for term, name in self.names["milk"].items()
+            if name == NO_MILK and term != NO_MILK
+        ]
+        self.drink = re.compile(rf"\b({_alternation(self.names['drink'])})\b")
+        self.size = re.compile(rf"\b({_alternation(self.names['size'])})\b")
+        self.milk = re.compile(rf"\b({milks})\s+milk\b|\bwith\s+({milks})\b")
+        self.no_milk = re.compile(
+            r"\b(?:" + "|".join([r"(?:no|without)\s+milk", *no_milk]) + r")\b"
+        )
+        self.extra = re.compile(rf"\b({_alternation(self.names['extra'])})\b")
+
+
+@lru_cache(maxsize=4)
+def _menu_terms(menu: MenuCatalog) -> _MenuTerms:
+    return _MenuTerms(menu)
+
+
+_NO_EXTRAS_RE = re.compile(
+    r"\b(no extras?|nothing else|keep it simple|that'?s it|no add[- ]?ons?)\b"
+)
+# "my name is" introduces a name even in an all-lowercase transcript; "this is"
+# and "call me" only when a capitalized word follows ("this is Jenna", not
+# "this is my first time")
+_NAME_RE = re.compile(
+    r"\b(?i:(my name is|name's|name is)|this is|call me)\s+([A-Za-z][A-Za-z'-]{1,30})\b"
+)
+_NOT_NAMES = frozenset(
+    {
+        "a",
+        "actually",
+        "an",
+        "going",
+        "gonna",
+        "here",
+        "it",
+        "just",
+        "me",
+        "my",
+        "not",
+        "okay",
+        "really",
+        "so",
+        "still",
+        "that",
+        "the",
+        "this",
+    }
+)
+
+
+def extract_order_slots(text: str, menu: Optional[MenuCatalog] = None) -> dict:
+    """Return the order fields that can be read straight off ``text``.
+
+    Keys match ``CoffeeBarista.order_state`` (``name``) and its cart items
+    (``drinkType``, ``size``, ``milk``, ``extras``); a field is only present
+    when it was found, with its name on ``menu`` (by default the built-in
+    menu). An explicit "no extras" yields ``extras == []``.
+    """
+    lowered = text.lower()
+    # menu words are matched without accents or punctuation ("frappé", "soy-milk")
+    folded = normalize(text)
+    terms = _menu_terms(menu or _MENU)
+    slots: dict = {}
+
+    if m := _NAME_RE.search(text):
+        # "this is Sam's" names whose drink it is
+        name = m.group(2).removesuffix("'s")
+        if name.lower() not in _NOT_NAMES and (m.group(1) or name[0].isupper()):
+            slots["name"] = name.capitalize()
+
+    if m := terms.drink.search(folded):
+        slots["drinkType"] = terms.names["drink"][m.group(1)]
+
+    if m := terms.size.search(folded):
+        slots["size"] = terms.names["size"][m.group(1)]
+
+    if terms.no_milk.search(folded):
+        slots["milk"] = NO_MILK
+    elif m := terms.milk.search(folded):
+        slots["milk"] = terms.names["milk"][m.group(1) or m.group(2)]
+
+    extras = []
+    for m in terms.extra.finditer(folded):
+        extra = terms.names["extra"][m.group(1)]
+        if extra not in extras:
+            extras.append(extra)
+    if extras:
+        slots["extras"] = extras
+    elif _NO_EXTRAS_RE.search(lowered):
+        slots["extras"] = []
+
+    return slots
@@ -0,0 +1,296 @@
+"""Live feed of confirmed orders for the bar display.
+
+The feed lives in the worker process, which runs as long as the agent: job
+processes exit with their call. ``save_order`` hands every confirmed order to
+an :class:`OrderRelay`, which posts it to ``/orders/publish`` of the worker's
+loopback server. There the :class:`OrderFeed` numbers the orders, keeps the
+last ``history`` of them in a ring buffer and fans each one out to its
+subscribers, so a display no longer has to poll and re-parse the orders
+directory.
+
+Every subscriber has its own bounded queue. ``publish`` never waits for a
+subscriber: one whose queue is full is dropped instead, and reconnects with
+the last sequence number it saw. The missed orders are then replayed from the
+ring buffer, or a ``reset`` event tells the display to reload from the order
+store when they have already left it.
+
+``add_feed_routes`` serves the feed as Server-Sent Events on ``/orders/feed``.
+Browsers' ``EventSource`` resends the last event id (``<epoch>:<seq>``) on
+reconnect by itself; the epoch changes when the worker restarts, which also
+ends in a ``reset``.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+from livekit.agents import utils
+
+from receipts import encode_receipt
+
+logger = logging.getLogger("agent.feed")
+
+# Comment line sent on idle SSE streams so dead connections are noticed
+KEEPALIVE_INTERVAL = 15.0
+
+
+class Subscription:
+    """Orders for one subscriber, as ``(seq, payload)``; iterate with ``async for``.
+
+    Iteration ends when the feed closes or drops the subscription because its
+    queue overflowed (``dropped``). ``gap`` is set when orders it asked to
+    resume from had already left the ring buffer.
+    """
+
+    def __init__(self, feed: "OrderFeed", max_queue: int) -> None:
+        self.max_queue = max_queue
+        # raised by a replay on resume, back to max_queue as the replay is read
+        self.limit = max_queue
+        self.gap = False
+        self.dropped = False
+        self.last_seq = 0
+        self._feed = feed
+        self._pending: deque[tuple[int, bytes]] = deque()
+        self._wake = asyncio.Event()
+        self._closed = False
+
+    def _offer(self, event: tuple[int, bytes]) -> bool:
+        if len(self._pending) >= self.limit:
+            self.dropped = True
+            self._close()
+            return False
+        self._pending.append(event)
+        self._wake.set()
+        return True
+
+    def _close(self) -> None:
+        self._closed = True
+        self._wake.set()
+
+    def close(self) -> None:
+        """Unsubscribe; already queued orders can still be read."""
+        self._feed._subscribers.discard(self)
+        self._close()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> tuple[int, bytes]:
+        while not self._pending or self.dropped:
+            # a dropped subscriber stops right away: it resumes from last_seq anyway
+            if self._closed:
+                raise StopAsyncIteration
+            self._wake.clear()
+            await self._wake.wait()
+        event = self._pending.popleft()
+        if self.limit > self.max_queue:
+            self.limit -= 1
+        self.last_seq = event[0]
+        return event
+
+
+class OrderFeed:
+    """In-process pub/sub of confirmed orders with replay after reconnects.
+
+    Args:
+        history: Orders kept for subscribers resuming after a reconnect.
+        max_queue: Orders buffered per subscriber before it is dropped.
+    """
+
+    def __init__(self, *, history: int = 1024, max_queue: int = 256) -> None:
+        self.epoch = f"{os.getpid():x}{time.time_ns() // 1_000_000:x}"
+        self.max_queue = max_queue
+        self.seq = 0
+        self.dropped = 0
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=history)
+        self._subscribers: set[Subscription] = set()
+
+    @classmethod
+    def from_env(cls) -> "OrderFeed":
+        """Create a feed configured through ``ORDER_FEED_*`` variables."""
+        return cls(
+            history=int(os.getenv("ORDER_FEED_HISTORY", "1024")),
+            max_queue=int(os.getenv("ORDER_FEED_MAX_QUEUE", "256")),
+        )
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, order_data: dict) -> int:
+        """Send an order to every subscriber; returns its sequence number."""
+        return self.publish_payload(encode_receipt(order_data))
+
+    def publish_payload(self, payload: bytes) -> int:
+        """``publish`` for an already encoded receipt (relayed from a job process)."""
+        self.seq += 1
+        event = (self.seq, payload)
+        self._history.append(event)
+        for sub in list(self._subscribers):
+            if not sub._offer(event):
+                self._subscribers.discard(sub)
+                self.dropped += 1
+                logger.warning(
+                    "Order feed subscriber fell %d orders behind, dropped it",
+                    sub.max_queue,
+                )
+        return self.seq
+
+    def subscribe(self, after: Optional[int] = None) -> Subscription:
+        """Subscribe to new orders, first replaying those after ``after`` (seq) if given."""
+        sub = Subscription(self, self.max_queue)
+        if after is not None and after < self.seq:
+            oldest = self._history[0][0] if self._history else self.seq + 1
+            sub.gap = after + 1 < oldest
+            sub._pending.extend(event for event in self._history if event[0] > after)
+            sub.limit += len(sub._pending)
+        sub.last_seq = self.seq if after is None else min(after, self.seq)
+        self._subscribers.add(sub)
+        return sub
+
+    async def aclose(self) -> None:
+        """End every subscription."""
+        for sub in list(self._subscribers):
+            sub.close()
+
+
+class OrderRelay:
+    """Posts a job's confirmed orders to the worker's ``/orders/publish``, in order.
+
+    ``publish`` only queues the order; one connection sends them one at a time.
+
+    Args:
+        url: The feed's ``/orders/publish`` URL.
+        max_queue: Orders waiting to be sent before new ones are skipped.
+        retries: Further attempts per order, one second apart, while the
+            worker's server cannot be reached.
+    """
+
+    def __init__(self, url: str, *, max_queue: int = 256, retries: int = 2) -> None:
+        self.url = url
+        self.max_queue = max_queue
+        self.retries = retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, url: str) -> "OrderRelay":
+        return cls(url, max_queue=int(os.getenv("ORDER_FEED_MAX_QUEUE", "256")))
+
+    def publish(self, order_data: dict) -> None:
+        """Queue an order for the feed."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run(), name="order_feed_relay")
+        try:
+            self._queue.put_nowait(encode_receipt(order_data))
+        except asyncio.QueueFull:
+            logger.warning(
+                "Order feed relay to %s is behind, skipped an order", self.url
+            )
+
+    async def _run(self) -> None:
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=5)
+        ) as session:
+            while True:
+                payload = await self._queue.get()
+                try:
+                    await self._send(session, payload)
+                finally:
+                    self._queue.task_done()
+
+    async def _send(self, session: aiohttp.ClientSession, payload: bytes) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.post(self.url, data=payload) as resp:
+                    resp.raise_for_status()
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    logger.warning("Could not relay order to %s: %s", self.url, e)
+                    return
+            await asyncio.sleep(1.0)
+
+    async def aclose(self, timeout: float = 2.0) -> None:
+        """Stop relaying, after up to ``timeout`` s of pending orders."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Order feed relay stopped with %d orders not sent", self._queue.qsize()
+            )
+        await utils.aio.cancel_and_wait(self._task)
+        self._task = None
+        self._queue = None
+
+
+def _parse_event_id(value: Optional[str], epoch: str) -> tuple[Optional[int], bool]:
+    """``(after, reset)`` from a Last-Event-ID / ``after`` value."""
+    if not value:
+        return None, False
+    seen_epoch, _, seq = value.rpartition(":")
+    try:
+        after = int(seq)
+    except ValueError:
+        return None, True
+    if seen_epoch and seen_epoch != epoch:
+        # the process restarted; its sequence numbers mean nothing here
+        return None, True
+    return after, False
+
+
+def add_feed_routes(server, feed: OrderFeed) -> None:
+    """``/orders/feed`` (Server-Sent Events) and ``/orders/publish`` (from the job processes)."""
+
+    async def _feed(request: web.Request) -> web.StreamResponse:
+        value = request.headers.get("Last-Event-ID") or request.query.get("after")
+        after, reset = _parse_event_id(value, feed.epoch)
+        sub = feed.subscribe(after)
+        epoch = feed.epoch.encode()
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        try:
+            if reset or sub.gap:
+                await response.write(
+                    f"id: {feed.epoch}:{sub.last_seq}\nevent: reset\ndata: {{}}\n\n".encode()
+                )
+            while True:
+                try:
+                    seq, payload = await asyncio.wait_for(
+                        sub.__anext__(), KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                except StopAsyncIteration:
+                    break
+                # aiohttp waits for the socket to drain, so a slow client fills its own queue
+                await response.write(
+                    b"id: %s:%d\nevent: order\ndata: %s\n\n" % (epoch, seq, payload)
+                )
+        except ConnectionResetError:
+            pass  # the display went away; it resumes with Last-Event-ID
+        finally:
+            sub.close()
+        return response
+
+    async def _publish(request: web.Request) -> web.Response:
+        payload = await request.read()
+        if not payload or b"\n" in payload:
+            # one SSE data line per order
+            raise web.HTTPBadRequest(text="expected one compact JSON receipt")
+        seq = feed.publish_payload(payload)
+        return web.json_response({"seq": seq})
+
+    server.add_get("/orders/feed", _feed)
+    server.add_post("/orders/publish", _publish)
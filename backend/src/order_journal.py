@@ -0,0 +1,304 @@
+"""Write-behind journal for confirmed orders.
+
+Tool calls hand confirmed orders to an :class:`OrderJournal`. The journal puts
+them on a bounded queue and a dedicated writer thread appends them to a
+rotating JSONL file, so no file I/O ever runs on the agent's event loop.
+
+A job process lives for one call, so every process on the host appends to the
+same daily segment (``orders-<day>-<n>.jsonl``), each batch under an exclusive
+``flock`` on ``.orders.lock`` in the directory; ``n`` moves on once a segment
+reaches ``max_bytes``.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Optional
+
+logger = logging.getLogger("agent.journal")
+
+# none   - write and flush to the OS, never fsync (survives a process crash)
+# group  - one fsync per drained batch; callers do not wait for it (default)
+# strict - like group, with the receipt files fsynced too; callers wait until their
+#          order and its files are on disk
+DURABILITY_MODES = ("none", "group", "strict")
+
+_STOP = object()
+
+
+class _Entry:
+    __slots__ = ("files", "future", "record")
+
+    def __init__(
+        self,
+        record: Optional[dict],
+        files: Optional[dict[str, str]],
+        future: Optional[Future],
+    ) -> None:
+        self.record = record
+        self.files = files
+        self.future = future
+
+
+class OrderJournal:
+    """Append-only, rotating JSONL journal written from a background thread.
+
+    Args:
+        directory: Directory the journal segments (and attached files) go to.
+        durability: One of ``DURABILITY_MODES``.
+        max_queue: Queue capacity; ``submit`` waits (without blocking the loop)
+            once this many orders are pending.
+        max_batch: Maximum number of orders written per fsync group.
+        max_bytes: Segment size after which the journal rotates to a new file.
+        sinks: Callables run in the writer thread with each written batch.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        durability: str = "group",
+        max_queue: int = 1024,
+        max_batch: int = 256,
+        max_bytes: int = 16 * 1024 * 1024,
+        sinks: tuple[Callable[[list[dict]], None], ...] = (),
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"durability must be one of {DURABILITY_MODES}, got {durability!r}"
+            )
+
+        self.directory = directory
+        self.durability = durability
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self.sinks = list(sinks)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._segment_path = ""
+        self._segment_day = ""
+        self._segment_index = 0
+
+    @classmethod
+    def from_env(cls, directory: str, **kwargs) -> "OrderJournal":
+        """Create a journal configured through ``ORDER_JOURNAL_*`` variables."""
+        return cls(
+            directory,
+            durability=os.getenv("ORDER_JOURNAL_DURABILITY", "group"),
+            max_queue=int(os.getenv("ORDER_JOURNAL_MAX_QUEUE", "1024")),
+            max_bytes=int(os.getenv("ORDER_JOURNAL_MAX_BYTES", str(16 * 1024 * 1024))),
+            **kwargs,
+        )
+
+    @property
+    def segment_path(self) -> str:
+        """Path of the segment currently being written ("" before the first write)."""
+        return self._segment_path
+
+    def start(self) -> None:
+        """Start the writer thread. Called lazily by ``submit``."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(
+                target=self._run, name="order-journal", daemon=True
+            )
+            self._thread.start()
+
+    async def submit(
+        self, record: dict, *, files: Optional[dict[str, str]] = None
+    ) -> None:
+        """Queue an order for writing.
+
+        Returns as soon as the order is queued, except in ``strict`` mode where
+        it returns once the order has been fsynced.
+
+        Args:
+            record: JSON-serializable order record, appended as one line.
+            files: Extra files to write next to the journal, keyed by file name
+                relative to the journal directory (e.g. the HTML receipt).
+        """
+        self.start()
+        future: Optional[Future] = Future() if self.durability == "strict" else None
+        entry = _Entry(record, files, future)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # backpressure: wait for room in a worker thread, not on the loop
+            logger.warning("Order journal queue is full, waiting for the writer")
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._queue.put, entry
+            )
+
+        if future is not None:
+            await asyncio.wrap_future(future)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every order queued so far is written and fsynced."""
+        if self._thread is None:
+            return
+        future: Future = Future()
+        self._queue.put(_Entry(None, None, future))
+        future.result(timeout=timeout)
+
+    async def aflush(self) -> None:
+        """Async ``flush`` for use as a job shutdown callback."""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def close(self) -> None:
+        """Flush pending orders and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+
+            batch = [entry]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch: list[_Entry]) -> None:
+        records = [e.record for e in batch if e.record is not None]
+        force_sync = any(e.record is None for e in batch)
+        try:
+            if records:
+                payload = "".join(
+                    json.dumps(r, separators=(",", ":"), ensure_ascii=False) + "\n"
+                    for r in records
+                )
+                with self._append_lock():
+                    path = self._segment()
+                    # one open per batch: the writer thread batches, so this is cheap
+                    with open(path, "a", encoding="utf-8") as fp:
+                        fp.write(payload)
+                        fp.flush()
+                        if force_sync or self.durability != "none":
+                            os.fsync(fp.fileno())
+            elif force_sync and self._segment_path:
+                with open(self._segment_path, "rb") as fp:
+                    os.fsync(fp.fileno())
+
+            wrote_files = False
+            for e in batch:
+                for name, content in (e.files or {}).items():
+                    with open(
+                        os.path.join(self.directory, name), "w", encoding="utf-8"
+                    ) as f:
+                        f.write(content)
+                        if self.durability == "strict":
+                            f.flush()
+                            os.fsync(f.fileno())
+                    wrote_files = True
+            if wrote_files and self.durability == "strict":
+                # the new receipt files' directory entries
+                _fsync_dir(self.directory)
+
+            for sink in self.sinks if records else ():
+                try:
+                    sink(records)
+                except Exception:
+                    logger.exception("Order journal sink failed")
+        except Exception as e:
+            logger.exception("Failed to write order journal batch")
+            for entry in batch:
+                if entry.future is not None and not entry.future.done():
+                    entry.future.set_exception(e)
+            return
+
+        for entry in batch:
+            if entry.future is not None and not entry.future.done():
+                entry.future.set_result(None)
+
+    @contextlib.contextmanager
+    def _append_lock(self):
+        """Exclusive lock shared by the journals of every process on the directory."""
+        if self._lock_fd is None:
+            self._lock_fd = os.open(
+                os.path.join(self.directory, ".orders.lock"),
+                os.O_RDWR | os.O_CREAT,
+                0o644,
+            )
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _segment(self) -> str:
+        """Today's segment with room left; called with the append lock held."""
+        day = datetime.now().strftime("%Y%m%d")
+        if day != self._segment_day:
+            self._segment_day = day
+            self._segment_index = 1
+        while True:
+            path = os.path.join(
+                self.directory, f"orders-{day}-{self._segment_index:04d}.jsonl"
+            )
+            # other processes append to it too: its size is only known under the lock
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < self.max_bytes:
+                break
+            self._segment_index += 1
+
+        if path != self._segment_path:
+            self._segment_path = path
+            logger.info("Order journal segment: %s", path)
+        return path
+
+
+def _fsync_dir(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_journal(directory: str) -> list[dict]:
+    """Read every order from the journal segments in ``directory``, oldest first."""
+    orders = []
+    segments = sorted(
+        f
+        for f in os.listdir(directory)
+        if f.startswith("orders-") and f.endswith(".jsonl")
+    )
+    for name in segments:
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    orders.append(json.loads(line))
+    orders.sort(key=lambda o: o.get("timestamp", ""))
+    return orders
@@ -0,0 +1,216 @@
+"""Embedded, indexed store for confirmed orders.
+
+Orders live in a local SQLite database in WAL mode with secondary indexes on
+token number, customer name, status and timestamp, so a token lookup is a
+single B-tree probe instead of a scan over the ``orders/`` directory.
+
+Usage from the command line (run from ``backend/``)::
+
+    python src/order_store.py import orders/      # one-shot import of *.json / *.jsonl
+    python src/order_store.py token BT-20251123-J3FN
+    python src/order_store.py range 2025-11-23T00:00 2025-11-24T00:00
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from typing import Optional
+
+logger = logging.getLogger("agent.store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    token_number TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS orders_token ON orders (token_number);
+CREATE INDEX IF NOT EXISTS orders_name ON orders (name COLLATE NOCASE, timestamp);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, timestamp);
+CREATE INDEX IF NOT EXISTS orders_timestamp ON orders (timestamp);
+"""
+
+_UPSERT = """
+INSERT INTO orders (token_number, name, status, timestamp, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (token_number) DO UPDATE SET
+    name = excluded.name,
+    status = excluded.status,
+    timestamp = excluded.timestamp,
+    data = excluded.data
+"""
+
+
+class OrderStore:
+    """SQLite-backed order store; safe to share between threads.
+
+    Each thread gets its own connection, so the store can be written from the
+    order journal's writer thread while the event loop (or a CLI) reads it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def put(self, order: dict) -> None:
+        """Insert or update one order, keyed by its token number."""
+        self.put_many([order])
+
+    def put_many(self, orders: Iterable[dict]) -> int:
+        """Insert or update orders in a single transaction. Returns the row count."""
+        rows = [_row(o) for o in orders]
+        if not rows:
+            return 0
+        with self._connection() as conn:
+            conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def get_by_token(self, token_number: str) -> Optional[dict]:
+        """Return the order with this token number, or None."""
+        row = (
+            self._connection()
+            .execute("SELECT data FROM orders WHERE token_number = ?", (token_number,))
+            .fetchone()
+        )
+        return json.loads(row["data"]) if row else None
+
+    def find_by_name(self, name: str, limit: int = 50) -> list[dict]:
+        """Most recent orders for a customer name (case-insensitive)."""
+        rows = self._connection().execute(
+            "SELECT data FROM orders WHERE name = ? COLLATE NOCASE "
+            "ORDER BY timestamp DESC LIMIT ?",
+            (name, limit),
+        )
+        return [json.loads(r["data"]) for r in rows]
+
+    def find_by_status(self, status: str, limit: int = 50) -> list[dict]:
+        """Most recent orders with the given status."""
+        rows = self._connection().execute(
+            "SELECT data FROM orders WHERE status = ? ORDER BY timestamp DESC LIMIT ?",
+            (status, limit),
+        )
+        return [json.loads(r["data"]) for r in rows]
+
+    def scan_time_range(self, start: str, end: str) -> Iterator[dict]:
+        """Yield orders with ``start <= timestamp < end`` in time order.
+
+        Timestamps are ISO-8601 strings, so any prefix such as ``"2025-11-23"``
+        or ``"2025-11-23T10:00"`` works as a bound.
+        """
+        rows = self._connection().execute(
+            "SELECT data FROM orders WHERE timestamp >= ? AND timestamp < ? "
+            "ORDER BY timestamp",
+            (start, end),
+        )
+        for r in rows:
+            yield json.loads(r["data"])
+
+    def scan_after(self, row_id: int, limit: int) -> list[tuple[int, dict]]:
+        """Up to ``limit`` ``(row id, order)`` pairs stored after ``row_id``, oldest first."""
+        rows = self._connection().execute(
+            "SELECT id, data FROM orders WHERE id > ? ORDER BY id LIMIT ?",
+            (row_id, limit),
+        )
+        return [(r["id"], json.loads(r["data"])) for r in rows]
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def import_directory(self, directory: str) -> int:
+        """One-shot import of legacy ``order_*.json`` files and journal segments.
+
+        Orders saved before token numbers existed get a ``LEGACY-<file>`` token
+        so they stay addressable. Re-running the import is idempotent.
+        """
+        orders = []
+        for fname in sorted(os.listdir(directory)):
+            path = os.path.join(directory, fname)
+            if fname.endswith(".json"):
+                with open(path, encoding="utf-8") as f:
+                    order = json.load(f)
+                order.setdefault("token_number", f"LEGACY-{fname[: -len('.json')]}")
+                orders.append(order)
+            elif fname.endswith(".jsonl"):
+                with open(path, encoding="utf-8") as f:
+                    orders.extend(json.loads(line) for line in f if line.strip())
+        count = self.put_many(orders)
+        logger.info("Imported %d orders from %s into %s", count, directory, self.path)
+        return count
+
+
+def _row(order: dict) -> tuple:
+    return (
+        order["token_number"],
+        order.get("name", ""),
+        order.get("status", "confirmed"),
+        order.get("timestamp", ""),
+        json.dumps(order, separators=(",", ":"), ensure_ascii=False),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query or populate the order store")
+    parser.add_argument(
+        "--db", default=os.path.join(os.getenv("ORDERS_DIR", "orders"), "orders.db")
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser(
+        "import", help="import *.json / *.jsonl orders from a directory"
+    )
+    p_import.add_argument("directory")
+    p_token = sub.add_parser("token", help="look up an order by token number")
+    p_token.add_argument("token_number")
+    p_name = sub.add_parser("name", help="list orders for a customer")
+    p_name.add_argument("name")
+    p_range = sub.add_parser("range", help="list orders in [start, end)")
+    p_range.add_argument("start")
+    p_range.add_argument("end")
+    args = parser.parse_args()
+
+    store = OrderStore(args.db)
+    if args.command == "import":
+        print(
+            f"imported {store.import_directory(args.directory)} orders into {args.db}"
+        )
+    elif args.command == "token":
+        order = store.get_by_token(args.token_number)
+        print(json.dumps(order, indent=2) if order else "not found")
+    elif args.command == "name":
+        for order in store.find_by_name(args.name):
+            print(json.dumps(order))
+    else:
+        for order in store.scan_time_range(args.start, args.end):
+            print(json.dumps(order))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Per-request prompt accounting for the agent's LLM calls.
+
+``PromptAccountant.begin_request`` is called from ``CoffeeBarista.llm_node``
+with the exact chat context and tools about to be sent, and stores a local
+token estimate. When the LLM reports its ``LLMMetrics`` (through the session's
+``metrics_collected`` event), ``record`` pairs them with that estimate. Each
+request then carries the estimate, the provider's prompt and cached-prompt
+token counts, and the time to first token.
+
+The estimator is deliberately crude (about four characters per token). It
+needs no tokenizer, so prompt budgets can be checked offline with a fake LLM.
+"""
+
+import json
+import logging
+import math
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from livekit.agents import llm
+from livekit.agents.metrics import LLMMetrics
+
+logger = logging.getLogger("agent.prompt")
+
+CHARS_PER_TOKEN = 4
+# role markers, separators and the like that every message costs on the wire
+_MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def estimate_tools_tokens(tools) -> int:
+    """Rough token count of the JSON schemas sent for ``tools``."""
+    schemas = [llm.utils.build_legacy_openai_schema(tool) for tool in tools]
+    return estimate_tokens(json.dumps(schemas, separators=(",", ":")))
+
+
+def estimate_item_tokens(item: llm.ChatItem) -> int:
+    """Rough token count of one chat item (0 for items never sent to the LLM)."""
+    if item.type == "message":
+        text = item.text_content or ""
+    elif item.type == "function_call":
+        text = item.name + item.arguments
+    elif item.type == "function_call_output":
+        text = item.output
+    else:
+        return 0
+    return estimate_tokens(text) + _MESSAGE_OVERHEAD
+
+
+def estimate_chat_tokens(chat_ctx: llm.ChatContext) -> int:
+    """Rough token count of every item in ``chat_ctx``."""
+    return sum(estimate_item_tokens(item) for item in chat_ctx.items)
+
+
+@dataclass
+class RequestUsage:
+    estimated_tokens: int
+    prompt_tokens: int = 0
+    prompt_cached_tokens: int = 0
+    completion_tokens: int = 0
+    ttft: float = 0.0
+
+
+class PromptAccountant:
+    """Keeps the last ``max_requests`` LLM requests of a session.
+
+    Args:
+        max_requests: Bound on the per-request history kept for ``summary``.
+    """
+
+    def __init__(self, max_requests: int = 512) -> None:
+        self.requests: deque[RequestUsage] = deque(maxlen=max_requests)
+        self._pending: Optional[int] = None
+        # tool schemas only change when the tool set does
+        self._tools_key: tuple = ()
+        self._tools_tokens = 0
+
+    def begin_request(self, chat_ctx: llm.ChatContext, tools) -> int:
+        """Estimate the prompt about to be sent; returns the estimate."""
+        key = tuple(id(tool) for tool in tools)
+        if key != self._tools_key:
+            self._tools_key = key
+            self._tools_tokens = estimate_tools_tokens(tools)
+        self._pending = estimate_chat_tokens(chat_ctx) + self._tools_tokens
+        return self._pending
+
+    def record(self, metrics: LLMMetrics) -> RequestUsage:
+        """Attach the provider's usage numbers to the last estimated request.
+
+        A request cancelled before its first token reports no metrics; its
+        estimate is simply replaced by the next ``begin_request``.
+        """
+        usage = RequestUsage(
+            estimated_tokens=self._pending or 0,
+            prompt_tokens=metrics.prompt_tokens,
+            prompt_cached_tokens=metrics.prompt_cached_tokens,
+            completion_tokens=metrics.completion_tokens,
+            ttft=metrics.ttft,
+        )
+        self._pending = None
+        self.requests.append(usage)
+        logger.debug("LLM request: %s", asdict(usage))
+        return usage
+
+    def summary(self) -> dict:
+        """Totals and averages over the recorded requests."""
+        count = len(self.requests)
+        if not count:
+            return {"requests": 0}
+        prompt = sum(r.prompt_tokens for r in self.requests)
+        cached = sum(r.prompt_cached_tokens for r in self.requests)
+        ttfts = sorted(r.ttft for r in self.requests)
+        return {
+            "requests": count,
+            "estimated_tokens_avg": round(
+                sum(r.estimated_tokens for r in self.requests) / count
+            ),
+            "prompt_tokens_avg": round(prompt / count),
+            "prompt_cached_ratio": round(cached / prompt, 3) if prompt else 0.0,
+            "ttft_avg": round(sum(ttfts) / count, 3),
+            "ttft_max": round(ttfts[-1], 3),
+        }
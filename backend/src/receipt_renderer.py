@@ -0,0 +1,412 @@
+"""Precompiled HTML receipt renderer.
+
+The receipt template is parsed once per process into literal chunks and
+slots. Everything that depends only on the drink (cup size and colour,
+whipped-cream topping, detail rows, extras) is rendered once per
+``(drinkType, size, milk, extras)`` and kept in an LRU cache, so a render only
+fills the customer name, token and timestamp into a prebuilt template.
+
+An order with several drinks shows the first one in the template's cup and
+detail rows; every further drink adds a cup and detail block of its own
+(``_ITEM_TEMPLATE``, cached per drink the same way) below them.
+
+By default the ``<style>`` block is emitted inline and the output matches the
+original receipt byte for byte. With ``stylesheet_href`` set, the static
+rules are hoisted into a shared stylesheet (see ``STATIC_CSS`` and
+``write_stylesheet``) and only the per-cup rule stays inline.
+"""
+
+import html
+import os
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Optional
+
+from receipts import order_items
+
+CUP_HEIGHTS = {"small": "100px", "medium": "140px", "large": "180px"}
+DEFAULT_CUP_HEIGHT = "140px"
+COLD_KEYWORDS = ("iced", "cold", "frappe")
+COLD_CUP_COLOR = "#87CEEB"
+HOT_CUP_COLOR = "#8B4513"
+
+_WHIPPED_CREAM_HTML = (
+    "\n"
+    "            <div style='position: absolute; top: -20px; left: 50%; transform: translateX(-50%); \n"
+    "                        width: 80px; height: 30px; background: #FFFACD; \n"
+    "                        border-radius: 50% 50% 0 0; border: 2px solid #F5DEB3;'></div>\n"
+    "            "
+)
+
+# Slots filled per order; every other slot depends only on the (first) drink
+_ORDER_SLOTS = ("name", "token_number", "timestamp", "more_items")
+
+_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$store_brand Order - $name</title>
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            min-height: 100vh;
+            margin: 0;
+            padding: 20px;
+        }
+        .receipt {
+            background: white;
+            border-radius: 20px;
+            padding: 40px;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+            max-width: 500px;
+            width: 100%;
+        }
+        .header {
+            text-align: center;
+            border-bottom: 3px solid #667eea;
+            padding-bottom: 20px;
+            margin-bottom: 30px;
+        }
+        .header h1 {
+            color: #667eea;
+            margin: 0;
+            font-size: 28px;
+        }
+        .header p {
+            color: #666;
+            margin: 5px 0 0 0;
+            font-size: 14px;
+        }
+        .token-number {
+            background: #667eea;
+            color: white;
+            padding: 10px 20px;
+            border-radius: 25px;
+            font-size: 18px;
+            font-weight: 700;
+            letter-spacing: 1px;
+            margin: 15px 0;
+            display: inline-block;
+        }
+        .cup-container {
+            display: flex;
+            justify-content: center;
+            margin: 30px 0;
+            position: relative;
+        }
+        .cup {
+            position: relative;
+            width: 100px;
+            height: $cup_height;
+            background: $cup_color;
+            border-radius: 0 0 20px 20px;
+            border: 3px solid #333;
+            box-shadow: inset 0 -20px 30px rgba(0,0,0,0.2);
+        }
+        .order-details {
+            background: #f8f9fa;
+            border-radius: 10px;
+            padding: 20px;
+            margin: 20px 0;
+        }
+        .order-row {
+            display: flex;
+            justify-content: space-between;
+            padding: 10px 0;
+            border-bottom: 1px solid #dee2e6;
+        }
+        .order-row:last-child {
+            border-bottom: none;
+        }
+        .label {
+            font-weight: 600;
+            color: #495057;
+        }
+        .value {
+            color: #212529;
+            text-transform: capitalize;
+        }
+        .footer {
+            text-align: center;
+            margin-top: 30px;
+            padding-top: 20px;
+            border-top: 2px solid #dee2e6;
+        }
+        .footer h2 {
+            color: #667eea;
+            margin: 0 0 10px 0;
+            font-size: 24px;
+        }
+        .footer p {
+            color: #666;
+            margin: 5px 0;
+            font-size: 14px;
+        }
+        .timestamp {
+            text-align: center;
+            color: #999;
+            font-size: 12px;
+            margin-top: 20px;
+        }
+    </style>
+</head>
+<body>
+    <div class="receipt">
+        <div class="header">
+            <h1>☕ $store_heading</h1>
+            <p>$store_tagline</p>
+            <div class="token-number">Token: $token_number</div>
+        </div>
+        
+        <div class="cup-container">
+            <div class="cup">
+                $whipped_cream_html
+            </div>
+        </div>
+        
+        <div class="order-details">
+            <div class="order-row">
+                <span class="label">Customer:</span>
+                <span class="value">$name</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Drink:</span>
+                <span class="value">$drinkType</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Size:</span>
+                <span class="value">$size</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Milk:</span>
+                <span class="value">$milk</span>
+            </div>
+            $extras_html
+        </div>$more_items
+        
+        <div class="footer">
+            <h2>Order Confirmed!</h2>
+            <p>Your coffee will be ready shortly</p>
+            <p style="color: #667eea; font-weight: 600;">Enjoy your brew! ☕</p>
+        </div>
+        
+        <div class="timestamp">
+            Order placed: $timestamp
+        </div>
+    </div>
+</body>
+</html>
+"""  # noqa: W293 (the original receipt's blank lines are indented)
+
+# One more drink of a cart; the cup's size and colour are inline because the
+# .cup rule in the stylesheet belongs to the first drink
+_ITEM_TEMPLATE = """
+        
+        <div class="cup-container">
+            <div class="cup" style="height: $cup_height; background: $cup_color;">
+                $whipped_cream_html
+            </div>
+        </div>
+        
+        <div class="order-details">
+            <div class="order-row">
+                <span class="label">Drink:</span>
+                <span class="value">$drinkType</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Size:</span>
+                <span class="value">$size</span>
+            </div>
+            <div class="order-row">
+                <span class="label">Milk:</span>
+                <span class="value">$milk</span>
+            </div>
+            $extras_html
+        </div>"""  # noqa: W293
+
+_STYLE_RE = re.compile(r"    <style>\n(.*?)    </style>\n", re.S)
+_CUP_RULE_RE = re.compile(
+    r"            height: \$cup_height;\n            background: \$cup_color;\n"
+)
+
+# Receipt rules that never change between orders, suitable for a shared asset
+STATIC_CSS = _CUP_RULE_RE.sub("", _STYLE_RE.search(_TEMPLATE).group(1))
+
+_HOISTED_STYLE = (
+    '    <link rel="stylesheet" href="{href}">\n'
+    "    <style>\n"
+    "        .cup {{ height: $cup_height; background: $cup_color; }}\n"
+    "    </style>\n"
+)
+
+
+def _compile(template: str) -> list[tuple[str, Optional[str]]]:
+    """Split a ``$slot`` template into ``(literal, slot)`` pairs."""
+    parts = []
+    pos = 0
+    for m in re.finditer(r"\$(\w+)", template):
+        parts.append((template[pos : m.start()], m.group(1)))
+        pos = m.end()
+    parts.append((template[pos:], None))
+    return parts
+
+
+class ReceiptRenderer:
+    """Renders order receipts from a template compiled once at construction.
+
+    Args:
+        stylesheet_href: When set, link to this stylesheet instead of inlining
+            the static CSS (write it with ``write_stylesheet``).
+        cache_size: Number of distinct drinks whose chunks are kept in the LRU.
+        brand, tagline: The store's name in the title and header.
+        cup_heights: Cup height per size; other sizes get ``default_cup_height``.
+        cold_keywords: Lowercase words that make a drink's cup cold-coloured.
+    """
+
+    def __init__(
+        self,
+        *,
+        stylesheet_href: Optional[str] = None,
+        cache_size: int = 256,
+        brand: str = "Blue Tokai",
+        tagline: str = "Coffee Roasters",
+        cup_heights: Mapping[str, str] = CUP_HEIGHTS,
+        default_cup_height: str = DEFAULT_CUP_HEIGHT,
+        cold_keywords: tuple[str, ...] = COLD_KEYWORDS,
+    ) -> None:
+        self.stylesheet_href = stylesheet_href
+        self.cup_heights = cup_heights
+        self.default_cup_height = default_cup_height
+        self.cold_keywords = cold_keywords
+        # the store's names are the same on every receipt: fill them in before compiling
+        store = {
+            "store_brand": brand,
+            "store_heading": brand.upper(),
+            "store_tagline": tagline,
+        }
+        template = re.sub(
+            r"\$(store_\w+)",
+            lambda m: _escape(store[m.group(1)]).replace("$", "&#36;"),
+            _TEMPLATE,
+        )
+        if stylesheet_href:
+            template = _STYLE_RE.sub(
+                _HOISTED_STYLE.format(href=html.escape(stylesheet_href)), template, 1
+            )
+        self._parts = _compile(template)
+        self._order_slots = tuple(
+            slot for _, slot in self._parts if slot in _ORDER_SLOTS
+        )
+        self._item_parts = _compile(_ITEM_TEMPLATE)
+        self._drink_chunks = lru_cache(maxsize=cache_size)(self._build_drink_chunks)
+        self._item_blocks = lru_cache(maxsize=cache_size)(self._build_item_block)
+
+    def render(self, order_data: dict, token_number: str) -> str:
+        """Render the receipt HTML for a saved order.
+
+        ``order_data["items"]`` holds the drinks; orders saved before carts
+        carry a single drink's fields at the top level.
+        """
+        items = order_items(order_data)
+        chunks = self._drink_chunks(*_drink_key(items[0]))
+        more_items = ""
+        if len(items) > 1:
+            more_items = "".join(
+                self._item_blocks(*_drink_key(item)) for item in items[1:]
+            )
+        values = {
+            "name": _escape(order_data["name"]),
+            "token_number": _escape(token_number),
+            "timestamp": _escape(order_data["timestamp"]),
+            "more_items": more_items,
+        }
+        out = [chunks[0]]
+        for slot, chunk in zip(self._order_slots, chunks[1:]):
+            out.append(values[slot])
+            out.append(chunk)
+        return "".join(out)
+
+    def cache_info(self):
+        """``functools`` cache statistics for the per-drink chunk cache (first drinks)."""
+        return self._drink_chunks.cache_info()
+
+    def write_stylesheet(self, directory: str, filename: str = "receipt.css") -> str:
+        """Write ``STATIC_CSS`` into ``directory`` once and return its path."""
+        path = os.path.join(directory, filename)
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(STATIC_CSS)
+        return path
+
+    def _build_drink_chunks(
+        self, drink_type: str, size: str, milk: str, extras: tuple[str, ...]
+    ) -> tuple[str, ...]:
+        drink_values = self._drink_values(drink_type, size, milk, extras)
+
+        # Fold every drink-level slot into the surrounding literals so only
+        # the per-order slots (``self._order_slots``) separate the chunks
+        chunks = [""]
+        for literal, slot in self._parts:
+            chunks[-1] += literal
+            if slot in _ORDER_SLOTS:
+                chunks.append("")
+            elif slot is not None:
+                chunks[-1] += drink_values[slot]
+        return tuple(chunks)
+
+    def _build_item_block(
+        self, drink_type: str, size: str, milk: str, extras: tuple[str, ...]
+    ) -> str:
+        drink_values = self._drink_values(drink_type, size, milk, extras)
+        return "".join(
+            literal + (drink_values[slot] if slot else "")
+            for literal, slot in self._item_parts
+        )
+
+    def _drink_values(
+        self, drink_type: str, size: str, milk: str, extras: tuple[str, ...]
+    ) -> dict[str, str]:
+        """Values of the drink-level template slots."""
+        is_cold = any(word in drink_type.lower() for word in self.cold_keywords)
+        has_whipped_cream = any("whipped" in extra.lower() for extra in extras)
+
+        extras_html = ""
+        if extras:
+            extras_items = "".join(f"<li>{_escape(extra)}</li>" for extra in extras)
+            extras_html = (
+                "<div style='margin-top: 10px;'><strong>Extras:</strong>"
+                f"<ul style='margin: 5px 0; padding-left: 20px;'>{extras_items}</ul></div>"
+            )
+
+        return {
+            "cup_height": self.cup_heights.get(size, self.default_cup_height),
+            "cup_color": COLD_CUP_COLOR if is_cold else HOT_CUP_COLOR,
+            "whipped_cream_html": _WHIPPED_CREAM_HTML if has_whipped_cream else "",
+            "drinkType": _escape(drink_type),
+            "size": _escape(size),
+            "milk": _escape(milk),
+            "extras_html": extras_html,
+        }
+
+
+def _drink_key(item: dict) -> tuple:
+    return (
+        item["drinkType"],
+        item["size"],
+        item["milk"],
+        tuple(item.get("extras") or ()),
+    )
+
+
+def _escape(value: str) -> str:
+    value = str(value)
+    if "&" in value or "<" in value or ">" in value:
+        return html.escape(value, quote=False)
+    return value
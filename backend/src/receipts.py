@@ -0,0 +1,47 @@
+"""Compact receipt protocol between the agent and the frontend.
+
+A confirmed order is sent through ``transport.DataTransport`` on
+``RECEIPT_TOPIC`` as a ``RECEIPT_TYPE`` message whose data is a small
+versioned object holding only the order fields, with one entry per drink in
+``items``. The frontend renders the receipt from its own template, so no HTML
+crosses the data channel or enters the LLM context.
+
+Version 2 added ``items``; version 1 carried a single drink's fields at the
+top level.
+"""
+
+import json
+
+RECEIPT_TOPIC = "blue-tokai.receipt"
+RECEIPT_TYPE = "receipt"
+RECEIPT_VERSION = 2
+
+_FIELDS = ("token_number", "name", "timestamp")
+_ITEM_FIELDS = ("drinkType", "size", "milk", "extras")
+
+
+def order_items(order_data: dict) -> list[dict]:
+    """The drinks of an order; orders saved before carts hold one drink at the top level."""
+    return order_data.get("items") or [order_data]
+
+
+def build_receipt(order_data: dict) -> dict:
+    """Receipt payload for a saved order: ``{"v": 2, <order fields>, "items": [<drink fields>]}``."""
+    receipt = {"v": RECEIPT_VERSION}
+    for field in _FIELDS:
+        receipt[field] = order_data.get(field, "")
+    receipt["items"] = [
+        {
+            field: item.get(field) or ([] if field == "extras" else "")
+            for field in _ITEM_FIELDS
+        }
+        for item in order_items(order_data)
+    ]
+    return receipt
+
+
+def encode_receipt(order_data: dict) -> bytes:
+    """Wire encoding of ``build_receipt``: compact UTF-8 JSON."""
+    return json.dumps(
+        build_receipt(order_data), separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
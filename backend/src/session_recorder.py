@@ -0,0 +1,588 @@
+"""Compressed, rotated per-session audit trail: transcript, tool calls and saved orders.
+
+A ``SessionRecorder`` per job process takes records from every session's
+``SessionTrail``: the customer's and the agent's messages
+(``conversation_item_added``), every tool call with its arguments and result
+(``function_tools_executed``), the slots pre-filled from the transcript and
+every saved order with its token. Taking a record on the event loop is a
+``put_nowait`` of a small dict onto a bounded queue; JSON encoding,
+compression and file I/O happen in the recorder's writer thread, as in
+``OrderJournal``. When the queue is full the record is dropped and counted
+rather than held, and the session's ``end`` record carries the count.
+
+The writer buffers each session's encoded records until ``flush_bytes`` or
+``flush_interval`` and then appends them to the current segment as one
+compressed member (a zstd frame when ``zstandard`` is installed, else a gzip
+member), so memory depends on the number of running sessions, never on how
+long one runs. Next to each segment an ``.idx`` file gets one JSON line per
+member: session, room, the tokens saved in it, offset and length. A lookup
+reads the small index files and decompresses only the members of the
+sessions it asked for::
+
+    python src/session_recorder.py recordings/ --token BT-20251123-0042
+    python src/session_recorder.py recordings/ --room playground-abc1 --json
+
+A segment is a plain concatenation of members, so ``zcat`` / ``zstdcat``
+read it whole as well.
+
+Every job process on the host appends to the same segment: a job process
+lives for one call, and per-process segments left a small segment and index
+behind for each call. A member and its index line are appended under an
+exclusive ``flock`` on ``.sessions.lock`` in the directory. Segments cover
+``max_age``-aligned time windows (``sessions-<window start>-<n>``) and move
+on to the next ``n`` once one reaches ``max_bytes``, so every process picks
+the same file without talking to the others.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import fcntl
+import gzip
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # not a declared dependency; segments fall back to gzip
+    zstandard = None
+
+logger = logging.getLogger("agent.recorder")
+
+CODECS = ("zstd", "gzip")
+_SUFFIXES = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz"}
+
+_STOP = object()
+
+
+class SessionRecorder:
+    """Writes every session's trail into compressed, rotated segments from a background thread.
+
+    Args:
+        directory: Where the segments and their ``.idx`` files go.
+        codec: One of ``CODECS``; zstd needs the ``zstandard`` package.
+        max_queue: Records waiting for the writer; more are dropped and counted.
+        flush_bytes: Encoded bytes a session buffers before they become a member.
+        flush_interval: Seconds after which a session's buffer is written anyway.
+        max_bytes: Segment size after which the recorders move on to a new file.
+        max_age: Seconds of records per segment; segments start at multiples
+            of it.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        codec: Optional[str] = None,
+        max_queue: int = 4096,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 5.0,
+        max_bytes: int = 16 * 1024 * 1024,
+        max_age: float = 3600.0,
+    ) -> None:
+        codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {CODECS}, got {codec!r}")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("the zstd codec needs the zstandard package")
+
+        self.directory = directory
+        self.codec = codec
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.dropped = 0
+        # members and bytes written, for stats
+        self.members = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # writer thread only: session id -> _Pending
+        self._pending: dict[str, _Pending] = {}
+        self._lock_fd: Optional[int] = None
+        self._segment_fd: Optional[int] = None
+        self._index_fd: Optional[int] = None
+        self._segment_path = ""
+        self._segment_window = 0
+        self._segment_number = 0
+        self._compress = (
+            zstandard.ZstdCompressor(level=3).compress
+            if codec == "zstd"
+            else _gzip_member
+        )
+
+    @classmethod
+    def from_env(cls, directory: str, **kwargs) -> "SessionRecorder":
+        """Create a recorder configured through ``SESSION_RECORDER_*`` variables."""
+        return cls(
+            directory,
+            codec=os.getenv("SESSION_RECORDER_CODEC") or None,
+            max_queue=int(os.getenv("SESSION_RECORDER_MAX_QUEUE", "4096")),
+            flush_interval=float(os.getenv("SESSION_RECORDER_FLUSH_S", "5")),
+            max_bytes=int(
+                os.getenv("SESSION_RECORDER_MAX_BYTES", str(16 * 1024 * 1024))
+            ),
+            max_age=float(os.getenv("SESSION_RECORDER_MAX_AGE_S", "3600")),
+            **kwargs,
+        )
+
+    @property
+    def segment_path(self) -> str:
+        """Path of the segment currently being written ("" before the first member)."""
+        return self._segment_path
+
+    def start(self) -> None:
+        """Start the writer thread. Called lazily by ``trail``."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(
+                target=self._run, name="session-recorder", daemon=True
+            )
+            self._thread.start()
+
+    def trail(self, session_id: str, room: str) -> "SessionTrail":
+        """A new session's trail; its ``start`` record is taken now."""
+        self.start()
+        trail = SessionTrail(self, session_id, room)
+        trail.record("start", room=room, pid=os.getpid())
+        return trail
+
+    def put(
+        self, session_id: str, record: dict, *, timeout: Optional[float] = None
+    ) -> bool:
+        """Queue one record, by default without blocking; False when it was dropped."""
+        try:
+            if timeout is None:
+                self._queue.put_nowait((session_id, record))
+            else:
+                self._queue.put((session_id, record), timeout=timeout)
+            return True
+        except queue.Full:
+            if not self.dropped:
+                logger.warning("Session recorder queue is full, dropping records")
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every record queued so far is in a segment."""
+        if self._thread is None:
+            return
+        future: Future = Future()
+        self._queue.put(future)
+        future.result(timeout=timeout)
+
+    async def aflush(self) -> None:
+        """Async ``flush`` for use as a job shutdown callback."""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def close(self) -> None:
+        """Write every buffered session and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "members": self.members,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "dropped": self.dropped,
+            "buffered_sessions": len(self._pending),
+        }
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            try:
+                if item is _STOP or isinstance(item, Future):
+                    self._write_pending(force=True)
+                elif item is not None:
+                    self._add(*item)
+                    self._write_pending(force=False)
+                else:
+                    self._write_pending(force=False)
+            except Exception as e:
+                logger.exception("Failed to write session records")
+                if isinstance(item, Future):
+                    item.set_exception(e)
+            if item is _STOP:
+                self._close_segment()
+                if self._lock_fd is not None:
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+                return
+            if isinstance(item, Future) and not item.done():
+                item.set_result(None)
+
+    def _add(self, session_id: str, record: dict) -> None:
+        pending = self._pending.get(session_id)
+        if pending is None:
+            pending = self._pending[session_id] = _Pending(record.get("room", ""))
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        pending.lines.append(line)
+        pending.size += len(line)
+        if record["type"] == "order":
+            pending.tokens.append(record["order"]["token_number"])
+        if record["type"] == "end" or pending.size >= self.flush_bytes:
+            self._write_member(session_id, pending)
+            if record["type"] == "end":
+                del self._pending[session_id]
+
+    def _write_pending(self, *, force: bool) -> None:
+        """Write the sessions whose buffers are older than ``flush_interval``."""
+        now = time.monotonic()
+        gone = []
+        for session_id, pending in self._pending.items():
+            if pending.lines and (force or now - pending.since >= self.flush_interval):
+                self._write_member(session_id, pending)
+            elif not pending.lines and now - pending.since >= self.max_age:
+                # silent that long: its process never sent the end
+                gone.append(session_id)
+        for session_id in gone:
+            del self._pending[session_id]
+        if self._segment_fd is not None and self._window() != self._segment_window:
+            self._close_segment()
+
+    def _write_member(self, session_id: str, pending: "_Pending") -> None:
+        payload = "".join(pending.lines).encode()
+        member = self._compress(payload)
+        with self._append_lock():
+            segment_fd, index_fd = self._segment()
+            offset = os.fstat(segment_fd).st_size
+            _write_all(segment_fd, member)
+            # the index line goes out after its member, so it never points past the data
+            entry = {
+                "session": session_id,
+                "room": pending.room,
+                "tokens": pending.tokens,
+                "offset": offset,
+                "length": len(member),
+                "records": len(pending.lines),
+                "at": time.time(),
+            }
+            _write_all(
+                index_fd, (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+            )
+        self.members += 1
+        self.bytes_in += len(payload)
+        self.bytes_out += len(member)
+        pending.reset()
+
+    @contextlib.contextmanager
+    def _append_lock(self):
+        """Exclusive lock shared by the recorders of every process on the directory."""
+        if self._lock_fd is None:
+            self._lock_fd = os.open(
+                os.path.join(self.directory, ".sessions.lock"),
+                os.O_RDWR | os.O_CREAT,
+                0o644,
+            )
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _window(self) -> int:
+        return int(time.time() // self.max_age)
+
+    def _segment(self) -> tuple[int, int]:
+        """Segment and index fds to append to; called with the append lock held."""
+        window = self._window()
+        if window != self._segment_window:
+            self._close_segment()
+            self._segment_window = window
+            self._segment_number = 1
+        stamp = datetime.fromtimestamp(window * self.max_age).strftime("%Y%m%d-%H%M%S")
+        while True:
+            if self._segment_fd is None:
+                path = os.path.join(
+                    self.directory,
+                    f"sessions-{stamp}-{self._segment_number:04d}{_SUFFIXES[self.codec]}",
+                )
+                self._segment_fd = _open_append(path)
+                try:
+                    self._index_fd = _open_append(path + ".idx")
+                except BaseException:
+                    os.close(self._segment_fd)
+                    self._segment_fd = None
+                    raise
+                if path != self._segment_path:
+                    logger.info("Session recorder segment: %s", path)
+                self._segment_path = path
+            # another process may have filled it since the last member
+            if os.fstat(self._segment_fd).st_size < self.max_bytes:
+                return self._segment_fd, self._index_fd
+            self._close_segment()
+            self._segment_number += 1
+
+    def _close_segment(self) -> None:
+        if self._segment_fd is None:
+            return
+        try:
+            os.close(self._segment_fd)
+        finally:
+            os.close(self._index_fd)
+            self._segment_fd = self._index_fd = None
+
+
+class _Pending:
+    """One session's records not yet written, and what the index needs about them."""
+
+    __slots__ = ("lines", "room", "since", "size", "tokens")
+
+    def __init__(self, room: str) -> None:
+        self.room = room
+        self.reset()
+
+    def reset(self) -> None:
+        self.lines: list[str] = []
+        self.size = 0
+        self.tokens: list[str] = []
+        self.since = time.monotonic()
+
+
+class SessionTrail:
+    """One session's side of the recorder; every method is cheap enough for the event loop."""
+
+    def __init__(self, recorder: SessionRecorder, session_id: str, room: str) -> None:
+        self.recorder = recorder
+        self.session_id = session_id
+        self.room = room
+        self.dropped = 0
+        self._ended = False
+
+    def record(self, kind: str, **fields) -> None:
+        fields["type"] = kind
+        fields["ts"] = round(time.time(), 3)
+        if not self.recorder.put(self.session_id, fields):
+            self.dropped += 1
+
+    def attach(self, session) -> None:
+        """Record ``session``'s messages and tool calls."""
+        session.on("conversation_item_added", self._on_item)
+        session.on("function_tools_executed", self._on_tools)
+
+    def _on_item(self, ev) -> None:
+        item = ev.item
+        if getattr(item, "type", None) != "message":
+            return
+        self.record(
+            "message",
+            role=item.role,
+            text=item.text_content or "",
+            interrupted=item.interrupted,
+        )
+
+    def _on_tools(self, ev) -> None:
+        for call, output in ev.zipped():
+            self.record(
+                "tool",
+                name=call.name,
+                arguments=call.arguments,
+                output=output.output if output is not None else None,
+                error=bool(output is not None and output.is_error),
+            )
+
+    def prefilled(self, slots: dict) -> None:
+        self.record("prefill", slots=dict(slots))
+
+    def order(self, order_data: dict) -> None:
+        """A saved order; its token goes into the index."""
+        self.record(
+            "order",
+            order={**order_data, "items": [dict(i) for i in order_data["items"]]},
+        )
+
+    def end(self, reason: str = "") -> None:
+        """Close the trail; the session's buffer is written right after."""
+        if self._ended:
+            return
+        self._ended = True
+        record = {
+            "type": "end",
+            "ts": round(time.time(), 3),
+            "reason": reason,
+            "dropped": self.dropped,
+        }
+        if not self.recorder.put(
+            self.session_id, record, timeout=self.recorder.flush_interval
+        ):
+            logger.warning(
+                "Session recorder queue is full, the end of %s is not recorded",
+                self.session_id,
+            )
+
+    async def aclose(self, reason: str = "") -> None:
+        """``end`` for use as a job shutdown callback, waiting for room off the loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.end, reason)
+
+
+def _open_append(path: str) -> int:
+    return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _gzip_member(payload: bytes) -> bytes:
+    return gzip.compress(payload, compresslevel=6, mtime=0)
+
+
+def _decompress(path: str, member: bytes) -> bytes:
+    if path.endswith(_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(
+                f"{path} is zstd-compressed; install zstandard to read it"
+            )
+        return zstandard.ZstdDecompressor().decompress(member)
+    return gzip.decompress(member)
+
+
+def _index_files(directory: str) -> list[str]:
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.startswith("sessions-") and name.endswith(".idx")
+    )
+
+
+def _index_entries(directory: str, needles: tuple[str, ...]):
+    """(segment, entry) for the index lines containing one of ``needles``; others are not parsed."""
+    for index_path in _index_files(directory):
+        with open(index_path, encoding="utf-8") as f:
+            for line in f:
+                # a line being written has no newline yet
+                if line.endswith("\n") and any(needle in line for needle in needles):
+                    yield index_path[: -len(".idx")], json.loads(line)
+
+
+def _session_needle(session_id: str) -> str:
+    # index lines are written with separators=(",", ":") and the session first
+    return '{"session":' + json.dumps(session_id) + ","
+
+
+def find_sessions(
+    directory: str,
+    *,
+    room: Optional[str] = None,
+    token: Optional[str] = None,
+    session: Optional[str] = None,
+) -> list[str]:
+    """Ids of the sessions recorded in ``room``, that saved ``token``, or called ``session``."""
+    needles = []
+    if room is not None:
+        needles.append('"room":' + json.dumps(room) + ",")
+    if token is not None:
+        needles.append(json.dumps(token))
+    if session is not None:
+        needles.append(_session_needle(session))
+    found: dict[str, None] = {}
+    for _, entry in _index_entries(directory, tuple(needles)):
+        if (
+            (room is not None and entry["room"] == room)
+            or (token is not None and token in entry["tokens"])
+            or (session is not None and entry["session"] == session)
+        ):
+            found[entry["session"]] = None
+    return list(found)
+
+
+def read_trail(directory: str, **query) -> dict[str, list[dict]]:
+    """Every record of the matching sessions (see ``find_sessions``), per session, in order.
+
+    Only the index files and the matching members are read.
+    """
+    sessions = find_sessions(directory, **query)
+    trails: dict[str, list[dict]] = {session_id: [] for session_id in sessions}
+    files = {}
+    with contextlib.ExitStack() as stack:
+        for segment, entry in _index_entries(
+            directory, tuple(map(_session_needle, sessions))
+        ):
+            if entry["session"] not in trails:
+                continue
+            fp = files.get(segment)
+            if fp is None:
+                fp = files[segment] = stack.enter_context(open(segment, "rb"))
+            fp.seek(entry["offset"])
+            payload = _decompress(segment, fp.read(entry["length"]))
+            trails[entry["session"]].extend(
+                json.loads(line) for line in payload.decode().splitlines()
+            )
+    return trails
+
+
+def _print_trail(session_id: str, records: list[dict]) -> None:
+    print(f"== session {session_id}")
+    for r in records:
+        at = datetime.fromtimestamp(r["ts"]).strftime("%H:%M:%S.%f")[:-3]
+        kind = r["type"]
+        if kind == "start":
+            what = f"room {r['room']} (pid {r['pid']})"
+        elif kind == "message":
+            what = f"{r['role']}: {r['text']}" + (
+                " [interrupted]" if r["interrupted"] else ""
+            )
+        elif kind == "tool":
+            what = f"{r['name']}({r['arguments']}) -> {r['output']}" + (
+                " [error]" if r["error"] else ""
+            )
+        elif kind == "prefill":
+            what = json.dumps(r["slots"], ensure_ascii=False)
+        elif kind == "order":
+            what = json.dumps(r["order"], ensure_ascii=False)
+        else:
+            what = (
+                f"{r.get('reason') or 'closed'}, {r.get('dropped', 0)} records dropped"
+            )
+        print(f"{at} {kind:<8} {what}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print recorded session trails")
+    parser.add_argument("directory")
+    which = parser.add_mutually_exclusive_group(required=True)
+    which.add_argument("--room")
+    which.add_argument("--token")
+    which.add_argument("--session")
+    parser.add_argument("--json", action="store_true", help="one JSON record per line")
+    args = parser.parse_args()
+
+    trails = read_trail(
+        args.directory, room=args.room, token=args.token, session=args.session
+    )
+    if not trails:
+        sys.exit("no recorded session matches")
+    for session_id, records in trails.items():
+        if args.json:
+            for r in records:
+                print(json.dumps({"session": session_id, **r}, ensure_ascii=False))
+        else:
+            _print_trail(session_id, records)
+
+
+if __name__ == "__main__":
+    main()
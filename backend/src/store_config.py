@@ -0,0 +1,331 @@
+"""Process-wide store configuration: brand, menu, persona, cups and spoken replies.
+
+One JSON file (``STORE_CONFIG``, default ``store.json``) describes the store.
+Keys left out of it, or a missing file, keep the built-in Blue Tokai values::
+
+    {
+      "brand": "Blue Tokai",
+      "tagline": "Coffee Roasters",
+      "persona": "You are a warm, slightly witty virtual barista for ...",
+      "style": ["Speak only English, ...", "..."],
+      "menu": [{"sku": "DRK-LATTE", "category": "drink", "name": "Latte", "aliases": ["lattay"]}],
+      "cup_heights": {"small": "100px", "medium": "140px", "large": "180px"},
+      "default_cup_height": "140px",
+      "cold_keywords": ["iced", "cold", "frappe"],
+      "replies": {"greeting": "Hello! ...", "saved": "Perfect! ... {token} ..."}
+    }
+
+``python src/store_config.py`` prints the built-in configuration in this form;
+``python src/store_config.py store.json`` checks a file before it is deployed.
+
+A job process parses the file once in ``prewarm`` (``StoreConfigFile``).
+Everything in a ``StoreConfig`` is immutable and its menu catalog is built
+with it, so sessions share one object and only take a reference to it.
+A ``StoreConfigFile`` thread stats the file every ``check_interval`` and
+builds a new ``StoreConfig`` when its inode, mtime or size changed; the new
+object replaces the old one in a single assignment, so ``current`` never
+touches the file and is safe to call on the event loop. A
+session keeps the config it started with, so a reload never changes the
+menu or the replies halfway through an order. A file that fails to parse or
+validate is logged and the previous config stays in use.
+"""
+
+import json
+import logging
+import os
+import string
+import sys
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Optional
+
+from menu_catalog import CATEGORIES, MENU, MenuCatalog, get_catalog
+from receipt_renderer import COLD_KEYWORDS, CUP_HEIGHTS, DEFAULT_CUP_HEIGHT
+
+logger = logging.getLogger("agent.store")
+
+PERSONA = (
+    "You are a warm, slightly witty virtual barista for BLUE TOKAI COFFEE ROASTERS, "
+    "taking coffee orders by voice."
+)
+STYLE = (
+    "Speak only English, in a friendly Indian English style; keep jokes light and never be rude",
+    "Short spoken sentences with no formatting, emojis, or markdown",
+    "Ask one or two things at a time; if the customer drifts off-topic, steer back to the order",
+)
+
+# Reply templates and the ``str.format`` fields each one may use
+REPLIES = {
+    "greeting": "Hello! Welcome to Blue Tokai Coffee Roasters. I'm your virtual barista today. "
+    "What's your name, and what kind of coffee are you in the mood for?",
+    "confirm_question": "Sab theek hai? Should I lock this in?",
+    "saved": "Perfect! Your Blue Tokai order is locked in. Your {what} will be ready shortly. "
+    "Your token number is {token}. Thank you, {name}! Enjoy your brew!",
+}
+REPLY_FIELDS = {"saved": {"what", "token", "name"}}
+# Spoken word for word in every session, so their audio is synthesized once per host
+FIXED_REPLIES = ("greeting", "confirm_question")
+
+
+@dataclass(frozen=True, eq=False)
+class StoreConfig:
+    """One store's configuration; compared and hashed by identity, so it can key caches."""
+
+    brand: str = "Blue Tokai"
+    tagline: str = "Coffee Roasters"
+    persona: str = PERSONA
+    style: tuple[str, ...] = STYLE
+    # (sku, category, canonical name, aliases), as ``menu_catalog.MENU``
+    menu: tuple = MENU
+    cup_heights: Mapping[str, str] = field(
+        default_factory=lambda: MappingProxyType(CUP_HEIGHTS)
+    )
+    default_cup_height: str = DEFAULT_CUP_HEIGHT
+    cold_keywords: tuple[str, ...] = COLD_KEYWORDS
+    replies: Mapping[str, str] = field(
+        default_factory=lambda: MappingProxyType(REPLIES)
+    )
+    catalog: MenuCatalog = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # the built-in menu shares the process-wide catalog
+        catalog = get_catalog() if self.menu == MENU else MenuCatalog(self.menu)
+        object.__setattr__(self, "catalog", catalog)
+
+    @property
+    def phrases(self) -> tuple[str, ...]:
+        return tuple(self.replies[name] for name in FIXED_REPLIES)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StoreConfig":
+        """Validated config from parsed JSON; missing keys keep the built-in values.
+
+        Raises:
+            ValueError: on unknown keys, wrong types or reply templates with unknown fields.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("the store config must be a JSON object")
+        unknown = data.keys() - {f for f in cls.__dataclass_fields__ if f != "catalog"}
+        if unknown:
+            raise ValueError(f"unknown store config keys: {', '.join(sorted(unknown))}")
+        kwargs = {}
+        for key in ("brand", "tagline", "persona", "default_cup_height"):
+            if key in data:
+                kwargs[key] = _text(key, data[key])
+        if "style" in data:
+            kwargs["style"] = tuple(
+                _text("style", line) for line in _list("style", data["style"])
+            )
+        if "cold_keywords" in data:
+            words = _list("cold_keywords", data["cold_keywords"])
+            kwargs["cold_keywords"] = tuple(
+                _text("cold_keywords", word).lower() for word in words
+            )
+        if "menu" in data:
+            kwargs["menu"] = _menu(data["menu"])
+        if "cup_heights" in data:
+            heights = _dict("cup_heights", data["cup_heights"])
+            kwargs["cup_heights"] = MappingProxyType(
+                {
+                    size: _text(f"cup_heights.{size}", height)
+                    for size, height in heights.items()
+                }
+            )
+        if "replies" in data:
+            replies = dict(REPLIES)
+            for name, template in _dict("replies", data["replies"]).items():
+                if name not in REPLIES:
+                    raise ValueError(f"unknown reply {name!r}")
+                replies[name] = _template(name, _text(f"replies.{name}", template))
+            kwargs["replies"] = MappingProxyType(replies)
+        return cls(**kwargs)
+
+    @classmethod
+    def load(cls, path: str) -> "StoreConfig":
+        """Parse ``path``; a missing file gives the built-in config."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return DEFAULT_STORE_CONFIG
+        return cls.from_dict(data)
+
+    def to_dict(self) -> dict:
+        return {
+            "brand": self.brand,
+            "tagline": self.tagline,
+            "persona": self.persona,
+            "style": list(self.style),
+            "menu": [
+                {
+                    "sku": sku,
+                    "category": category,
+                    "name": name,
+                    "aliases": list(aliases),
+                }
+                for sku, category, name, aliases in self.menu
+            ],
+            "cup_heights": dict(self.cup_heights),
+            "default_cup_height": self.default_cup_height,
+            "cold_keywords": list(self.cold_keywords),
+            "replies": dict(self.replies),
+        }
+
+
+def _text(key: str, value) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{key} must be a non-empty string")
+    return value
+
+
+def _list(key: str, value) -> list:
+    if not isinstance(value, list):
+        raise ValueError(f"{key} must be a list")
+    return value
+
+
+def _dict(key: str, value) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError(f"{key} must be an object")
+    return value
+
+
+def _menu(rows) -> tuple:
+    menu = []
+    skus = set()
+    for row in _list("menu", rows):
+        row = _dict("menu item", row)
+        sku = _text("menu sku", row.get("sku"))
+        category = row.get("category")
+        if category not in CATEGORIES:
+            raise ValueError(
+                f"menu item {sku}: category must be one of {', '.join(CATEGORIES)}"
+            )
+        if sku in skus:
+            raise ValueError(f"menu item {sku} is listed twice")
+        skus.add(sku)
+        aliases = tuple(
+            _text(f"menu item {sku} alias", a)
+            for a in _list("aliases", row.get("aliases", []))
+        )
+        menu.append(
+            (sku, category, _text(f"menu item {sku} name", row.get("name")), aliases)
+        )
+    missing = [c for c in CATEGORIES if not any(item[1] == c for item in menu)]
+    if missing:
+        raise ValueError(f"the menu has no {', '.join(missing)}")
+    return tuple(menu)
+
+
+def _template(name: str, template: str) -> str:
+    allowed = REPLY_FIELDS.get(name, set())
+    for _, field_name, _, _ in string.Formatter().parse(template):
+        if field_name is not None and field_name not in allowed:
+            raise ValueError(
+                f"reply {name!r} uses {{{field_name}}}; it can use "
+                + (", ".join(f"{{{f}}}" for f in sorted(allowed)) or "no fields")
+            )
+    return template
+
+
+DEFAULT_STORE_CONFIG = StoreConfig()
+
+
+class StoreConfigFile:
+    """The config in ``path``, re-read when the file is replaced or changed.
+
+    Args:
+        path: The JSON file; while it does not exist the built-in config is used.
+        check_interval: Seconds between checks of the file, made by a daemon
+            thread; 0 starts no thread and leaves checking to ``check``.
+    """
+
+    def __init__(self, path: str, *, check_interval: float = 2.0) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.rejected = 0
+        self._identity = self._stat()
+        self._config = StoreConfig.load(path)
+        self._rejected: Optional[tuple] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if check_interval > 0:
+            self._thread = threading.Thread(
+                target=self._poll, name="store-config", daemon=True
+            )
+            self._thread.start()
+
+    def current(self) -> StoreConfig:
+        """The latest valid config; take it once per session and keep it."""
+        return self._config
+
+    def check(self) -> bool:
+        """Stat the file and reload it if it changed; True when the config changed."""
+        identity = self._stat()
+        return identity != self._identity and self._reload(identity)
+
+    def close(self) -> None:
+        """Stop the checking thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Store config check failed")
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _reload(self, identity: Optional[tuple]) -> bool:
+        try:
+            config = StoreConfig.load(self.path)
+        except (OSError, ValueError) as e:
+            # possibly caught mid-write: the identity is not taken, so the next check retries
+            self.rejected += 1
+            if identity != self._rejected:
+                self._rejected = identity
+                logger.error(
+                    "Store config %s rejected, keeping the previous one: %s",
+                    self.path,
+                    e,
+                )
+            return False
+        self._config = config
+        self._identity = identity
+        self.reloads += 1
+        logger.info(
+            "Store config %s %s (%d menu items)",
+            self.path,
+            "reloaded" if identity else "removed, using the built-in one",
+            len(config.menu),
+        )
+        return True
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        # validate a file: exits non-zero with the reason
+        try:
+            config = StoreConfig.load(sys.argv[1])
+        except (OSError, ValueError) as e:
+            sys.exit(f"{sys.argv[1]}: {e}")
+        print(f"{sys.argv[1]}: ok, {len(config.menu)} menu items")
+        return
+    json.dump(DEFAULT_STORE_CONFIG.to_dict(), sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+if __name__ == "__main__":
+    main()
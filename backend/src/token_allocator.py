@@ -0,0 +1,87 @@
+"""Collision-free order token numbers shared by every job process on a host.
+
+Tokens look like ``BT-20251123-002K``: a per-day sequence number in base 36.
+Each process leases a block of sequence numbers from a per-day counter file
+under an exclusive ``flock`` and then hands them out from memory, so the file
+lock is taken once per ``block_size`` tokens instead of on every order. The
+counter is fsynced before a lease is used, so restarts never reuse a number;
+unused numbers in a leased block are simply skipped.
+
+Tokens are unique per day across processes and increase monotonically within
+a process.
+"""
+
+import fcntl
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _base36(n: int, width: int) -> str:
+    out = []
+    while n:
+        n, r = divmod(n, 36)
+        out.append(_DIGITS[r])
+    return "".join(reversed(out)).rjust(width, "0")
+
+
+class TokenAllocator:
+    """Hands out ``<prefix>-<YYYYMMDD>-<seq>`` tokens from leased blocks.
+
+    Args:
+        directory: Where the per-day ``<YYYYMMDD>.seq`` counter files live.
+        prefix: Token prefix (``BT`` = Blue Tokai).
+        block_size: Sequence numbers leased per trip to the counter file.
+        width: Minimum number of base-36 digits (4 digits = 1.6M tokens/day).
+        today: Returns the current day as ``YYYYMMDD``; injectable for tests.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        prefix: str = "BT",
+        block_size: int = 32,
+        width: int = 4,
+        today: Optional[Callable[[], str]] = None,
+    ) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.block_size = block_size
+        self.width = width
+        self._today = today or (lambda: datetime.now().strftime("%Y%m%d"))
+        self._lock = threading.Lock()
+        self._day = ""
+        self._next = 0
+        self._limit = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def allocate(self) -> str:
+        """Return the next unused token for today."""
+        day = self._today()
+        with self._lock:
+            if day != self._day or self._next >= self._limit:
+                self._next, self._limit = self._lease(day)
+                self._day = day
+            seq = self._next
+            self._next += 1
+        return f"{self.prefix}-{day}-{_base36(seq, self.width)}"
+
+    def _lease(self, day: str) -> tuple[int, int]:
+        path = os.path.join(self.directory, f"{day}.seq")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 32, 0).strip()
+            start = int(raw) if raw else 1
+            end = start + self.block_size
+            # fixed-width record rewritten in place: never truncated, so a crash
+            # mid-lease can not reset the counter
+            os.pwrite(fd, f"{end:020d}\n".encode(), 0)
+            os.fsync(fd)
+        finally:
+            os.close(fd)  # also releases the flock
+        return start, end
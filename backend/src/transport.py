@@ -0,0 +1,204 @@
+"""Message transport between the agent and the frontend over LiveKit data packets.
+
+Every message is a typed envelope, ``{"type": <type>, "data": <payload>}`` as
+compact UTF-8 JSON, published on a topic. The frontend
+(``frontend/lib/data-transport.ts``) dispatches by topic and type, so a
+handler only ever sees its own messages.
+
+On the wire each data packet starts with a small binary header:
+
+    byte 0      wire version (``WIRE_VERSION``)
+    byte 1      flags: ``FLAG_DEFLATE`` (envelope is zlib-compressed),
+                ``FLAG_CHUNKED`` (packet is one part of a larger message)
+    bytes 2-9   only when chunked: message id (uint32), part index and part
+                count (uint16 each), big-endian
+
+Envelopes of at least ``compress_threshold`` bytes are compressed with zlib
+(what the browser's ``DecompressionStream("deflate")`` reads), unless that
+does not make them smaller. A message still larger than ``max_packet`` bytes
+is split into parts that the receiver reassembles; LiveKit drops reliable
+packets over about 15 KiB.
+"""
+
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from collections.abc import Awaitable
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("agent.transport")
+
+WIRE_VERSION = 1
+FLAG_DEFLATE = 0x01
+FLAG_CHUNKED = 0x02
+
+_HEADER = struct.Struct(">BB")
+_CHUNK_HEADER = struct.Struct(">BBIHH")
+
+# LiveKit's limit for one reliable data packet
+MAX_PACKET_BYTES = 15_000
+
+# publish_data of a LocalParticipant: (payload, *, reliable, destination_identities, topic)
+Publish = Callable[..., Awaitable[None]]
+
+
+def encode_envelope(msg_type: str, data: Any) -> bytes:
+    """The JSON envelope of a message, before compression and chunking."""
+    return json.dumps(
+        {"type": msg_type, "data": data}, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def encode_packets(
+    envelope: bytes,
+    *,
+    message_id: int = 0,
+    compress_threshold: int = 1024,
+    max_packet: int = MAX_PACKET_BYTES,
+) -> list[bytes]:
+    """Split an envelope into data packets, compressed and chunked as needed."""
+    flags = 0
+    body = envelope
+    if compress_threshold and len(envelope) >= compress_threshold:
+        compressed = zlib.compress(envelope, 6)
+        if len(compressed) < len(envelope):
+            flags |= FLAG_DEFLATE
+            body = compressed
+    if _HEADER.size + len(body) <= max_packet:
+        return [_HEADER.pack(WIRE_VERSION, flags) + body]
+
+    part = max_packet - _CHUNK_HEADER.size
+    count = -(-len(body) // part)
+    if count > 0xFFFF:
+        raise ValueError(f"message of {len(body)} bytes needs more than 65535 parts")
+    flags |= FLAG_CHUNKED
+    return [
+        _CHUNK_HEADER.pack(WIRE_VERSION, flags, message_id, index, count)
+        + body[index * part : (index + 1) * part]
+        for index in range(count)
+    ]
+
+
+def decode_envelope(body: bytes, flags: int) -> tuple[str, Any]:
+    if flags & FLAG_DEFLATE:
+        body = zlib.decompress(body)
+    envelope = json.loads(body)
+    return envelope["type"], envelope["data"]
+
+
+class Reassembler:
+    """Turns received data packets back into ``(type, data)`` messages.
+
+    Parts are kept per sender and message id; a message whose parts stop
+    arriving is forgotten after ``timeout`` seconds.
+    """
+
+    def __init__(self, *, timeout: float = 10.0) -> None:
+        self.timeout = timeout
+        self.expired = 0
+        # (sender, message id) -> (first seen, part count, parts by index, flags)
+        self._partial: dict[
+            tuple[str, int], tuple[float, int, dict[int, bytes], int]
+        ] = {}
+
+    def feed(self, packet: bytes, sender: str = "") -> Optional[tuple[str, Any]]:
+        """The message ``packet`` completes, or None while parts are missing."""
+        version, flags = _HEADER.unpack_from(packet)
+        if version != WIRE_VERSION:
+            raise ValueError(f"unsupported wire version: {version}")
+        if not flags & FLAG_CHUNKED:
+            return decode_envelope(packet[_HEADER.size :], flags)
+
+        _, _, message_id, index, count = _CHUNK_HEADER.unpack_from(packet)
+        now = time.monotonic()
+        self._expire(now)
+        key = (sender, message_id)
+        _, _, parts, _ = self._partial.setdefault(key, (now, count, {}, flags))
+        parts[index] = packet[_CHUNK_HEADER.size :]
+        if len(parts) < count:
+            return None
+        del self._partial[key]
+        return decode_envelope(b"".join(parts[i] for i in range(count)), flags)
+
+    def _expire(self, now: float) -> None:
+        for key, (started, *_) in list(self._partial.items()):
+            if now - started > self.timeout:
+                del self._partial[key]
+                self.expired += 1
+
+
+class DataTransport:
+    """Sends typed messages on topics through ``publish`` (a ``publish_data``).
+
+    Args:
+        publish: ``LocalParticipant.publish_data`` or anything with its signature.
+        compress_threshold: Envelopes of at least this many bytes are
+            compressed; 0 disables compression.
+        max_packet: Largest data packet sent; bigger messages are chunked.
+    """
+
+    def __init__(
+        self,
+        publish: Publish,
+        *,
+        compress_threshold: int = 1024,
+        max_packet: int = MAX_PACKET_BYTES,
+    ) -> None:
+        self.publish = publish
+        self.compress_threshold = compress_threshold
+        self.max_packet = max_packet
+        self._next_id = 0
+
+    @classmethod
+    def from_env(cls, publish: Publish) -> "DataTransport":
+        return cls(
+            publish,
+            compress_threshold=int(os.getenv("AGENT_DATA_COMPRESS_BYTES", "1024")),
+            max_packet=int(
+                os.getenv("AGENT_DATA_MAX_PACKET_BYTES", str(MAX_PACKET_BYTES))
+            ),
+        )
+
+    def encode(self, msg_type: str, data: Any) -> list[bytes]:
+        """Data packets for one message."""
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        return encode_packets(
+            encode_envelope(msg_type, data),
+            message_id=self._next_id,
+            compress_threshold=self.compress_threshold,
+            max_packet=self.max_packet,
+        )
+
+    async def send(
+        self,
+        topic: str,
+        msg_type: str,
+        data: Any,
+        *,
+        reliable: bool = True,
+        destination_identities: Optional[list[str]] = None,
+    ) -> int:
+        """Publish one message on ``topic``; returns the bytes sent.
+
+        Chunked messages need ``reliable``: a lost part loses the message.
+        """
+        packets = self.encode(msg_type, data)
+        if len(packets) > 1 and not reliable:
+            raise ValueError(
+                f"{msg_type} message needs {len(packets)} packets, send it reliably"
+            )
+        for packet in packets:
+            await self.publish(
+                packet,
+                reliable=reliable,
+                destination_identities=destination_identities or [],
+                topic=topic,
+            )
+        size = sum(len(packet) for packet in packets)
+        logger.debug(
+            "Sent %s on %s: %d bytes in %d packets", msg_type, topic, size, len(packets)
+        )
+        return size
@@ -0,0 +1,420 @@
+"""Phrase-level TTS audio cache.
+
+``CachedTTS`` wraps a TTS, splits the LLM's output into sentences and keys
+each one on (voice, style, sample rate, text). Only the sentences of the
+store's fixed phrases (the greeting, the confirmation question) are cached:
+they are spoken word for word in every session, while anything else the LLM
+says may carry a customer's name or order and is never written to disk. A
+hit is read from a memory-mapped PCM file in the default executor, with no
+network round-trip, so those phrases start instantly. A miss goes to the
+wrapped TTS's own stream (Murf's pooled websocket) when it has one, so its
+audio is forwarded as it arrives; a fixed phrase is stored afterwards.
+
+``PhraseAudioCache`` keeps one ``<sha1>.pcm`` file per phrase in a directory
+shared by every job process on the host:
+
+- files are written atomically (temp file + rename), so readers never see a
+  partial phrase
+- mapped pages are shared through the page cache
+- eviction is LRU, bounded by ``max_bytes``; the bound covers the entries
+  each process knows about, which is what it has read or written
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable
+from typing import Callable, Optional
+
+import aiohttp
+from livekit.agents import APIConnectOptions, tokenize, tts, utils
+from livekit.agents.tts.stream_adapter import DEFAULT_STREAM_ADAPTER_API_CONNECT_OPTIONS
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.voice.io import TimedString
+
+logger = logging.getLogger("agent.tts_cache")
+
+
+class PhraseAudioCache:
+    """Size-bounded, memory-mapped PCM store shared across processes.
+
+    Args:
+        directory: Where the ``<key>.pcm`` files live.
+        max_bytes: Total PCM bytes kept before the least recently used phrases
+            are deleted.
+    """
+
+    def __init__(self, directory: str, *, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._maps: dict[str, mmap.mmap] = {}
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # oldest first, so eviction starts with what was written longest ago
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".pcm") and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self._total += size
+
+    @staticmethod
+    def key(voice: str, style: str, sample_rate: int, text: str) -> str:
+        return hashlib.sha1(
+            f"{voice}\0{style}\0{sample_rate}\0{text}".encode()
+        ).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._sizes:
+                return True
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        """PCM bytes for ``key``, or None; may open the file, so not on the event loop."""
+        with self._lock:
+            mapped = self._maps.get(key)
+            if mapped is None:
+                mapped = self._map(key)
+            if mapped is None:
+                self.misses += 1
+                return None
+            self._sizes.move_to_end(key)
+            self.hits += 1
+            return mapped[:]
+
+    def _map(self, key: str) -> Optional[mmap.mmap]:
+        # also picks up phrases another process wrote since we scanned the directory
+        try:
+            with open(self._path(key), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            self._forget(key)
+            return None
+        if key not in self._sizes:
+            self._sizes[key] = len(mapped)
+            self._total += len(mapped)
+        self._maps[key] = mapped
+        return mapped
+
+    def put(self, key: str, pcm: bytes) -> None:
+        """Store ``pcm`` under ``key`` and evict down to ``max_bytes``."""
+        if not pcm or len(pcm) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        with self._lock:
+            self._forget(key)
+            self._sizes[key] = len(pcm)
+            self._total += len(pcm)
+            while self._total > self.max_bytes and len(self._sizes) > 1:
+                oldest = next(iter(self._sizes))
+                self._forget(oldest)
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self._path(oldest))
+
+    def _forget(self, key: str) -> None:
+        size = self._sizes.pop(key, None)
+        if size is not None:
+            self._total -= size
+        mapped = self._maps.pop(key, None)
+        if mapped is not None:
+            mapped.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "phrases": len(self._sizes),
+                "bytes": self._total,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+class CachedTTS(tts.TTS):
+    """Streaming TTS that serves repeated sentences from a ``PhraseAudioCache``.
+
+    Args:
+        wrapped: The TTS that synthesizes cache misses; its ``stream`` is used
+            when it supports streaming, else ``synthesize``.
+        cache: The phrase store.
+        voice: Voice id, part of the cache key.
+        style: Voice style, part of the cache key.
+        phrases: Fixed text spoken word for word; only its sentences are cached.
+        sentence_tokenizer: Splits streamed text and ``phrases`` into sentences.
+        text_pacing: Passed on as ``tts.StreamAdapter`` takes it.
+    """
+
+    def __init__(
+        self,
+        wrapped: tts.TTS,
+        cache: PhraseAudioCache,
+        *,
+        voice: str,
+        style: str = "",
+        phrases: Iterable[str] = (),
+        sentence_tokenizer: Optional[tokenize.SentenceTokenizer] = None,
+        text_pacing: "tts.SentenceStreamPacer | bool" = False,
+    ) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=True, aligned_transcript=True),
+            sample_rate=wrapped.sample_rate,
+            num_channels=wrapped.num_channels,
+        )
+        self._wrapped = wrapped
+        self._cache = cache
+        self._voice = voice
+        self._style = style
+        self._sentence_tokenizer = (
+            sentence_tokenizer or tokenize.basic.SentenceTokenizer()
+        )
+        # split as streamed text is, so a phrase's sentences match word for word
+        self.phrases = frozenset(
+            sentence.strip()
+            for phrase in phrases
+            for sentence in self._sentence_tokenizer.tokenize(phrase)
+            if sentence.strip()
+        )
+        self._stream_pacer: Optional[tts.SentenceStreamPacer] = None
+        if text_pacing is True:
+            self._stream_pacer = tts.SentenceStreamPacer()
+        elif isinstance(text_pacing, tts.SentenceStreamPacer):
+            self._stream_pacer = text_pacing
+        self._write_tasks: set[asyncio.Future] = set()
+
+    @property
+    def model(self) -> str:
+        return self._wrapped.model
+
+    @property
+    def provider(self) -> str:
+        return self._wrapped.provider
+
+    def cache_key(self, text: str) -> str:
+        return self._cache.key(self._voice, self._style, self.sample_rate, text)
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> "_CachedChunkedStream":
+        return _CachedChunkedStream(
+            tts=self, input_text=text, conn_options=conn_options
+        )
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "_CachedSynthesizeStream":
+        return _CachedSynthesizeStream(tts=self, conn_options=conn_options)
+
+    async def _audio(
+        self, text: str, conn_options: APIConnectOptions
+    ) -> AsyncIterator[bytes]:
+        """PCM of one sentence, from the cache or else from the wrapped TTS as it arrives."""
+        cacheable = text in self.phrases
+        if cacheable:
+            pcm = await asyncio.get_running_loop().run_in_executor(
+                None, self._cache.get, self.cache_key(text)
+            )
+            if pcm is not None:
+                yield pcm
+                return
+
+        if self._wrapped.capabilities.streaming:
+            source = self._wrapped.stream(conn_options=conn_options)
+            source.push_text(text)
+            source.end_input()
+        else:
+            source = self._wrapped.synthesize(text, conn_options=conn_options)
+        chunks = []
+        async with source:
+            async for audio in source:
+                data = audio.frame.data.tobytes()
+                if cacheable:
+                    chunks.append(data)
+                yield data
+        if chunks:
+            self._store(text, b"".join(chunks))
+
+    def _store(self, text: str, pcm: bytes) -> None:
+        # file write off the event loop; the caller never waits for it
+        future = asyncio.get_running_loop().run_in_executor(
+            None, self._cache.put, self.cache_key(text), pcm
+        )
+        self._write_tasks.add(future)
+        future.add_done_callback(self._write_tasks.discard)
+
+    async def precompute(self) -> int:
+        """Synthesize every phrase sentence not cached yet; returns how many were added."""
+        added = 0
+        for text in sorted(self.phrases):
+            if self.cache_key(text) in self._cache:
+                continue
+            frames = []
+            async with self._wrapped.synthesize(text) as stream:
+                async for audio in stream:
+                    frames.append(audio.frame.data.tobytes())
+            self._cache.put(self.cache_key(text), b"".join(frames))
+            added += 1
+        return added
+
+    def prewarm(self) -> None:
+        self._wrapped.prewarm()
+
+    async def aclose(self) -> None:
+        if self._write_tasks:
+            await asyncio.gather(*self._write_tasks, return_exceptions=True)
+        await self._wrapped.aclose()
+
+
+class _CachedChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        cached_tts: CachedTTS = self._tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=cached_tts.sample_rate,
+            num_channels=cached_tts.num_channels,
+            mime_type="audio/pcm",
+        )
+        async for data in cached_tts._audio(self._input_text, self._conn_options):
+            output_emitter.push(data)
+        output_emitter.flush()
+
+
+class _CachedSynthesizeStream(tts.SynthesizeStream):
+    """One sentence at a time, as ``tts.StreamAdapter`` does, with hits from the cache."""
+
+    def __init__(self, *, tts: CachedTTS, conn_options: APIConnectOptions) -> None:
+        # retries happen per sentence, inside the wrapped TTS's own streams
+        super().__init__(
+            tts=tts, conn_options=DEFAULT_STREAM_ADAPTER_API_CONNECT_OPTIONS
+        )
+        self._tts: CachedTTS = tts
+        self._wrapped_conn_options = conn_options
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        cached_tts = self._tts
+        sent_stream = cached_tts._sentence_tokenizer.stream()
+        if cached_tts._stream_pacer:
+            sent_stream = cached_tts._stream_pacer.wrap(
+                sent_stream=sent_stream, audio_emitter=output_emitter
+            )
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=cached_tts.sample_rate,
+            num_channels=cached_tts.num_channels,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        bytes_per_second = 2 * cached_tts.sample_rate * cached_tts.num_channels
+
+        async def _forward_input() -> None:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    sent_stream.flush()
+                    continue
+                sent_stream.push_text(data)
+            sent_stream.end_input()
+
+        async def _synthesize() -> None:
+            duration = 0.0
+            async for ev in sent_stream:
+                output_emitter.push_timed_transcript(
+                    TimedString(text=ev.token, start_time=duration)
+                )
+                if not (text := ev.token.strip()):
+                    continue
+                async for data in cached_tts._audio(text, self._wrapped_conn_options):
+                    self._mark_started()
+                    output_emitter.push(data)
+                    duration += len(data) / bytes_per_second
+                output_emitter.flush()
+
+        tasks = [
+            asyncio.create_task(_forward_input()),
+            asyncio.create_task(_synthesize()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await sent_stream.aclose()
+            await utils.aio.cancel_and_wait(*tasks)
+
+
+def precompute_in_background(
+    make_tts: Callable[[aiohttp.ClientSession], tts.TTS],
+    cache: PhraseAudioCache,
+    phrases: Iterable[str],
+    *,
+    voice: str,
+    style: str = "",
+    sentence_tokenizer: Optional[tokenize.SentenceTokenizer] = None,
+) -> threading.Thread:
+    """Fill ``cache`` with the sentences of ``phrases`` from a daemon thread with its own event loop.
+
+    Meant for ``prewarm``, which must return quickly: the process starts
+    accepting jobs right away and the phrases land in the cache as they are
+    synthesized. There is no job context in that thread, so ``make_tts`` is
+    given an HTTP session of the thread's own to build the TTS with. Failures
+    (no API key, no network) are logged and otherwise ignored - the phrases
+    are then cached on first use instead.
+    """
+
+    async def _run() -> None:
+        http_session = aiohttp.ClientSession()
+        cached = None
+        try:
+            cached = CachedTTS(
+                make_tts(http_session),
+                cache,
+                voice=voice,
+                style=style,
+                phrases=phrases,
+                sentence_tokenizer=sentence_tokenizer,
+            )
+            added = await cached.precompute()
+            logger.info("Precomputed %d TTS phrases (%s)", added, cache.stats())
+        finally:
+            if cached is not None:
+                await cached.aclose()
+            await http_session.close()
+
+    def _target() -> None:
+        try:
+            asyncio.run(_run())
+        except Exception as e:
+            logger.warning("TTS phrase precompute failed: %s", e)
+
+    thread = threading.Thread(target=_target, name="tts-precompute", daemon=True)
+    thread.start()
+    return thread
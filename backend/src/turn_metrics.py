@@ -0,0 +1,540 @@
+"""Per-turn latency histograms for the agent.
+
+``LogHistogram`` is a fixed-memory, HDR-style histogram: values in
+microseconds land in 272 log-linear buckets (8 per power of two). That is
+about 12% relative precision from 1 us to 19 hours. Recording a sample is a
+float-to-int conversion, a few integer operations, one list increment and
+one float add, so it stays well below a microsecond.
+
+``TurnMetrics`` turns the session's ``metrics_collected`` events into:
+
+- ``eou_delay_seconds``: end of speech to end-of-utterance decision
+- ``stt_latency_seconds``: end of speech to final transcript
+- ``llm_ttft_seconds``: LLM time to first token
+- ``tts_ttfb_seconds``: TTS time to first audio byte
+- ``turn_latency_seconds``: EOU + LLM TTFT + TTS TTFB of the same ``speech_id``
+
+Every sample is recorded once, into the session's registry. Closed sessions
+are folded into the process-wide ``PROCESS_METRICS``; ``process_metrics()``
+adds the running ones. ``timed_tool`` adds ``tool_duration_seconds{tool=...}``
+for each ``@function_tool``.
+
+Job processes are separate OS processes, so worker-wide numbers come from
+the periodic per-pid JSON snapshots (``SnapshotWriter``). A job process exits
+with its call; ``fold_snapshots`` adds the snapshots of exited ones to
+``cumulative.json`` and deletes them. The worker process serves the merged
+numbers on ``/metrics`` (``add_metrics_routes``); merge them by hand with
+``merge_snapshots`` or::
+
+    python src/turn_metrics.py metrics/
+"""
+
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from aiohttp import web
+from livekit.agents import utils
+from livekit.agents.metrics import EOUMetrics, LLMMetrics, TTSMetrics
+
+logger = logging.getLogger("agent.metrics")
+
+_SUB_BITS = 3
+_SUB = 1 << _SUB_BITS
+_LINEAR = 2 * _SUB  # values below this get a bucket each
+_MAX_BITS = 36  # 2**36 us ~ 19 hours
+_BUCKETS = (_MAX_BITS - _SUB_BITS) * _SUB + _SUB
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# snapshots of exited job processes, folded together by ``fold_snapshots``
+CUMULATIVE_FILE = "cumulative.json"
+
+
+def _bucket_low(index: int) -> int:
+    """Smallest value (us) that lands in bucket ``index``."""
+    if index < _LINEAR:
+        return index
+    shift = index // _SUB - 1
+    return (index % _SUB + _SUB) << shift
+
+
+class LogHistogram:
+    """Log-linear histogram of durations in seconds.
+
+    ``record`` only bumps one bucket and the running sum; the sample count is
+    derived from the buckets when read.
+    """
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * _BUCKETS
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1_000_000)
+        if us < _LINEAR:
+            self.counts[us if us > 0 else 0] += 1
+        else:
+            shift = us.bit_length() - _SUB_BITS - 1
+            index = (shift + 1) * _SUB + ((us >> shift) & (_SUB - 1))
+            self.counts[index if index < _BUCKETS else _BUCKETS - 1] += 1
+        self.total += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def merge(self, other: "LogHistogram") -> None:
+        counts = self.counts
+        for index, n in enumerate(other.counts):
+            if n:
+                counts[index] += n
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        """Approximate ``q`` quantile in seconds (midpoint of its bucket)."""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = max(1, round(q * count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return (_bucket_low(index) + _bucket_low(index + 1)) / 2 / 1_000_000
+        return _bucket_low(_BUCKETS) / 1_000_000
+
+    def snapshot(self) -> dict:
+        return {
+            "sum": self.total,
+            "buckets": {str(i): n for i, n in enumerate(self.counts) if n},
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "LogHistogram":
+        hist = cls()
+        for index, n in data["buckets"].items():
+            hist.counts[int(index)] = n
+        hist.total = data["sum"]
+        return hist
+
+
+def _key(name: str, labels: Optional[dict]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _split_key(key: str) -> tuple[str, str]:
+    name, _, labels = key.partition("{")
+    return name, labels.rstrip("}")
+
+
+class MetricsRegistry:
+    """Named histograms, keyed by Prometheus-style ``name{label="value"}``."""
+
+    def __init__(self) -> None:
+        self.histograms: dict[str, LogHistogram] = {}
+
+    def histogram(self, name: str, labels: Optional[dict] = None) -> LogHistogram:
+        key = _key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = LogHistogram()
+        return hist
+
+    def snapshot(self) -> dict:
+        return {key: hist.snapshot() for key, hist in self.histograms.items()}
+
+    def merge(self, other: "MetricsRegistry") -> None:
+        for key, hist in other.histograms.items():
+            self.histograms.setdefault(key, LogHistogram()).merge(hist)
+
+    def merge_snapshot(self, data: dict) -> None:
+        for key, hist in data.items():
+            self.histograms.setdefault(key, LogHistogram()).merge(
+                LogHistogram.from_snapshot(hist)
+            )
+
+    def summary(self) -> dict:
+        """p50/p95/p99 and count per histogram, in milliseconds."""
+        return {
+            key: {
+                "count": hist.count,
+                "p50_ms": round(hist.quantile(0.5) * 1000, 1),
+                "p95_ms": round(hist.quantile(0.95) * 1000, 1),
+                "p99_ms": round(hist.quantile(0.99) * 1000, 1),
+            }
+            for key, hist in sorted(self.histograms.items())
+        }
+
+
+def to_prometheus(sources: list[tuple[MetricsRegistry, dict]]) -> str:
+    """Prometheus text exposition, one summary family per histogram name.
+
+    ``sources`` pairs each registry with the labels added to all its series,
+    e.g. ``[(worker, {}), (session, {"session": "room-1"})]``.
+    """
+    families: dict[str, list[str]] = {}
+    for registry, extra_labels in sources:
+        extra = ",".join(f'{k}="{v}"' for k, v in sorted(extra_labels.items()))
+        for key, hist in sorted(registry.histograms.items()):
+            name, labels = _split_key(key)
+            lines = families.setdefault(name, [])
+            base = ",".join(filter(None, (labels, extra)))
+            for q in QUANTILES:
+                quantile = ",".join(filter(None, (base, f'quantile="{q}"')))
+                lines.append(f"agent_{name}{{{quantile}}} {hist.quantile(q):.6f}")
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"agent_{name}_sum{suffix} {hist.total:.6f}")
+            lines.append(f"agent_{name}_count{suffix} {hist.count}")
+    out = []
+    for name, lines in families.items():
+        out.append(f"# TYPE agent_{name} summary")
+        out.extend(lines)
+    return "\n".join(out) + "\n" if out else ""
+
+
+# tool durations and every closed session of this process
+PROCESS_METRICS = MetricsRegistry()
+# room name -> registry of each running session in this process
+SESSION_METRICS: dict[str, MetricsRegistry] = {}
+
+
+def process_metrics() -> MetricsRegistry:
+    """This process's histograms, including the sessions still running."""
+    merged = MetricsRegistry()
+    merged.merge(PROCESS_METRICS)
+    for registry in list(SESSION_METRICS.values()):
+        merged.merge(registry)
+    return merged
+
+
+class TurnMetrics:
+    """Feeds ``metrics_collected`` events into the session's histograms.
+
+    Each sample is recorded once, into the session registry; ``close`` folds
+    the session into ``PROCESS_METRICS``.
+
+    Args:
+        session: Key of this session in ``SESSION_METRICS`` (the room name).
+        max_pending_turns: Turns still waiting for their EOU/LLM/TTS parts.
+    """
+
+    def __init__(self, session: str, *, max_pending_turns: int = 64) -> None:
+        self.session = session
+        self.registry = MetricsRegistry()
+        self.max_pending_turns = max_pending_turns
+        self._pending: dict[str, list[Optional[float]]] = {}
+        self._eou = self._recorder("eou_delay_seconds")
+        self._stt = self._recorder("stt_latency_seconds")
+        self._ttft = self._recorder("llm_ttft_seconds")
+        self._ttfb = self._recorder("tts_ttfb_seconds")
+        self._turn = self._recorder("turn_latency_seconds")
+        SESSION_METRICS[session] = self.registry
+
+    def _recorder(self, name: str):
+        return self.registry.histogram(name).record
+
+    def on_metrics(self, metrics) -> None:
+        # exact type checks: isinstance on pydantic models goes through ABCMeta
+        kind = type(metrics)
+        if kind is EOUMetrics:
+            delay = metrics.end_of_utterance_delay
+            self._eou(delay)
+            self._stt(metrics.transcription_delay)
+            self._join(metrics.speech_id, 0, delay)
+        elif kind is LLMMetrics:
+            ttft = metrics.ttft
+            if ttft >= 0:
+                self._ttft(ttft)
+                self._join(metrics.speech_id, 1, ttft)
+        elif kind is TTSMetrics:
+            ttfb = metrics.ttfb
+            if ttfb >= 0:
+                self._ttfb(ttfb)
+                self._join(metrics.speech_id, 2, ttfb)
+
+    def _join(self, speech_id: Optional[str], part: int, seconds: float) -> None:
+        if not speech_id:
+            return
+        parts = self._pending.get(speech_id)
+        if parts is None:
+            if len(self._pending) >= self.max_pending_turns:
+                # turns without a spoken reply (interrupted, tool-only) never complete
+                del self._pending[next(iter(self._pending))]
+            parts = self._pending[speech_id] = [None, None, None]
+        # tool calls add LLM requests; the first one is the turn's
+        if parts[part] is None:
+            parts[part] = seconds
+        if None not in parts:
+            del self._pending[speech_id]
+            self._turn(parts[0] + parts[1] + parts[2])
+
+    def close(self) -> None:
+        if SESSION_METRICS.pop(self.session, None) is not None:
+            PROCESS_METRICS.merge(self.registry)
+
+
+# task -> the @function_tool it is running; each tool call of a session runs in a
+# task of its own, so concurrent calls are told apart
+_tool_tasks: dict[asyncio.Task, str] = {}
+
+
+def running_tool(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    """The ``@function_tool`` the task now running on ``loop`` is in, if any.
+
+    Only reads dicts, so it can be called from another thread (the loop watchdog).
+    """
+    task = asyncio.current_task(loop)
+    return _tool_tasks.get(task) if task is not None else None
+
+
+def timed_tool(fn):
+    """Record the duration of a tool method in ``tool_duration_seconds{tool=<name>}``.
+
+    Goes under ``@function_tool()`` so the tool keeps its name, signature and
+    docstring.
+    """
+    hist = PROCESS_METRICS.histogram("tool_duration_seconds", {"tool": fn.__name__})
+
+    @functools.wraps(fn)
+    async def wrapper(self, *args, **kwargs):
+        task = asyncio.current_task()
+        previous = _tool_tasks.get(task)
+        _tool_tasks[task] = fn.__name__
+        start = time.perf_counter()
+        try:
+            return await fn(self, *args, **kwargs)
+        finally:
+            hist.record(time.perf_counter() - start)
+            if previous is None:
+                del _tool_tasks[task]
+            else:
+                _tool_tasks[task] = previous
+
+    return wrapper
+
+
+def _write_json(directory: str, name: str, data: dict) -> str:
+    path = os.path.join(directory, name)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+def write_snapshot(directory: str) -> str:
+    """Atomically write this process's metrics to ``<directory>/<pid>.json``."""
+    os.makedirs(directory, exist_ok=True)
+    data = {
+        "pid": os.getpid(),
+        "time": time.time(),
+        "process": process_metrics().snapshot(),
+        "sessions": {name: reg.snapshot() for name, reg in SESSION_METRICS.items()},
+    }
+    return _write_json(directory, f"{os.getpid()}.json", data)
+
+
+def _read_snapshots(directory: str) -> tuple[Optional[dict], dict[str, dict]]:
+    """The cumulative snapshot (or None) and the per-pid ones by file name."""
+    cumulative = None
+    snapshots = {}
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue  # being replaced right now
+        if name == CUMULATIVE_FILE:
+            cumulative = data
+        else:
+            snapshots[name] = data
+    if cumulative is not None:
+        # files it already holds that were not deleted yet
+        for name, folded_time in cumulative["folded"].items():
+            if name in snapshots and snapshots[name]["time"] == folded_time:
+                del snapshots[name]
+    return cumulative, snapshots
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # someone else's process
+    return True
+
+
+_fold_lock = threading.Lock()
+
+
+def fold_snapshots(directory: str) -> int:
+    """Fold the snapshots of exited processes into ``cumulative.json``; returns how many.
+
+    A job process exits with its call, so without this the directory would
+    gain a file per call. ``cumulative.json`` lists the files it took in until
+    they are deleted, so a fold interrupted in between never counts one twice.
+    """
+    with _fold_lock:
+        cumulative, snapshots = _read_snapshots(directory)
+        registry = MetricsRegistry()
+        if cumulative is not None:
+            registry.merge_snapshot(cumulative["process"])
+            # taken in by the last fold but still on disk (_read_snapshots skipped them)
+            folded = {
+                name: folded_time
+                for name, folded_time in cumulative["folded"].items()
+                if name not in snapshots
+                and os.path.exists(os.path.join(directory, name))
+            }
+        else:
+            folded = {}
+        for name, data in snapshots.items():
+            if not _pid_alive(data["pid"]):
+                registry.merge_snapshot(data["process"])
+                folded[name] = data["time"]
+        if not folded:
+            return 0
+        data = {"time": time.time(), "process": registry.snapshot(), "folded": folded}
+        _write_json(directory, CUMULATIVE_FILE, data)
+        for name in folded:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(os.path.join(directory, name))
+        return len(folded)
+
+
+def merge_snapshots(
+    directory: str,
+    *,
+    max_age: Optional[float] = None,
+    sessions: Optional[dict[str, MetricsRegistry]] = None,
+) -> MetricsRegistry:
+    """Worker-wide registry: ``cumulative.json`` plus every per-pid snapshot in ``directory``.
+
+    Snapshots older than ``max_age`` seconds are left out: their process
+    either hangs or exited without being folded yet. The running sessions of
+    the others are added to ``sessions`` when it is given.
+    """
+    cumulative, snapshots = _read_snapshots(directory)
+    merged = MetricsRegistry()
+    if cumulative is not None:
+        merged.merge_snapshot(cumulative["process"])
+    now = time.time()
+    for data in snapshots.values():
+        if max_age is not None and now - data["time"] > max_age:
+            continue
+        merged.merge_snapshot(data["process"])
+        if sessions is not None:
+            for name, snapshot in data["sessions"].items():
+                sessions.setdefault(name, MetricsRegistry()).merge_snapshot(snapshot)
+    return merged
+
+
+def add_metrics_routes(server, directory: str, *, max_age: float) -> None:
+    """``/metrics`` (Prometheus text) and ``/snapshot`` (JSON summary), worker-wide.
+
+    For the worker process's server: the numbers come from the job processes'
+    snapshots in ``directory``, not from this process.
+    """
+
+    def _merge() -> tuple[MetricsRegistry, dict[str, MetricsRegistry]]:
+        fold_snapshots(directory)
+        sessions: dict[str, MetricsRegistry] = {}
+        return merge_snapshots(directory, max_age=max_age, sessions=sessions), sessions
+
+    async def _metrics(request: web.Request) -> web.Response:
+        # one file per running job; read them off the event loop
+        worker, sessions = await asyncio.get_running_loop().run_in_executor(
+            None, _merge
+        )
+        sources = [(worker, {})]
+        sources += [(reg, {"session": name}) for name, reg in sessions.items()]
+        return web.Response(text=to_prometheus(sources), content_type="text/plain")
+
+    async def _snapshot(request: web.Request) -> web.Response:
+        worker, sessions = await asyncio.get_running_loop().run_in_executor(
+            None, _merge
+        )
+        return web.json_response(
+            {
+                "worker": worker.summary(),
+                "sessions": {name: reg.summary() for name, reg in sessions.items()},
+            }
+        )
+
+    server.add_get("/metrics", _metrics)
+    server.add_get("/snapshot", _snapshot)
+
+
+async def fold_snapshots_every(directory: str, interval: float) -> None:
+    """Run ``fold_snapshots`` every ``interval`` seconds, off the event loop, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, fold_snapshots, directory
+            )
+        except OSError as e:
+            logger.warning("Could not fold metrics snapshots: %s", e)
+
+
+class SnapshotWriter:
+    """Writes ``write_snapshot`` every ``interval`` seconds, off the event loop."""
+
+    def __init__(self, directory: str, *, interval: float = 30.0) -> None:
+        self.directory = directory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="metrics_snapshots")
+
+    async def _write(self) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, write_snapshot, self.directory
+            )
+        except OSError as e:
+            logger.warning("Could not write metrics snapshot: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._write()
+
+    async def aclose(self) -> None:
+        """Stop and write one last snapshot."""
+        if self._task is not None:
+            await utils.aio.cancel_and_wait(self._task)
+            self._task = None
+        await self._write()
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else "metrics"
+    for key, row in merge_snapshots(directory).summary().items():
+        print(
+            f"{key:48s} n={row['count']:<7d} p50 {row['p50_ms']:8.1f} ms  "
+            f"p95 {row['p95_ms']:8.1f} ms  p99 {row['p99_ms']:8.1f} ms"
+        )
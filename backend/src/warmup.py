@@ -0,0 +1,101 @@
+"""Provider connection warm-up for job processes.
+
+``ConnectionWarmer`` opens a connection to every provider host as soon as a
+job starts, in parallel with joining the room. The connection goes through
+the job's shared ``http_session()``, so the DNS lookup and the TCP and TLS
+handshakes are done before the first STT/TTS request needs them. It then
+re-touches the hosts every ``interval`` seconds, well inside the session's
+keep-alive timeout, so the pooled connections stay open through quiet
+stretches of the call.
+
+Only hosts reached through ``http_session()`` are warmed. The Gemini LLM
+plugin talks to its API through google-genai's own httpx client, whose pool
+this session cannot fill, so its first request still pays for the handshake.
+
+Any HTTP response (even a 404) means the connection is up. Failures are
+logged at debug level and never affect the job.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from typing import Optional
+
+import aiohttp
+from livekit.agents import utils
+
+logger = logging.getLogger("agent.warmup")
+
+PROVIDER_URLS = (
+    "https://api.deepgram.com",
+    "https://global.api.murf.ai",
+)
+
+
+class ConnectionWarmer:
+    """Keeps one pooled connection per provider host open for a job.
+
+    Args:
+        urls: One URL per provider host.
+        interval: Seconds between keep-alive touches.
+        timeout: Per-request timeout.
+        session: HTTP session to warm; defaults to the job's ``http_session()``.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str] = PROVIDER_URLS,
+        *,
+        interval: float = 60.0,
+        timeout: float = 5.0,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> None:
+        self.urls = tuple(urls)
+        self.interval = interval
+        self.timeout = timeout
+        self._session = session
+        self._task: Optional[asyncio.Task] = None
+        self.warmed = asyncio.Event()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="connection_warmer")
+
+    async def warm_once(self) -> dict[str, float]:
+        """Touch every host concurrently; returns seconds per URL (-1 on failure)."""
+        session = self._session or utils.http_context.http_session()
+        results = await asyncio.gather(
+            *(self._touch(session, url) for url in self.urls)
+        )
+        return dict(zip(self.urls, results))
+
+    async def _touch(self, session: aiohttp.ClientSession, url: str) -> float:
+        start = time.perf_counter()
+        try:
+            async with session.head(
+                url,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                allow_redirects=False,
+            ) as resp:
+                await resp.read()
+        except Exception as e:
+            logger.debug("Warm-up of %s failed: %s", url, e)
+            return -1.0
+        return time.perf_counter() - start
+
+    async def _run(self) -> None:
+        timings = await self.warm_once()
+        self.warmed.set()
+        logger.info(
+            "Provider connections warmed: %s",
+            {u: round(t, 3) for u, t in timings.items()},
+        )
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.warm_once()
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            await utils.aio.cancel_and_wait(self._task)
+            self._task = None
@@ -0,0 +1,345 @@
+"""Worker load score for LiveKit's job admission.
+
+LiveKit stops sending jobs to a worker once its ``load_fnc`` reports at
+least ``load_threshold``. The default load is the host CPU alone, sampled
+every half second. Every session here also runs Silero VAD, BVC noise
+cancellation and the turn detector, and latency degrades well before the
+CPU reads 100%, so ``WorkerLoad`` reports the highest of four parts:
+
+- ``sessions``: running jobs against the calibrated ``max_sessions``,
+  scaled so the score reaches the threshold at exactly ``max_sessions``
+- ``cpu``: CPU time of the worker's process tree (job processes and the
+  inference process) per wall second, as a share of the available cores,
+  averaged over the last 2.5 s
+- ``lag``: p95 event-loop lag of the job processes (``loop_lag_seconds``)
+  against ``lag_budget``
+- ``turn``: p95 ``turn_latency_seconds`` against ``turn_budget``
+
+The last two come from the samples added to the job processes' metrics
+snapshots (``turn_metrics.SnapshotWriter``) since the previous read, one
+read per ``window``. A window with fewer than ``min_samples`` samples scores
+0: a single slow LLM reply on a quiet worker is not load.
+
+``calibrate`` turns a ``benchmarks/load_test.py --json`` report into the
+per-session CPU cost and a concurrency limit for ``AGENT_MAX_SESSIONS``::
+
+    uv run python benchmarks/load_test.py --sessions 2,4,8,16 --json load.json
+    python src/worker_load.py calibrate load.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+import psutil
+from livekit.agents import utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+from turn_metrics import CUMULATIVE_FILE, LogHistogram
+
+logger = logging.getLogger("agent.load")
+
+LAG_METRIC = "loop_lag_seconds"
+TURN_METRIC = "turn_latency_seconds"
+
+
+class SnapshotWindow:
+    """Samples added to some histograms across the per-pid snapshots since the last ``read``.
+
+    Only snapshot files modified since the previous read are parsed; a job
+    process's counts only grow, so its delta is the new samples. The first
+    read only takes the baseline: files left from earlier runs add nothing.
+    Files not modified for ``max_age`` seconds belong to jobs that are over
+    and are neither read nor remembered, so the state stays as small as the
+    number of running jobs.
+    """
+
+    def __init__(
+        self, directory: str, names: tuple[str, ...], *, max_age: float = 300.0
+    ) -> None:
+        self.directory = directory
+        self.names = names
+        self.max_age = max_age
+        # file name -> (mtime, counts per histogram at the last read)
+        self._seen: dict[str, tuple[float, dict[str, list[int]]]] = {}
+        self._primed = False
+
+    def read(self) -> dict[str, LogHistogram]:
+        window = {name: LogHistogram() for name in self.names}
+        present = set()
+        oldest = time.time() - self.max_age
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            # the cumulative file only grows by samples already read from a job's file
+            if not entry.name.endswith(".json") or entry.name == CUMULATIVE_FILE:
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+                if mtime < oldest:
+                    continue
+                present.add(entry.name)
+                previous = self._seen.get(entry.name)
+                if previous is not None and previous[0] == mtime:
+                    continue
+                with open(entry.path) as f:
+                    process = json.load(f)["process"]
+            except (OSError, ValueError, KeyError):
+                continue  # being replaced right now
+            counts = {}
+            for name in self.names:
+                if name not in process:
+                    continue
+                now = counts[name] = LogHistogram.from_snapshot(process[name]).counts
+                before = previous[1].get(name) if previous is not None else None
+                if not self._primed:
+                    continue
+                delta = window[name].counts
+                for index, n in enumerate(now):
+                    if n:
+                        delta[index] += n - before[index] if before else n
+            self._seen[entry.name] = (mtime, counts)
+        for name in self._seen.keys() - present:
+            del self._seen[name]
+        self._primed = True
+        return window
+
+
+class WorkerLoad:
+    """``load_fnc`` for ``WorkerOptions``: the highest of the session, CPU, lag and turn parts.
+
+    Args:
+        metrics_dir: Where the job processes write their metrics snapshots;
+            None leaves out the lag and turn parts.
+        max_sessions: Sessions at which the score reaches ``threshold``;
+            0 leaves out the session part.
+        threshold: The ``load_threshold`` given to the worker.
+        lag_budget: Event-loop lag p95 (seconds) that scores 1.
+        turn_budget: Turn latency p95 (seconds) that scores 1.
+        window: Seconds between reads of the snapshots.
+        min_samples: Samples a window needs before its p95 counts.
+    """
+
+    def __init__(
+        self,
+        metrics_dir: Optional[str] = None,
+        *,
+        max_sessions: int = 0,
+        threshold: float = 0.75,
+        lag_budget: float = 0.05,
+        turn_budget: float = 2.5,
+        window: float = 30.0,
+        min_samples: int = 10,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.threshold = threshold
+        self.lag_budget = lag_budget
+        self.turn_budget = turn_budget
+        self.window = window
+        self.min_samples = min_samples
+        self.parts = {"sessions": 0.0, "cpu": 0.0, "lag": 0.0, "turn": 0.0}
+        self.load = 0.0
+        self._snapshots = (
+            # a running job rewrites its snapshot every window or so
+            SnapshotWindow(metrics_dir, (LAG_METRIC, TURN_METRIC), max_age=10 * window)
+            if metrics_dir
+            else None
+        )
+        self._next_read = 0.0
+        self._cores = get_cpu_monitor().cpu_count()
+        self._cpu = utils.MovingAverage(5)
+        self._root = psutil.Process()
+        # pid -> CPU seconds at the last sample
+        self._cpu_seen: dict[int, float] = {}
+        self._sampled_at = 0.0
+
+    @classmethod
+    def from_env(
+        cls, metrics_dir: Optional[str], threshold: float, *, window: float = 30.0
+    ) -> "WorkerLoad":
+        return cls(
+            metrics_dir,
+            max_sessions=int(os.getenv("AGENT_MAX_SESSIONS", "0")),
+            threshold=threshold,
+            lag_budget=float(os.getenv("AGENT_LOAD_LAG_MS", "50")) / 1000,
+            turn_budget=float(os.getenv("AGENT_LOAD_TURN_P95_MS", "2500")) / 1000,
+            window=float(os.getenv("AGENT_LOAD_WINDOW_S", str(window))),
+        )
+
+    def __call__(self, worker) -> float:
+        # called from a thread of the worker's executor every 0.5 s
+        return self.update(len(worker.active_jobs))
+
+    def update(self, sessions: int) -> float:
+        """Score for ``sessions`` running jobs, in [0, 1]."""
+        now = time.monotonic()
+        parts = self.parts
+        parts["sessions"] = (
+            sessions / self.max_sessions * self.threshold if self.max_sessions else 0.0
+        )
+        parts["cpu"] = self._sample_cpu(now)
+        if self._snapshots is not None and now >= self._next_read:
+            self._next_read = now + self.window
+            window = self._snapshots.read()
+            parts["lag"] = self._p95_share(window[LAG_METRIC], self.lag_budget)
+            parts["turn"] = self._p95_share(window[TURN_METRIC], self.turn_budget)
+        load = min(1.0, max(parts.values()))
+        if (load >= self.threshold) != (self.load >= self.threshold):
+            logger.info(
+                "Worker load %.2f %s the threshold %.2f (%s)",
+                load,
+                "reached" if load >= self.threshold else "back under",
+                self.threshold,
+                ", ".join(f"{name} {value:.2f}" for name, value in parts.items()),
+            )
+        self.load = load
+        return load
+
+    def _p95_share(self, hist: LogHistogram, budget: float) -> float:
+        if hist.count < self.min_samples:
+            return 0.0
+        return hist.quantile(0.95) / budget
+
+    def _sample_cpu(self, now: float) -> float:
+        """Share of the cores the process tree used since the last call, averaged."""
+        used = 0.0
+        seen = {}
+        for proc in [self._root, *self._root.children(recursive=True)]:
+            try:
+                times = proc.cpu_times()
+            except psutil.Error:
+                continue  # exited in between
+            seen[proc.pid] = cpu = times.user + times.system
+            used += cpu - self._cpu_seen.get(
+                proc.pid, cpu if not self._sampled_at else 0.0
+            )
+        self._cpu_seen = seen
+        if self._sampled_at:
+            self._cpu.add_sample(
+                max(0.0, used) / (now - self._sampled_at) / self._cores
+            )
+        self._sampled_at = now
+        return self._cpu.get_avg()
+
+
+def calibrate(
+    report: dict, *, threshold: float, lag_budget_ms: float, turn_budget_ms: float
+) -> dict:
+    """Per-session CPU cost and the largest safe concurrency from a load-test report."""
+    levels = [level for level in report["levels"] if "error" not in level]
+    if not levels:
+        raise ValueError("the report has no completed load level")
+    sessions = [level["sessions"] for level in levels]
+    cores_used = [level["cpu_cores"] for level in levels]
+    cores = levels[-1]["cpu_cores"] / (levels[-1]["cpu_host_percent"] / 100)
+
+    # cores used = base + per_session * sessions, least squares over the levels
+    if len(levels) > 1:
+        mean_s, mean_c = (
+            sum(sessions) / len(sessions),
+            sum(cores_used) / len(cores_used),
+        )
+        per_session = sum(
+            (s - mean_s) * (c - mean_c) for s, c in zip(sessions, cores_used)
+        ) / sum((s - mean_s) ** 2 for s in sessions)
+        base = max(0.0, mean_c - per_session * mean_s)
+    else:
+        per_session, base = cores_used[0] / sessions[0], 0.0
+    cpu_limit = (
+        (threshold * cores - base) / per_session if per_session > 0 else float("inf")
+    )
+
+    # where the load score's lag or turn part crosses the threshold, between measured levels;
+    # load_test reports lag p99, which stands in for the p95 the score uses
+    def share(level: dict) -> float:
+        turn = level["turn_metrics_ms"].get(TURN_METRIC, {}).get("p95_ms", 0.0)
+        return max(level["loop_lag_p99_ms"] / lag_budget_ms, turn / turn_budget_ms)
+
+    latency_limit = float("inf")
+    previous = None
+    for level in levels:
+        if share(level) >= threshold:
+            if previous is None:
+                latency_limit = level["sessions"] * threshold / share(level)
+            else:
+                s0, v0 = previous["sessions"], share(previous)
+                latency_limit = s0 + (level["sessions"] - s0) * (threshold - v0) / (
+                    share(level) - v0
+                )
+            break
+        previous = level
+
+    memory_limit = levels[-1]["memory_limit_sessions"]
+    limits = {"cpu": cpu_limit, "latency": latency_limit, "memory": memory_limit}
+    bound = min(limits, key=limits.get)
+    return {
+        "cores": round(cores, 2),
+        "base_cores": round(base, 3),
+        "cores_per_session": round(per_session, 4),
+        "limits": {
+            name: (round(v, 1) if v != float("inf") else None)
+            for name, v in limits.items()
+        },
+        "bound_by": bound,
+        "max_sessions": max(1, int(limits[bound])),
+        "measured_up_to": max(sessions),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker load score tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_cal = sub.add_parser(
+        "calibrate", help="suggest AGENT_MAX_SESSIONS from a load_test.py --json report"
+    )
+    p_cal.add_argument("report")
+    p_cal.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.getenv("AGENT_LOAD_THRESHOLD", "0.75")),
+    )
+    p_cal.add_argument(
+        "--lag-ms", type=float, default=float(os.getenv("AGENT_LOAD_LAG_MS", "50"))
+    )
+    p_cal.add_argument(
+        "--turn-p95-ms",
+        type=float,
+        default=float(os.getenv("AGENT_LOAD_TURN_P95_MS", "2500")),
+    )
+    args = parser.parse_args()
+
+    with open(args.report) as f:
+        report = json.load(f)
+    try:
+        result = calibrate(
+            report,
+            threshold=args.threshold,
+            lag_budget_ms=args.lag_ms,
+            turn_budget_ms=args.turn_p95_ms,
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+    print(
+        f"{result['cores']:.1f} cores; {result['base_cores']:.3f} cores idle + "
+        f"{result['cores_per_session']:.4f} cores per session"
+    )
+    for name, limit in result["limits"].items():
+        print(
+            f"  {name:<8} limit {'-' if limit is None else f'{limit:.1f}':>8} sessions"
+        )
+    print(f"suggested (bound by {result['bound_by']}, threshold {args.threshold}):")
+    print(f"AGENT_MAX_SESSIONS={result['max_sessions']}")
+    if result["max_sessions"] > result["measured_up_to"]:
+        print(
+            f"(extrapolated beyond the largest measured level, {result['measured_up_to']} sessions)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from livekit.agents import llm
+
+from agent import CoffeeBarista
+from order_feed import OrderFeed
+from order_journal import OrderJournal
+from store_config import StoreConfig
+from token_allocator import TokenAllocator
+from transport import DataTransport
+
+
+def barista(directory) -> CoffeeBarista:
+    return CoffeeBarista(
+        order_journal=OrderJournal(str(directory)),
+        order_feed=OrderFeed(),
+        token_allocator=TokenAllocator(str(directory / "tokens")),
+        data_transport=DataTransport(None),
+    )
+
+
+def said(text: str) -> llm.ChatMessage:
+    return llm.ChatMessage(role="user", content=[text])
+
+
+def test_prefill_keeps_the_order_name(tmp_path):
+    agent = barista(tmp_path)
+    agent.order_state["name"] = "Priya"
+
+    filled = agent._prefill(said("and this is Sam's, a large mocha"))
+
+    assert agent.order_state["name"] == "Priya"
+    assert sorted(filled) == ["drinkType", "size"]
+    assert agent.order_state["items"][0]["size"] == "large"
+
+
+def test_prefill_fills_an_empty_name(tmp_path):
+    agent = barista(tmp_path)
+
+    agent._prefill(said("Hi, this is Sam's order, a small latte"))
+
+    assert agent.order_state["name"] == "Sam"
+
+
+def test_questions_offer_the_store_menu(tmp_path):
+    store = StoreConfig(
+        menu=(
+            ("DRK-CHAI", "drink", "Masala Chai", ()),
+            ("SZ-CUT", "size", "cutting", ()),
+            ("SZ-FULL", "size", "full", ()),
+            ("MILK-REG", "milk", "regular", ()),
+            ("MILK-NONE", "milk", "none", ()),
+            ("EXT-GINGER", "extra", "ginger", ()),
+        )
+    )
+    agent = CoffeeBarista(
+        order_journal=OrderJournal(str(tmp_path)),
+        order_feed=OrderFeed(),
+        token_allocator=TokenAllocator(str(tmp_path / "tokens")),
+        data_transport=DataTransport(None),
+        store_config=store,
+    )
+    agent.order_state["name"] = "Priya"
+    agent._prefill(said("one masala chai"))
+
+    assert agent._next_step() == "Next: ask what size - cutting or full."
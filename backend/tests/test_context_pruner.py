@@ -0,0 +1,90 @@
+from livekit.agents import llm
+
+from context_pruner import SUMMARY_ID, ContextPruner
+from prompt_budget import estimate_chat_tokens
+
+INSTRUCTIONS = "You are a friendly barista at Blue Tokai. " * 20
+
+
+def order_turns(chat_ctx: llm.ChatContext, n: int) -> None:
+    """One customer's order: three turns, the last one saving it through a tool call."""
+    chat_ctx.add_message(
+        role="user", content=f"Hi, I'm Guest {n}, a large oat latte please"
+    )
+    chat_ctx.add_message(role="assistant", content="Lovely! Any extras with that?")
+    chat_ctx.add_message(role="user", content="Caramel drizzle, and make it iced")
+    chat_ctx.add_message(
+        role="assistant", content="An iced large oat latte with caramel."
+    )
+    chat_ctx.add_message(role="user", content="Yes, that's right")
+    chat_ctx.items.append(
+        llm.FunctionCall(call_id=f"call_{n}", name="save_order", arguments="{}")
+    )
+    chat_ctx.items.append(
+        llm.FunctionCallOutput(
+            call_id=f"call_{n}",
+            name="save_order",
+            output=f"Saved BT-{n:04d} for Guest {n}",
+            is_error=False,
+        )
+    )
+    chat_ctx.add_message(role="assistant", content=f"Your token is BT-{n:04d}.")
+
+
+def run_orders(orders: int, pruner: ContextPruner) -> list[int]:
+    """Estimated tokens of the context after every order, pruned as the agent does."""
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content=INSTRUCTIONS)
+    sizes = []
+    for n in range(orders):
+        order_turns(chat_ctx, n)
+        pruner.order_saved(f"BT-{n:04d} for Guest {n}: large iced oat latte, caramel")
+        # once the reply is spoken
+        chat_ctx = pruner.prune(chat_ctx) or chat_ctx
+        sizes.append(estimate_chat_tokens(chat_ctx))
+    return sizes
+
+
+def test_pruned_context_stays_bounded_over_100_orders():
+    pruner = ContextPruner(1500, max_orders=5)
+    sizes = run_orders(100, pruner)
+
+    assert max(sizes) <= 1500
+    # the summary lists five orders at most, so the context stops growing
+    # (only the "+N older" count gains digits)
+    assert max(sizes[10:]) - min(sizes[10:]) <= 2
+
+    unpruned = run_orders(100, ContextPruner(0))
+    assert unpruned[-1] > 10 * sizes[-1]
+
+
+def test_summary_keeps_the_last_orders():
+    pruner = ContextPruner(1500, max_orders=5)
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content=INSTRUCTIONS)
+    for n in range(12):
+        order_turns(chat_ctx, n)
+        pruner.order_saved(f"BT-{n:04d} for Guest {n}")
+        chat_ctx = pruner.prune(chat_ctx) or chat_ctx
+
+    assert [item.role for item in chat_ctx.items] == ["system", "user"]
+    summary = chat_ctx.items[1]
+    assert summary.id == SUMMARY_ID
+    assert "BT-0011 for Guest 11" in summary.text_content
+    assert "BT-0006" not in summary.text_content
+    assert "(+7 older)" in summary.text_content
+
+
+def test_within_an_order_the_newest_turn_is_kept():
+    pruner = ContextPruner(200)
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="Short instructions.")
+    for n in range(30):
+        chat_ctx.add_message(role="user", content=f"Tell me about bean number {n} " * 5)
+        chat_ctx.add_message(role="assistant", content="It is a lovely bean. " * 5)
+
+    pruned = pruner.prune(chat_ctx)
+
+    assert estimate_chat_tokens(pruned) <= 200
+    assert pruned.items[0].role == "system"
+    assert pruned.items[-2].text_content == chat_ctx.items[-2].text_content
@@ -0,0 +1,19 @@
+import asyncio
+import time
+
+from loop_watchdog import sample_loop_lag
+from turn_metrics import MetricsRegistry
+
+
+async def test_sampler_records_how_late_the_loop_runs():
+    registry = MetricsRegistry()
+    sampler = asyncio.create_task(sample_loop_lag(0.01, registry=registry))
+    await asyncio.sleep(0.005)
+    # hold the loop past the sampler's next wake-up
+    time.sleep(0.1)
+    await asyncio.sleep(0.05)
+    sampler.cancel()
+
+    lag = registry.histogram("loop_lag_seconds")
+    assert lag.count >= 2
+    assert lag.quantile(1.0) >= 0.05
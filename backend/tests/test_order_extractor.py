@@ -0,0 +1,78 @@
+import pytest
+
+from menu_catalog import MenuCatalog
+from order_extractor import extract_order_slots
+
+
+@pytest.mark.parametrize(
+    ("text", "name"),
+    [
+        ("my name is priya, a large latte", "Priya"),
+        ("Hello! Name's Meera", "Meera"),
+        ("This is Jenna, one cold brew", "Jenna"),
+        ("Call me Arjun, the mocha I guess", "Arjun"),
+    ],
+)
+def test_name_is_extracted(text, name):
+    assert extract_order_slots(text)["name"] == name
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "this is my first time here",
+        "This is my first time, what's good?",
+        "this is it, thanks",
+        "This is it",
+        "call me when it's ready",
+        "Call me maybe",
+        "this is Actually a cold brew",
+        "my name is not important, just a latte",
+    ],
+)
+def test_no_name_from_common_words(text):
+    assert "name" not in extract_order_slots(text)
+
+
+def test_order_fields():
+    slots = extract_order_slots(
+        "Iced latte, medium, skim milk and caramel drizzle please"
+    )
+    assert slots == {
+        "drinkType": "Iced Latte",
+        "size": "medium",
+        "milk": "skim",
+        "extras": ["caramel drizzle"],
+    }
+
+
+def test_explicit_no_extras():
+    assert extract_order_slots("That's it")["extras"] == []
+
+
+def test_possessive_name_loses_its_s():
+    assert extract_order_slots("and this is Sam's, a large mocha")["name"] == "Sam"
+
+
+def test_fields_come_from_the_store_menu():
+    menu = MenuCatalog(
+        (
+            ("DRK-CHAI", "drink", "Masala Chai", ("cutting chai",)),
+            ("SZ-S", "size", "small", ()),
+            ("SZ-L", "size", "large", ()),
+            ("MILK-REG", "milk", "regular", ()),
+            ("MILK-CASHEW", "milk", "cashew", ()),
+            ("MILK-NONE", "milk", "none", ("black",)),
+            ("EXT-GINGER", "extra", "ginger", ("adrak",)),
+        )
+    )
+
+    slots = extract_order_slots("a large cutting chai with cashew and adrak", menu)
+
+    assert slots == {
+        "drinkType": "Masala Chai",
+        "size": "large",
+        "milk": "cashew",
+        "extras": ["ginger"],
+    }
+    assert extract_order_slots("a latte with oat milk", menu) == {}
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import aiohttp
+
+from local_http import LocalHTTPServer
+from order_feed import OrderFeed, OrderRelay, add_feed_routes
+
+
+def order(n: int) -> dict:
+    return {
+        "name": f"Guest {n}",
+        "items": [
+            {"drinkType": "Latte", "size": "medium", "milk": "oat", "extras": []}
+        ],
+        "token_number": f"BT-{n:06d}",
+        "timestamp": "2026-01-01T08:00:00",
+    }
+
+
+async def read_events(resp: aiohttp.ClientResponse, count: int) -> list[dict]:
+    events = []
+    event: dict = {}
+    async for line in resp.content:
+        line = line.decode().rstrip("\n")
+        if not line:
+            if event:
+                events.append(event)
+                event = {}
+            if len(events) == count:
+                return events
+        elif not line.startswith(":"):
+            field, _, value = line.partition(": ")
+            event[field] = value
+    return events
+
+
+async def test_orders_of_every_call_reach_one_feed():
+    feed = OrderFeed()
+    server = LocalHTTPServer(0)
+    add_feed_routes(server, feed)
+    port = await server.start()
+    url = f"http://127.0.0.1:{port}"
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{url}/orders/feed") as resp:
+                # one relay per job process, each gone after its call
+                for call in range(3):
+                    relay = OrderRelay(f"{url}/orders/publish")
+                    relay.publish(order(call))
+                    await relay.aclose()
+                events = await asyncio.wait_for(read_events(resp, 3), 5)
+            assert [e["id"] for e in events] == [f"{feed.epoch}:{n}" for n in (1, 2, 3)]
+            assert [json.loads(e["data"])["token_number"] for e in events] == [
+                "BT-000000",
+                "BT-000001",
+                "BT-000002",
+            ]
+
+            # a display that saw the first order resumes after it
+            headers = {"Last-Event-ID": f"{feed.epoch}:1"}
+            async with session.get(f"{url}/orders/feed", headers=headers) as resp:
+                events = await asyncio.wait_for(read_events(resp, 2), 5)
+            assert [e["event"] for e in events] == ["order", "order"]
+            assert events[-1]["id"] == f"{feed.epoch}:3"
+    finally:
+        await feed.aclose()
+        await server.aclose()
+
+
+def test_resume_past_the_history_is_a_gap():
+    feed = OrderFeed(history=2)
+    for n in range(3):
+        feed.publish(order(n))
+
+    sub = feed.subscribe(after=0)
+    assert sub.gap
+    assert [seq for seq, _ in sub._pending] == [2, 3]
@@ -0,0 +1,69 @@
+import asyncio
+import multiprocessing
+import os
+from datetime import datetime
+
+import pytest
+
+import order_journal
+from order_journal import OrderJournal, read_journal
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 11, 23, 23, 59, 59)
+
+
+@pytest.fixture(autouse=True)
+def frozen_day(monkeypatch):
+    """Every segment in a test belongs to the same day, even across midnight."""
+    monkeypatch.setattr(order_journal, "datetime", FrozenDatetime)
+
+
+def journal_calls(directory: str, first: int, count: int) -> None:
+    """One job process: a journal per call, as each call gets a fresh process."""
+    for call in range(first, first + count):
+        journal = OrderJournal(directory, durability="none")
+        record = {"token_number": f"BT-{call:04d}", "timestamp": f"{call:04d}"}
+        asyncio.run(journal.submit(record))
+        journal.close()
+
+
+def segments(directory) -> list[str]:
+    return sorted(name for name in os.listdir(directory) if name.endswith(".jsonl"))
+
+
+def test_job_processes_share_the_daily_segment(tmp_path):
+    context = multiprocessing.get_context("fork")
+    jobs = [
+        context.Process(target=journal_calls, args=(str(tmp_path), first, 10))
+        for first in range(0, 40, 10)
+    ]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+    assert [job.exitcode for job in jobs] == [0] * 4
+
+    assert len(segments(tmp_path)) == 1
+    orders = read_journal(str(tmp_path))
+    assert [o["token_number"] for o in orders] == [f"BT-{n:04d}" for n in range(40)]
+
+
+def test_full_segment_moves_on(tmp_path):
+    journal_calls(str(tmp_path), 0, 1)
+    journal = OrderJournal(str(tmp_path), durability="none", max_bytes=1)
+    for call in range(1, 3):
+        record = {"token_number": f"BT-{call:04d}", "timestamp": f"{call:04d}"}
+        asyncio.run(journal.submit(record))
+        journal.flush()
+    journal.close()
+
+    names = segments(tmp_path)
+    assert names == [
+        "orders-20251123-0001.jsonl",
+        "orders-20251123-0002.jsonl",
+        "orders-20251123-0003.jsonl",
+    ]
+    assert len(read_journal(str(tmp_path))) == 3
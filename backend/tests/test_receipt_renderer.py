@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+
+from receipt_renderer import STATIC_CSS, ReceiptRenderer
+
+# Written by the original CoffeeBarista._generate_html_receipt for these orders
+BASELINE = Path(__file__).parent / "data" / "receipts"
+
+ORDERS = {
+    "hot_latte": (
+        {"name": "Priya", "drinkType": "Latte", "size": "medium", "milk": "oat"},
+        [],
+    ),
+    "iced_whipped": (
+        {"name": "Sam", "drinkType": "Iced Latte", "size": "large", "milk": "soy"},
+        ["vanilla syrup", "whipped cream"],
+    ),
+    "small_extra_shot": (
+        {
+            "name": "Arjun",
+            "drinkType": "Cappuccino",
+            "size": "small",
+            "milk": "regular",
+        },
+        ["extra shot"],
+    ),
+}
+
+
+def baseline_order(n: int, name: str) -> tuple[dict, str]:
+    fields, extras = ORDERS[name]
+    order = {**fields, "extras": extras, "timestamp": f"2025-11-23T08:0{n}:00"}
+    return order, f"BT-20251123-{n:04d}"
+
+
+@pytest.mark.parametrize("n, name", list(enumerate(ORDERS, 1)))
+def test_render_matches_the_baseline_byte_for_byte(n, name):
+    renderer = ReceiptRenderer()
+    order, token = baseline_order(n, name)
+    expected = (BASELINE / f"{name}.html").read_bytes()
+
+    assert renderer.render(order, token).encode() == expected
+    # the second render comes from the drink's cached chunks
+    assert renderer.render(order, token).encode() == expected
+    assert renderer.cache_info().hits == 1
+
+
+def test_cart_items_are_cached_per_drink():
+    renderer = ReceiptRenderer()
+    order, token = baseline_order(1, "hot_latte")
+    latte = {key: order[key] for key in ("drinkType", "size", "milk", "extras")}
+    cart = dict(order, items=[latte, latte, dict(latte, size="large")])
+
+    receipt = renderer.render(cart, token)
+
+    assert receipt.count('<div class="cup"') == 3
+    assert renderer._item_blocks.cache_info().currsize == 2
+
+
+def test_hoisted_stylesheet_keeps_only_the_cup_rule_inline(tmp_path):
+    renderer = ReceiptRenderer(stylesheet_href="receipt.css")
+    order, token = baseline_order(2, "iced_whipped")
+
+    receipt = renderer.render(order, token)
+
+    assert '<link rel="stylesheet" href="receipt.css">' in receipt
+    assert ".cup { height: 180px; background: #87CEEB; }" in receipt
+    assert ".token-number" not in receipt
+    path = renderer.write_stylesheet(str(tmp_path))
+    assert Path(path).read_text() == STATIC_CSS
+
+
+def test_markup_in_the_name_is_escaped():
+    order, token = baseline_order(1, "hot_latte")
+    order["name"] = "<script>alert(1)</script>"
+
+    receipt = ReceiptRenderer().render(order, token)
+
+    assert "<script>" not in receipt
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in receipt
@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import session_recorder
+from session_recorder import SessionRecorder, _index_files, read_trail
+
+# 2025-11-23 23:59:59 UTC, one second before the hourly segment window changes
+FROZEN = 1763942399.0
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    """Every segment in a test belongs to the same window, even across the hour."""
+    clock = SimpleNamespace(time=lambda: FROZEN, monotonic=time.monotonic)
+    monkeypatch.setattr(session_recorder, "time", clock)
+
+
+def record_calls(directory: str, first: int, count: int) -> None:
+    """One job process: a recorder per call, as each call gets a fresh process."""
+    for call in range(first, first + count):
+        recorder = SessionRecorder(directory, codec="gzip", flush_interval=0)
+        trail = recorder.trail(f"call-{call}", f"room-{call}")
+        for n in range(20):
+            trail.record("message", role="user", text=f"turn {n}", interrupted=False)
+        trail.order({"token_number": f"BT-{call:04d}", "items": []})
+        trail.end()
+        recorder.close()
+
+
+def test_job_processes_share_one_segment(tmp_path):
+    context = multiprocessing.get_context("fork")
+    jobs = [
+        context.Process(target=record_calls, args=(str(tmp_path), first, 10))
+        for first in range(0, 40, 10)
+    ]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+    assert [job.exitcode for job in jobs] == [0] * 4
+
+    assert len(_index_files(str(tmp_path))) == 1
+    trails = read_trail(str(tmp_path), token="BT-0025")
+    assert list(trails) == ["call-25"]
+    assert [r["type"] for r in trails["call-25"]].count("message") == 20
+
+
+def test_full_segment_moves_on(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), codec="gzip", max_bytes=1)
+    for call in range(3):
+        trail = recorder.trail(f"call-{call}", f"room-{call}")
+        trail.end()
+        recorder.flush()
+    recorder.close()
+
+    stamp = datetime.fromtimestamp(FROZEN // 3600 * 3600).strftime("%Y%m%d-%H%M%S")
+    segments = sorted(path[: -len(".idx")] for path in _index_files(str(tmp_path)))
+    assert [os.path.basename(path) for path in segments] == [
+        f"sessions-{stamp}-0001.jsonl.gz",
+        f"sessions-{stamp}-0002.jsonl.gz",
+        f"sessions-{stamp}-0003.jsonl.gz",
+    ]
+    assert list(read_trail(str(tmp_path), session="call-1")) == ["call-1"]
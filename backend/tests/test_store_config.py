@@ -0,0 +1,44 @@
+import json
+import os
+import time
+
+from store_config import DEFAULT_STORE_CONFIG, StoreConfigFile
+
+
+def write_store(path, brand: str) -> None:
+    data = DEFAULT_STORE_CONFIG.to_dict()
+    data["brand"] = brand
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def test_current_never_touches_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "store.json"
+    write_store(path, "Store 1")
+    holder = StoreConfigFile(str(path), check_interval=0)
+    write_store(path, "Store 2")
+
+    monkeypatch.setattr(os, "stat", None)
+    assert holder.current().brand == "Store 1"
+    monkeypatch.undo()
+
+    assert holder.check()
+    assert holder.current().brand == "Store 2"
+    assert not holder.check()
+
+
+def test_the_thread_picks_up_a_replaced_file(tmp_path):
+    path = tmp_path / "store.json"
+    write_store(path, "Store 1")
+    holder = StoreConfigFile(str(path), check_interval=0.01)
+    try:
+        write_store(path, "Store 2")
+        deadline = time.monotonic() + 5
+        while holder.current().brand != "Store 2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert holder.current().brand == "Store 2"
+        assert holder.reloads == 1
+    finally:
+        holder.close()
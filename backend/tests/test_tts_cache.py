@@ -0,0 +1,175 @@
+import asyncio
+
+import aiohttp
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, tokenize, tts, utils
+
+from tts_cache import CachedTTS, PhraseAudioCache, precompute_in_background
+
+SAMPLE_RATE = 16000
+
+
+class FakeTTS(tts.TTS):
+    """Two bytes of PCM per character; records what reached it and how."""
+
+    def __init__(self, *, streaming: bool = True) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=streaming),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.streamed: list[str] = []
+        self.synthesized: list[str] = []
+
+    def synthesize(self, text, *, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        self.synthesized.append(text)
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        return FakeStream(tts=self, conn_options=conn_options)
+
+
+def pcm(text: str) -> bytes:
+    return text.encode("ascii")[:1] * 2 * len(text)
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        output_emitter.push(pcm(self._input_text))
+        output_emitter.flush()
+
+
+class FakeStream(tts.SynthesizeStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        text = ""
+        async for data in self._input_ch:
+            if isinstance(data, str):
+                text += data
+        self._tts.streamed.append(text)
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        output_emitter.push(pcm(text))
+        output_emitter.end_input()
+
+
+GREETING = "Hello! Welcome in."
+
+
+def cached_tts(fake: FakeTTS, directory, **kwargs) -> CachedTTS:
+    return CachedTTS(
+        fake,
+        PhraseAudioCache(str(directory), **kwargs),
+        voice="en-US-natalie",
+        phrases=(GREETING, "Sure thing."),
+        sentence_tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+    )
+
+
+async def speak(speaker: tts.TTS, text: str) -> bytes:
+    """PCM out of ``speaker``, without the silence the emitter pads frames with."""
+    audio = b""
+    async with speaker.stream() as stream:
+        stream.push_text(text)
+        stream.end_input()
+        async for ev in stream:
+            audio += ev.frame.data.tobytes()
+    return audio.rstrip(b"\0")
+
+
+async def test_miss_then_hit(tmp_path):
+    fake = FakeTTS()
+    cached = cached_tts(fake, tmp_path)
+
+    first = await speak(cached, GREETING)
+    await asyncio.gather(*cached._write_tasks)
+    second = await speak(cached, GREETING)
+
+    assert first == second == pcm("Hello!") + pcm("Welcome in.")
+    assert fake.streamed == ["Hello!", "Welcome in."]
+    assert cached._cache.stats()["hits"] == 2
+
+
+async def test_miss_uses_the_wrapped_stream(tmp_path):
+    fake = FakeTTS()
+    cached = cached_tts(fake, tmp_path)
+
+    await speak(cached, "Got it. What size would you like?")
+
+    assert fake.streamed == ["Got it.", "What size would you like?"]
+    assert fake.synthesized == []
+
+
+async def test_miss_without_streaming_synthesizes(tmp_path):
+    fake = FakeTTS(streaming=False)
+    cached = cached_tts(fake, tmp_path)
+
+    assert await speak(cached, "Sure thing.") == pcm("Sure thing.")
+    assert fake.synthesized == ["Sure thing."]
+
+
+async def test_only_fixed_phrases_are_cached(tmp_path):
+    fake = FakeTTS()
+    cached = cached_tts(fake, tmp_path)
+
+    for _ in range(2):
+        await speak(cached, "Sure thing. Thank you, Priya!")
+        await asyncio.gather(*cached._write_tasks)
+
+    assert fake.streamed == ["Sure thing.", "Thank you, Priya!", "Thank you, Priya!"]
+    assert cached._cache.stats()["phrases"] == 1
+
+
+async def test_new_process_reads_what_another_wrote(tmp_path):
+    writer = cached_tts(FakeTTS(), tmp_path)
+    await speak(writer, "Sure thing.")
+    await asyncio.gather(*writer._write_tasks)
+
+    fake = FakeTTS()
+    assert await speak(cached_tts(fake, tmp_path), "Sure thing.") == pcm("Sure thing.")
+    assert fake.streamed == []
+
+
+def test_lru_eviction(tmp_path):
+    cache = PhraseAudioCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8
+
+
+def test_precompute_in_background_gets_its_own_http_session(tmp_path):
+    cache = PhraseAudioCache(str(tmp_path))
+    sessions = []
+
+    def make_tts(http_session):
+        sessions.append(http_session)
+        return FakeTTS(streaming=False)
+
+    precompute_in_background(
+        make_tts,
+        cache,
+        [GREETING],
+        voice="en-US-natalie",
+        sentence_tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+    ).join(timeout=5)
+
+    assert len(sessions) == 1
+    assert isinstance(sessions[0], aiohttp.ClientSession)
+    assert sessions[0].closed
+    assert cache.stats()["phrases"] == 2
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import time
+
+import turn_metrics
+from turn_metrics import (
+    CUMULATIVE_FILE,
+    MetricsRegistry,
+    fold_snapshots,
+    merge_snapshots,
+    running_tool,
+    timed_tool,
+)
+
+EXITED_PID = 1 << 23  # above any pid_max
+
+
+def write_job_snapshot(directory, name: str, pid: int, seconds: list[float], age=0.0):
+    registry = MetricsRegistry()
+    for value in seconds:
+        registry.histogram("turn_latency_seconds").record(value)
+    data = {
+        "pid": pid,
+        "time": time.time() - age,
+        "process": registry.snapshot(),
+        "sessions": {f"room-{name}": registry.snapshot()},
+    }
+    (directory / f"{name}.json").write_text(json.dumps(data))
+
+
+def turns(registry: MetricsRegistry) -> int:
+    return registry.histogram("turn_latency_seconds").count
+
+
+def test_fold_takes_in_exited_jobs_only(tmp_path):
+    write_job_snapshot(tmp_path, "1", EXITED_PID, [1.0, 2.0])
+    write_job_snapshot(tmp_path, "2", EXITED_PID + 1, [1.5])
+    write_job_snapshot(tmp_path, "3", os.getpid(), [0.5])
+
+    assert fold_snapshots(tmp_path) == 2
+    assert sorted(os.listdir(tmp_path)) == ["3.json", CUMULATIVE_FILE]
+    assert turns(merge_snapshots(tmp_path)) == 4
+
+    write_job_snapshot(tmp_path, "4", EXITED_PID, [3.0])
+    assert fold_snapshots(tmp_path) == 1
+    assert fold_snapshots(tmp_path) == 0
+    assert turns(merge_snapshots(tmp_path)) == 5
+
+
+def test_interrupted_fold_counts_once(tmp_path, monkeypatch):
+    write_job_snapshot(tmp_path, "1", EXITED_PID, [1.0, 2.0])
+    # the cumulative file is written, then the process dies before deleting
+    monkeypatch.setattr(os, "unlink", lambda path: None)
+    fold_snapshots(tmp_path)
+    monkeypatch.undo()
+
+    assert turns(merge_snapshots(tmp_path)) == 2
+    assert fold_snapshots(tmp_path) == 1
+    assert os.listdir(tmp_path) == [CUMULATIVE_FILE]
+    assert turns(merge_snapshots(tmp_path)) == 2
+
+
+def test_merge_leaves_out_stale_snapshots(tmp_path):
+    write_job_snapshot(tmp_path, "1", EXITED_PID, [1.0])
+    fold_snapshots(tmp_path)
+    write_job_snapshot(tmp_path, "2", os.getpid(), [1.0, 1.0])
+    write_job_snapshot(tmp_path, "3", os.getpid(), [1.0], age=600)
+
+    sessions = {}
+    merged = merge_snapshots(tmp_path, max_age=90, sessions=sessions)
+
+    assert turns(merged) == 3
+    assert list(sessions) == ["room-2"]
+    assert turns(merge_snapshots(tmp_path)) == 4
+
+
+async def test_running_tool_is_per_task():
+    loop = asyncio.get_running_loop()
+    seen = {}
+    release = asyncio.Event()
+
+    class Tools:
+        @timed_tool
+        async def save_order(self):
+            seen["save_order"] = running_tool(loop)
+            await release.wait()
+
+        @timed_tool
+        async def add_item(self):
+            seen["add_item"] = running_tool(loop)
+            await release.wait()
+
+    tools = Tools()
+    tasks = [
+        asyncio.create_task(tools.save_order()),
+        asyncio.create_task(tools.add_item()),
+    ]
+    await asyncio.sleep(0)
+    assert running_tool(loop) is None
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert seen == {"save_order": "save_order", "add_item": "add_item"}
+    assert not turn_metrics._tool_tasks
@@ -0,0 +1,38 @@
+import json
+import os
+import time
+
+from turn_metrics import MetricsRegistry
+from worker_load import LAG_METRIC, SnapshotWindow
+
+
+def write_snapshot(directory, name: str, lags: int, age: float = 0.0) -> None:
+    registry = MetricsRegistry()
+    for _ in range(lags):
+        registry.histogram(LAG_METRIC).record(0.001)
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps({"process": registry.snapshot()}))
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_window_counts_new_samples_only(tmp_path):
+    window = SnapshotWindow(str(tmp_path), (LAG_METRIC,))
+    write_snapshot(tmp_path, "100", 5)
+    assert window.read()[LAG_METRIC].count == 0  # baseline
+
+    write_snapshot(tmp_path, "100", 8)
+    write_snapshot(tmp_path, "101", 2)
+    assert window.read()[LAG_METRIC].count == 5
+
+
+def test_window_forgets_finished_jobs(tmp_path):
+    window = SnapshotWindow(str(tmp_path), (LAG_METRIC,), max_age=60)
+    for pid in range(50):
+        write_snapshot(tmp_path, str(pid), 3, age=3600)
+    write_snapshot(tmp_path, "running", 3)
+    window.read()
+
+    write_snapshot(tmp_path, "running", 4)
+    assert window.read()[LAG_METRIC].count == 1
+    assert list(window._seen) == ["running.json"]
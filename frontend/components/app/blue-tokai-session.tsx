@@ -7,10 +7,31 @@ import { useConnectionTimeout } from "@/hooks/useConnectionTimout";
 import { useDebugMode } from "@/hooks/useDebug";
 import { useVoiceAssistant, useRoomContext } from "@livekit/components-react";
 import { AnimatedGrid } from "@/components/app/animated-grid";
+import { DataDispatcher } from "@/lib/data-transport";
 import styles from './blue-tokai-session.module.css';
 
 const IN_DEVELOPMENT = process.env.NODE_ENV !== "production";
 
+// Compact receipt protocol - must match backend/src/receipts.py (sent through lib/data-transport)
+const RECEIPT_TOPIC = "blue-tokai.receipt";
+const RECEIPT_TYPE = "receipt";
+const RECEIPT_VERSION = 2;
+
+interface ReceiptItem {
+  drinkType: string;
+  size: string;
+  milk: string;
+  extras: string[];
+}
+
+interface Receipt {
+  v: number;
+  token_number: string;
+  name: string;
+  items: ReceiptItem[];
+  timestamp: string;
+}
+
 interface BlueTokaSessionProps {
   appConfig: AppConfig;
   onEndSession?: () => void;
@@ -35,16 +56,10 @@ export const BlueTokaSessionView = ({
   // Mic state for visual animation
   const [isMuted, setIsMuted] = useState(false);
   
-  // HTML bill content from backend
-  const [billHTML, setBillHTML] = useState<string>("");
-  
-  // Order history - store all completed orders
+  // Order history - store all completed orders, one entry per token
   const [orderHistory, setOrderHistory] = useState<Array<{
     name: string;
-    drinkType: string;
-    size: string;
-    milk: string;
-    extras: string[];
+    items: ReceiptItem[];
     token: string;
     timestamp: string;
   }>>([]);
@@ -94,132 +109,88 @@ export const BlueTokaSessionView = ({
     }
   }, [messages.length]);
 
-  // Helper function to extract drink details from HTML and trigger animation
-  const triggerAnimationFromHTML = (html: string) => {
-    // Extract all values: [Customer, Drink, Size, Milk]
-    const valueMatches = html.match(/<span class="value">([^<]+)<\/span>/g);
-    console.log('🔍 Found values:', valueMatches);
+  // Helper function to record a structured receipt and trigger the animation
+  const triggerAnimationFromReceipt = (receipt: Receipt) => {
+    const customerName = receipt.name || '';
+    const items = (receipt.items || []).map(item => ({
+      drinkType: item.drinkType || 'Coffee',
+      size: item.size || 'medium',
+      milk: item.milk || 'regular',
+      extras: item.extras || [],
+    }));
+    const token = receipt.token_number || '';
+    const timestamp = receipt.timestamp || new Date().toISOString();
+    // The cup animates the first drink of the order
+    const { drinkType, size, extras } = items[0] ?? { drinkType: 'Coffee', size: 'medium', extras: [] };
+    const hasWhippedCream = extras.some(extra => extra.toLowerCase().includes('whipped'));
+    const isCold = /iced|cold|frapp/.test(drinkType.toLowerCase());
+
+    console.log('📋 Receipt:', { customerName, items: items.length, drinkType, size, token });
+    console.log('🎬 Triggering animation NOW!');
+
+    // Add to order history
+    const newOrder = {
+      name: customerName,
+      items,
+      token,
+      timestamp
+    };
     
-    // Extract token number
-    const tokenMatch = html.match(/Token:\s*([A-Z0-9-]+)/);
-    const token = tokenMatch ? tokenMatch[1] : '';
+    setOrderHistory(prev => {
+      const updated = [...prev, newOrder];
+      console.log('📝 Added to order history. Total orders:', updated.length);
+      console.log('📝 Order details:', newOrder);
+      console.log('📝 Full history:', updated);
+      return updated;
+    });
     
-    // Extract timestamp
-    const timestampMatch = html.match(/Order placed:\s*([^<]+)/);
-    const timestamp = timestampMatch ? timestampMatch[1].trim() : new Date().toISOString();
+    // Reset animation state first to ensure it replays
+    setAnimationState('idle');
+    setDrinkOrder(null);
     
-    if (valueMatches && valueMatches.length >= 3) {
-      // Extract text from each match
-      const values = valueMatches.map(match => {
-        const text = match.match(/>([^<]+)</);
-        return text ? text[1].trim() : '';
-      });
-      
-      const customerName = values[0] || '';
-      const drinkType = values[1] || 'Coffee';
-      const size = values[2] || 'medium';
-      const milk = values[3] || 'regular';
-      
-      console.log('📋 Extracted:', { customerName, drinkType, size, milk, token });
-      console.log('🎬 Triggering animation NOW!');
-      
-      // Add to order history
-      const newOrder = {
-        name: customerName,
-        drinkType,
-        size,
-        milk,
-        extras: html.toLowerCase().includes('whipped') ? ['Whipped Cream'] : [],
-        token,
-        timestamp
-      };
-      
-      setOrderHistory(prev => {
-        const updated = [...prev, newOrder];
-        console.log('📝 Added to order history. Total orders:', updated.length);
-        console.log('📝 Order details:', newOrder);
-        console.log('📝 Full history:', updated);
-        return updated;
+    // Small delay to ensure state reset, then trigger new animation
+    setTimeout(() => {
+      // Trigger pouring animation
+      setDrinkOrder({
+        size: size.toLowerCase() as 'small' | 'medium' | 'large',
+        type: drinkType,
+        hasWhippedCream,
+        hasFoam: drinkType.toLowerCase().includes('latte') || drinkType.toLowerCase().includes('cappuccino'),
+        temperature: isCold ? 'cold' : 'hot',
+        price: 0
       });
       
-      // Reset animation state first to ensure it replays
-      setAnimationState('idle');
-      setDrinkOrder(null);
+      setAnimationState('pouring');
+      console.log('✅ Animation state set to: pouring');
       
-      // Small delay to ensure state reset, then trigger new animation
       setTimeout(() => {
-        // Trigger pouring animation
-        setDrinkOrder({
-          size: size.toLowerCase() as 'small' | 'medium' | 'large',
-          type: drinkType,
-          hasWhippedCream: html.toLowerCase().includes('whipped'),
-          hasFoam: drinkType.toLowerCase().includes('latte') || drinkType.toLowerCase().includes('cappuccino'),
-          temperature: html.toLowerCase().includes('iced') || html.toLowerCase().includes('cold') ? 'cold' : 'hot',
-          price: 0
-        });
-        
-        setAnimationState('pouring');
-        console.log('✅ Animation state set to: pouring');
-        
-        setTimeout(() => {
-          setAnimationState('ready');
-          console.log('✅ Animation state set to: ready');
-        }, 2500);
-      }, 50);
-    } else {
-      console.log('⚠️ Not enough values in HTML. Found:', valueMatches?.length);
-    }
+        setAnimationState('ready');
+        console.log('✅ Animation state set to: ready');
+      }, 2500);
+    }, 50);
   };
 
-  // Listen for data messages (HTML receipts)
+  // Route agent data messages by topic; only receipts are handled here
   useEffect(() => {
-    const handleDataReceived = (payload: Uint8Array, participant: any) => {
-      console.log('📦 Data message received from:', participant?.identity);
-      const message = new TextDecoder().decode(payload);
-      console.log('📦 Data message length:', message.length);
-      console.log('📦 Data message preview:', message.substring(0, 200));
-      
-      const htmlMatch = message.match(/HTML_SNIPPET:([\s\S]*?)END_HTML_SNIPPET/);
-      if (htmlMatch) {
-        const html = htmlMatch[1].trim();
-        setBillHTML(html);
-        console.log('✅ Bill HTML received via data message, length:', html.length);
-        console.log('🎬 Triggering animation from HTML');
-        triggerAnimationFromHTML(html);
-      } else {
-        console.log('⚠️ No HTML_SNIPPET found in data message');
-        console.log('⚠️ Message content:', message);
+    const dispatcher = new DataDispatcher();
+    dispatcher.on<Receipt>(RECEIPT_TOPIC, RECEIPT_TYPE, (receipt, participant) => {
+      console.log('📦 Receipt received from:', participant?.identity, 'token:', receipt.token_number);
+      if (receipt.v !== RECEIPT_VERSION) {
+        console.log('⚠️ Unsupported receipt version:', receipt.v);
+        return;
       }
-    };
+      triggerAnimationFromReceipt(receipt);
+    });
 
-    console.log('📡 Setting up data message listener on room:', room.name);
-    room.on('dataReceived', handleDataReceived);
+    console.log('📡 Setting up data message dispatcher on room:', room.name);
+    const detach = dispatcher.attach(room);
     
     return () => {
-      console.log('🔌 Removing data message listener');
-      room.off('dataReceived', handleDataReceived);
+      console.log('🔌 Removing data message dispatcher');
+      detach();
     };
   }, [room]);
 
-  // Extract HTML bill from messages (fallback method)
-  useEffect(() => {
-    const lastMessage = messages.at(-1);
-    if (lastMessage?.message) {
-      const msg = lastMessage.message;
-      
-      console.log('📨 New message received, checking for HTML...');
-      
-      // Extract HTML bill if present (fallback method)
-      const htmlMatch = msg.match(/HTML_SNIPPET:(.*?)END_HTML_SNIPPET/);
-      if (htmlMatch) {
-        const html = htmlMatch[1].trim();
-        setBillHTML(html);
-        console.log('✅ Bill HTML received via chat message (fallback)');
-        triggerAnimationFromHTML(html);
-      }
-    }
-  }, [messages]);
-
   // Toggle mic mute - reuses existing LiveKit handler
   const handleMicToggle = async () => {
     try {
@@ -244,7 +215,6 @@ export const BlueTokaSessionView = ({
       // Reset UI state
       setMode("welcome");
       setDrinkOrder(null);
-      setBillHTML("");
       setAnimationState('idle');
       
       // Disconnect and reconnect to restart the agent conversation
@@ -413,24 +383,30 @@ export const BlueTokaSessionView = ({
                         <span className={styles.orderLabel}>Customer:</span>
                         <span className={styles.orderValue}>{order.name}</span>
                       </div>
-                      <div className={styles.orderRow}>
-                        <span className={styles.orderLabel}>Drink:</span>
-                        <span className={styles.orderValue}>{order.drinkType}</span>
-                      </div>
-                      <div className={styles.orderRow}>
-                        <span className={styles.orderLabel}>Size:</span>
-                        <span className={styles.orderValue}>{order.size}</span>
-                      </div>
-                      <div className={styles.orderRow}>
-                        <span className={styles.orderLabel}>Milk:</span>
-                        <span className={styles.orderValue}>{order.milk}</span>
-                      </div>
-                      {order.extras.length > 0 && (
-                        <div className={styles.orderRow}>
-                          <span className={styles.orderLabel}>Extras:</span>
-                          <span className={styles.orderValue}>{order.extras.join(', ')}</span>
-                        </div>
-                      )}
+                      {order.items.map((item, itemIndex) => (
+                        <React.Fragment key={itemIndex}>
+                          <div className={styles.orderRow}>
+                            <span className={styles.orderLabel}>
+                              {order.items.length > 1 ? `Drink ${itemIndex + 1}:` : 'Drink:'}
+                            </span>
+                            <span className={styles.orderValue}>{item.drinkType}</span>
+                          </div>
+                          <div className={styles.orderRow}>
+                            <span className={styles.orderLabel}>Size:</span>
+                            <span className={styles.orderValue}>{item.size}</span>
+                          </div>
+                          <div className={styles.orderRow}>
+                            <span className={styles.orderLabel}>Milk:</span>
+                            <span className={styles.orderValue}>{item.milk}</span>
+                          </div>
+                          {item.extras.length > 0 && (
+                            <div className={styles.orderRow}>
+                              <span className={styles.orderLabel}>Extras:</span>
+                              <span className={styles.orderValue}>{item.extras.join(', ')}</span>
+                            </div>
+                          )}
+                        </React.Fragment>
+                      ))}
                     </div>
                     
                     <div className={styles.orderCardFooter}>
@@ -0,0 +1,136 @@
+import type { RemoteParticipant, Room } from 'livekit-client';
+
+// Wire format - must match backend/src/transport.py
+const WIRE_VERSION = 1;
+const FLAG_DEFLATE = 0x01;
+const FLAG_CHUNKED = 0x02;
+const HEADER_BYTES = 2;
+const CHUNK_HEADER_BYTES = 10;
+// Parts of a message that stop arriving are dropped after this long
+const PARTIAL_TIMEOUT_MS = 10_000;
+
+export type MessageHandler<T = unknown> = (data: T, participant?: RemoteParticipant) => void;
+
+interface PartialMessage {
+  startedAt: number;
+  parts: (Uint8Array | undefined)[];
+  received: number;
+}
+
+async function inflate(body: Uint8Array): Promise<Uint8Array> {
+  // zlib.compress output is what DecompressionStream calls "deflate"
+  const stream = new Blob([body as BlobPart]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+}
+
+function concat(parts: Uint8Array[]): Uint8Array {
+  const out = new Uint8Array(parts.reduce((size, part) => size + part.length, 0));
+  let offset = 0;
+  for (const part of parts) {
+    out.set(part, offset);
+    offset += part.length;
+  }
+  return out;
+}
+
+/**
+ * Routes agent messages by topic and envelope type, reassembling chunked
+ * messages and inflating compressed ones. Packets on topics nobody listens
+ * to are ignored without being decoded.
+ */
+export class DataDispatcher {
+  private handlers = new Map<string, Map<string, Set<MessageHandler>>>();
+  private partials = new Map<string, PartialMessage>();
+  private decoder = new TextDecoder();
+  // packets are handled one after another, so inflating one never reorders messages
+  private queue: Promise<void> = Promise.resolve();
+
+  on<T>(topic: string, type: string, handler: MessageHandler<T>): () => void {
+    let types = this.handlers.get(topic);
+    if (!types) {
+      types = new Map();
+      this.handlers.set(topic, types);
+    }
+    const set = types.get(type) ?? new Set();
+    types.set(type, set);
+    set.add(handler as MessageHandler);
+    return () => {
+      set.delete(handler as MessageHandler);
+    };
+  }
+
+  attach(room: Room): () => void {
+    const listener = (
+      payload: Uint8Array,
+      participant?: RemoteParticipant,
+      _kind?: unknown,
+      topic?: string
+    ) => {
+      this.queue = this.queue
+        .then(() => this.handlePacket(payload, participant, topic))
+        .catch((error) => console.error('❌ Failed to decode data message on', topic, error));
+    };
+    room.on('dataReceived', listener);
+    return () => {
+      room.off('dataReceived', listener);
+    };
+  }
+
+  async handlePacket(payload: Uint8Array, participant?: RemoteParticipant, topic?: string) {
+    const types = topic ? this.handlers.get(topic) : undefined;
+    if (!types || payload.length < HEADER_BYTES) {
+      return;
+    }
+    const version = payload[0];
+    const flags = payload[1];
+    if (version !== WIRE_VERSION) {
+      console.log('⚠️ Unsupported wire version on', topic, version);
+      return;
+    }
+
+    let body: Uint8Array | undefined = payload.subarray(HEADER_BYTES);
+    if (flags & FLAG_CHUNKED) {
+      body = this.reassemble(payload, participant?.identity ?? '');
+      if (!body) {
+        return;
+      }
+    }
+    if (flags & FLAG_DEFLATE) {
+      body = await inflate(body);
+    }
+
+    const envelope = JSON.parse(this.decoder.decode(body)) as { type: string; data: unknown };
+    types.get(envelope.type)?.forEach((handler) => handler(envelope.data, participant));
+  }
+
+  private reassemble(packet: Uint8Array, sender: string): Uint8Array | undefined {
+    const view = new DataView(packet.buffer, packet.byteOffset, packet.byteLength);
+    const messageId = view.getUint32(2);
+    const index = view.getUint16(6);
+    const count = view.getUint16(8);
+
+    const now = Date.now();
+    for (const [key, partial] of this.partials) {
+      if (now - partial.startedAt > PARTIAL_TIMEOUT_MS) {
+        this.partials.delete(key);
+      }
+    }
+
+    const key = `${sender}:${messageId}`;
+    let partial = this.partials.get(key);
+    if (!partial) {
+      partial = { startedAt: now, parts: new Array(count), received: 0 };
+      this.partials.set(key, partial);
+    }
+    if (!partial.parts[index]) {
+      // copy: the packet's buffer is not ours to keep
+      partial.parts[index] = packet.slice(CHUNK_HEADER_BYTES);
+      partial.received += 1;
+    }
+    if (partial.received < count) {
+      return undefined;
+    }
+    this.partials.delete(key);
+    return concat(partial.parts as Uint8Array[]);
+  }
+}